@@ -0,0 +1,24 @@
+"""
+Offline benchmarks for Check-IA.
+
+Run from the repository root, e.g.:
+
+    python -m benchmarks.supabase_upload_overhead
+    python -m benchmarks.end_to_end --requests 50 --concurrency 8
+    python -m benchmarks.llm_batching --claims 40 --batch-size 5
+"""
+
+import os
+
+
+def setup_django():
+    """Configure Django with the test settings so benchmarks need no real services."""
+    os.environ.setdefault("DJANGO_SECRET_KEY", "benchmark-secret-key")
+    os.environ.setdefault("DB_HOST", "localhost")
+    os.environ.setdefault("SUPABASE_URL", "https://benchmark.supabase.co")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "benchmark-anon-key")
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings_test")
+
+    import django
+
+    django.setup()
@@ -0,0 +1,228 @@
+"""
+End-to-end load benchmark with every external API replaced by a local fake.
+
+Requests go through the real URL routing, middleware, authentication, views
+and Celery tasks (run eagerly, so a request's latency includes its task) into
+the fake Perplexity, OpenRouter, Google Translate, Sightengine, Supabase and
+Bambara servers of benchmarks.fake_services. Data is written to a throwaway
+SQLite database.
+
+Each endpoint is loaded in turn with --requests requests over --concurrency
+threads; the report gives throughput and p50/p95/p99 latency per endpoint,
+then the calls and injected failures seen by each fake.
+
+    python -m benchmarks.end_to_end --requests 50 --concurrency 8
+    python -m benchmarks.end_to_end --endpoints submissions,detect-ai-image \\
+        --latency-scale 0.1 --latency openrouter=2000:5000 --errors perplexity=0.05
+
+The submissions endpoint runs the RoBERTa classifier: its weights must be in
+the local Hugging Face cache (run once online, then HF_HUB_OFFLINE=1).
+"""
+
+import argparse
+import io
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import setup_django
+from benchmarks.fake_services import DEFAULT_PROFILES, FakeServices, LatencyProfile
+
+logger = logging.getLogger(__name__)
+
+
+def _image(name):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from PIL import Image
+
+    # Random noise: every upload has new bytes, so none is deduplicated
+    buffer = io.BytesIO()
+    Image.effect_noise((512, 384), 64).convert("RGB").save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+def _submission(client, i):
+    return client.post(
+        "/api/submissions/",
+        {"texte": f"Le Mali a remporté la Coupe d'Afrique des nations de football en {1990 + i % 35}."},
+        content_type="application/json",
+    )
+
+
+def _verify_image_content(client, i):
+    return client.post(
+        "/api/verify-image-content/",
+        {"image": _image(f"content-{i}.png"), "claim_text": "Cette photo a été prise à Bamako hier."},
+    )
+
+
+def _detect_ai_image(client, i):
+    return client.post("/api/detect-ai-image/", {"image": _image(f"detect-{i}.png")})
+
+
+def _image_verifications(client, i):
+    return client.get("/api/image-verifications/")
+
+
+def _bambara_translate(client, i):
+    return client.post(
+        "/api/bambara/translate/",
+        {"text": "I ni ce", "source_lang": "bm", "target_lang": "fr"},
+        content_type="application/json",
+    )
+
+
+ENDPOINTS = {
+    "submissions": ("POST /api/submissions/", _submission),
+    "verify-image-content": ("POST /api/verify-image-content/", _verify_image_content),
+    "detect-ai-image": ("POST /api/detect-ai-image/", _detect_ai_image),
+    "image-verifications": ("GET /api/image-verifications/", _image_verifications),
+    "bambara-translate": ("POST /api/bambara/translate/", _bambara_translate),
+}
+
+
+def _parse_overrides(values, parse):
+    overrides = {}
+    for value in values or []:
+        name, _, setting = value.partition("=")
+        if name not in DEFAULT_PROFILES:
+            raise SystemExit(f"Unknown service {name!r} (choose from {', '.join(DEFAULT_PROFILES)})")
+        overrides[name] = parse(setting)
+    return overrides
+
+
+def _profiles(args):
+    latencies = _parse_overrides(args.latency, lambda v: [float(ms) for ms in v.split(":")])
+    errors = _parse_overrides(args.errors, float)
+    profiles = {}
+    for name, (median_ms, p95_ms) in DEFAULT_PROFILES.items():
+        if name in latencies:
+            median_ms, p95_ms = latencies[name][0], (latencies[name][1:] or [None])[0]
+        profiles[name] = LatencyProfile(
+            median_ms, p95_ms, error_rate=errors.get(name, 0.0), scale=args.latency_scale
+        )
+    return profiles
+
+
+def _use_benchmark_database(path):
+    """Point Django at a file SQLite database (shared by all threads) and migrate it."""
+    from django.conf import settings
+    from django.core.management import call_command
+
+    settings.DATABASES["default"].update(
+        NAME=path,
+        OPTIONS={"timeout": 30, "transaction_mode": "IMMEDIATE", "init_command": "PRAGMA journal_mode=WAL;"},
+    )
+    call_command("migrate", verbosity=0)
+
+
+def _percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _run_endpoint(call, requests, concurrency):
+    from django.db import connections
+    from django.test import Client
+
+    local = threading.local()
+    clients = []
+
+    def one(i):
+        if not hasattr(local, "client"):
+            local.client = Client(
+                SERVER_NAME="localhost",
+                headers={"Authorization": f"Bearer benchmark-user-{len(clients)}"},
+            )
+            clients.append(local.client)
+        start = time.perf_counter()
+        try:
+            status = call(local.client, i).status_code
+        except Exception:
+            logger.exception(f"Request {i} raised")
+            status = None
+        finally:
+            connections.close_all()
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - start
+
+    latencies = sorted(elapsed * 1000 for elapsed, _ in results)
+    errors = sum(1 for _, status in results if status is None or status >= 400)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": requests / wall if wall else 0.0,
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "p99_ms": _percentile(latencies, 99),
+        "max_ms": latencies[-1] if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS),
+                        help=f"Comma-separated endpoints to load (default: all of {', '.join(ENDPOINTS)})")
+    parser.add_argument("--requests", type=int, default=30, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent clients")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiplier applied to every fake API latency (e.g. 0.1 for a quick run)")
+    parser.add_argument("--latency", action="append", metavar="SERVICE=MEDIAN_MS[:P95_MS]",
+                        help="Override a fake API's latency distribution (repeatable)")
+    parser.add_argument("--errors", action="append", metavar="SERVICE=RATE",
+                        help="Share of a fake API's calls that fail, 0-1 (repeatable)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep the application's INFO logs")
+    args = parser.parse_args()
+
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+    if not args.verbose:
+        logging.disable(logging.INFO)  # The pipeline logs every step at INFO
+
+    with FakeServices(_profiles(args)) as fakes, tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(fakes.environment())
+        setup_django()
+        fakes.route_google_translate()
+        _use_benchmark_database(os.path.join(tmp, "benchmark.sqlite3"))
+
+        results = {}
+        for name in endpoints:
+            label, call = ENDPOINTS[name]
+            _run_endpoint(call, 1, 1)  # Warm-up: imports, model load, bucket check
+            results[label] = _run_endpoint(call, args.requests, args.concurrency)
+
+        print(f"\n{args.requests} requests per endpoint, concurrency {args.concurrency}, "
+              f"latency scale {args.latency_scale}\n")
+        print(f"{'endpoint':<36} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for label, result in results.items():
+            print(f"{label:<36} {result['errors']:>6} {result['throughput_rps']:>8.2f} "
+                  f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+
+        counters = fakes.counters()
+        print(f"\n{'fake API':<12} {'calls':>6} {'failed':>6}")
+        for service, counter in counters.items():
+            print(f"{service:<12} {counter['requests']:>6} {counter['errors']:>6}")
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as output:
+                json.dump({"endpoints": results, "fake_apis": counters, "args": vars(args)}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
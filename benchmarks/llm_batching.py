@@ -0,0 +1,107 @@
+"""
+Tokens and wall time per claim: one LLM call per claim vs batched calls.
+
+Each claim comes with its own Perplexity summary and web sources, as in the
+pipeline. The single mode calls llm_analysis() once per claim; the batched
+mode sends --batch-size claims per llm_analysis_batch() call, so the system
+instructions are paid once per batch. Calls go to the fake OpenRouter of
+benchmarks.fake_services, which estimates usage from the request and answer
+sizes and spends --ms-per-token per completion token after a latency of
+--latency-ms (median).
+
+    python -m benchmarks.llm_batching --claims 40 --batch-size 5
+    python -m benchmarks.llm_batching --claims 40 --batch-size 10 --latency-ms 1500 --ms-per-token 10
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from benchmarks import setup_django
+from benchmarks.fake_services import FakeServices, LatencyProfile
+
+
+def _claims(count, sources):
+    return [
+        {
+            "translated_text": f"The national team won match number {i} of the 2026 qualifiers by {i % 4} goals.",
+            "initial_result": "vérifié" if i % 2 else "rejeté",
+            "web_sources": [
+                {
+                    "title": f"Match report {i}.{n}",
+                    "link": f"https://news.example.org/claim-{i}/source-{n}",
+                    "date": "2026-03-14",
+                    "snippet": f"Report {n} on match {i}: the score, the scorers and the attendance are detailed. "
+                               f"Officials confirmed the result of game {i} after review number {n}.",
+                }
+                for n in range(1, sources + 1)
+            ],
+            "perplexity_verification": f"Several outlets covered match {i}. The final score was confirmed by "
+                                       f"the federation on the following day, and game {i} statistics agree.",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def _run(claims, batch_size):
+    from core.services import llm
+
+    usages = []
+    start = time.perf_counter()
+    if batch_size <= 1:
+        for claim in claims:
+            llm.llm_analysis(
+                claim["translated_text"], claim["initial_result"], claim["web_sources"],
+                claim["perplexity_verification"], on_usage=usages.append,
+            )
+    else:
+        for i in range(0, len(claims), batch_size):
+            llm.llm_analysis_batch(claims[i:i + batch_size], on_usage=usages.append)
+    return usages, (time.perf_counter() - start) * 1000
+
+
+def _report(label, claims, usages, elapsed_ms):
+    prompt = sum(usage["prompt_tokens"] for usage in usages)
+    completion = sum(usage["completion_tokens"] for usage in usages)
+    latencies = [usage["latency_ms"] for usage in usages]
+    print(
+        f"{label:<16} {len(usages):4d} calls   per claim: prompt {prompt / claims:7.1f} tok   "
+        f"completion {completion / claims:6.1f} tok   wall {elapsed_ms / claims:7.1f} ms   "
+        f"(call p50 {statistics.median(latencies):7.1f} ms)"
+    )
+    return prompt + completion, elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--sources", type=int, default=5, help="Web sources per claim")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Median OpenRouter time to first token")
+    parser.add_argument("--ms-per-token", type=float, default=5.0, help="Simulated generation time per output token")
+    args = parser.parse_args()
+
+    profiles = {"openrouter": LatencyProfile(args.latency_ms, args.latency_ms * 2)}
+    with FakeServices(profiles) as fakes:
+        fakes.services["openrouter"].seconds_per_output_token = args.ms_per_token / 1000
+        os.environ.update(fakes.environment())
+        setup_django()
+        import logging
+        logging.disable(logging.WARNING)
+
+        claims = _claims(args.claims, args.sources)
+        single = _run(claims, 1)
+        batched = _run(claims, args.batch_size)
+
+    print(f"{args.claims} claims, {args.sources} sources each, batches of {args.batch_size}")
+    single_tokens, single_ms = _report("single calls", args.claims, *single)
+    batched_tokens, batched_ms = _report(f"batches of {args.batch_size}", args.claims, *batched)
+    print(
+        f"tokens saved: {100 * (1 - batched_tokens / single_tokens):.1f}%   "
+        f"wall time saved: {100 * (1 - batched_ms / single_ms):.1f}%"
+    )
+
+
+if __name__ == "__main__":
+    main()
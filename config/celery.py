@@ -3,6 +3,7 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from celery.signals import worker_init, before_task_publish, task_prerun, task_postrun, task_retry
 from django.conf import settings
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
@@ -11,6 +12,47 @@ app = Celery('config')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
 
+@worker_init.connect
+def start_metrics_exporter(**kwargs):
+    # Workers have no HTTP server: expose their metrics on a dedicated port
+    from core.metrics import start_worker_exporter
+    start_worker_exporter(settings.WORKER_METRICS_PORT)
+
+@worker_init.connect
+def name_worker_traces(**kwargs):
+    from core import tracing
+    tracing.set_service_name(f"{settings.TRACING_SERVICE_NAME}-worker")
+
+# Trace context propagation through task message headers
+@before_task_publish.connect
+def inject_trace_headers(**kwargs):
+    from core import tracing
+    tracing.inject_task_headers(**kwargs)
+
+@task_prerun.connect
+def start_task_trace(**kwargs):
+    from core import tracing
+    tracing.start_task_span(**kwargs)
+
+@task_postrun.connect
+def end_task_trace(**kwargs):
+    from core import tracing
+    tracing.end_task_span(**kwargs)
+
+# Fair-share queue: a finished task chain frees its slot for the next user's task
+# (a task waiting for its retry keeps it)
+@task_postrun.connect
+def release_fair_queue_slot(task_id=None, kwargs=None, retval=None, state=None, **extra):
+    if state == 'RETRY':
+        return
+    from core.services.fair_queue import release_finished
+    release_finished(task_id, kwargs, retval)
+
+@task_retry.connect
+def count_task_retry(sender=None, reason=None, **kwargs):
+    from core import metrics
+    metrics.record_task_retry(sender.name, getattr(reason, 'provider', type(reason).__name__))
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
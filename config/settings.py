@@ -2,6 +2,8 @@
 
 from pathlib import Path
 import os
+from celery.schedules import crontab
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -24,6 +26,7 @@ INSTALLED_APPS = [
 
 # Middleware pour gérer les requêtes
 MIDDLEWARE = [
+    'core.middleware.TracingMiddleware',  # First, so the span covers the whole request
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -38,6 +41,9 @@ if _cors_origins == '*':
     CORS_ALLOW_ALL_ORIGINS = True
 else:
     CORS_ALLOWED_ORIGINS = _cors_origins.split(',')
+# Clé d'idempotence des requêtes de vérification (voir core/services/idempotency.py)
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'Retry-After']
 
 ROOT_URLCONF = 'config.urls'
 
@@ -82,6 +88,127 @@ BAMBARA_API_BASE_URL = os.getenv('BAMBARA_API_BASE_URL', '')
 BAMBARA_API_KEY = os.getenv('BAMBARA_API_KEY', '')
 BAMBARA_API_TIMEOUT = int(os.getenv('BAMBARA_API_TIMEOUT', '60'))
 
+# Batch image verification
+IMAGE_BATCH_MAX_FILES = int(os.getenv('IMAGE_BATCH_MAX_FILES', '50'))
+IMAGE_BATCH_CONCURRENCY = int(os.getenv('IMAGE_BATCH_CONCURRENCY', '4'))
+
+# Bulk claim import (CSV/NDJSON): claims per file, rows inserted and queued per chunk
+CLAIM_IMPORT_MAX_CLAIMS = int(os.getenv('CLAIM_IMPORT_MAX_CLAIMS', '1000'))
+CLAIM_IMPORT_CHUNK_SIZE = int(os.getenv('CLAIM_IMPORT_CHUNK_SIZE', '100'))
+
+# Redis (progress events) and server-sent events
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '2'))
+PROGRESS_EVENTS_TTL = int(os.getenv('PROGRESS_EVENTS_TTL', '3600'))
+PROGRESS_SSE_KEEPALIVE = int(os.getenv('PROGRESS_SSE_KEEPALIVE', '15'))
+PROGRESS_SSE_MAX_DURATION = int(os.getenv('PROGRESS_SSE_MAX_DURATION', '600'))
+# Stream the LLM explanation to progress subscribers while it is generated
+LLM_STREAM_EXPLANATIONS = os.getenv('LLM_STREAM_EXPLANATIONS', 'True').lower() == 'true'
+PROGRESS_TOKEN_FLUSH_INTERVAL = float(os.getenv('PROGRESS_TOKEN_FLUSH_INTERVAL', '0.1'))
+
+# Per-user rate limit of the endpoints launching verifications (token bucket:
+# PER_MINUTE refill, BURST capacity; 0 per minute disables it)
+RATE_LIMIT_VERIFICATIONS_PER_MINUTE = int(os.getenv('RATE_LIMIT_VERIFICATIONS_PER_MINUTE', '10'))
+RATE_LIMIT_VERIFICATIONS_BURST = int(os.getenv('RATE_LIMIT_VERIFICATIONS_BURST', '20'))
+# Image batches have their own bucket, at least as large as a full batch
+RATE_LIMIT_IMAGE_BATCHES_PER_MINUTE = int(os.getenv('RATE_LIMIT_IMAGE_BATCHES_PER_MINUTE', '10'))
+RATE_LIMIT_IMAGE_BATCHES_BURST = max(
+    int(os.getenv('RATE_LIMIT_IMAGE_BATCHES_BURST', str(IMAGE_BATCH_MAX_FILES))), IMAGE_BATCH_MAX_FILES
+)
+# Imported claims have their own bucket, sized for newsroom files
+RATE_LIMIT_CLAIM_IMPORTS_PER_MINUTE = int(os.getenv('RATE_LIMIT_CLAIM_IMPORTS_PER_MINUTE', '10'))
+RATE_LIMIT_CLAIM_IMPORTS_BURST = int(os.getenv('RATE_LIMIT_CLAIM_IMPORTS_BURST', '1000'))
+
+# Fair-share dispatch: verification tasks wait in per-user queues and are sent
+# to Celery round-robin, at most MAX_IN_FLIGHT at a time (0 sends directly)
+FAIR_QUEUE_MAX_IN_FLIGHT = int(os.getenv('FAIR_QUEUE_MAX_IN_FLIGHT', '8'))
+FAIR_QUEUE_SLOT_TIMEOUT = int(os.getenv('FAIR_QUEUE_SLOT_TIMEOUT', '600'))
+
+# Idempotency: responses replayed for a repeated Idempotency-Key header, and
+# lifetime of the claim that lets one delivery of a task run its external calls
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', '86400'))
+IDEMPOTENCY_RUN_TTL = int(os.getenv('IDEMPOTENCY_RUN_TTL', '900'))
+# Claim of a key while an image batch request uploads its files (up to IMAGE_BATCH_MAX_FILES)
+IDEMPOTENCY_BATCH_PENDING_TTL = int(os.getenv('IDEMPOTENCY_BATCH_PENDING_TTL', '1800'))
+
+# Perplexity search cache (Redis) lifetime in seconds by kind of claim:
+# news-style, scientific/historical, and the rest (0 disables a tier)
+PERPLEXITY_CACHE_TTL_BREAKING = int(os.getenv('PERPLEXITY_CACHE_TTL_BREAKING', '3600'))
+PERPLEXITY_CACHE_TTL_DEFAULT = int(os.getenv('PERPLEXITY_CACHE_TTL_DEFAULT', '86400'))
+PERPLEXITY_CACHE_TTL_EVERGREEN = int(os.getenv('PERPLEXITY_CACHE_TTL_EVERGREEN', '2592000'))
+
+# Retries of tasks hit by a transient provider failure: longest wait between
+# two attempts (keep it below FAIR_QUEUE_SLOT_TIMEOUT)
+TASK_RETRY_BACKOFF_MAX = int(os.getenv('TASK_RETRY_BACKOFF_MAX', '300'))
+
+# Circuit breakers of the external providers (Perplexity, OpenRouter): open
+# when, over WINDOW seconds and at least MIN_CALLS calls, the share of failed
+# calls or of calls slower than SLOW_CALL_SECONDS reaches its rate; probe
+# again after OPEN_SECONDS
+CIRCUIT_BREAKER_WINDOW = int(os.getenv('CIRCUIT_BREAKER_WINDOW', '60'))
+CIRCUIT_BREAKER_BUCKET_SECONDS = int(os.getenv('CIRCUIT_BREAKER_BUCKET_SECONDS', '10'))
+CIRCUIT_BREAKER_MIN_CALLS = int(os.getenv('CIRCUIT_BREAKER_MIN_CALLS', '5'))
+CIRCUIT_BREAKER_FAILURE_RATE = float(os.getenv('CIRCUIT_BREAKER_FAILURE_RATE', '0.5'))
+CIRCUIT_BREAKER_SLOW_RATE = float(os.getenv('CIRCUIT_BREAKER_SLOW_RATE', '0.5'))
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS = float(os.getenv('CIRCUIT_BREAKER_SLOW_CALL_SECONDS', '20'))
+CIRCUIT_BREAKER_OPEN_SECONDS = int(os.getenv('CIRCUIT_BREAKER_OPEN_SECONDS', '30'))
+# Degraded verdicts (LLM unavailable) keep the classifier's label only above this confidence
+DEGRADED_MIN_CONFIDENCE = float(os.getenv('DEGRADED_MIN_CONFIDENCE', '0.9'))
+
+# LLM cost accounting: USD per million (prompt, completion) tokens, as JSON
+# {"model": [prompt, completion]}, merged over the built-in OpenRouter prices
+LLM_PRICES = os.getenv('LLM_PRICES', '{}')
+
+# Fact-check prompt budgets (estimated tokens): Perplexity summary, and web
+# source snippets shared between the sources
+LLM_PROMPT_SUMMARY_TOKEN_BUDGET = int(os.getenv('LLM_PROMPT_SUMMARY_TOKEN_BUDGET', '600'))
+LLM_PROMPT_SOURCES_TOKEN_BUDGET = int(os.getenv('LLM_PROMPT_SOURCES_TOKEN_BUDGET', '1200'))
+
+# Output tokens allowed for a fact-check verdict (structured JSON answer)
+LLM_FACT_CHECK_MAX_TOKENS = int(os.getenv('LLM_FACT_CHECK_MAX_TOKENS', '400'))
+
+# Batched fact-checks of bulk imports: claims per LLM call (1 disables
+# batching) and output tokens allowed per claim of a batch
+LLM_BATCH_SIZE = int(os.getenv('LLM_BATCH_SIZE', '5'))
+LLM_BATCH_MAX_TOKENS_PER_CLAIM = int(os.getenv('LLM_BATCH_MAX_TOKENS_PER_CLAIM', '400'))
+
+# Verdicts of claims citing a source domain before its history is shown in
+# the fact-check prompt
+DOMAIN_RELIABILITY_MIN_VERDICTS = int(os.getenv('DOMAIN_RELIABILITY_MIN_VERDICTS', '5'))
+
+# Nightly re-verification (Celery beat, at REVERIFY_HOUR UTC): undetermined
+# submissions younger than UNDETERMINED_MAX_AGE_DAYS and not re-checked for
+# UNDETERMINED_INTERVAL_DAYS, and facts not verified for FACT_MAX_AGE_DAYS.
+# Each run handles at most MAX_CLAIMS claims (one Perplexity search each) in
+# CONCURRENCY parallel chunks and stops at BUDGET_USD of estimated cost: LLM
+# tokens plus SEARCH_COST_USD per Perplexity search. A claim is only started
+# if the search and the average LLM cost of the chunk (LLM_COST_USD before
+# the first claim) still fit (MAX_CLAIMS = 0 disables the run)
+REVERIFY_HOUR = int(os.getenv('REVERIFY_HOUR', '3'))
+REVERIFY_MAX_CLAIMS = int(os.getenv('REVERIFY_MAX_CLAIMS', '200'))
+REVERIFY_CONCURRENCY = int(os.getenv('REVERIFY_CONCURRENCY', '2'))
+REVERIFY_BUDGET_USD = float(os.getenv('REVERIFY_BUDGET_USD', '1.0'))
+REVERIFY_SEARCH_COST_USD = float(os.getenv('REVERIFY_SEARCH_COST_USD', '0.006'))
+REVERIFY_LLM_COST_USD = float(os.getenv('REVERIFY_LLM_COST_USD', '0.002'))
+REVERIFY_PAGE_SIZE = int(os.getenv('REVERIFY_PAGE_SIZE', '100'))
+REVERIFY_UNDETERMINED_INTERVAL_DAYS = int(os.getenv('REVERIFY_UNDETERMINED_INTERVAL_DAYS', '1'))
+REVERIFY_UNDETERMINED_MAX_AGE_DAYS = int(os.getenv('REVERIFY_UNDETERMINED_MAX_AGE_DAYS', '30'))
+REVERIFY_FACT_MAX_AGE_DAYS = int(os.getenv('REVERIFY_FACT_MAX_AGE_DAYS', '90'))
+
+# Prometheus metrics: /metrics on the web process (bearer token required,
+# closed while unset),
+# separate exporter port on Celery workers (0 disables it)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+WORKER_METRICS_PORT = int(os.getenv('WORKER_METRICS_PORT', '0'))
+
+# Distributed tracing: '' (disabled), 'otlp' (OTLP/HTTP JSON collector) or 'file' (JSON lines)
+TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', '')
+TRACING_OTLP_ENDPOINT = os.getenv('TRACING_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+TRACING_FILE = os.getenv('TRACING_FILE', 'traces.jsonl')
+TRACING_SERVICE_NAME = os.getenv('TRACING_SERVICE_NAME', 'check-ia')
+TRACING_FLUSH_INTERVAL = float(os.getenv('TRACING_FLUSH_INTERVAL', '2'))
+TRACING_MAX_QUEUE = int(os.getenv('TRACING_MAX_QUEUE', '10000'))
+
 
 # Configuration internationale
 LANGUAGE_CODE = 'en-us'
@@ -125,7 +252,30 @@ LOGGING = {
 }
 
 # Configuration de Celery
-CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', REDIS_URL)
 CELERY_ACCEPT_CONTENT = ['json']
-CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', REDIS_URL)
 CELERY_TASK_SERIALIZER = 'json'
+
+# Files de workers : les étapes CPU (RoBERTa, spaCy) sur CELERY_CPU_QUEUE,
+# servie par un worker prefork dimensionné au nombre de cœurs ; les appels
+# réseau (traduction, Perplexity, OpenRouter, Supabase) sur la file par défaut,
+# servie par un worker à threads très concurrent (voir Procfile). La file
+# réseau garde le nom historique "celery", où attendent les messages déjà
+# publiés par les versions précédentes
+CELERY_TASK_DEFAULT_QUEUE = os.getenv('CELERY_IO_QUEUE', 'celery')
+CELERY_CPU_QUEUE = os.getenv('CELERY_CPU_QUEUE', 'cpu')
+CELERY_TASK_ROUTES = {
+    'core.tasks.classify_submission_task': {'queue': CELERY_CPU_QUEUE},
+    'core.tasks.classify_submission_batch_task': {'queue': CELERY_CPU_QUEUE},
+    'core.tasks.extract_fact_keywords_task': {'queue': CELERY_CPU_QUEUE},
+    'core.tasks.classify_reverification_task': {'queue': CELERY_CPU_QUEUE},
+}
+
+# Tâches périodiques (processus celery beat, voir Procfile)
+CELERY_BEAT_SCHEDULE = {
+    'reverify-stale-verdicts': {
+        'task': 'core.tasks.reverify_stale_verdicts_task',
+        'schedule': crontab(hour=REVERIFY_HOUR, minute=0),
+    },
+}
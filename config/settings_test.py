@@ -21,3 +21,6 @@ DATABASES = {
 # Run Celery tasks synchronously during tests
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
+
+# No Redis in CI: progress events are disabled unless a test provides a client
+REDIS_URL = ''
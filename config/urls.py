@@ -15,11 +15,12 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.urls import path, include
-from core.views import home, supabase_login, supabase_register, supabase_logout, supabase_user
+from core.views import home, metrics_view, supabase_login, supabase_register, supabase_logout, supabase_user
 
 urlpatterns = [
     path('', home, name='home'),
     path('api/', include('core.urls')),
+    path('metrics', metrics_view, name='metrics'),
     # Supabase auth endpoints
     path('api/auth/login/', supabase_login, name='supabase_login'),
     path('api/auth/register/', supabase_register, name='supabase_register'),
@@ -1,7 +1,36 @@
 from django.contrib import admin
-from .models import Fact, Submission, VerifiedMedia, Keyword
+from .models import DomainReliability, Fact, LLMUsage, Source, Submission, VerdictChange, VerifiedMedia, Keyword
 
-admin.site.register(Fact)
-admin.site.register(Submission)
+# Sources are too many for a select widget
+admin.site.register(Fact, raw_id_fields=('sources',))
+admin.site.register(Submission, raw_id_fields=('sources',))
 admin.site.register(VerifiedMedia)
-admin.site.register(Keyword)
\ No newline at end of file
+admin.site.register(Keyword)
+
+
+@admin.register(LLMUsage)
+class LLMUsageAdmin(admin.ModelAdmin):
+    list_display = ('date', 'operation', 'model', 'prompt_tokens', 'completion_tokens', 'latency_ms', 'cost_usd', 'supabase_user_id')
+    list_filter = ('operation', 'model')
+    search_fields = ('supabase_user_id',)
+    date_hierarchy = 'date'
+
+
+@admin.register(VerdictChange)
+class VerdictChangeAdmin(admin.ModelAdmin):
+    list_display = ('date', 'previous_verdict', 'new_verdict', 'submission', 'fact')
+    list_filter = ('previous_verdict', 'new_verdict')
+    date_hierarchy = 'date'
+
+
+@admin.register(Source)
+class SourceAdmin(admin.ModelAdmin):
+    list_display = ('domain', 'title', 'url', 'published', 'first_seen')
+    search_fields = ('domain', 'url', 'title')
+
+
+@admin.register(DomainReliability)
+class DomainReliabilityAdmin(admin.ModelAdmin):
+    list_display = ('domain', 'vraie', 'fausse', 'indeterminee', 'last_seen')
+    search_fields = ('domain',)
+    readonly_fields = ('domain', 'vraie', 'fausse', 'indeterminee', 'last_seen')  # Maintained by the tasks
@@ -17,6 +17,7 @@ class SimpleSupabaseUser:
         self.id = supabase_user.id
         self.email = supabase_user.email
         self.user_metadata = supabase_user.user_metadata
+        self.app_metadata = getattr(supabase_user, 'app_metadata', None) or {}
         self.is_authenticated = True
         self.is_active = True
         
@@ -36,7 +37,15 @@ class SupabaseAuthentication(BaseAuthentication):
             return None
 
         token = auth_header.split(' ')[1]
+        return self.authenticate_token(token)
 
+    def authenticate_token(self, token):
+        """
+        Resolve a Supabase access token to a user
+
+        Also used by endpoints that receive the token outside the
+        Authorization header (EventSource cannot set headers).
+        """
         try:
             supabase: Client = create_client(
                 settings.SUPABASE_URL,
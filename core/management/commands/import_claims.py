@@ -0,0 +1,48 @@
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import SubmissionBatch
+from core.services import claim_import
+
+
+class Command(BaseCommand):
+    help = 'Import claims from a CSV or NDJSON file on behalf of a user and queue their analysis'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (texte, source columns) or NDJSON file')
+        parser.add_argument('--user-id', required=True, type=uuid.UUID, help='Supabase user id owning the submissions')
+        parser.add_argument('--email', required=True, help='Email of that user')
+        parser.add_argument('--name', default='', help='Display name of that user')
+        parser.add_argument('--format', choices=claim_import.FORMATS, help='File format (default: from the extension)')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the file')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            file_format = claim_import.detect_format(path, options['format'])
+            with open(path, 'rb') as claims_file:
+                parsed = claim_import.parse_claims(claims_file, file_format)
+        except (OSError, claim_import.ClaimImportError) as e:
+            raise CommandError(str(e))
+
+        claims = parsed['claims']
+        self.stdout.write(
+            f"{len(claims)} claims, {len(parsed['duplicates'])} duplicates, {len(parsed['rejected'])} rejected lines"
+        )
+        for line in parsed['rejected']:
+            self.stdout.write(f"  line {line['line']}: {line['error']}")
+        if options['dry_run'] or not claims:
+            return
+
+        batch = SubmissionBatch.objects.create(
+            supabase_user_id=options['user_id'],
+            user_email=options['email'],
+            file_format=file_format,
+            filename=path.rsplit('/', 1)[-1][:255],
+            total=len(claims),
+            duplicates=parsed['duplicates'],
+            rejected=parsed['rejected'],
+        )
+        claim_import.create_submissions(batch, claims, options['name'])
+        self.stdout.write(self.style.SUCCESS(f"Import {batch.id} queued ({batch.total} claims)"))
@@ -0,0 +1,48 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.services.llm_usage import usage_report
+
+
+class Command(BaseCommand):
+    help = 'Report LLM token usage and estimated cost per prompt, and per user and day'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Number of days to cover (default: 7)')
+        parser.add_argument('--user', help='Only report this Supabase user id')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days'])
+        report = usage_report(since=since, user_id=options['user'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, default=str, indent=2))
+            return
+
+        totals = report['totals']
+        self.stdout.write(self.style.SUCCESS(
+            f"LLM usage over the last {options['days']} days: {totals['calls']} calls, "
+            f"{totals['prompt_tokens']} prompt + {totals['completion_tokens']} completion tokens, "
+            f"${totals['cost_usd']:.4f}"
+        ))
+
+        self.stdout.write('\nPer prompt (largest prompt volume first):')
+        self.stdout.write(f"{'operation':<22} {'model':<24} {'calls':>6} {'avg in':>8} {'avg out':>8} {'avg ms':>8} {'cost $':>10}")
+        for row in report['per_prompt']:
+            self.stdout.write(
+                f"{row['operation']:<22} {row['model']:<24} {row['calls']:>6} "
+                f"{row['avg_prompt_tokens']:>8.0f} {row['avg_completion_tokens']:>8.0f} "
+                f"{row['avg_latency_ms']:>8.0f} {row['cost_usd']:>10.4f}"
+            )
+
+        self.stdout.write('\nPer user and day:')
+        self.stdout.write(f"{'day':<12} {'user':<38} {'calls':>6} {'tokens in':>10} {'tokens out':>10} {'cost $':>10}")
+        for row in report['per_user_day']:
+            self.stdout.write(
+                f"{str(row['day']):<12} {str(row['supabase_user_id'] or '-'):<38} {row['calls']:>6} "
+                f"{row['prompt_tokens']:>10} {row['completion_tokens']:>10} {row['cost_usd']:>10.4f}"
+            )
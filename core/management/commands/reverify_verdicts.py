@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.services import reverification
+from core.tasks import reverify_claims_task, reverify_stale_verdicts_task
+
+
+class Command(BaseCommand):
+    help = 'Re-verify undetermined submissions and stale facts (same selection as the nightly job)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=settings.REVERIFY_MAX_CLAIMS,
+                            help=f'Maximum number of claims (default: {settings.REVERIFY_MAX_CLAIMS})')
+        parser.add_argument('--concurrency', type=int, default=settings.REVERIFY_CONCURRENCY,
+                            help=f'Parallel Celery tasks (default: {settings.REVERIFY_CONCURRENCY})')
+        parser.add_argument('--budget-usd', type=float, default=settings.REVERIFY_BUDGET_USD,
+                            help=f'Maximum estimated cost in USD, LLM and searches (default: {settings.REVERIFY_BUDGET_USD})')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the selected claims')
+        parser.add_argument('--sync', action='store_true', help='Run in this process instead of Celery workers')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            candidates = reverification.select_candidates(options['limit'])
+            submissions = sum(1 for kind, _ in candidates if kind == reverification.SUBMISSION)
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(candidates)} claims to re-verify: {submissions} undetermined submissions, "
+                f"{len(candidates) - submissions} stale facts"
+            ))
+            for kind, record_id in candidates:
+                self.stdout.write(f"{kind:<12} {record_id}")
+            return
+
+        if options['sync']:
+            candidates = reverification.select_candidates(options['limit'])
+            summary = reverify_claims_task(candidates, options['budget_usd'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{summary['checked']} of {len(candidates)} claims re-verified, {summary['changed']} verdicts changed, "
+                f"{summary['errors']} errors, ${summary['cost_usd']:.4f}"
+                + (f" (stopped: {summary['stopped']})" if summary['stopped'] else "")
+            ))
+            return
+
+        result = reverify_stale_verdicts_task.delay(options['limit'], options['concurrency'], options['budget_usd'])
+        self.stdout.write(self.style.SUCCESS(f"Re-verification queued (task {result.id})"))
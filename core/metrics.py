@@ -0,0 +1,221 @@
+"""
+Prometheus metrics for the verification pipeline.
+
+Every stage worth an SLO is timed with observe_stage(), which also counts the
+exceptions raised inside it and records the block as a tracing span. Cache
+lookups are counted with record_cache(), LLM tokens and estimated cost with
+record_llm_tokens(), rate-limited requests with record_throttled(), the
+time tasks wait in the fair-share queue with observe_queue_wait() and the
+circuit breakers of the external providers with set_breaker_state(),
+record_breaker_rejection() and record_breaker_transition(). Task retries on
+transient provider errors are counted with record_task_retry() and
+record_retries_exhausted().
+
+The web process serves the metrics at /metrics; Celery workers expose their
+own registry on WORKER_METRICS_PORT (see start_worker_exporter). When several
+processes share a host (Gunicorn workers, prefork pool), set
+PROMETHEUS_MULTIPROC_DIR so the values are aggregated across processes.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+from core import tracing
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages
+TRANSLATION = "translation"
+TOKENIZATION = "tokenization"
+INFERENCE = "inference"
+PERPLEXITY = "perplexity"
+OPENROUTER = "openrouter"
+SIGHTENGINE = "sightengine"
+IMAGE_DOWNLOAD = "image_download"
+SUPABASE_UPLOAD = "supabase_upload"
+DB_WRITE = "db_write"
+BAMBARA = "bambara"
+
+# Stages that call another service (client spans in traces)
+REMOTE_STAGES = {TRANSLATION, PERPLEXITY, OPENROUTER, SIGHTENGINE, IMAGE_DOWNLOAD, SUPABASE_UPLOAD, BAMBARA}
+
+# Remote calls take seconds, local steps milliseconds: cover both
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+STAGE_DURATION = Histogram(
+    "checkia_stage_duration_seconds",
+    "Duration of a verification pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "checkia_stage_errors_total",
+    "Exceptions raised during a verification pipeline stage",
+    ["stage", "error"],
+)
+CACHE_REQUESTS = Counter(
+    "checkia_cache_requests_total",
+    "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result"],
+)
+LLM_TOKENS = Counter(
+    "checkia_llm_tokens_total",
+    "Tokens sent to and generated by the LLM",
+    ["model", "operation", "kind"],
+)
+LLM_COST = Counter(
+    "checkia_llm_cost_usd_total",
+    "Estimated LLM cost in USD",
+    ["model", "operation"],
+)
+THROTTLED_REQUESTS = Counter(
+    "checkia_throttled_requests_total",
+    "Requests rejected by the per-user rate limit",
+    ["scope"],
+)
+QUEUE_WAIT = Histogram(
+    "checkia_fair_queue_wait_seconds",
+    "Time a task waited in its user's fair-share queue before being sent to Celery",
+    ["task"],
+    buckets=STAGE_BUCKETS,
+)
+BREAKER_STATE = Gauge(
+    "checkia_circuit_breaker_state",
+    "Circuit breaker state of an external provider (0 closed, 1 half-open, 2 open)",
+    ["provider"],
+    multiprocess_mode="livemax",
+)
+BREAKER_REJECTIONS = Counter(
+    "checkia_circuit_breaker_rejections_total",
+    "Provider calls refused because the provider's circuit breaker was open",
+    ["provider"],
+)
+BREAKER_TRANSITIONS = Counter(
+    "checkia_circuit_breaker_transitions_total",
+    "Circuit breaker state changes by provider and new state",
+    ["provider", "state"],
+)
+TASK_RETRIES = Counter(
+    "checkia_task_retries_total",
+    "Celery task retries scheduled after a transient provider error",
+    ["task", "provider"],
+)
+TASK_RETRIES_EXHAUSTED = Counter(
+    "checkia_task_retries_exhausted_total",
+    "Celery tasks that failed on a transient error after their last retry",
+    ["task"],
+)
+REVERIFICATIONS = Counter(
+    "checkia_reverifications_total",
+    "Claims re-verified by the nightly job by kind (submission, fact) and outcome",
+    ["kind", "outcome"],
+)
+
+BREAKER_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+@contextmanager
+def observe_stage(stage):
+    """
+    Time the enclosed block as `stage`, trace it as a span and count the
+    exception it raises, if any.
+    """
+    kind = tracing.CLIENT if stage in REMOTE_STAGES else tracing.INTERNAL
+    start = time.perf_counter()
+    with tracing.span(stage, kind=kind, **{"checkia.stage": stage}):
+        try:
+            yield
+        except Exception as e:
+            STAGE_ERRORS.labels(stage=stage, error=type(e).__name__).inc()
+            raise
+        finally:
+            STAGE_DURATION.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def record_error(stage, error):
+    """Count a failure reported without an exception (e.g. an HTTP error status)."""
+    STAGE_ERRORS.labels(stage=stage, error=error).inc()
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_llm_tokens(model, operation, prompt_tokens, completion_tokens, cost):
+    LLM_TOKENS.labels(model=model, operation=operation, kind="prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(model=model, operation=operation, kind="completion").inc(completion_tokens)
+    LLM_COST.labels(model=model, operation=operation).inc(float(cost))
+
+
+def record_throttled(scope):
+    THROTTLED_REQUESTS.labels(scope=scope).inc()
+
+
+def observe_queue_wait(task_name, seconds):
+    QUEUE_WAIT.labels(task=task_name).observe(seconds)
+
+
+def set_breaker_state(provider, state):
+    BREAKER_STATE.labels(provider=provider).set(BREAKER_STATE_VALUES.get(state, 0))
+
+
+def record_breaker_rejection(provider):
+    BREAKER_REJECTIONS.labels(provider=provider).inc()
+
+
+def record_breaker_transition(provider, state):
+    BREAKER_TRANSITIONS.labels(provider=provider, state=state).inc()
+
+
+def record_task_retry(task_name, provider):
+    TASK_RETRIES.labels(task=task_name, provider=provider).inc()
+
+
+def record_retries_exhausted(task_name):
+    TASK_RETRIES_EXHAUSTED.labels(task=task_name).inc()
+
+
+def record_reverification(kind, outcome):
+    REVERIFICATIONS.labels(kind=kind, outcome=outcome).inc()
+
+
+def _registry():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_metrics():
+    """Return (body, content type) of the Prometheus text exposition."""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def start_worker_exporter(port):
+    """
+    Serve the worker's metrics on `port` (0 disables the exporter).
+    """
+    if not port:
+        return False
+    try:
+        start_http_server(port, registry=_registry())
+    except OSError as e:
+        logger.warning(f"Celery metrics exporter not started on port {port}: {e}")
+        return False
+    logger.info(f"Celery metrics exporter listening on port {port}")
+    return True
@@ -1,7 +1,57 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.utils.deprecation import MiddlewareMixin
 from django.conf import settings
 from supabase import create_client, Client
 
+from core import tracing
+
+
+class TracingMiddleware:
+    """
+    Open the server span of each request, continuing the caller's trace
+    when a W3C traceparent header is present
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _span(self, request):
+        return tracing.span(
+            f"{request.method} {request.path}",
+            kind=tracing.SERVER,
+            parent=tracing.parse_traceparent(request.META.get('HTTP_TRACEPARENT')),
+            **{"http.method": request.method, "http.target": request.path},
+        )
+
+    @staticmethod
+    def _finish(span, request, response):
+        if span is None:
+            return
+        span.set_attribute("http.status_code", response.status_code)
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            span.set_attribute("http.route", match.route)
+        if response.status_code >= 500:
+            span.error = f"HTTP {response.status_code}"
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self._span(request) as span:
+            response = self.get_response(request)
+            self._finish(span, request, response)
+        return response
+
+    async def __acall__(self, request):
+        with self._span(request) as span:
+            response = await self.get_response(request)
+            self._finish(span, request, response)
+        return response
+
 
 class SupabaseAuthMiddleware(MiddlewareMixin):
     """
@@ -0,0 +1,37 @@
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factcheck', '0009_alter_imageverification_model_used'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVerificationBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('supabase_user_id', models.UUIDField()),
+                ('user_email', models.EmailField(max_length=254)),
+                ('verification_type', models.CharField(choices=[('content', 'Content Verification'), ('ai_detection', 'AI Detection')], max_length=50)),
+                ('claim_text', models.TextField(blank=True, null=True)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('duplicates', models.JSONField(blank=True, default=list)),
+                ('failed_uploads', models.PositiveIntegerField(default=0)),
+                ('task_id', models.CharField(blank=True, max_length=255)),
+                ('date', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='imageverification',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='verifications', to='factcheck.imageverificationbatch'),
+        ),
+    ]
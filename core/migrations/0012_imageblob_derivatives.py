@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factcheck', '0011_imageblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageblob',
+            name='thumbnail_url',
+            field=models.URLField(blank=True, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='imageblob',
+            name='preview_url',
+            field=models.URLField(blank=True, max_length=1000),
+        ),
+    ]
@@ -0,0 +1,32 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factcheck', '0012_imageblob_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('supabase_user_id', models.UUIDField(blank=True, null=True)),
+                ('operation', models.CharField(choices=[('fact_check', 'Fact Check'), ('content_verification', 'Content Verification'), ('ai_detection', 'AI Detection')], max_length=50)),
+                ('model', models.CharField(max_length=100)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('latency_ms', models.PositiveIntegerField(default=0)),
+                ('cost_usd', models.DecimalField(decimal_places=6, default=0, max_digits=12)),
+                ('date', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('image_verification', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='llm_usages', to='factcheck.imageverification')),
+                ('submission', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='llm_usages', to='factcheck.submission')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['supabase_user_id', 'date'], name='factcheck_l_supabas_5cb1c9_idx')],
+            },
+        ),
+    ]
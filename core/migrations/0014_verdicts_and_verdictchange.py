@@ -0,0 +1,59 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+VERDICT_CHOICES = [('VRAIE', 'Vraie'), ('FAUSSE', 'Fausse'), ('INDÉTERMINÉE', 'Indéterminée')]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factcheck', '0013_llmusage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fact',
+            name='verdict',
+            field=models.CharField(choices=VERDICT_CHOICES, default='VRAIE', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='fact',
+            name='verified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='verdict',
+            field=models.CharField(blank=True, choices=VERDICT_CHOICES, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='verified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='fact',
+            index=models.Index(fields=['verdict', 'id'], name='factcheck_f_verdict_3d3a7b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['verdict', 'id'], name='factcheck_s_verdict_fc03b1_idx'),
+        ),
+        migrations.CreateModel(
+            name='VerdictChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_verdict', models.CharField(blank=True, max_length=20)),
+                ('new_verdict', models.CharField(choices=VERDICT_CHOICES, max_length=20)),
+                ('explanation', models.TextField(blank=True)),
+                ('web_sources', models.JSONField(blank=True, null=True)),
+                ('date', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('fact', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='verdict_changes', to='factcheck.fact')),
+                ('submission', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='verdict_changes', to='factcheck.submission')),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+    ]
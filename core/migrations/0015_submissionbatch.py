@@ -0,0 +1,35 @@
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factcheck', '0014_verdicts_and_verdictchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('supabase_user_id', models.UUIDField()),
+                ('user_email', models.EmailField(max_length=254)),
+                ('file_format', models.CharField(choices=[('csv', 'CSV'), ('ndjson', 'NDJSON')], max_length=10)),
+                ('filename', models.CharField(blank=True, max_length=255)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('duplicates', models.JSONField(blank=True, default=list)),
+                ('rejected', models.JSONField(blank=True, default=list)),
+                ('date', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to='factcheck.submissionbatch'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factcheck', '0015_submissionbatch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='llmusage',
+            name='operation',
+            field=models.CharField(choices=[('fact_check', 'Fact Check'), ('fact_check_batch', 'Fact Check (batch)'), ('content_verification', 'Content Verification'), ('ai_detection', 'AI Detection')], max_length=50),
+        ),
+    ]
@@ -0,0 +1,154 @@
+import hashlib
+from datetime import date
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.db import migrations, models, transaction
+
+# Frozen copy of core/services/sources.py as of this migration: later changes
+# to the live module must not change what this backfill does.
+TRACKING_PARAMS = ("fbclid", "gclid", "mc_cid", "mc_eid", "igshid", "ref_src")
+TITLE_MAX_LENGTH = 500
+URL_MAX_LENGTH = 2000
+BATCH_SIZE = 500
+
+
+def canonical_url(url):
+    try:
+        parts = urlsplit((url or "").strip())
+        port = parts.port  # ValueError for an invalid or out-of-range port
+    except ValueError:
+        return ""
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").removeprefix("www.")
+    if scheme not in ("http", "https") or not host:
+        return ""
+    netloc = f"{host}:{port}" if port and port not in (80, 443) else host
+    query = urlencode([
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith("utm_") and name.lower() not in TRACKING_PARAMS
+    ])
+    return urlunsplit((scheme, netloc, parts.path.rstrip("/"), query, ""))
+
+
+def domain_of(url):
+    value = (url or "").strip().lower()
+    if "://" not in value:
+        value = f"http://{value}"
+    try:
+        return (urlsplit(value).hostname or "").removeprefix("www.")
+    except ValueError:
+        return ""
+
+
+def published(value):
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_sources(web_sources):
+    parsed = {}
+    for source in web_sources if isinstance(web_sources, list) else []:
+        if not isinstance(source, dict):
+            continue
+        url = canonical_url(source.get("link") or source.get("url") or "")
+        if not url or len(url) > URL_MAX_LENGTH:
+            continue
+        digest = hashlib.sha256(url.encode()).hexdigest()
+        parsed.setdefault(digest, {
+            "url_hash": digest,
+            "url": url,
+            "domain": domain_of(url),
+            "title": str(source.get("title") or "")[:TITLE_MAX_LENGTH],
+            "published": published(source.get("date")),
+        })
+    return parsed
+
+
+def backfill(source_model, record_model, batch_size=BATCH_SIZE):
+    """
+    Link every row of `record_model` to the Sources of its web_sources,
+    batch_size rows at a time in id order, each batch in its own transaction.
+
+    Returns:
+        int: Number of rows read
+    """
+    through = record_model.sources.through
+    record_field = f"{record_model._meta.model_name}_id"
+    last_id = 0
+    rows_read = 0
+    while True:
+        rows = list(
+            record_model.objects.filter(id__gt=last_id, web_sources__isnull=False)
+            .order_by("id").values_list("id", "web_sources")[:batch_size]
+        )
+        if not rows:
+            return rows_read
+        last_id = rows[-1][0]
+        rows_read += len(rows)
+
+        per_row = [(record_id, parse_sources(web_sources)) for record_id, web_sources in rows]
+        parsed = {}
+        for _, row_sources in per_row:
+            parsed.update(row_sources)
+        with transaction.atomic():
+            source_model.objects.bulk_create(
+                [source_model(**fields) for fields in parsed.values()], ignore_conflicts=True
+            )
+            ids = dict(source_model.objects.filter(url_hash__in=list(parsed)).values_list("url_hash", "id"))
+            through.objects.bulk_create(
+                [
+                    through(**{record_field: record_id, "source_id": ids[digest]})
+                    for record_id, row_sources in per_row
+                    for digest in row_sources
+                    if digest in ids
+                ],
+                ignore_conflicts=True,
+            )
+
+
+def backfill_sources(apps, schema_editor):
+    Source = apps.get_model('factcheck', 'Source')
+    for model_name in ('Fact', 'Submission'):
+        backfill(Source, apps.get_model('factcheck', model_name))
+
+
+class Migration(migrations.Migration):
+
+    # Each backfill batch commits on its own, so a large table neither holds
+    # one long transaction nor restarts from scratch after a failure
+    atomic = False
+
+    dependencies = [
+        ('factcheck', '0016_llmusage_fact_check_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Source',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_hash', models.CharField(max_length=64, unique=True)),
+                ('url', models.URLField(max_length=2000)),
+                ('domain', models.CharField(max_length=255)),
+                ('title', models.CharField(blank=True, max_length=500)),
+                ('published', models.DateField(blank=True, null=True)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['domain', 'id'], name='factcheck_s_domain_575982_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='fact',
+            name='sources',
+            field=models.ManyToManyField(blank=True, related_name='facts', to='factcheck.source'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='sources',
+            field=models.ManyToManyField(blank=True, related_name='submissions', to='factcheck.source'),
+        ),
+        migrations.RunPython(backfill_sources, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+# Frozen copy of core/services/domain_reliability.py as of this migration:
+# later changes to the live module must not change what this backfill does.
+FIELDS = {"VRAIE": "vraie", "FAUSSE": "fausse", "INDÉTERMINÉE": "indeterminee"}
+
+
+def backfill(reliability_model, submission_model):
+    """
+    Count the current verdicts of every submission for the domains of its
+    linked sources, in one grouped query over the link table.
+
+    Returns:
+        int: Number of domains
+    """
+    link = submission_model.sources.through
+    verdict_counts = {
+        field: Count("submission_id", filter=Q(submission__verdict=verdict), distinct=True)
+        for verdict, field in FIELDS.items()
+    }
+    rows = (
+        link.objects.filter(submission__verdict__in=list(FIELDS))
+        .values("source__domain")
+        .annotate(**verdict_counts, last_seen=Max("submission__verified_at"))
+        .order_by()
+    )
+    created = reliability_model.objects.bulk_create(
+        [
+            reliability_model(domain=row.pop("source__domain"), **row)
+            for row in rows.iterator()
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    return len(created)
+
+
+def backfill_domain_reliability(apps, schema_editor):
+    backfill(
+        apps.get_model('factcheck', 'DomainReliability'),
+        apps.get_model('factcheck', 'Submission'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factcheck', '0017_source'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DomainReliability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=255, unique=True)),
+                ('vraie', models.PositiveIntegerField(default=0)),
+                ('fausse', models.PositiveIntegerField(default=0)),
+                ('indeterminee', models.PositiveIntegerField(default=0)),
+                ('last_seen', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'domain reliabilities',
+            },
+        ),
+        migrations.RunPython(backfill_domain_reliability, migrations.RunPython.noop),
+    ]
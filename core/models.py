@@ -1,16 +1,26 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 import uuid
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Verdicts du LLM
+VERDICT_CHOICES = [('VRAIE', 'Vraie'), ('FAUSSE', 'Fausse'), ('INDÉTERMINÉE', 'Indéterminée')]
+
 class Fact(models.Model):
     texte = models.TextField()  # Le texte du fait à vérifier
     source = models.URLField(max_length=200)  # L'URL de la source du fait
     date = models.DateTimeField(auto_now_add=True)  # Date à laquelle le fait a été ajouté
     mots_cles = models.ManyToManyField('Keyword')  # Les mots-clés associés au fait
     web_sources = models.JSONField(blank=True, null=True)  # Sources web utilisées pour vérifier l'information
+    sources = models.ManyToManyField('Source', blank=True, related_name='facts')  # Sources de web_sources, une ligne par URL
+    verdict = models.CharField(max_length=20, choices=VERDICT_CHOICES, default='VRAIE')  # Verdict actuel, mis à jour par la re-vérification
+    verified_at = models.DateTimeField(blank=True, null=True)  # Dernière re-vérification (à défaut, date d'ajout)
+
+    class Meta:
+        indexes = [models.Index(fields=['verdict', 'id'])]
 
     def delete(self, *args, **kwargs):
         # Clear the ManyToMany relationship before deleting the Fact instance
@@ -29,6 +39,68 @@ class Keyword(models.Model):
         return self.mot
 
 
+class Source(models.Model):
+    # Web source cited by facts and submissions, stored once per canonical
+    # URL (see services/sources.py)
+    url_hash = models.CharField(max_length=64, unique=True)  # SHA-256 of the canonical URL
+    url = models.URLField(max_length=2000)  # Canonical URL
+    domain = models.CharField(max_length=255)  # Host without "www."
+    title = models.CharField(max_length=500, blank=True)
+    published = models.DateField(blank=True, null=True)  # Date given by the search, when it is a date
+    first_seen = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['domain', 'id'])]
+
+    def __str__(self):
+        return self.url
+
+
+class DomainReliability(models.Model):
+    # Current verdicts of the submissions citing a domain, updated when a
+    # verdict is saved (see services/domain_reliability.py)
+    domain = models.CharField(max_length=255, unique=True)  # Host without "www."
+    vraie = models.PositiveIntegerField(default=0)
+    fausse = models.PositiveIntegerField(default=0)
+    indeterminee = models.PositiveIntegerField(default=0)
+    last_seen = models.DateTimeField(blank=True, null=True)  # Last verdict of a submission citing the domain
+
+    class Meta:
+        verbose_name_plural = 'domain reliabilities'
+
+    @property
+    def total(self):
+        return self.vraie + self.fausse + self.indeterminee
+
+    @property
+    def score(self):
+        """Share of VRAIE among the VRAIE and FAUSSE verdicts, None without any."""
+        decided = self.vraie + self.fausse
+        return round(self.vraie / decided, 3) if decided else None
+
+    def __str__(self):
+        return f"{self.domain} - {self.vraie} VRAIE / {self.fausse} FAUSSE"
+
+
+class SubmissionBatch(models.Model):
+    # Groups claims imported together from a CSV or NDJSON file
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    supabase_user_id = models.UUIDField()  # Supabase user UUID
+    user_email = models.EmailField()  # User email for display and reference
+    file_format = models.CharField(max_length=10, choices=[('csv', 'CSV'), ('ndjson', 'NDJSON')])
+    filename = models.CharField(max_length=255, blank=True)  # Name of the imported file
+    total = models.PositiveIntegerField(default=0)  # Number of claims imported (after deduplication)
+    duplicates = models.JSONField(default=list, blank=True)  # Lines skipped because identical to an earlier line
+    rejected = models.JSONField(default=list, blank=True)  # Invalid lines, with the reason
+    date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Import {self.id} - {self.total} claims - {self.user_email}"
+
+    class Meta:
+        ordering = ['-date']
+
+
 class Submission(models.Model):
     # Replace Django User foreign key with Supabase user fields
     supabase_user_id = models.UUIDField()  # Supabase user UUID
@@ -40,12 +112,120 @@ class Submission(models.Model):
     date = models.DateTimeField(auto_now_add=True)  # Date de soumission
     statut = models.CharField(max_length=50, choices=[('en cours', 'En cours'), ('vérifié', 'Vérifié'), ('rejeté', 'Rejeté')], default='en cours')  # Statut de la soumission
     web_sources = models.JSONField(blank=True, null=True)  # Sources web utilisées pour vérifier l'information
+    sources = models.ManyToManyField('Source', blank=True, related_name='submissions')  # Sources de web_sources, une ligne par URL
     detailed_result = models.TextField(blank=True, null=True)  # Detailed analysis result
+    verdict = models.CharField(max_length=20, choices=VERDICT_CHOICES, blank=True, default='')  # Verdict du LLM (vide avant l'analyse)
+    verified_at = models.DateTimeField(blank=True, null=True)  # Date du dernier verdict
+    batch = models.ForeignKey(
+        SubmissionBatch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='submissions'
+    )  # Import groupé d'origine (facultatif)
+
+    class Meta:
+        indexes = [models.Index(fields=['verdict', 'id'])]
 
     def __str__(self):
         return f"{self.texte[:50]} - {self.user_email}"  # Include user email in representation
 
 
+class ImageBlob(models.Model):
+    # Image stored once in Supabase, keyed by the SHA-256 of its bytes and
+    # shared by every ImageVerification of the same file
+    sha256 = models.CharField(max_length=64, primary_key=True)  # Hex digest of the image bytes
+    path = models.CharField(max_length=1000)  # Path to the object in Supabase storage
+    url = models.URLField(max_length=1000)  # Signed URL of the object
+    thumbnail_url = models.URLField(max_length=1000, blank=True)  # Signed URL of the 256px WebP thumbnail
+    preview_url = models.URLField(max_length=1000, blank=True)  # Signed URL of the 1024px WebP preview
+    size = models.PositiveIntegerField(default=0)  # Size in bytes
+    ref_count = models.PositiveIntegerField(default=0)  # Number of verifications referencing the blob
+    date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} réf.)"
+
+    @classmethod
+    def acquire(cls, sha256, size=0):
+        """
+        Add a reference to the blob, creating the row (without stored object
+        yet) on first use
+
+        Taken under the row lock before any upload: a concurrent release()
+        of the last reference either finishes first (object deleted, row
+        created again here) or sees this reference and keeps the object.
+
+        Returns:
+            tuple: (blob, created)
+        """
+        with transaction.atomic():
+            blob, created = cls.objects.select_for_update().get_or_create(
+                sha256=sha256,
+                defaults={'size': size, 'ref_count': 1}
+            )
+            if not created:
+                cls.objects.filter(pk=sha256).update(ref_count=F('ref_count') + 1)
+                blob.refresh_from_db()
+        return blob, created
+
+    @classmethod
+    def release(cls, sha256):
+        """
+        Drop a reference to the blob; the stored object is deleted from
+        Supabase only when the last reference goes
+        """
+        from .services.supabase_storage import delete_image_from_supabase, derivative_path
+
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(pk=sha256).first()
+            if blob is None:
+                return False
+            if blob.ref_count > 1:
+                cls.objects.filter(pk=sha256).update(ref_count=F('ref_count') - 1)
+                return False
+            paths = [blob.path] if blob.path else []
+            if blob.thumbnail_url:
+                paths.append(derivative_path(sha256, 'thumbnail'))
+            if blob.preview_url:
+                paths.append(derivative_path(sha256, 'preview'))
+            blob.delete()
+
+            # Deleted before the row lock is released, so an acquire()
+            # waiting on it never reuses an object about to disappear
+            if paths:
+                delete_result = delete_image_from_supabase(paths if len(paths) > 1 else paths[0])
+                if not delete_result["success"]:
+                    logger.warning(f"Failed to delete image from Supabase: {delete_result.get('error')}")
+        return True
+
+
+class ImageVerificationBatch(models.Model):
+    # Groups images uploaded together through the batch endpoint
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    supabase_user_id = models.UUIDField()  # Supabase user UUID
+    user_email = models.EmailField()  # User email for display and reference
+    verification_type = models.CharField(
+        max_length=50,
+        choices=[
+            ('content', 'Content Verification'),
+            ('ai_detection', 'AI Detection')
+        ]
+    )
+    claim_text = models.TextField(blank=True, null=True)  # Claim shared by every image of the batch
+    total = models.PositiveIntegerField(default=0)  # Number of distinct images (after deduplication)
+    duplicates = models.JSONField(default=list, blank=True)  # Files skipped because identical to another file
+    failed_uploads = models.PositiveIntegerField(default=0)  # Images that never reached the verification stage
+    task_id = models.CharField(max_length=255, blank=True)  # Celery group id
+    date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Batch {self.id} - {self.total} images - {self.user_email}"
+
+    class Meta:
+        ordering = ['-date']
+
+
 class ImageVerification(models.Model):
     # User information
     supabase_user_id = models.UUIDField()  # Supabase user UUID
@@ -87,6 +267,20 @@ class ImageVerification(models.Model):
     # Metadata
     date = models.DateTimeField(auto_now_add=True)  # Date of verification
     model_used = models.CharField(max_length=100, default='openai/gpt-4.1-mini')  # AI model used
+    blob = models.ForeignKey(
+        ImageBlob,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='verifications'
+    )  # Content-addressed stored image (null for images uploaded before deduplication)
+    batch = models.ForeignKey(
+        ImageVerificationBatch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='verifications'
+    )  # Batch the image was submitted with, if any
     
     def __str__(self):
         claim_preview = self.claim_text[:30] if self.claim_text else "No claim"
@@ -94,19 +288,102 @@ class ImageVerification(models.Model):
 
     def delete(self, *args, **kwargs):
         """
-        Override delete to also remove image from Supabase storage
+        Override delete to also remove image from Supabase storage.
+        Content-addressed images are shared, so only the reference is dropped
+        and the object goes with the last verification using it.
         """
-        try:
-            from .services.supabase_storage import delete_image_from_supabase
-            if self.image_path:
-                delete_result = delete_image_from_supabase(self.image_path)
-                if not delete_result["success"]:
-                    logger.warning(f"Failed to delete image from Supabase: {delete_result.get('error')}")
-        except Exception as e:
-            logger.warning(f"Error deleting image from Supabase during model deletion: {e}")
+        blob_id = self.blob_id
+
+        if not blob_id:
+            try:
+                from .services.supabase_storage import delete_image_from_supabase
+                if self.image_path:
+                    delete_result = delete_image_from_supabase(self.image_path)
+                    if not delete_result["success"]:
+                        logger.warning(f"Failed to delete image from Supabase: {delete_result.get('error')}")
+            except Exception as e:
+                logger.warning(f"Error deleting image from Supabase during model deletion: {e}")
         
         super().delete(*args, **kwargs)
 
+        if blob_id:
+            try:
+                ImageBlob.release(blob_id)
+            except Exception as e:
+                logger.warning(f"Error releasing image blob during model deletion: {e}")
+
+    class Meta:
+        ordering = ['-date']
+
+
+class LLMUsage(models.Model):
+    # One OpenRouter call: tokens, latency and estimated cost. Rows outlive
+    # the submission/verification they belong to so totals stay accurate.
+    supabase_user_id = models.UUIDField(null=True, blank=True)  # Supabase user UUID
+    operation = models.CharField(
+        max_length=50,
+        choices=[
+            ('fact_check', 'Fact Check'),
+            ('fact_check_batch', 'Fact Check (batch)'),
+            ('content_verification', 'Content Verification'),
+            ('ai_detection', 'AI Detection')
+        ]
+    )  # Prompt that was sent
+    model = models.CharField(max_length=100)  # Model billed for the call
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    latency_ms = models.PositiveIntegerField(default=0)  # Duration of the API call
+    cost_usd = models.DecimalField(max_digits=12, decimal_places=6, default=0)  # Estimated from LLM_PRICES
+    submission = models.ForeignKey(
+        Submission,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='llm_usages'
+    )
+    image_verification = models.ForeignKey(
+        ImageVerification,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='llm_usages'
+    )
+    date = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.operation} - {self.model} - {self.prompt_tokens}+{self.completion_tokens} tokens"
+
+    class Meta:
+        ordering = ['-date']
+        indexes = [models.Index(fields=['supabase_user_id', 'date'])]
+
+
+class VerdictChange(models.Model):
+    # Verdict changed by the re-verification of an undetermined submission
+    # or a stale fact (see core/services/reverification.py)
+    submission = models.ForeignKey(
+        Submission,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='verdict_changes'
+    )
+    fact = models.ForeignKey(
+        Fact,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='verdict_changes'
+    )
+    previous_verdict = models.CharField(max_length=20, blank=True)
+    new_verdict = models.CharField(max_length=20, choices=VERDICT_CHOICES)
+    explanation = models.TextField(blank=True)  # Explanation of the new verdict
+    web_sources = models.JSONField(blank=True, null=True)  # Sources of the new verdict
+    date = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.previous_verdict or '-'} -> {self.new_verdict}"
+
     class Meta:
         ordering = ['-date']
 
@@ -0,0 +1,15 @@
+from rest_framework.permissions import BasePermission
+
+
+class IsClaimImportPartner(BasePermission):
+    """
+    Newsroom partners allowed to import claims in bulk
+
+    The Supabase app_metadata flag claim_import is set by an administrator
+    (service role): unlike user_metadata, users cannot change it themselves.
+    """
+    message = "L'import d'affirmations est réservé aux partenaires"
+
+    def has_permission(self, request, view):
+        app_metadata = getattr(request.user, 'app_metadata', None) or {}
+        return bool(request.user and request.user.is_authenticated and app_metadata.get('claim_import'))
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Fact, Submission, VerifiedMedia, Keyword
+from .models import DomainReliability, Fact, Submission, VerifiedMedia, Keyword
 
 class KeywordSerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,15 +11,23 @@ class FactSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Fact
-        fields = '__all__'
+        exclude = ['sources']  # Same sources as web_sources
 
 class SubmissionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Submission
-        fields = '__all__'
+        exclude = ['sources']  # Same sources as web_sources
         read_only_fields = ['supabase_user_id', 'user_email', 'user_name']  # These are set automatically from the authenticated user
 
 class VerifiedMediaSerializer(serializers.ModelSerializer):
     class Meta:
         model = VerifiedMedia
         fields = '__all__'
+
+class DomainReliabilitySerializer(serializers.ModelSerializer):
+    total = serializers.IntegerField(read_only=True)
+    score = serializers.FloatField(read_only=True)  # Share of VRAIE among VRAIE and FAUSSE, null without any
+
+    class Meta:
+        model = DomainReliability
+        fields = ['domain', 'vraie', 'fausse', 'indeterminee', 'total', 'score', 'last_seen']
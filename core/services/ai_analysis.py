@@ -1,9 +1,16 @@
 import logging
+import threading
 import torch
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
+import requests
 from deep_translator import GoogleTranslator
-from core.services.llm import llm_analysis
+from deep_translator.exceptions import RequestError, TooManyRequests
+from core.services.llm import llm_analysis, llm_analysis_batch
 from core.services.perplexity_search import search_with_perplexity
+from core.services import circuit_breaker
+from core.services.errors import TransientError
+from core import metrics
+from django.conf import settings
 import os
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
@@ -11,103 +18,267 @@ os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Charger le modèle pré-entraîné Roberta pour la classification de fausses nouvelles
+# Modèle pré-entraîné Roberta pour la classification de fausses nouvelles,
+# chargé au premier usage : seuls les workers de la file CPU en ont besoin
 model_name = "hamzab/roberta-fake-news-classification"
-logging.info(f"Chargement du modèle {model_name}...")
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSequenceClassification.from_pretrained(model_name)
-logging.info("Modèle et tokenizer chargés avec succès.")
+_classifier = None
+_classifier_lock = threading.Lock()
 
 
-def analyze_text(text):
+def get_classifier():
+    """
+    Tokenizer et modèle RoBERTa, chargés une fois par processus.
+    """
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                logging.info(f"Chargement du modèle {model_name}...")
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                model = AutoModelForSequenceClassification.from_pretrained(model_name)
+                device = 'cuda' if torch.cuda.is_available() else 'cpu'
+                model.to(device)
+                logging.info(f"Modèle et tokenizer chargés avec succès (dispositif : {device}).")
+                _classifier = (tokenizer, model, device)
+    return _classifier
+
+
+def translate_text(text):
+    """
+    Étape 1 (réseau) : traduction de l'affirmation en anglais.
+
+    Lève TransientError si le service de traduction est injoignable ou
+    limite le débit.
+    """
+    logging.info("ÉTAPE 1: Traduction du texte en anglais...")
     try:
-        logging.info(f"=== DÉBUT DE L'ANALYSE ===")
-        logging.info(f"Texte original à analyser: {text}")
-        
-        # Traduire le texte en anglais avec deep-translator
-        logging.info("ÉTAPE 1: Traduction du texte en anglais...")
-        translated_text = GoogleTranslator(source='fr', target='en').translate(text)
-        logging.info(f"Texte traduit: {translated_text}")
-
-        # Préparer l'entrée pour le modèle
-        logging.info("ÉTAPE 2: Préparation pour le modèle RoBERTa...")
-        input_str = f"<title> Title <content> {translated_text} <end>"
-        logging.info(f"Input formaté pour RoBERTa: {input_str[:100]}...")
-        
+        with metrics.observe_stage(metrics.TRANSLATION):
+            translated_text = GoogleTranslator(source='fr', target='en').translate(text)
+    except (RequestError, TooManyRequests, requests.ConnectionError, requests.Timeout) as e:
+        raise TransientError(metrics.TRANSLATION, f"Traduction temporairement indisponible: {e}") from e
+    logging.info(f"Texte traduit: {translated_text}")
+    return translated_text
+
+
+def classify_text(translated_text):
+    """
+    Étapes 2 et 3 (CPU) : classification RoBERTa du texte traduit.
+
+    Returns:
+        tuple: (résultat initial 'vérifié' ou 'rejeté', confiance entre 0 et 1)
+    """
+    tokenizer, model, device = get_classifier()
+
+    # Préparer l'entrée pour le modèle
+    logging.info("ÉTAPE 2: Préparation pour le modèle RoBERTa...")
+    input_str = f"<title> Title <content> {translated_text} <end>"
+    logging.info(f"Input formaté pour RoBERTa: {input_str[:100]}...")
+
+    with metrics.observe_stage(metrics.TOKENIZATION):
         input_ids = tokenizer.encode_plus(input_str, max_length=512, padding="max_length", truncation=True, return_tensors="pt")
-        logging.info("Texte encodé avec succès pour le modèle.")
-
-        # Effectuer la prédiction
-        logging.info("ÉTAPE 3: Prédiction avec le modèle RoBERTa...")
-        device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        model.to(device)
-        logging.info(f"Utilisation du dispositif : {device}")
-
-        with torch.no_grad():
-            logging.info("Effectuation de la prédiction...")
-            output = model(input_ids['input_ids'].to(device), attention_mask=input_ids['attention_mask'].to(device))
-            logging.info("Prédiction terminée.")
-
-        # Convertir la prédiction en probabilité
-        logging.info("Analyse des résultats du modèle RoBERTa...")
-        probabilities = torch.nn.functional.softmax(output.logits, dim=-1)[0]
-        prediction = torch.argmax(probabilities).item()
-        confidence = probabilities[prediction].item()
-        
-        logging.info(f"Résultat de la prédiction RoBERTa: {prediction}")
-        logging.info(f"Probabilités: {probabilities.tolist()}")
-        logging.info(f"Confiance: {confidence:.4f}")
-
-        # Traduire le résultat en français
-        initial_result = "vérifié" if prediction == 1 else "rejeté"
-        logging.info(f"Résultat initial RoBERTa: {initial_result} (confiance: {confidence:.2%})")
-
-        # Utiliser Perplexity pour rechercher des sources et vérifier le fait
-        logging.info("ÉTAPE 4: Recherche avec Perplexity...")
-        perplexity_result = search_with_perplexity(text)
-        logging.info(f"Résultat Perplexity - Sources: {len(perplexity_result['sources'])}, Citations: {len(perplexity_result.get('citations', []))}")
-        
-        if perplexity_result['verification_content']:
-            logging.info(f"Contenu de vérification Perplexity (extrait): {perplexity_result['verification_content'][:300]}...")
-        
-        # Log des sources avec leurs extraits
-        for i, source in enumerate(perplexity_result['sources'][:3], 1):
-            logging.info(f"Source {i} détaillée:")
-            logging.info(f"  Titre: {source.get('title', 'N/A')}")
-            logging.info(f"  URL: {source.get('link', 'N/A')}")
-            logging.info(f"  Date: {source.get('date', 'N/A')}")
-            if source.get('snippet'):
-                logging.info(f"  Extrait: {source['snippet'][:150]}...")
-
-        # Utiliser l'API OpenRouter pour analyser les résultats combinés et obtenir une décision finale
-        logging.info("ÉTAPE 5: Analyse finale avec OpenRouter...")
+    logging.info("Texte encodé avec succès pour le modèle.")
+
+    # Effectuer la prédiction
+    logging.info(f"ÉTAPE 3: Prédiction avec le modèle RoBERTa (dispositif : {device})...")
+    with metrics.observe_stage(metrics.INFERENCE), torch.no_grad():
+        output = model(input_ids['input_ids'].to(device), attention_mask=input_ids['attention_mask'].to(device))
+        logging.info("Prédiction terminée.")
+
+    # Convertir la prédiction en probabilité
+    probabilities = torch.nn.functional.softmax(output.logits, dim=-1)[0]
+    prediction = torch.argmax(probabilities).item()
+    confidence = probabilities[prediction].item()
+
+    logging.info(f"Résultat de la prédiction RoBERTa: {prediction}")
+    logging.info(f"Probabilités: {probabilities.tolist()}")
+
+    # Traduire le résultat en français
+    initial_result = "vérifié" if prediction == 1 else "rejeté"
+    logging.info(f"Résultat initial RoBERTa: {initial_result} (confiance: {confidence:.2%})")
+    return initial_result, confidence
+
+
+def cached_sources(text):
+    """
+    Sources web de la dernière soumission du même texte, utilisées quand
+    Perplexity est indisponible.
+    """
+    from core.models import Submission
+
+    try:
+        previous = (
+            Submission.objects
+            .filter(texte__iexact=text.strip(), web_sources__isnull=False)
+            .exclude(web_sources=[])
+            .order_by('-date')
+            .values_list('web_sources', flat=True)
+            .first()
+        )
+    except Exception as e:
+        logging.warning(f"Sources en cache non lues: {e}")
+        return []
+    return previous or []
+
+
+def degraded_analysis(initial_result, confidence, sources):
+    """
+    Décision sans LLM (disjoncteur OpenRouter ouvert) : le résultat du
+    classifieur n'est repris que s'il est très confiant
+    (DEGRADED_MIN_CONFIDENCE), sinon la déclaration reste indéterminée.
+    """
+    if confidence is not None and confidence >= settings.DEGRADED_MIN_CONFIDENCE:
+        statut = "VRAIE" if initial_result == "vérifié" else "FAUSSE"
+    else:
+        statut = "INDÉTERMINÉE"
+    confidence_text = f" (confiance : {confidence:.0%})" if confidence is not None else ""
+    return {
+        "statut": statut,
+        "explication": (
+            "Le service d'analyse détaillée est temporairement indisponible. "
+            f"Résultat provisoire basé sur le modèle de classification automatique : {initial_result}{confidence_text}. "
+            "Relancez la vérification plus tard pour une analyse complète des sources."
+        ),
+        "sources_principales": [source.get('link', '') for source in sources[:3] if source.get('link')],
+        "mode_degrade": True,
+    }
+
+
+def search_sources(text, use_cache=True):
+    """
+    Étape 4 : recherche Perplexity des sources d'une déclaration.
+
+    Si le disjoncteur de Perplexity est ouvert, les sources de la dernière
+    vérification du même texte sont réutilisées. use_cache=False ignore le
+    cache des recherches Perplexity (voir search_cache).
+
+    Returns:
+        dict: verification_content, sources et citations (voir search_with_perplexity)
+    """
+    logging.info("ÉTAPE 4: Recherche avec Perplexity...")
+    if circuit_breaker.PERPLEXITY.is_open():
+        logging.warning("Perplexity indisponible (disjoncteur ouvert) : utilisation des sources en cache")
+        perplexity_result = {'verification_content': '', 'sources': cached_sources(text), 'citations': []}
+    else:
+        perplexity_result = search_with_perplexity(text, use_cache=use_cache)
+    logging.info(f"Résultat Perplexity - Sources: {len(perplexity_result['sources'])}, Citations: {len(perplexity_result.get('citations', []))}")
+    return perplexity_result
+
+
+def research_claim(text, translated_text, initial_result, on_stage=None, on_token=None, on_usage=None, confidence=None,
+                   use_cache=True):
+    """
+    Étapes 4 et 5 (réseau) : recherche Perplexity puis décision finale du LLM.
+
+    Appelée par la dernière tâche de la chaîne de vérification (file réseau),
+    après la traduction et la classification RoBERTa.
+
+    on_stage(stage, **data), si fourni, est appelé à la fin des étapes
+    searched et analysed ; on_token(text) reçoit l'explication du LLM au fil
+    du streaming ; on_usage(usage) la consommation de tokens de l'appel.
+    confidence : confiance du classifieur, utilisée en mode dégradé.
+    use_cache : voir search_sources.
+
+    Si le disjoncteur d'un fournisseur est ouvert, l'étape correspondante est
+    remplacée par une version dégradée : sources de la dernière vérification
+    du même texte au lieu de Perplexity, verdict du classifieur
+    (degraded_analysis) au lieu du LLM.
+
+    Returns:
+        tuple: (analyse finale, sources web)
+    """
+    def report(stage, **data):
+        if on_stage is None:
+            return
+        try:
+            on_stage(stage, **data)
+        except Exception as e:
+            logging.warning(f"Suivi de progression ({stage}) ignoré: {e}")
+
+    # Utiliser Perplexity pour rechercher des sources et vérifier le fait
+    perplexity_result = search_sources(text, use_cache=use_cache)
+    report(
+        "searched",
+        sources_count=len(perplexity_result['sources']),
+        sources=perplexity_result['sources']
+    )
+
+    if perplexity_result['verification_content']:
+        logging.info(f"Contenu de vérification Perplexity (extrait): {perplexity_result['verification_content'][:300]}...")
+
+    # Log des sources avec leurs extraits
+    for i, source in enumerate(perplexity_result['sources'][:3], 1):
+        logging.info(f"Source {i} détaillée:")
+        logging.info(f"  Titre: {source.get('title', 'N/A')}")
+        logging.info(f"  URL: {source.get('link', 'N/A')}")
+        logging.info(f"  Date: {source.get('date', 'N/A')}")
+        if source.get('snippet'):
+            logging.info(f"  Extrait: {source['snippet'][:150]}...")
+
+    # Utiliser l'API OpenRouter pour analyser les résultats combinés et obtenir une décision finale
+    logging.info("ÉTAPE 5: Analyse finale avec OpenRouter...")
+    if circuit_breaker.OPENROUTER.is_open():
+        logging.warning("OpenRouter indisponible (disjoncteur ouvert) : décision du classifieur en mode dégradé")
+        final_analysis = degraded_analysis(initial_result, confidence, perplexity_result['sources'])
+    else:
         final_analysis = llm_analysis(
-            translated_text, 
-            initial_result, 
+            translated_text,
+            initial_result,
             perplexity_result['sources'],
-            perplexity_result['verification_content']
+            perplexity_result['verification_content'],
+            on_token=on_token,
+            on_usage=on_usage
         )
-        
-        logging.info(f"=== RÉSULTAT FINAL ===")
-        if isinstance(final_analysis, dict):
-            logging.info(f"Statut final: {final_analysis.get('statut', 'INDÉTERMINÉE')}")
-            explanation = final_analysis.get('explication', 'Pas d\'explication')
-            logging.info(f"Explication: {explanation[:100]}...")
-            logging.info(f"Sources principales: {final_analysis.get('sources_principales', [])}")
-        else:
-            logging.info(f"Décision finale (format legacy): {final_analysis}")
-        
-        # Retourner les résultats dans le bon format
-        return final_analysis, perplexity_result['sources']
 
-    except Exception as e:
-        logging.error(f"ERREUR lors de l'analyse du texte : {e}")
-        logging.error(f"Type d'erreur: {type(e).__name__}")
-        import traceback
-        logging.error(f"Traceback: {traceback.format_exc()}")
-        error_msg = f"Une erreur s'est produite lors de l'analyse: {str(e)}"
-        return {
-            "statut": "ERREUR",
-            "explication": error_msg,
-            "sources_principales": []
-        }, []
\ No newline at end of file
+    logging.info(f"=== RÉSULTAT FINAL ===")
+    report(
+        "analysed",
+        statut=final_analysis.get('statut', 'INDÉTERMINÉE') if isinstance(final_analysis, dict) else final_analysis
+    )
+    if isinstance(final_analysis, dict):
+        logging.info(f"Statut final: {final_analysis.get('statut', 'INDÉTERMINÉE')}")
+        explanation = final_analysis.get('explication', 'Pas d\'explication')
+        logging.info(f"Explication: {explanation[:100]}...")
+        logging.info(f"Sources principales: {final_analysis.get('sources_principales', [])}")
+    else:
+        logging.info(f"Décision finale (format legacy): {final_analysis}")
+
+    return final_analysis, perplexity_result['sources']
+
+
+def research_claims_batch(claims, on_usage=None):
+    """
+    Étapes 4 et 5 pour plusieurs déclarations indépendantes (imports en masse).
+
+    claims : liste de dicts (text, translated_text, initial_result,
+    confidence). La recherche Perplexity reste faite déclaration par
+    déclaration ; la décision finale est demandée au LLM en un seul appel
+    pour tout le groupe (llm_analysis_batch), ou au classifieur en mode
+    dégradé si le disjoncteur d'OpenRouter est ouvert.
+
+    Returns:
+        list: (analyse finale, sources web) par déclaration, dans l'ordre des claims
+    """
+    searches = [search_sources(claim['text']) for claim in claims]
+
+    logging.info(f"ÉTAPE 5: Analyse finale groupée de {len(claims)} déclarations avec OpenRouter...")
+    if circuit_breaker.OPENROUTER.is_open():
+        logging.warning("OpenRouter indisponible (disjoncteur ouvert) : décisions du classifieur en mode dégradé")
+        analyses = [
+            degraded_analysis(claim['initial_result'], claim.get('confidence'), search['sources'])
+            for claim, search in zip(claims, searches)
+        ]
+    else:
+        analyses = llm_analysis_batch(
+            [
+                {
+                    'translated_text': claim['translated_text'],
+                    'initial_result': claim['initial_result'],
+                    'web_sources': search['sources'],
+                    'perplexity_verification': search['verification_content'],
+                }
+                for claim, search in zip(claims, searches)
+            ],
+            on_usage=on_usage
+        )
+    return [(analysis, search['sources']) for analysis, search in zip(analyses, searches)]
+
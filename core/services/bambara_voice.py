@@ -4,6 +4,8 @@ from urllib.parse import urljoin
 import requests
 from django.conf import settings
 
+from core import metrics
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,12 +35,13 @@ def _timeout():
 def _post(endpoint, **kwargs):
     url = urljoin(_base_url(), endpoint)
     try:
-        response = requests.post(
-            url,
-            headers=_headers(),
-            timeout=_timeout(),
-            **kwargs,
-        )
+        with metrics.observe_stage(metrics.BAMBARA):
+            response = requests.post(
+                url,
+                headers=_headers(),
+                timeout=_timeout(),
+                **kwargs,
+            )
     except requests.exceptions.Timeout as exc:
         logger.warning("Bambara API request timed out: %s", exc)
         raise RuntimeError("Bambara API request timed out") from exc
@@ -47,6 +50,7 @@ def _post(endpoint, **kwargs):
         raise RuntimeError("Bambara API request failed") from exc
 
     if response.status_code >= 400:
+        metrics.record_error(metrics.BAMBARA, f"http_{response.status_code}")
         logger.warning(
             "Bambara API returned HTTP %s for %s",
             response.status_code,
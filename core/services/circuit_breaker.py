@@ -0,0 +1,217 @@
+"""
+Circuit breakers for the external providers (Perplexity, OpenRouter).
+
+A breaker is closed while its provider behaves. Each call is recorded in
+per-CIRCUIT_BREAKER_BUCKET_SECONDS counters covering the last
+CIRCUIT_BREAKER_WINDOW seconds; once at least CIRCUIT_BREAKER_MIN_CALLS calls
+were made, the breaker opens when the share of failed calls reaches
+CIRCUIT_BREAKER_FAILURE_RATE or the share of calls slower than
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS reaches CIRCUIT_BREAKER_SLOW_RATE.
+
+While open, calls are refused at once (CircuitOpenError) instead of holding
+a worker until the provider times out, and research_claim (the search and
+LLM step of the verification chain tasks) takes its degraded path. After CIRCUIT_BREAKER_OPEN_SECONDS the breaker is half-open: a single
+probe call is let through; it closes the breaker if it succeeds in time and
+reopens it otherwise.
+
+State and counters live in Redis, so every web and worker process shares the
+same view of a provider; transitions run in Lua scripts. Without Redis the
+breakers stay closed. The state is exported as checkia_circuit_breaker_state
+(0 closed, 1 half-open, 2 open).
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from core import metrics
+
+from .errors import TransientError
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_ALLOW = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+if state == 'closed' then
+    return {1, state}
+end
+local now = tonumber(ARGV[1])
+if state == 'open' then
+    local opened_at = tonumber(redis.call('HGET', KEYS[1], 'opened_at') or '0')
+    if now - opened_at < tonumber(ARGV[2]) then
+        return {0, state}
+    end
+    redis.call('HSET', KEYS[1], 'state', 'half_open', 'probe_until', now + tonumber(ARGV[3]))
+    return {1, 'half_open'}
+end
+-- Half-open: one probe at a time, a new one if the last never reported
+local probe_until = tonumber(redis.call('HGET', KEYS[1], 'probe_until') or '0')
+if now < probe_until then
+    return {0, state}
+end
+redis.call('HSET', KEYS[1], 'probe_until', now + tonumber(ARGV[3]))
+return {1, state}
+"""
+
+# KEYS: state hash, current bucket, then every bucket of the window
+_RECORD = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+local failed = ARGV[2] == '0'
+local slow = ARGV[3] == '1'
+if state == 'half_open' then
+    if failed or slow then
+        redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', ARGV[1])
+        return {'open', 1}
+    end
+    redis.call('HSET', KEYS[1], 'state', 'closed')
+    redis.call('DEL', unpack(KEYS, 2))
+    return {'closed', 1}
+end
+redis.call('HINCRBY', KEYS[2], 'calls', 1)
+if failed then
+    redis.call('HINCRBY', KEYS[2], 'failures', 1)
+end
+if slow then
+    redis.call('HINCRBY', KEYS[2], 'slow', 1)
+end
+redis.call('EXPIRE', KEYS[2], tonumber(ARGV[7]))
+if state == 'open' then
+    return {state, 0}
+end
+local calls, failures, slows = 0, 0, 0
+for i = 3, #KEYS do
+    local bucket = redis.call('HMGET', KEYS[i], 'calls', 'failures', 'slow')
+    calls = calls + (tonumber(bucket[1]) or 0)
+    failures = failures + (tonumber(bucket[2]) or 0)
+    slows = slows + (tonumber(bucket[3]) or 0)
+end
+if calls >= tonumber(ARGV[4])
+        and (failures / calls >= tonumber(ARGV[5]) or slows / calls >= tonumber(ARGV[6])) then
+    redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', ARGV[1])
+    redis.call('DEL', unpack(KEYS, 3))
+    return {'open', 1}
+end
+return {state, 0}
+"""
+
+
+class CircuitOpenError(TransientError):
+    """Raised instead of calling a provider whose breaker is open."""
+
+    def __init__(self, provider):
+        super().__init__(provider, f"Service {provider} temporairement indisponible (disjoncteur ouvert)")
+
+
+class _Call:
+    """Outcome of a guarded call; set success = False for a failed response."""
+
+    success = True
+
+
+class CircuitBreaker:
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def state_key(self):
+        return f"breaker:{self.name}"
+
+    def _bucket_key(self, bucket):
+        return f"breaker:{self.name}:{bucket}"
+
+    def is_open(self):
+        """
+        Whether calls are currently refused (read-only: takes no probe slot).
+        """
+        client = get_redis_client()
+        if client is None:
+            return False
+        try:
+            state, opened_at, probe_until = client.hmget(self.state_key, "state", "opened_at", "probe_until")
+        except Exception as e:
+            logger.warning(f"Circuit breaker {self.name} not read: {e}")
+            return False
+        now = time.time()
+        state = state or CLOSED
+        metrics.set_breaker_state(self.name, state)
+        if state == OPEN:
+            return now - float(opened_at or 0) < settings.CIRCUIT_BREAKER_OPEN_SECONDS
+        if state == HALF_OPEN:
+            return now < float(probe_until or 0)
+        return False
+
+    def allow(self):
+        """Whether a call may go out now (in half-open state, only the probe may)."""
+        client = get_redis_client()
+        if client is None:
+            return True
+        try:
+            allowed, state = client.eval(
+                _ALLOW, 1, self.state_key,
+                time.time(), settings.CIRCUIT_BREAKER_OPEN_SECONDS, settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS * 2,
+            )
+        except Exception as e:
+            logger.warning(f"Circuit breaker {self.name} not checked: {e}")
+            return True
+        metrics.set_breaker_state(self.name, state)
+        if not int(allowed):
+            metrics.record_breaker_rejection(self.name)
+        return bool(int(allowed))
+
+    def record(self, success, elapsed):
+        """Record the outcome of a call and apply the resulting transition."""
+        client = get_redis_client()
+        if client is None:
+            return
+        bucket_seconds = settings.CIRCUIT_BREAKER_BUCKET_SECONDS
+        now = time.time()
+        current = int(now // bucket_seconds)
+        window = [self._bucket_key(current - i) for i in range(max(1, settings.CIRCUIT_BREAKER_WINDOW // bucket_seconds))]
+        slow = elapsed >= settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS
+        try:
+            state, changed = client.eval(
+                _RECORD, 2 + len(window), self.state_key, window[0], *window,
+                now, int(success), int(slow),
+                settings.CIRCUIT_BREAKER_MIN_CALLS, settings.CIRCUIT_BREAKER_FAILURE_RATE,
+                settings.CIRCUIT_BREAKER_SLOW_RATE, settings.CIRCUIT_BREAKER_WINDOW + bucket_seconds,
+            )
+        except Exception as e:
+            logger.warning(f"Circuit breaker {self.name} outcome not recorded: {e}")
+            return
+        metrics.set_breaker_state(self.name, state)
+        if int(changed):
+            metrics.record_breaker_transition(self.name, state)
+            log = logger.warning if state == OPEN else logger.info
+            log(f"Circuit breaker {self.name} {state} (last call {'ok' if success else 'failed'}, {elapsed:.1f}s)")
+
+    @contextmanager
+    def guard(self):
+        """
+        Run a provider call through the breaker.
+
+        Raises CircuitOpenError without running the block when the breaker
+        refuses the call. An exception in the block, or call.success set to
+        False, counts as a failure; the block's duration is checked against
+        the slow-call threshold.
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        call = _Call()
+        started = time.perf_counter()
+        try:
+            yield call
+        except Exception:
+            self.record(False, time.perf_counter() - started)
+            raise
+        self.record(call.success, time.perf_counter() - started)
+
+
+PERPLEXITY = CircuitBreaker(metrics.PERPLEXITY)
+OPENROUTER = CircuitBreaker(metrics.OPENROUTER)
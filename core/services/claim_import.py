@@ -0,0 +1,239 @@
+"""
+Bulk import of claims from CSV or NDJSON files (newsroom partners).
+
+The uploaded file is read line by line, never loaded whole: a CSV file needs
+a header row with a `texte` (or `text`, `claim`) column and an optional
+`source` (or `url`) column; an NDJSON file has one JSON object per line with
+the same keys. Empty texts, invalid lines and sources longer than the
+Submission field are reported per line; a text repeated in the file is
+imported once. A file may hold at most CLAIM_IMPORT_MAX_CLAIMS claims.
+
+create_submissions() inserts the claims with bulk_create,
+CLAIM_IMPORT_CHUNK_SIZE rows at a time, and queues the analysis of each chunk
+in the user's fair queue (fair_queue.submit_many), so an import of hundreds
+of claims does not delay other users' submissions. Claims are analysed in
+groups of LLM_BATCH_SIZE (analyze_submission_batch_task): one LLM call
+decides the whole group. The SubmissionBatch is the
+job handle: batch_progress() aggregates the statuses and verdicts of its
+submissions, and export_results() streams them back as CSV or NDJSON.
+"""
+
+import codecs
+import csv
+import json
+import logging
+
+from django.conf import settings
+from django.db.models import Count
+
+from . import fair_queue
+
+logger = logging.getLogger(__name__)
+
+CSV = "csv"
+NDJSON = "ndjson"
+FORMATS = (CSV, NDJSON)
+
+TEXT_FIELDS = ("texte", "text", "claim")
+SOURCE_FIELDS = ("source", "url")
+SOURCE_MAX_LENGTH = 200
+
+RESULT_FIELDS = ("id", "texte", "source", "statut", "verdict", "detailed_result", "sources", "verified_at")
+
+
+class ClaimImportError(ValueError):
+    """The file as a whole cannot be imported (format, header, size)."""
+
+
+def detect_format(filename, requested=None):
+    """CSV or NDJSON, from the requested format or the file extension."""
+    if requested:
+        fmt = requested.lower()
+    else:
+        extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+        fmt = {"csv": CSV, "ndjson": NDJSON, "jsonl": NDJSON}.get(extension, "")
+    if fmt not in FORMATS:
+        raise ClaimImportError("Format de fichier non pris en charge (csv ou ndjson)")
+    return fmt
+
+
+def _field(row, names):
+    for name in names:
+        value = row.get(name)
+        if value is not None:
+            return str(value).strip()
+    return ""
+
+
+def _rows(lines, fmt):
+    """Yield (line number, row dict or None, error) for each non-empty line."""
+    if fmt == CSV:
+        reader = csv.DictReader(lines)
+        header = [name.strip().lower() for name in reader.fieldnames or []]
+        if not any(name in header for name in TEXT_FIELDS):
+            raise ClaimImportError("L'en-tête CSV doit contenir une colonne texte")
+        reader.fieldnames = header
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None, "JSON invalide"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Objet JSON attendu"
+            continue
+        yield line_number, row, None
+
+
+def parse_claims(upload, fmt, max_claims=None):
+    """
+    Read the claims of an uploaded file (any iterable of byte lines).
+
+    Raises ClaimImportError for an unreadable file or more than max_claims
+    claims (CLAIM_IMPORT_MAX_CLAIMS).
+
+    Returns:
+        dict: claims (list of (line, texte, source)), duplicates and rejected
+        (lists of dicts with the line number)
+    """
+    max_claims = settings.CLAIM_IMPORT_MAX_CLAIMS if max_claims is None else max_claims
+    claims = []
+    duplicates = []
+    rejected = []
+    first_line = {}
+    try:
+        for line_number, row, error in _rows(codecs.iterdecode(upload, "utf-8-sig"), fmt):
+            if error is None:
+                texte = _field(row, TEXT_FIELDS)
+                source = _field(row, SOURCE_FIELDS)
+                if not texte:
+                    error = "Texte vide"
+                elif len(source) > SOURCE_MAX_LENGTH:
+                    error = f"Source de plus de {SOURCE_MAX_LENGTH} caractères"
+            if error is not None:
+                rejected.append({"line": line_number, "error": error})
+                continue
+
+            key = " ".join(texte.lower().split())
+            if key in first_line:
+                duplicates.append({"line": line_number, "duplicate_of": first_line[key]})
+                continue
+            if len(claims) >= max_claims:
+                raise ClaimImportError(f"Un import ne peut pas dépasser {max_claims} affirmations")
+            first_line[key] = line_number
+            claims.append((line_number, texte, source))
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ClaimImportError(f"Fichier illisible : {e}") from e
+    return {"claims": claims, "duplicates": duplicates, "rejected": rejected}
+
+
+def create_submissions(batch, claims, user_name=""):
+    """
+    Insert the claims of `batch` in chunks and queue their analysis.
+
+    Returns:
+        int: Number of submissions created
+    """
+    from core.models import Submission
+    from core.tasks import analyze_submission_batch_task, analyze_submission_text_task
+
+    chunk_size = max(1, settings.CLAIM_IMPORT_CHUNK_SIZE)
+    batch_size = max(1, settings.LLM_BATCH_SIZE)
+    created = 0
+    for start in range(0, len(claims), chunk_size):
+        submissions = Submission.objects.bulk_create([
+            Submission(
+                supabase_user_id=batch.supabase_user_id,
+                user_email=batch.user_email,
+                user_name=user_name,
+                texte=texte,
+                source=source or None,
+                statut="en cours",
+                detailed_result="Analyse en cours...",
+                batch=batch,
+            )
+            for _, texte, source in claims[start:start + chunk_size]
+        ])
+        if batch_size == 1:
+            fair_queue.submit_many(
+                analyze_submission_text_task,
+                batch.supabase_user_id,
+                [(submission.id, submission.texte) for submission in submissions],
+            )
+        else:
+            fair_queue.submit_many(
+                analyze_submission_batch_task,
+                batch.supabase_user_id,
+                [
+                    ([submission.id for submission in submissions[i:i + batch_size]],)
+                    for i in range(0, len(submissions), batch_size)
+                ],
+            )
+        created += len(submissions)
+        logger.info(f"Import {batch.id}: {created}/{len(claims)} claims queued")
+    return created
+
+
+def batch_progress(batch):
+    """Counts of the batch's submissions: completed, pending, and per verdict."""
+    counts = batch.submissions.values("statut", "verdict").annotate(count=Count("id"))
+    pending = 0
+    verdicts = {}
+    for row in counts:
+        if row["statut"] == "en cours":
+            pending += row["count"]
+            continue
+        verdict = row["verdict"] or "ERREUR"
+        verdicts[verdict] = verdicts.get(verdict, 0) + row["count"]
+    return {
+        "total": batch.total,
+        "completed": batch.total - pending,
+        "pending": pending,
+        "verdicts": verdicts,
+    }
+
+
+def _result_rows(batch):
+    submissions = batch.submissions.order_by("id").only(
+        "id", "texte", "source", "statut", "verdict", "detailed_result", "web_sources", "verified_at"
+    )
+    for submission in submissions.iterator(chunk_size=500):
+        yield {
+            "id": submission.id,
+            "texte": submission.texte,
+            "source": submission.source or "",
+            "statut": submission.statut,
+            "verdict": submission.verdict,
+            "detailed_result": submission.detailed_result or "",
+            "sources": [
+                source.get("link", "") for source in submission.web_sources or [] if isinstance(source, dict)
+            ],
+            "verified_at": submission.verified_at.isoformat() if submission.verified_at else "",
+        }
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_results(batch, fmt):
+    """Yield the batch's results as CSV or NDJSON lines, without loading them all."""
+    if fmt == CSV:
+        writer = csv.writer(_Echo())
+        yield writer.writerow(RESULT_FIELDS)
+        for row in _result_rows(batch):
+            row["sources"] = " ".join(row["sources"])
+            yield writer.writerow([row[field] for field in RESULT_FIELDS])
+        return
+
+    for row in _result_rows(batch):
+        yield json.dumps(row, ensure_ascii=False) + "\n"
@@ -11,7 +11,7 @@ def get_facts_translated(request):
     if not hasattr(request.user, 'is_authenticated') or not request.user.is_authenticated:
         return JsonResponse({"error": "Unauthorized"}, status=401)
 
-    facts = Fact.objects.all()
+    facts = Fact.objects.filter(verdict='VRAIE')
     translated_facts = set()
     seen_texts = set()  # Set to track unique translated texts
 
@@ -0,0 +1,94 @@
+"""
+Reliability of source domains, from the verdicts of the claims citing them.
+
+One DomainReliability row per domain counts the submissions whose sources
+cite it, by current verdict (VRAIE, FAUSSE, INDÉTERMINÉE), with the time of
+the last such verdict. The counts are maintained incrementally when a task
+saves a verdict: record_verdict() adds one to the new verdict of each domain
+of the submission and, when the nightly re-verification changes a verdict,
+removes one from the previous verdict of the domains cited before. Each
+update is a single UPDATE ... SET count = count + 1 on the domains of one
+claim, so no query ever reads the web_sources of other claims. A domain
+cited several times by one claim counts once. Facts are not counted: they
+are copies of submissions verified as VRAIE.
+
+hints() turns the counts of the domains cited by a claim into the compact
+"HISTORIQUE DU DOMAINE" line of the fact-check prompt, for domains with at
+least DOMAIN_RELIABILITY_MIN_VERDICTS verdicts. Migration 0018 built the
+initial counts from the Source links with one grouped query.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .sources import domain_of
+
+logger = logging.getLogger(__name__)
+
+# Count field of each verdict
+FIELDS = {"VRAIE": "vraie", "FAUSSE": "fausse", "INDÉTERMINÉE": "indeterminee"}
+
+
+def record_verdict(domains, verdict, previous_domains=(), previous_verdict=""):
+    """
+    Count a submission's verdict for the domains it cites, and uncount its
+    previous verdict for the domains it cited before (re-verification).
+    Best-effort: never fails a verification.
+    """
+    from core.models import DomainReliability
+
+    domains = sorted(set(domains))
+    previous_domains = sorted(set(previous_domains))
+    try:
+        with transaction.atomic():
+            field = FIELDS.get(previous_verdict)
+            if field and previous_domains:
+                DomainReliability.objects.filter(domain__in=previous_domains, **{f"{field}__gt": 0}).update(
+                    **{field: F(field) - 1}
+                )
+            field = FIELDS.get(verdict)
+            if field and domains:
+                DomainReliability.objects.bulk_create(
+                    [DomainReliability(domain=domain) for domain in domains], ignore_conflicts=True
+                )
+                DomainReliability.objects.filter(domain__in=domains).update(
+                    **{field: F(field) + 1}, last_seen=timezone.now()
+                )
+    except Exception as e:
+        logger.warning(f"Domain reliability not updated for {domains}: {e}")
+
+
+def describe(row):
+    """Compact French summary of a domain's verdicts, for the prompt."""
+    return (
+        f"cité par {row.total} déclarations vérifiées "
+        f"({row.vraie} VRAIES, {row.fausse} FAUSSES, {row.indeterminee} INDÉTERMINÉES)"
+    )
+
+
+def hints(web_sources):
+    """
+    Reliability hints of the domains of a list of web sources.
+
+    Returns:
+        dict: domain -> hint, for domains with at least
+        DOMAIN_RELIABILITY_MIN_VERDICTS verdicts (empty on any error)
+    """
+    from core.models import DomainReliability
+
+    domains = {
+        domain_of(source.get("link") or source.get("url") or "")
+        for source in web_sources or [] if isinstance(source, dict)
+    } - {""}
+    if not domains:
+        return {}
+    try:
+        rows = list(DomainReliability.objects.filter(domain__in=domains))
+    except Exception as e:
+        logger.warning(f"Domain reliability unavailable: {e}")
+        return {}
+    return {row.domain: describe(row) for row in rows if row.total >= settings.DOMAIN_RELIABILITY_MIN_VERDICTS}
@@ -0,0 +1,22 @@
+"""
+Errors shared by the service modules.
+
+Services raise TransientError for provider failures that are likely to pass
+(timeouts, connection errors, HTTP 429 and 5xx, open circuit breaker) instead
+of turning them into a result. The Celery tasks retry on it with exponential
+backoff (autoretry_for) and only mark the record as failed once the retries
+are exhausted. Other failures keep being reported as results.
+"""
+
+
+class TransientError(Exception):
+    """A provider failure worth retrying later."""
+
+    def __init__(self, provider, message=""):
+        self.provider = provider
+        super().__init__(message or f"Service {provider} temporairement indisponible")
+
+
+def is_transient_status(status_code):
+    """Whether an HTTP status is a rate limit or a server error."""
+    return status_code == 429 or status_code >= 500
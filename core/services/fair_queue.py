@@ -0,0 +1,238 @@
+"""
+Fair-share dispatch of verification tasks in front of Celery.
+
+Views do not send verification tasks to the broker directly. submit() gives
+the task its id (returned to the client as before) and appends it to its
+user's queue in Redis. dispatch() sends tasks to Celery taking one task per
+user in turn, and only while fewer than FAIR_QUEUE_MAX_IN_FLIGHT dispatched
+tasks are running. A user who submits a hundred claims therefore fills only
+their own queue: the next user's claim goes out after at most one of theirs.
+
+dispatch() runs after each submit() and after each dispatched task ends
+(task_postrun signal, see config/celery.py). A dispatched task that never
+reports its end (lost worker) frees its slot after FAIR_QUEUE_SLOT_TIMEOUT.
+A task the broker refuses goes back to the head of its user's queue and is
+sent by the next dispatch().
+
+Redis layout:
+- fairq:users: round-robin list of the users with queued tasks
+- fairq:user:<user id>: the user's queued tasks, oldest first
+- fairq:inflight: sorted set of dispatched task ids, scored by dispatch time
+
+Tasks that continue a dispatched task (text stages on the CPU and I/O
+queues, image upload -> verification) are sent directly and receive the
+dispatched task's id as their progress_id: the slot is freed when the last
+task of the chain ends (see release_finished). When fair queueing is disabled (FAIR_QUEUE_MAX_IN_FLIGHT = 0)
+or Redis is unavailable, submit() sends the task to Celery immediately.
+"""
+
+import logging
+import time
+import uuid
+
+from celery import current_app
+from django.conf import settings
+from kombu.utils import json
+
+from core import metrics, tracing
+
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+USERS_KEY = "fairq:users"
+INFLIGHT_KEY = "fairq:inflight"
+USER_QUEUE_PREFIX = "fairq:user:"
+
+_ENQUEUE = """
+local length = redis.call('RPUSH', KEYS[2], ARGV[2])
+if length == 1 then
+    redis.call('RPUSH', KEYS[1], ARGV[1])
+end
+return length
+"""
+
+# Puts back a task that could not be sent at the head of its user's queue
+_REQUEUE = """
+local length = redis.call('LPUSH', KEYS[2], ARGV[2])
+if length == 1 then
+    redis.call('LPUSH', KEYS[1], ARGV[1])
+end
+return length
+"""
+
+# Pops the next task in round-robin order and marks it in flight, or returns
+# nil when every slot is taken or no task is queued
+_NEXT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[3])
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[2]) then
+    return nil
+end
+local user = redis.call('LPOP', KEYS[1])
+while user do
+    local queue = ARGV[4] .. user
+    local item = redis.call('LPOP', queue)
+    if item then
+        if redis.call('LLEN', queue) > 0 then
+            redis.call('RPUSH', KEYS[1], user)
+        end
+        redis.call('ZADD', KEYS[2], ARGV[1], cjson.decode(item)['task_id'])
+        return item
+    end
+    user = redis.call('LPOP', KEYS[1])
+end
+return nil
+"""
+
+
+def user_queue_key(user_id):
+    return f"{USER_QUEUE_PREFIX}{user_id}"
+
+
+def _enabled_client():
+    if settings.FAIR_QUEUE_MAX_IN_FLIGHT <= 0:
+        return None
+    return get_redis_client()
+
+
+def submit(task, user_id, *args, **kwargs):
+    """
+    Queue `task(*args, **kwargs)` behind the user's earlier tasks.
+
+    Returns:
+        str: The Celery task id the client follows
+    """
+    task_id = str(uuid.uuid4())
+    client = _enabled_client()
+    if client is not None and _enqueue(client, task, task_id, user_id, args, kwargs):
+        dispatch()
+        return task_id
+
+    task.apply_async(args, kwargs, task_id=task_id)
+    return task_id
+
+
+def submit_many(task, user_id, args_list):
+    """
+    Queue `task(*args)` for each args of `args_list` (e.g. a chunk of
+    imported claims), then dispatch once.
+
+    Returns:
+        list: The Celery task ids, in the order of args_list
+    """
+    client = _enabled_client()
+    task_ids = []
+    for args in args_list:
+        task_id = str(uuid.uuid4())
+        if client is None or not _enqueue(client, task, task_id, user_id, args, {}):
+            client = None
+            task.apply_async(args, task_id=task_id)
+        task_ids.append(task_id)
+    dispatch()
+    return task_ids
+
+
+def _enqueue(client, task, task_id, user_id, args, kwargs):
+    """
+    Append the task to the user's queue; False when Redis fails.
+
+    The entry keeps the submitter's traceparent: dispatch() runs in whatever
+    request or task frees a slot, and publishes the task in the submitter's
+    trace instead.
+    """
+    current = tracing.current_span()
+    item = json.dumps({
+        "task": task.name,
+        "task_id": task_id,
+        "args": args,
+        "kwargs": kwargs,
+        "user_id": str(user_id),
+        "queued_at": time.time(),
+        "traceparent": current.traceparent if current is not None else None,
+    })
+    try:
+        position = client.eval(_ENQUEUE, 2, USERS_KEY, user_queue_key(user_id), str(user_id), item)
+    except Exception as e:
+        logger.warning(f"Fair queue unavailable, sending task {task_id} directly: {e}")
+        return False
+    logger.info(f"Task {task_id} queued for user {user_id} (position {position})")
+    return True
+
+
+def dispatch():
+    """
+    Send queued tasks to Celery while slots are free.
+
+    Returns:
+        int: Number of tasks sent
+    """
+    client = _enabled_client()
+    if client is None:
+        return 0
+
+    sent = 0
+    while True:
+        now = time.time()
+        try:
+            item = client.eval(
+                _NEXT, 2, USERS_KEY, INFLIGHT_KEY,
+                now, settings.FAIR_QUEUE_MAX_IN_FLIGHT, now - settings.FAIR_QUEUE_SLOT_TIMEOUT, USER_QUEUE_PREFIX,
+            )
+        except Exception as e:
+            logger.warning(f"Fair queue not drained: {e}")
+            return sent
+        if item is None:
+            return sent
+
+        entry = json.loads(item)
+        metrics.observe_queue_wait(entry["task"], now - entry["queued_at"])
+        try:
+            with tracing.use_traceparent(entry.get("traceparent")):
+                current_app.tasks[entry["task"]].apply_async(entry["args"], entry["kwargs"], task_id=entry["task_id"])
+            sent += 1
+        except Exception as e:
+            # Broker unavailable: keep the task first in line for the next dispatch
+            logger.error(f"Task {entry['task_id']} of user {entry['user_id']} could not be sent to Celery: {e}")
+            _requeue(client, entry, item)
+            release(entry["task_id"], redispatch=False)
+            return sent
+
+
+def _requeue(client, entry, item):
+    try:
+        client.eval(_REQUEUE, 2, USERS_KEY, user_queue_key(entry["user_id"]), entry["user_id"], item)
+    except Exception as e:
+        logger.error(f"Task {entry['task_id']} of user {entry['user_id']} lost, fair queue unavailable: {e}")
+
+
+def release_finished(task_id, task_kwargs, retval):
+    """
+    task_postrun hook: free the slot of the chain `task_id` belongs to.
+
+    A task that handed its work to a follow-up task (returns success with the
+    follow-up's task_id) keeps the slot; the follow-up releases it under its
+    progress_id.
+    """
+    if isinstance(retval, dict) and retval.get("success") and retval.get("task_id"):
+        return False
+    return release((task_kwargs or {}).get("progress_id") or task_id)
+
+
+def release(task_id, redispatch=True):
+    """
+    Free the slot of a dispatched task that ended, then dispatch the next one.
+
+    Tasks that were not dispatched through the fair queue are ignored.
+    """
+    client = _enabled_client()
+    if client is None or not task_id:
+        return False
+    try:
+        released = bool(client.zrem(INFLIGHT_KEY, task_id))
+    except Exception as e:
+        logger.warning(f"Fair queue slot of task {task_id} not released: {e}")
+        return False
+    if released and redispatch:
+        dispatch()
+    return released
+
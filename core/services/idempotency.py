@@ -0,0 +1,152 @@
+"""
+Idempotent create requests and task runs.
+
+Requests: a client may send an `Idempotency-Key` header (any unique string,
+e.g. a UUID per user action) with the endpoints that launch verifications.
+The first request with a key claims it in Redis; once it succeeds, its
+response is stored for IDEMPOTENCY_KEY_TTL seconds and every retry with the
+same key gets that response back (header `Idempotent-Replayed: true`)
+without creating a record or launching a task. A retry that arrives while the
+first request is still being handled is answered 409, and a key reused with
+a different request body 422. Failed requests (4xx/5xx) release the key so
+the client can retry.
+
+Tasks: claim_run() lets a single delivery of a Celery message run its
+expensive part, so a redelivered task running alongside the original does
+not call the external APIs twice; a task released by release_run() before
+it is retried can claim it again. Sequential redeliveries are stopped by the
+tasks themselves, which only act on records still "en cours" and save their
+result with a conditional UPDATE.
+
+Without Redis, keys are not checked and runs are not claimed.
+"""
+
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+# A claimed key whose request never completes (crashed process) is freed after
+# this; views slower than that (image batch uploads) pass a longer pending_ttl
+PENDING_TTL = 60
+
+NEW = "new"
+PENDING = "pending"
+DONE = "done"
+MISMATCH = "mismatch"
+
+
+def request_key(user_id, key):
+    return f"idempotency:{user_id}:{key}"
+
+
+def run_key(name):
+    return f"idempotency:run:{name}"
+
+
+def request_fingerprint(request):
+    """SHA-256 of the request fields and uploaded file contents."""
+    digest = hashlib.sha256()
+    data = request.data
+    items = data.lists() if hasattr(data, "lists") else data.items()
+    for name, values in sorted(items, key=lambda item: item[0]):
+        for value in values if isinstance(values, list) else [values]:
+            digest.update(name.encode())
+            if hasattr(value, "chunks"):
+                for chunk in value.chunks():
+                    digest.update(chunk)
+                value.seek(0)
+            else:
+                digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def begin(user_id, key, fingerprint, pending_ttl=PENDING_TTL):
+    """
+    Claim `key` for a new request, or find the request that claimed it. The
+    claim lasts `pending_ttl` seconds, longer than the request can take.
+
+    Returns:
+        dict: state (new, pending, done or mismatch) and, when done, the
+        stored status and data of the response
+    """
+    client = get_redis_client()
+    if client is None:
+        return {"state": NEW}
+    redis_key = request_key(user_id, key)
+    try:
+        if client.set(redis_key, json.dumps({"fingerprint": fingerprint}), nx=True, ex=pending_ttl):
+            return {"state": NEW}
+        stored = client.get(redis_key)
+    except Exception as e:
+        logger.warning(f"Idempotency key of user {user_id} not checked: {e}")
+        return {"state": NEW}
+    if stored is None:
+        # Expired between the two calls: handle as a new request
+        return {"state": NEW}
+
+    entry = json.loads(stored)
+    if entry["fingerprint"] != fingerprint:
+        return {"state": MISMATCH}
+    if "status" not in entry:
+        return {"state": PENDING}
+    return {"state": DONE, "status": entry["status"], "data": entry["data"]}
+
+
+def complete(user_id, key, fingerprint, status_code, data):
+    """Store the response of the request that claimed `key`."""
+    client = get_redis_client()
+    if client is None:
+        return
+    entry = json.dumps({"fingerprint": fingerprint, "status": status_code, "data": data}, cls=DjangoJSONEncoder)
+    try:
+        client.set(request_key(user_id, key), entry, ex=settings.IDEMPOTENCY_KEY_TTL)
+    except Exception as e:
+        logger.warning(f"Response for idempotency key of user {user_id} not stored: {e}")
+
+
+def release(user_id, key):
+    """Free `key` after a failed request so that it can be retried."""
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        client.delete(request_key(user_id, key))
+    except Exception as e:
+        logger.warning(f"Idempotency key of user {user_id} not released: {e}")
+
+
+def claim_run(name):
+    """
+    Whether this process is the first to run `name` (e.g. a stage and the id
+    of the task chain); later claims within IDEMPOTENCY_RUN_TTL are refused.
+    """
+    client = get_redis_client()
+    if client is None:
+        return True
+    try:
+        return bool(client.set(run_key(name), 1, nx=True, ex=settings.IDEMPOTENCY_RUN_TTL))
+    except Exception as e:
+        logger.warning(f"Run {name} not claimed: {e}")
+        return True
+
+
+def release_run(name):
+    """Drop the claim on `name` so that a retry of the task can run it."""
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        client.delete(run_key(name))
+    except Exception as e:
+        logger.warning(f"Run {name} not released: {e}")
@@ -0,0 +1,59 @@
+"""
+Resized WebP derivatives of verification images.
+
+A small thumbnail and a medium preview are generated at upload time and
+stored next to the original, so list views (image history, batch progress)
+download kilobytes instead of the full-size original.
+"""
+
+import logging
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# name -> (longest side in pixels, WebP quality)
+DERIVATIVE_SIZES = {
+    "thumbnail": (256, 70),
+    "preview": (1024, 80),
+}
+
+
+def generate_derivatives(image_bytes):
+    """
+    Build the WebP derivatives of an image.
+
+    Args:
+        image_bytes: Raw bytes of the original image.
+
+    Returns:
+        dict mapping derivative name to WebP bytes. Empty if the bytes are
+        not a readable image.
+    """
+    try:
+        img = Image.open(BytesIO(image_bytes))
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+    except Exception as e:
+        logger.warning(f"Derivatives: unreadable image: {e}")
+        return {}
+
+    derivatives = {}
+    for name, (max_side, quality) in DERIVATIVE_SIZES.items():
+        try:
+            resized = img.copy()
+            resized.thumbnail((max_side, max_side), Image.LANCZOS)
+            output = BytesIO()
+            resized.save(output, format="WEBP", quality=quality, method=4)
+            derivatives[name] = output.getvalue()
+        except Exception as e:
+            logger.warning(f"Derivatives: failed to build {name}: {e}")
+
+    logger.info(
+        "Derivatives generated: "
+        + ", ".join(f"{name}={len(data)} bytes" for name, data in derivatives.items())
+        + f" (original {len(image_bytes)} bytes)"
+    )
+    return derivatives
@@ -6,6 +6,12 @@ from dotenv import load_dotenv
 from io import BytesIO
 from PIL import Image
 import json
+import time
+from core import metrics
+from core.services import circuit_breaker
+from core.services.errors import TransientError, is_transient_status
+from core.services.llm import OPENROUTER_TRANSIENT_ERRORS
+from core.services.llm_usage import AI_DETECTION, CONTENT_VERIFICATION, report_usage
 
 load_dotenv()
 
@@ -25,14 +31,20 @@ def _get_openai_client():
 def encode_image_url_to_base64(image_url):
     """
     Download an image from URL and encode it to base64
+
+    Raises TransientError when the storage is unreachable or answers 429/5xx.
     """
     try:
         logging.info(f"Downloading image from: {image_url}")
 
-        response = requests.get(image_url, timeout=30)
+        with metrics.observe_stage(metrics.IMAGE_DOWNLOAD):
+            response = requests.get(image_url, timeout=30)
 
         if response.status_code != 200:
             logging.error(f"HTTP error {response.status_code}: {response.text}")
+            metrics.record_error(metrics.IMAGE_DOWNLOAD, f"http_{response.status_code}")
+            if is_transient_status(response.status_code):
+                raise TransientError(metrics.IMAGE_DOWNLOAD, f"Image download failed: HTTP {response.status_code}")
             return None
 
         response.raise_for_status()
@@ -52,6 +64,11 @@ def encode_image_url_to_base64(image_url):
 
         logging.info(f"Image encoded successfully, format: {format_lower}, size: {len(response.content)} bytes")
         return data_url
+    except TransientError:
+        raise
+    except (requests.ConnectionError, requests.Timeout) as e:
+        logging.error(f"Request error while downloading: {e}")
+        raise TransientError(metrics.IMAGE_DOWNLOAD, f"Image download failed: {e}") from e
     except requests.exceptions.RequestException as e:
         logging.error(f"Request error while downloading: {e}")
         return None
@@ -201,9 +218,11 @@ def _run_pixel_analyzer(image_url):
         from core.services.pixel_analyzer import is_available, detect_ai_image
         if not is_available():
             return None
-        result = detect_ai_image(image_url)
+        with metrics.observe_stage(metrics.SIGHTENGINE):
+            result = detect_ai_image(image_url)
         if result["success"]:
             return result["ai_score"]
+        metrics.record_error(metrics.SIGHTENGINE, "api_error")
         logging.warning(f"Pixel analyzer failed: {result['error']}. Falling back to LLM-only.")
         return None
     except ImportError:
@@ -213,30 +232,90 @@ def _run_pixel_analyzer(image_url):
         return None
 
 
+# --- Metadata pre-screen (zero network, runs before pixel analyzer and LLM) ---
+
+METADATA_PRESCREEN_MODEL = "metadata-prescreen"
+
+
+def _run_metadata_prescreen(data_url):
+    """
+    Extract provenance metadata from the already-encoded image.
+    Returns None if the bytes cannot be analysed.
+    """
+    try:
+        from core.services.metadata_analyzer import analyze_image_metadata
+        image_bytes = base64.b64decode(data_url.split(",", 1)[1], validate=True)
+        result = analyze_image_metadata(image_bytes)
+        if result["success"]:
+            return result
+        return None
+    except Exception as e:
+        logging.warning(f"Metadata pre-screen error: {e}. Continuing without metadata.")
+        return None
+
+
+def _metadata_summary(metadata):
+    """Compact metadata block stored in ImageVerification.details."""
+    if not metadata:
+        return None
+    return {
+        "format": metadata["format"],
+        "exif": metadata["exif"],
+        "generator": metadata["generator"],
+        "digital_source_type": metadata["digital_source_type"],
+        "c2pa": metadata["c2pa"],
+        "signals": metadata["signals"],
+        "verdict": metadata["verdict"],
+    }
+
+
+def _metadata_verdict_result(metadata):
+    """Build the detection result when the metadata declares an AI generator."""
+    signals = "\n".join(f"- {signal}" for signal in metadata["signals"])
+    conclusion = (
+        "Les métadonnées du fichier déclarent explicitement une génération par IA. "
+        "Ces informations sont écrites par l'outil de génération lui-même : "
+        "l'analyse visuelle n'a pas été nécessaire."
+    )
+
+    return {
+        "statut": metadata["verdict"],
+        "explication": f"**Verdict établi à partir des métadonnées du fichier.**\n\n{signals}\n\n{conclusion}",
+        "details": {
+            "type_verification": "Détection IA",
+            "probabilite_ia": 99,
+            "elements_suspects": metadata["signals"],
+            "elements_authentiques": [],
+            "model": METADATA_PRESCREEN_MODEL,
+            "pixel_analyzer_score": None,
+            "llm_probabilite_ia": None,
+            "metadata": _metadata_summary(metadata),
+        },
+        "confidence": 95
+    }
+
+
 # --- Main detection functions ---
 
-def detect_ai_generated_image(image_url):
+def detect_ai_generated_image(image_url, on_usage=None):
     """
     Détecte si une image est générée par IA ou est un deepfake.
 
     Pipeline:
-    1. Pixel-level analysis (primary signal)
-    2. LLM vision analysis (provides human-readable explanation)
+    1. Metadata pre-screen (EXIF, PNG text, XMP, C2PA — no network call).
+       When the metadata declares an AI generator the remote calls below
+       are skipped; other metadata is only kept as signals.
+    2. Pixel-level analysis (primary signal)
+    3. LLM vision analysis (provides human-readable explanation)
 
     If pixel analyzer is unavailable, falls back to LLM-only detection.
+    on_usage, if given, receives the token usage of the LLM call.
     """
     try:
         logging.info("=== AI DETECTION START ===")
         logging.info(f"Image URL: {image_url}")
 
-        # Step 1: Pixel-level detection (optional)
-        pixel_score = _run_pixel_analyzer(image_url)
-        has_pixel_analyzer = pixel_score is not None
-
-        if has_pixel_analyzer:
-            logging.info(f"Pixel analyzer AI score: {pixel_score:.2f}")
-
-        # Step 2: Encode image for LLM analysis
+        # Encode image (also provides the bytes for the metadata pre-screen)
         data_url = encode_image_url_to_base64(image_url)
         if not data_url:
             return {
@@ -246,7 +325,20 @@ def detect_ai_generated_image(image_url):
                 "confidence": 0
             }
 
-        # Build prompt — same critical analysis always, pixel analyzer context appended when available
+        # Step 1: Metadata pre-screen
+        metadata = _run_metadata_prescreen(data_url)
+        if metadata and metadata["verdict"]:
+            logging.info(f"Metadata pre-screen is conclusive ({metadata['verdict']}), skipping remote analysis")
+            return _metadata_verdict_result(metadata)
+
+        # Step 2: Pixel-level detection (optional)
+        pixel_score = _run_pixel_analyzer(image_url)
+        has_pixel_analyzer = pixel_score is not None
+
+        if has_pixel_analyzer:
+            logging.info(f"Pixel analyzer AI score: {pixel_score:.2f}")
+
+        # Step 3: LLM vision analysis — same critical analysis always, pixel analyzer context appended when available
         prompt = """Tu es un expert en analyse forensique d'images numériques, spécialisé dans la détection d'images générées par intelligence artificielle et de deepfakes.
 
 Analyse cette image avec un regard CRITIQUE et SCEPTIQUE. Ne présume PAS qu'une image est authentique par défaut — les générateurs d'images IA modernes (Midjourney, DALL-E, Stable Diffusion, Flux, Gemini) produisent des résultats très réalistes.
@@ -302,17 +394,20 @@ NOTE ADDITIONNELLE: Notre analyseur spécialisé par analyse de pixels a estimé
         client = _get_openai_client()
 
         logging.info(f"Sending AI detection request via {AI_DETECTION_MODEL}...")
-        response = client.chat.completions.create(
-            extra_headers={
-                "HTTP-Referer": "https://check-ia.app",
-                "X-Title": "Check-IA",
-            },
-            model=AI_DETECTION_MODEL,
-            messages=messages,
-            temperature=0.2,
-            max_tokens=1500,
-            response_format=AI_DETECTION_SCHEMA
-        )
+        started = time.perf_counter()
+        with circuit_breaker.OPENROUTER.guard(), metrics.observe_stage(metrics.OPENROUTER):
+            response = client.chat.completions.create(
+                extra_headers={
+                    "HTTP-Referer": "https://check-ia.app",
+                    "X-Title": "Check-IA",
+                },
+                model=AI_DETECTION_MODEL,
+                messages=messages,
+                temperature=0.2,
+                max_tokens=1500,
+                response_format=AI_DETECTION_SCHEMA
+            )
+        report_usage(on_usage, AI_DETECTION, AI_DETECTION_MODEL, getattr(response, "usage", None), started)
 
         raw_text = response.choices[0].message.content.strip()
         logging.info(f"AI detection response received: {raw_text[:300]}...")
@@ -323,7 +418,7 @@ NOTE ADDITIONNELLE: Notre analyseur spécialisé par analyse de pixels a estimé
             llm_confiance = max(0, min(100, parsed.get("confiance", 50)))
             llm_probabilite_ia = max(0, min(100, parsed.get("probabilite_ia", 50)))
 
-            # Step 3: Determine verdict and confidence
+            # Step 4: Determine verdict and confidence
             if has_pixel_analyzer:
                 # Pixel analyzer is the authority for verdict and score
                 pixel_pct = int(pixel_score * 100)
@@ -358,6 +453,7 @@ NOTE ADDITIONNELLE: Notre analyseur spécialisé par analyse de pixels a estimé
                     "model": AI_DETECTION_MODEL,
                     "pixel_analyzer_score": pixel_score if has_pixel_analyzer else None,
                     "llm_probabilite_ia": llm_probabilite_ia,
+                    "metadata": _metadata_summary(metadata),
                 },
                 "confidence": final_confiance
             }
@@ -369,11 +465,17 @@ NOTE ADDITIONNELLE: Notre analyseur spécialisé par analyse de pixels a estimé
                 "details": {
                     "type_verification": "Détection IA",
                     "erreur_parsing": True,
-                    "model": AI_DETECTION_MODEL
+                    "model": AI_DETECTION_MODEL,
+                    "metadata": _metadata_summary(metadata),
                 },
                 "confidence": 50
             }
 
+    except TransientError:
+        raise
+    except OPENROUTER_TRANSIENT_ERRORS as e:
+        logging.error(f"OpenRouter unavailable during AI detection: {e}")
+        raise TransientError(metrics.OPENROUTER, f"OpenRouter temporairement indisponible: {e}") from e
     except Exception as e:
         logging.error(f"Error during AI detection: {e}")
         import traceback
@@ -386,10 +488,11 @@ NOTE ADDITIONNELLE: Notre analyseur spécialisé par analyse de pixels a estimé
         }
 
 
-def verify_image_content(image_url, claim_text=""):
+def verify_image_content(image_url, claim_text="", on_usage=None):
     """
     Vérifie le contenu d'une image et analyse les affirmations à son sujet.
     Utilise un modèle de vision via OpenRouter avec sortie JSON structurée.
+    on_usage, si fourni, reçoit la consommation de l'appel au LLM.
     """
     try:
         logging.info("=== IMAGE CONTENT VERIFICATION START ===")
@@ -410,6 +513,8 @@ def verify_image_content(image_url, claim_text=""):
                 "confidence": 0
             }
 
+        metadata = _run_metadata_prescreen(data_url)
+
         if claim_text:
             prompt = f"""Tu es un expert en vérification de faits par l'image. Nous sommes le {current_date} (année {current_year}).
 
@@ -458,17 +563,20 @@ Réponds en français."""
         client = _get_openai_client()
 
         logging.info(f"Sending content verification request via {CONTENT_VERIFICATION_MODEL}...")
-        response = client.chat.completions.create(
-            extra_headers={
-                "HTTP-Referer": "https://check-ia.app",
-                "X-Title": "Check-IA",
-            },
-            model=CONTENT_VERIFICATION_MODEL,
-            messages=messages,
-            temperature=0.3,
-            max_tokens=1500,
-            response_format=response_format
-        )
+        started = time.perf_counter()
+        with circuit_breaker.OPENROUTER.guard(), metrics.observe_stage(metrics.OPENROUTER):
+            response = client.chat.completions.create(
+                extra_headers={
+                    "HTTP-Referer": "https://check-ia.app",
+                    "X-Title": "Check-IA",
+                },
+                model=CONTENT_VERIFICATION_MODEL,
+                messages=messages,
+                temperature=0.3,
+                max_tokens=1500,
+                response_format=response_format
+            )
+        report_usage(on_usage, CONTENT_VERIFICATION, CONTENT_VERIFICATION_MODEL, getattr(response, "usage", None), started)
 
         raw_text = response.choices[0].message.content.strip()
         logging.info(f"Content verification response received: {raw_text[:300]}...")
@@ -485,7 +593,8 @@ Réponds en français."""
                     "type_verification": "Contenu d'image",
                     "affirmation": claim_text,
                     "elements_cles": parsed.get("elements_cles", []),
-                    "model": CONTENT_VERIFICATION_MODEL
+                    "model": CONTENT_VERIFICATION_MODEL,
+                    "metadata": _metadata_summary(metadata),
                 },
                 "confidence": confiance
             }
@@ -498,11 +607,17 @@ Réponds en français."""
                     "type_verification": "Contenu d'image",
                     "affirmation": claim_text,
                     "erreur_parsing": True,
-                    "model": CONTENT_VERIFICATION_MODEL
+                    "model": CONTENT_VERIFICATION_MODEL,
+                    "metadata": _metadata_summary(metadata),
                 },
                 "confidence": 50
             }
 
+    except TransientError:
+        raise
+    except OPENROUTER_TRANSIENT_ERRORS as e:
+        logging.error(f"OpenRouter unavailable during image content verification: {e}")
+        raise TransientError(metrics.OPENROUTER, f"OpenRouter temporairement indisponible: {e}") from e
     except Exception as e:
         logging.error(f"Error during image content verification: {e}")
         import traceback
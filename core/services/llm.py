@@ -1,7 +1,15 @@
+import json
 import logging
+import time
 from dotenv import load_dotenv
 import os
-from openai import OpenAI
+from django.conf import settings
+from openai import APIConnectionError, InternalServerError, OpenAI, RateLimitError
+from core import metrics
+from core.services import circuit_breaker, domain_reliability
+from core.services.errors import TransientError
+from core.services.llm_usage import FACT_CHECK, FACT_CHECK_BATCH, report_usage
+from core.services.prompt_builder import build_batch_fact_check_prompt, build_fact_check_prompt
 
 load_dotenv()
 
@@ -10,12 +18,206 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 # Initialiser le client OpenRouter avec l'API OpenAI
 client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
+    base_url=os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
     api_key=API_TOKEN,
+    timeout=float(os.getenv("OPENROUTER_TIMEOUT", "60")),
 )
 
+# Erreurs passagères du client OpenAI (réseau, délai, HTTP 429, HTTP 5xx)
+OPENROUTER_TRANSIENT_ERRORS = (APIConnectionError, RateLimitError, InternalServerError)
+
+VERDICTS = ("VRAIE", "FAUSSE", "INDÉTERMINÉE")
+
+# Verdict d'une déclaration, commun aux réponses structurées simple et groupée
+_VERDICT_PROPERTIES = {
+    "statut": {
+        "type": "string",
+        "enum": list(VERDICTS),
+        "description": "Le verdict sur la véracité de la déclaration"
+    },
+    "explication": {
+        "type": "string",
+        "description": "Explication concise en français basée sur les sources"
+    },
+    "sources_principales": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "URL des sources principales (3 au plus)"
+    }
+}
+
+FACT_CHECK_SCHEMA = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "fact_check_result",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": _VERDICT_PROPERTIES,
+            "required": ["statut", "explication", "sources_principales"],
+            "additionalProperties": False
+        }
+    }
+}
+
+# Réponse structurée du mode groupé : un verdict par déclaration numérotée
+FACT_CHECK_BATCH_SCHEMA = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "fact_check_batch",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "verdicts": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "numero": {
+                                "type": "integer",
+                                "description": "Numéro de la déclaration (### DÉCLARATION n)"
+                            },
+                            **_VERDICT_PROPERTIES
+                        },
+                        "required": ["numero", "statut", "explication", "sources_principales"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["verdicts"],
+            "additionalProperties": False
+        }
+    }
+}
+
+_JSON_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class ExplanationExtractor:
+    """
+    Extrait au fil de l'eau la valeur du champ "explication" d'une réponse
+    JSON encore incomplète.
+
+    feed() reçoit chaque fragment du flux et renvoie le texte d'explication
+    nouvellement décodé (chaîne vide tant que le champ n'a pas commencé, ou
+    quand une séquence d'échappement est coupée entre deux fragments).
+    """
+
+    def __init__(self, field="explication"):
+        self.marker = f'"{field}"'
+        self.buffer = ""
+        self.position = None  # Index du prochain caractère de la valeur
+        self.done = False
+
+    def feed(self, fragment):
+        self.buffer += fragment
+        if self.done:
+            return ""
+        if self.position is None:
+            start = self.buffer.find(self.marker)
+            if start < 0:
+                return ""
+            colon = self.buffer.find(':', start + len(self.marker))
+            quote = self.buffer.find('"', colon + 1) if colon >= 0 else -1
+            if quote < 0:
+                return ""
+            self.position = quote + 1
+
+        decoded = []
+        i = self.position
+        while i < len(self.buffer):
+            char = self.buffer[i]
+            if char == '"':
+                self.done = True
+                i += 1
+                break
+            if char != '\\':
+                decoded.append(char)
+                i += 1
+                continue
+            if i + 1 >= len(self.buffer):
+                break  # Échappement coupé : attendre le fragment suivant
+            escape = self.buffer[i + 1]
+            if escape == 'u':
+                if i + 6 > len(self.buffer):
+                    break
+                try:
+                    decoded.append(chr(int(self.buffer[i + 2:i + 6], 16)))
+                except ValueError:
+                    pass
+                i += 6
+            else:
+                decoded.append(_JSON_ESCAPES.get(escape, escape))
+                i += 2
+        self.position = i
+        return "".join(decoded)
+
+
+def _stream_completion(on_token, **request):
+    """
+    Consomme le flux OpenRouter et publie l'explication au fil de l'eau.
+
+    Returns:
+        tuple: (texte complet généré, usage envoyé avec le dernier fragment ou None)
+    """
+    extractor = ExplanationExtractor()
+    parts = []
+    usage = None
+    stream = client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **request)
+    for chunk in stream:
+        usage = getattr(chunk, "usage", None) or usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        parts.append(delta)
+        explanation_delta = extractor.feed(delta)
+        if explanation_delta:
+            try:
+                on_token(explanation_delta)
+            except Exception as e:
+                logging.warning(f"Publication du fragment d'explication ignorée: {e}")
+    return "".join(parts), usage
+
+
+def _verdict(data):
+    """
+    Verdict validé d'une réponse structurée (statut connu, explication non
+    vide), ou None.
+    """
+    if not isinstance(data, dict):
+        return None
+    explanation = data.get("explication")
+    if data.get("statut") not in VERDICTS or not isinstance(explanation, str) or not explanation.strip():
+        return None
+    sources = data.get("sources_principales")
+    return {
+        "statut": data["statut"],
+        "explication": explanation,
+        "sources_principales": [s for s in sources if isinstance(s, str)] if isinstance(sources, list) else [],
+    }
+
+
 # Fonction pour utiliser l'API OpenRouter pour l'analyse combinée
-def llm_analysis(translated_text, initial_result, web_sources, perplexity_verification=""):
+def llm_analysis(translated_text, initial_result, web_sources, perplexity_verification="", on_token=None, on_usage=None):
+    """
+    Décision finale du LLM à partir de la classification et des sources.
+
+    Si on_token est fourni, la réponse est lue en streaming et chaque
+    fragment de l'explication est passé à on_token dès sa réception ; le
+    verdict JSON complet est renvoyé comme en mode non-streaming.
+    on_usage, si fourni, reçoit la consommation de l'appel (voir
+    llm_usage.report_usage).
+
+    Les sources dont le domaine a assez de verdicts portent un indice
+    HISTORIQUE DU DOMAINE (domain_reliability.hints()).
+
+    La réponse suit le schéma FACT_CHECK_SCHEMA ; une réponse qui ne le
+    respecte pas (JSON tronqué, statut inconnu) est traitée comme une
+    erreur de l'API : verdict provisoire du classifieur (mode_degrade).
+    """
     try:
         logging.info("Utilisation de l'API OpenRouter pour l'analyse combinée...")
         logging.info(f"Résultat initial du modèle RoBERTa: {initial_result}")
@@ -25,127 +227,64 @@ def llm_analysis(translated_text, initial_result, web_sources, perplexity_verifi
         from datetime import datetime
         current_date = datetime.now().strftime("%d/%m/%Y")
         
-        # Construire le prompt pour générer une réponse complète
-        prompt = f"""Tu es un expert en vérification de faits. Analyse ATTENTIVEMENT toutes les informations suivantes pour déterminer la véracité de cette déclaration.
-
-DATE ACTUELLE: {current_date}
-
-DÉCLARATION À VÉRIFIER: {translated_text}
-
-ANALYSE INITIALE AUTOMATIQUE: 
-Le modèle de classification a donné le résultat '{initial_result}' (où 'vérifié' = probablement vrai, 'rejeté' = probablement faux).
-
-RECHERCHE ET VÉRIFICATION PERPLEXITY:
-{perplexity_verification if perplexity_verification else "Aucune vérification Perplexity disponible."}
-
-SOURCES WEB DISPONIBLES:"""
-
-        if web_sources:
-            for i, source in enumerate(web_sources, 1):
-                prompt += f"\n{i}. TITRE: {source.get('title', 'Source sans titre')}"
-                prompt += f"\n   URL: {source.get('link', 'Pas de lien')}"
-                if source.get('date'):
-                    prompt += f"\n   DATE: {source['date']}"
-                if source.get('snippet'):
-                    prompt += f"\n   CONTENU: {source['snippet']}"
-                prompt += "\n"
-        else:
-            prompt += "\nAucune source web spécifique n'a été trouvée."
-
-        prompt += f"""
-
-INSTRUCTIONS CRITIQUES:
-1. UTILISE LA DATE ACTUELLE ({current_date}) pour déterminer si les événements mentionnés sont passés, présents ou futurs
-2. ⚠️ PRIORITÉ AUX INFORMATIONS RÉCENTES: Si plusieurs événements similaires existent, privilégie TOUJOURS les plus récents
-3. LIS ATTENTIVEMENT le contenu de vérification Perplexity ET les extraits des sources
-4. CHERCHE des informations spécifiques comme des scores, des résultats, des confirmations dans les sources
-5. Pour les entreprises/personnalités: vérifie TOUJOURS les changements récents (nominations, licenciements, etc.) AVANT les informations historiques
-6. Si les sources mentionnent des scores ou résultats spécifiques, utilise-les pour confirmer ou infirmer
-7. Si un événement est mentionné comme étant dans le futur par rapport à la date actuelle, mais que les sources montrent qu'il a déjà eu lieu, fais confiance aux sources
-8. IGNORE l'analyse initiale automatique si les sources contredisent clairement le fait
-9. Si les sources confirment l'information avec des détails spécifiques, la déclaration est VRAIE
-10. Si les sources contredisent l'information, la déclaration est FAUSSE
-11. Si les sources sont insuffisantes ou contradictoires, la déclaration est INDÉTERMINÉE
-
-CONTEXTE TEMPOREL:
-- Si une source mentionne une date passée par rapport à {current_date}, l'événement a déjà eu lieu
-- Si une source donne un score ou un résultat final, l'événement s'est déjà déroulé
-- Priorise les informations factuelles (scores, résultats) sur les annonces préliminaires
-
-STATUTS POSSIBLES:
-- VRAIE: L'information est confirmée par des sources fiables avec des détails spécifiques
-- FAUSSE: L'information est contredite par des sources fiables
-- INDÉTERMINÉE: Pas assez d'informations fiables pour confirmer ou infirmer
-
-RÉPONDS STRICTEMENT AU FORMAT JSON SUIVANT:
-{{
-    "statut": "VRAIE|FAUSSE|INDÉTERMINÉE",
-    "explication": "Explication détaillée en français basée sur les sources analysées et le contexte temporel",
-    "sources_principales": ["URL1", "URL2", "URL3"]
-}}
-
-IMPORTANT: Base ta décision sur les FAITS SPÉCIFIQUES trouvés dans les sources (scores, résultats, confirmations), pas sur des annonces générales ou l'analyse initiale automatique."""
-
-        logging.info(f"Prompt complet envoyé à OpenRouter (avec date {current_date}): {prompt[:800]}...")
+        # Instructions fixes en message système (préfixe mis en cache), données de la vérification en message utilisateur
+        prompt = build_fact_check_prompt(
+            translated_text, initial_result, web_sources, perplexity_verification, current_date,
+            reliability=domain_reliability.hints(web_sources)
+        )
+        logging.info(
+            f"Prompt construit: ~{prompt['estimated_tokens']['total']} tokens estimés "
+            f"(système {prompt['estimated_tokens']['system']}, utilisateur {prompt['estimated_tokens']['user']}), "
+            f"{prompt['sources']} sources, {prompt['duplicates_removed']} doublons supprimés, "
+            f"{prompt['truncated']} textes tronqués"
+        )
+        logging.info(f"Message utilisateur envoyé à OpenRouter: {prompt['messages'][-1]['content'][:800]}...")
 
         # Envoyer la requête à l'API OpenRouter
-        response = client.chat.completions.create(
+        request = dict(
             extra_headers={
                 "HTTP-Referer": "https://check-ia.app",
                 "X-Title": "Check-IA",
             },
             model="openai/gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
+            messages=prompt["messages"],
+            response_format=FACT_CHECK_SCHEMA,
             temperature=0.1,  # Encore plus bas pour plus de précision factuelle
-            max_tokens=700,   # Augmenté pour des réponses plus détaillées
+            max_tokens=settings.LLM_FACT_CHECK_MAX_TOKENS,
             top_p=1,
             frequency_penalty=0,
             presence_penalty=0
         )
 
         # Extraire le texte généré par le LLM
-        generated_text = response.choices[0].message.content.strip()
-        logging.info(f"Réponse complète du LLM: {generated_text}")
-        
-        # Tenter de parser la réponse JSON
-        try:
-            import json
-            # Nettoyer la réponse si elle contient des balises markdown
-            clean_response = generated_text.replace('```json', '').replace('```', '').strip()
-            parsed_response = json.loads(clean_response)
-            logging.info(f"Réponse JSON parsée avec succès: {parsed_response}")
-            
-            # Validation du format de réponse
-            if not isinstance(parsed_response, dict):
-                raise ValueError("La réponse n'est pas un dictionnaire")
-            
-            if 'statut' not in parsed_response:
-                parsed_response['statut'] = 'INDÉTERMINÉE'
-            
-            if 'explication' not in parsed_response:
-                parsed_response['explication'] = generated_text
-                
-            if 'sources_principales' not in parsed_response:
-                parsed_response['sources_principales'] = [source.get('link', '') for source in web_sources[:3] if source.get('link')]
-            
-            return parsed_response
-            
-        except (json.JSONDecodeError, ValueError) as e:
-            logging.warning(f"Impossible de parser la réponse JSON: {e}, retour au format simple")
-            # Fallback amélioré avec analyse du texte
-            if any(keyword in generated_text.upper() for keyword in ["VRAIE", "CONFIRMÉ", "VÉRIFIÉ"]):
-                status = "VRAIE"
-            elif any(keyword in generated_text.upper() for keyword in ["FAUSSE", "INCORRECT", "ERRONÉ"]):
-                status = "FAUSSE"
+        started = time.perf_counter()
+        with circuit_breaker.OPENROUTER.guard(), metrics.observe_stage(metrics.OPENROUTER):
+            if on_token is not None:
+                generated_text, usage = _stream_completion(on_token, **request)
+                generated_text = generated_text.strip()
             else:
-                status = "INDÉTERMINÉE"
-                
-            return {
-                "statut": status, 
-                "explication": generated_text, 
-                "sources_principales": [source.get('link', '') for source in web_sources[:3] if source.get('link')]
-            }
+                response = client.chat.completions.create(**request)
+                usage = getattr(response, "usage", None)
+                generated_text = response.choices[0].message.content.strip()
+        report_usage(on_usage, FACT_CHECK, request["model"], usage, started)
+        if usage is not None:
+            cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None) or 0
+            logging.info(f"Tokens du prompt: {usage.prompt_tokens} (dont {cached} en cache)")
+        logging.info(f"Réponse complète du LLM: {generated_text}")
         
+        # Réponse structurée : le schéma impose le format, seul le contenu est vérifié
+        parsed_response = _verdict(json.loads(generated_text))
+        if parsed_response is None:
+            raise ValueError("Réponse non conforme au schéma fact_check_result")
+        logging.info(f"Réponse JSON parsée avec succès: {parsed_response}")
+        return parsed_response
+
+    except TransientError:
+        raise
+    except OPENROUTER_TRANSIENT_ERRORS as e:
+        # Réessayé par la tâche : pas de verdict de secours pour une panne passagère
+        logging.error(f"OpenRouter temporairement indisponible : {e}")
+        raise TransientError(metrics.OPENROUTER, f"OpenRouter temporairement indisponible: {e}") from e
     except Exception as e:
         logging.error(f"Erreur lors de l'utilisation de l'API OpenRouter : {e}")
         import traceback
@@ -153,8 +292,113 @@ IMPORTANT: Base ta décision sur les FAITS SPÉCIFIQUES trouvés dans les source
         
         # Retour de secours basé sur le résultat initial
         fallback_status = "FAUSSE" if initial_result == "rejeté" else "VRAIE"
+        # Verdict du classifieur, non confirmé par le LLM : traité comme le
+        # mode dégradé (pas de fait ajouté, re-vérifié la nuit)
         return {
             "statut": fallback_status,
             "explication": f"Une erreur s'est produite lors de l'analyse détaillée. Résultat basé sur l'analyse initiale: {initial_result}. Erreur: {str(e)}",
-            "sources_principales": [source.get('link', '') for source in web_sources[:3] if source.get('link')]
-        }
\ No newline at end of file
+            "sources_principales": [source.get('link', '') for source in web_sources[:3] if source.get('link')],
+            "mode_degrade": True
+        }
+
+
+def _split_batch_verdicts(content, count):
+    """
+    Verdicts valides de la réponse groupée, indexés par numéro (1 à count).
+
+    Un numéro hors plage ou répété, un statut inconnu ou une explication vide
+    invalide l'entrée concernée, qui sera vérifiée seule.
+    """
+    verdicts = json.loads(content).get("verdicts")
+    if not isinstance(verdicts, list):
+        raise ValueError("Champ verdicts absent de la réponse groupée")
+    valid, seen = {}, set()
+    for entry in verdicts:
+        number = entry.get("numero") if isinstance(entry, dict) else None
+        if not isinstance(number, int) or isinstance(number, bool) or not 1 <= number <= count:
+            continue
+        if number in seen:
+            valid.pop(number, None)
+            continue
+        seen.add(number)
+        verdict = _verdict(entry)
+        if verdict is not None:
+            valid[number] = verdict
+    return valid
+
+
+def llm_analysis_batch(claims, on_usage=None):
+    """
+    Décision finale du LLM pour plusieurs déclarations indépendantes en un seul appel.
+
+    claims : liste de dicts (translated_text, initial_result, web_sources,
+    perplexity_verification). Les déclarations sont envoyées dans un seul
+    message, chacune avec ses sources, et le LLM répond au format
+    FACT_CHECK_BATCH_SCHEMA (un verdict par déclaration numérotée).
+    Chaque verdict manquant ou invalide est redemandé par un appel
+    llm_analysis() individuel ; une réponse illisible ou une erreur non
+    passagère de l'appel groupé renvoie toutes les déclarations en appels
+    individuels. Les erreurs passagères (TransientError) sont propagées
+    pour que la tâche réessaie.
+
+    Returns:
+        list: Analyses finales, dans l'ordre des claims
+    """
+    if not claims:
+        return []
+    if len(claims) == 1:
+        claim = claims[0]
+        return [llm_analysis(
+            claim["translated_text"], claim["initial_result"], claim["web_sources"],
+            claim["perplexity_verification"], on_usage=on_usage
+        )]
+
+    from datetime import datetime
+
+    verdicts = {}
+    try:
+        prompt = build_batch_fact_check_prompt(
+            claims, datetime.now().strftime("%d/%m/%Y"),
+            reliability=domain_reliability.hints([source for claim in claims for source in claim["web_sources"] or []])
+        )
+        logging.info(
+            f"Analyse groupée de {len(claims)} déclarations: ~{prompt['estimated_tokens']['total']} tokens estimés, "
+            f"{prompt['sources']} sources, {prompt['duplicates_removed']} doublons supprimés, "
+            f"{prompt['truncated']} textes tronqués"
+        )
+        request = dict(
+            extra_headers={
+                "HTTP-Referer": "https://check-ia.app",
+                "X-Title": "Check-IA",
+            },
+            model="openai/gpt-4o-mini",
+            messages=prompt["messages"],
+            response_format=FACT_CHECK_BATCH_SCHEMA,
+            temperature=0.1,
+            max_tokens=settings.LLM_BATCH_MAX_TOKENS_PER_CLAIM * len(claims),
+        )
+        started = time.perf_counter()
+        with circuit_breaker.OPENROUTER.guard(), metrics.observe_stage(metrics.OPENROUTER):
+            response = client.chat.completions.create(**request)
+        report_usage(on_usage, FACT_CHECK_BATCH, request["model"], getattr(response, "usage", None), started)
+        verdicts = _split_batch_verdicts(response.choices[0].message.content, len(claims))
+    except TransientError:
+        raise
+    except OPENROUTER_TRANSIENT_ERRORS as e:
+        logging.error(f"OpenRouter temporairement indisponible : {e}")
+        raise TransientError(metrics.OPENROUTER, f"OpenRouter temporairement indisponible: {e}") from e
+    except Exception as e:
+        logging.warning(f"Réponse groupée inutilisable ({e}) : vérification déclaration par déclaration")
+
+    results = []
+    for number, claim in enumerate(claims, 1):
+        if number in verdicts:
+            results.append(verdicts[number])
+            continue
+        logging.warning(f"Verdict {number}/{len(claims)} absent ou invalide : appel individuel")
+        results.append(llm_analysis(
+            claim["translated_text"], claim["initial_result"], claim["web_sources"],
+            claim["perplexity_verification"], on_usage=on_usage
+        ))
+    logging.info(f"Analyse groupée : {len(verdicts)}/{len(claims)} verdicts issus de l'appel groupé")
+    return results
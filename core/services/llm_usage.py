@@ -0,0 +1,173 @@
+"""
+Token and cost accounting for OpenRouter calls.
+
+Services that call the LLM take an on_usage callback and report one usage
+dict per call (operation, model, tokens, latency). The Celery task collects
+them and persists them with record_llm_usage(), linked to the submission or
+image verification and its user. usage_report() aggregates the rows per user
+and day, and per prompt (operation and model), for the llm_usage_report
+management command.
+
+Costs are estimates from list prices (LLM_PRICES overrides them); OpenRouter
+remains the billing reference.
+"""
+
+import json
+import logging
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Avg, Count, Sum
+from django.db.models.functions import TruncDate
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+FACT_CHECK = "fact_check"
+FACT_CHECK_BATCH = "fact_check_batch"
+CONTENT_VERIFICATION = "content_verification"
+AI_DETECTION = "ai_detection"
+
+# USD per million tokens (prompt, completion), OpenRouter list prices
+MODEL_PRICES = {
+    "openai/gpt-4o-mini": (Decimal("0.15"), Decimal("0.60")),
+    "openai/gpt-4.1-mini": (Decimal("0.40"), Decimal("1.60")),
+}
+
+_MILLION = Decimal(1_000_000)
+
+
+def model_prices():
+    """Built-in prices updated with the LLM_PRICES setting."""
+    prices = dict(MODEL_PRICES)
+    try:
+        overrides = json.loads(getattr(settings, "LLM_PRICES", "") or "{}")
+        for model, (prompt_price, completion_price) in overrides.items():
+            prices[model] = (Decimal(str(prompt_price)), Decimal(str(completion_price)))
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Ignoring invalid LLM_PRICES setting: {e}")
+    return prices
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """Estimated cost in USD (0 for a model without a known price)."""
+    prices = model_prices().get(model)
+    if prices is None:
+        return Decimal(0)
+    prompt_price, completion_price = prices
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / _MILLION
+
+
+def report_usage(on_usage, operation, model, usage, started):
+    """
+    Pass the usage of one completion to on_usage.
+
+    Args:
+        on_usage: Callback receiving the usage dict (may be None)
+        operation: FACT_CHECK, CONTENT_VERIFICATION or AI_DETECTION
+        model: Model the request was sent to
+        usage: `usage` of the OpenAI response (None when not returned)
+        started: time.perf_counter() taken before the call
+    """
+    if on_usage is None:
+        return
+    try:
+        on_usage({
+            "operation": operation,
+            "model": model,
+            "prompt_tokens": getattr(usage, "prompt_tokens", None) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", None) or 0,
+            "latency_ms": round((time.perf_counter() - started) * 1000),
+        })
+    except Exception as e:
+        logger.warning(f"LLM usage not reported: {e}")
+
+
+def record_llm_usage(usages, user_id=None, submission=None, image_verification=None):
+    """
+    Persist the usage dicts reported during a task.
+
+    Best-effort: accounting never fails a verification.
+
+    Returns:
+        list: The created LLMUsage rows
+    """
+    if not usages:
+        return []
+    from core.models import LLMUsage
+
+    rows = []
+    for usage in usages:
+        cost = estimate_cost(usage["model"], usage["prompt_tokens"], usage["completion_tokens"])
+        metrics.record_llm_tokens(
+            usage["model"], usage["operation"], usage["prompt_tokens"], usage["completion_tokens"], cost
+        )
+        rows.append(LLMUsage(
+            supabase_user_id=user_id,
+            operation=usage["operation"],
+            model=usage["model"],
+            prompt_tokens=usage["prompt_tokens"],
+            completion_tokens=usage["completion_tokens"],
+            latency_ms=usage["latency_ms"],
+            cost_usd=cost,
+            submission=submission,
+            image_verification=image_verification,
+        ))
+    try:
+        return LLMUsage.objects.bulk_create(rows)
+    except Exception as e:
+        logger.warning(f"LLM usage not recorded ({len(rows)} calls): {e}")
+        return []
+
+
+def usage_report(since=None, until=None, user_id=None):
+    """
+    Aggregate the recorded usage.
+
+    Returns:
+        dict: totals, per-user per-day rows (most expensive first within a
+        day) and per-prompt rows (operation and model, with average tokens
+        per call: the candidates for prompt compression)
+    """
+    from core.models import LLMUsage
+
+    usages = LLMUsage.objects.all()
+    if since is not None:
+        usages = usages.filter(date__gte=since)
+    if until is not None:
+        usages = usages.filter(date__lt=until)
+    if user_id is not None:
+        usages = usages.filter(supabase_user_id=user_id)
+    usages = usages.order_by()
+
+    sums = {
+        "calls": Count("id"),
+        "prompt_tokens": Sum("prompt_tokens"),
+        "completion_tokens": Sum("completion_tokens"),
+        "cost_usd": Sum("cost_usd"),
+    }
+    totals = usages.aggregate(**sums)
+    per_user_day = (
+        usages.annotate(day=TruncDate("date"))
+        .values("day", "supabase_user_id")
+        .annotate(**sums)
+        .order_by("-day", "-cost_usd")
+    )
+    per_prompt = (
+        usages.values("operation", "model")
+        .annotate(
+            # Before the sums, which reuse the field names
+            avg_prompt_tokens=Avg("prompt_tokens"),
+            avg_completion_tokens=Avg("completion_tokens"),
+            avg_latency_ms=Avg("latency_ms"),
+            **sums,
+        )
+        .order_by("-prompt_tokens")
+    )
+    return {
+        "totals": {key: value or 0 for key, value in totals.items()},
+        "per_user_day": list(per_user_day),
+        "per_prompt": list(per_prompt),
+    }
@@ -0,0 +1,290 @@
+"""
+Zero-network image metadata pre-screen.
+
+Runs on the image bytes already downloaded for verification, before the pixel
+analyzer and the LLM. Extracts EXIF camera/software tags, PNG text chunks,
+XMP and C2PA provenance markers, and flags images whose metadata declares an
+AI generator so detect_ai_generated_image() can skip the remote calls.
+
+Generator names are matched as whole words, and names that other software
+also uses (OpenAI, Imagen, Gemini) only add a signal, never a verdict.
+
+C2PA manifests are detected and their claim generator / digital source type
+are read, but signatures are NOT cryptographically validated: anyone can
+embed a manifest. A capture manifest is therefore only a signal, and the
+metadata alone never establishes authenticity.
+"""
+
+import logging
+import re
+from io import BytesIO
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Lower-cased tool names written by image generators in Software / CreatorTool
+# tags or C2PA claim generators, matched as whole words.
+KNOWN_GENERATOR_SIGNATURES = [
+    "midjourney",
+    "dall-e",
+    "dall·e",
+    "stable diffusion",
+    "stablediffusion",
+    "automatic1111",
+    "comfyui",
+    "invokeai",
+    "fooocus",
+    "novelai",
+    "adobe firefly",
+    "leonardo.ai",
+    "ideogram",
+    "bing image creator",
+]
+
+# Names also used by software that does not generate images (API clients,
+# chat apps, editing plug-ins): reported as a signal only.
+AMBIGUOUS_GENERATOR_SIGNATURES = [
+    "openai",
+    "imagen",
+    "gemini",
+]
+
+# PNG text chunk keys that only image generation tools write.
+GENERATOR_PNG_KEYS = {
+    "parameters": "Stable Diffusion (AUTOMATIC1111)",
+    "prompt": "ComfyUI",
+    "workflow": "ComfyUI",
+    "dream": "InvokeAI",
+    "sd-metadata": "InvokeAI",
+    "invokeai_metadata": "InvokeAI",
+}
+
+# IPTC DigitalSourceType values (used by both XMP and C2PA) declaring
+# synthetic content.
+AI_SOURCE_TYPES = (
+    "trainedalgorithmicmedia",
+    "compositesynthetic",
+    "algorithmicmedia",
+)
+CAPTURE_SOURCE_TYPE = "digitalcapture"
+
+_XMP_PATTERN = re.compile(rb"<x:xmpmeta.*?</x:xmpmeta>", re.DOTALL)
+_SOURCE_TYPE_PATTERN = re.compile(rb"digitalsourcetype/([a-z]+)", re.IGNORECASE)
+_CREATOR_TOOL_PATTERN = re.compile(rb"CreatorTool(?:=\"|>)([^\"<]{1,200})")
+
+
+def _words_pattern(signatures):
+    names = "|".join(re.escape(signature) for signature in signatures)
+    return re.compile(rf"(?<![a-z0-9])({names})(?![a-z0-9])")
+
+
+_GENERATOR_PATTERN = _words_pattern(KNOWN_GENERATOR_SIGNATURES)
+_AMBIGUOUS_GENERATOR_PATTERN = _words_pattern(AMBIGUOUS_GENERATOR_SIGNATURES)
+
+EXIF_MAKE = 271
+EXIF_MODEL = 272
+EXIF_SOFTWARE = 305
+EXIF_DATETIME = 306
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+
+
+def _match_generator(value, pattern=_GENERATOR_PATTERN):
+    """Return the generator signature named (as whole words) in value, if any."""
+    if not value:
+        return None
+    match = pattern.search(str(value).lower())
+    return match.group(1) if match else None
+
+
+def _declared_tool(value, label, signals):
+    """
+    Generator declared by a Software / CreatorTool value, or None.
+
+    An ambiguous name is reported in `signals` but is not a generator.
+    """
+    generator = _match_generator(value)
+    if generator:
+        signals.append(f"{label} : {value}")
+        return generator
+    ambiguous = _match_generator(value, _AMBIGUOUS_GENERATOR_PATTERN)
+    if ambiguous:
+        signals.append(f"{label} : {value} (« {ambiguous} » ne désigne pas forcément un générateur d'images)")
+    return None
+
+
+def _cbor_text_after(data, key):
+    """
+    Read the CBOR text string that follows `key` in a C2PA manifest.
+
+    Only short definite-length strings are supported (major type 3 with an
+    inline or one-byte length), which covers claim generator names.
+    """
+    index = data.find(key)
+    if index < 0:
+        return None
+    position = index + len(key)
+    if position >= len(data):
+        return None
+    header = data[position]
+    if 0x60 <= header <= 0x77:
+        length = header - 0x60
+        position += 1
+    elif header == 0x78 and position + 1 < len(data):
+        length = data[position + 1]
+        position += 2
+    else:
+        return None
+    value = data[position:position + length]
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def _read_c2pa(image_bytes):
+    """Detect an embedded C2PA manifest (JUMBF box labelled c2pa)."""
+    if b"jumb" not in image_bytes or b"c2pa" not in image_bytes:
+        return {"present": False, "claim_generator": None}
+    claim_generator = _cbor_text_after(image_bytes, b"claim_generator")
+    if claim_generator is None:
+        # C2PA 2.x stores the generator under claim_generator_info.name
+        info_index = image_bytes.find(b"claim_generator_info")
+        if info_index >= 0:
+            claim_generator = _cbor_text_after(image_bytes[info_index:], b"name")
+    return {"present": True, "claim_generator": claim_generator}
+
+
+def _read_exif(img):
+    exif = img.getexif()
+    if not exif:
+        return {}
+    values = {
+        "make": exif.get(EXIF_MAKE),
+        "model": exif.get(EXIF_MODEL),
+        "software": exif.get(EXIF_SOFTWARE),
+        "datetime": exif.get(EXIF_DATETIME),
+    }
+    try:
+        values["datetime_original"] = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL)
+    except Exception:
+        values["datetime_original"] = None
+    return {
+        key: str(value).strip("\x00 ").strip()
+        for key, value in values.items()
+        if value
+    }
+
+
+def analyze_image_metadata(image_bytes):
+    """
+    Extract provenance metadata from raw image bytes without any network call.
+
+    Args:
+        image_bytes: Raw bytes of the image file.
+
+    Returns:
+        dict with:
+            - success (bool): Whether the bytes could be parsed
+            - verdict (str|None): "IA_DÉTECTÉE" when the metadata alone is
+              conclusive, otherwise None
+            - generator (str|None): Known generator signature found
+            - signals (list[str]): Human-readable findings (French)
+            - format, exif, png_text_keys, xmp_creator_tool,
+              digital_source_type, c2pa: raw extracted fields
+            - error (str|None): Error message if parsing failed
+    """
+    result = {
+        "success": False,
+        "verdict": None,
+        "generator": None,
+        "signals": [],
+        "format": None,
+        "exif": {},
+        "png_text_keys": [],
+        "xmp_creator_tool": None,
+        "digital_source_type": None,
+        "c2pa": {"present": False, "claim_generator": None},
+        "error": None,
+    }
+
+    try:
+        img = Image.open(BytesIO(image_bytes))
+        result["format"] = img.format
+        result["exif"] = _read_exif(img)
+
+        png_text = {
+            str(key).lower(): str(value)
+            for key, value in (getattr(img, "text", None) or {}).items()
+        }
+        result["png_text_keys"] = sorted(png_text)
+    except Exception as e:
+        logger.warning(f"Metadata pre-screen: unreadable image: {e}")
+        result["error"] = str(e)
+        return result
+
+    signals = result["signals"]
+    generator = None
+
+    # 1. PNG text chunks written by generation tools
+    for key, tool in GENERATOR_PNG_KEYS.items():
+        if key in png_text:
+            generator = generator or tool.lower()
+            signals.append(f"Bloc de métadonnées PNG « {key} » écrit par {tool}")
+
+    # 2. Software / CreatorTool tags
+    software = result["exif"].get("software") or png_text.get("software")
+    generator = generator or _declared_tool(software, "Logiciel déclaré dans les métadonnées", signals)
+
+    xmp_match = _XMP_PATTERN.search(image_bytes)
+    xmp = xmp_match.group(0) if xmp_match else b""
+    creator_tool = _CREATOR_TOOL_PATTERN.search(xmp)
+    if creator_tool:
+        result["xmp_creator_tool"] = creator_tool.group(1).decode("utf-8", "replace").strip()
+        generator = generator or _declared_tool(result["xmp_creator_tool"], "Outil de création XMP", signals)
+
+    # 3. C2PA provenance manifest
+    result["c2pa"] = _read_c2pa(image_bytes)
+    claim_generator = result["c2pa"]["claim_generator"]
+    if result["c2pa"]["present"]:
+        signals.append(
+            f"Manifeste de provenance C2PA présent, signature non vérifiée "
+            f"(générateur : {claim_generator or 'inconnu'})"
+        )
+        claim_match = _match_generator(claim_generator)
+        if claim_match:
+            generator = generator or claim_match
+
+    # 4. IPTC digital source type (XMP or C2PA assertion)
+    source_type = _SOURCE_TYPE_PATTERN.search(image_bytes)
+    if source_type:
+        result["digital_source_type"] = source_type.group(1).decode("ascii").lower()
+        if result["digital_source_type"] in AI_SOURCE_TYPES:
+            signals.append(
+                f"Type de source numérique déclaré : {result['digital_source_type']} (média généré par IA)"
+            )
+        elif result["digital_source_type"] == CAPTURE_SOURCE_TYPE:
+            signals.append("Type de source numérique déclaré : capture par appareil photo (non vérifié)")
+
+    # 5. Camera EXIF (informational only: social networks strip EXIF)
+    if result["exif"].get("make") or result["exif"].get("model"):
+        camera = " ".join(
+            part for part in (result["exif"].get("make"), result["exif"].get("model")) if part
+        )
+        signals.append(f"Données EXIF d'appareil photo : {camera}")
+    else:
+        signals.append("Aucune donnée EXIF d'appareil photo")
+
+    result["generator"] = generator
+
+    # Unsigned metadata can declare a generator, never prove authenticity
+    if generator or result["digital_source_type"] in AI_SOURCE_TYPES:
+        result["verdict"] = "IA_DÉTECTÉE"
+
+    result["success"] = True
+    logger.info(
+        f"Metadata pre-screen: format={result['format']}, generator={generator}, "
+        f"c2pa={result['c2pa']['present']}, verdict={result['verdict']}"
+    )
+    return result
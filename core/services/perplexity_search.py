@@ -4,19 +4,40 @@ import os
 from dotenv import load_dotenv
 import re
 from datetime import datetime
+from core import metrics
+from core.services import circuit_breaker, search_cache
+from core.services.errors import TransientError, is_transient_status
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
-PERPLEXITY_URL = "https://api.perplexity.ai/chat/completions"
+PERPLEXITY_URL = os.getenv("PERPLEXITY_URL", "https://api.perplexity.ai/chat/completions")
+PERPLEXITY_TIMEOUT = float(os.getenv("PERPLEXITY_TIMEOUT", "30"))
 
+# Sépare la réponse Perplexity des extraits ajoutés par create_enriched_content
+EXCERPTS_HEADER = "EXTRAITS DES SOURCES:"
 
-def search_with_perplexity(text):
+# Filtre de fraîcheur des résultats Perplexity (fait partie de la clé du cache)
+SEARCH_RECENCY_FILTER = "month"
+
+
+def search_with_perplexity(text, use_cache=True):
     """
     Utilise l'API Perplexity pour vérifier un fait et obtenir des sources
+
+    Lève TransientError (délai dépassé, erreur réseau, HTTP 429 ou 5xx) pour
+    que la tâche réessaie plus tard plutôt que de conclure sans sources.
+
+    Les recherches réussies sont mises en cache (voir search_cache) ;
+    use_cache=False force un nouvel appel, dont le résultat remplace celui
+    du cache.
     """
+    if use_cache:
+        cached = search_cache.get(text, SEARCH_RECENCY_FILTER)
+        if cached is not None:
+            return cached
     try:
         logging.info("Utilisation de l'API Perplexity pour la recherche de sources...")
         
@@ -88,7 +109,7 @@ Réponds en français avec:
                     "content": prompt
                 }
             ],
-            "search_recency_filter": "month"  # Filtre pour privilégier les résultats du dernier mois
+            "search_recency_filter": SEARCH_RECENCY_FILTER  # Filtre pour privilégier les résultats du dernier mois
         }
         
         headers = {
@@ -97,7 +118,11 @@ Réponds en français avec:
         }
         
         logging.info("Envoi de la requête à l'API Perplexity...")
-        response = requests.post(PERPLEXITY_URL, json=payload, headers=headers)
+        # Disjoncteur : refuse l'appel (CircuitOpenError) tant que Perplexity est en panne
+        with circuit_breaker.PERPLEXITY.guard() as call, metrics.observe_stage(metrics.PERPLEXITY):
+            response = requests.post(PERPLEXITY_URL, json=payload, headers=headers, timeout=PERPLEXITY_TIMEOUT)
+            # Les erreurs serveur et les limites de débit comptent comme des échecs
+            call.success = not is_transient_status(response.status_code)
         
         if response.status_code == 200:
             response_data = response.json()
@@ -136,14 +161,20 @@ Réponds en français avec:
             
             logging.info(f"Perplexity a trouvé {len(formatted_sources)} sources formatées")
             
-            return {
+            result = {
                 'verification_content': enriched_content,
                 'sources': formatted_sources,
                 'citations': citations,
                 'raw_content': raw_content  # Garder le contenu brut pour debug
             }
+            if formatted_sources or cleaned_content:
+                search_cache.store(text, SEARCH_RECENCY_FILTER, result)
+            return result
         else:
             logging.error(f"Erreur API Perplexity: {response.status_code} - {response.text}")
+            metrics.record_error(metrics.PERPLEXITY, f"http_{response.status_code}")
+            if is_transient_status(response.status_code):
+                raise TransientError(metrics.PERPLEXITY, f"Erreur API Perplexity: {response.status_code}")
             return {
                 'verification_content': '',
                 'sources': [],
@@ -151,6 +182,11 @@ Réponds en français avec:
                 'raw_content': ''
             }
             
+    except TransientError:
+        raise
+    except (requests.ConnectionError, requests.Timeout) as e:
+        logging.error(f"Perplexity injoignable : {e}")
+        raise TransientError(metrics.PERPLEXITY, f"Perplexity injoignable: {e}") from e
     except Exception as e:
         logging.error(f"Erreur lors de l'utilisation de l'API Perplexity : {e}")
         return {
@@ -189,7 +225,7 @@ def create_enriched_content(main_content, sources, current_date):
         enriched = main_content
         
         if sources:
-            enriched += "\n\nEXTRAITS DES SOURCES:\n"
+            enriched += f"\n\n{EXCERPTS_HEADER}\n"
             for i, source in enumerate(sources, 1):
                 if source.get('snippet'):
                     enriched += f"\n{i}. {source['title']}: {source['snippet']}"
@@ -16,7 +16,7 @@ logger = logging.getLogger(__name__)
 
 PIXEL_ANALYZER_API_USER = os.getenv("PIXEL_ANALYZER_API_USER")
 PIXEL_ANALYZER_API_SECRET = os.getenv("PIXEL_ANALYZER_API_SECRET")
-PIXEL_ANALYZER_API_URL = "https://api.sightengine.com/1.0/check.json"
+PIXEL_ANALYZER_API_URL = os.getenv("PIXEL_ANALYZER_API_URL", "https://api.sightengine.com/1.0/check.json")
 
 
 def is_available():
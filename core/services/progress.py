@@ -0,0 +1,227 @@
+"""
+Stage-transition events for long-running verifications.
+
+Events are keyed by the Celery task id returned to the client (the same id
+it used to poll /task-status/), so the image flow can be followed before its
+ImageVerification row exists. Tasks that continue another task's work (image
+upload -> verification) publish under the id of the task the client holds.
+
+Every event is appended to a per-task Redis list, so a client that connects
+late can replay what it missed, and published on a pub/sub channel, so
+connected clients get it immediately. The list length after the append is
+the event sequence number, used as the SSE event id.
+
+StageTracker additionally records the stages as the task's custom PROGRESS
+state (stage, per-stage timings, partial results), read back by the
+/task-status/ endpoint, and relays streamed LLM explanation text. Explanation
+fragments are published only (not stored in the history list) and carry no
+sequence number. The tasks of a chain do not store their own results: the
+task that concludes stores the final one under the followed id with
+store_final_result(), so that id only reaches SUCCESS once the chain is done.
+
+Publishing is best-effort: a Redis outage never fails a verification.
+"""
+
+import json
+import logging
+import time
+
+from celery import current_task, states
+from django.conf import settings
+
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Stages after which no further event is published for the task
+TERMINAL_STAGES = ("saved", "error")
+
+# Custom Celery state reported while a task moves through its stages
+PROGRESS_STATE = "PROGRESS"
+
+# Stage data kept in the PROGRESS state as partial results
+PARTIAL_RESULT_FIELDS = ("translated_text", "initial_result", "confidence", "sources", "status")
+
+
+def progress_channel(progress_id):
+    """Pub/sub channel carrying the live events of one task."""
+    return f"progress:{progress_id}"
+
+
+def progress_history_key(progress_id):
+    """Redis list holding every event already published for one task."""
+    return f"progress:history:{progress_id}"
+
+
+def progress_owner_key(progress_id):
+    """Redis key holding the Supabase user id allowed to follow the task."""
+    return f"progress:owner:{progress_id}"
+
+
+def current_progress_id():
+    """Id of the running Celery task (None when called outside a worker)."""
+    request = getattr(current_task, "request", None)
+    return getattr(request, "id", None)
+
+
+def register_progress_owner(progress_id, user_id):
+    """
+    Remember which user launched the task so only they can stream it.
+
+    Returns:
+        bool: Whether the owner could be stored.
+    """
+    client = get_redis_client()
+    if client is None or not progress_id:
+        return False
+    try:
+        client.set(progress_owner_key(progress_id), str(user_id), ex=settings.PROGRESS_EVENTS_TTL)
+        return True
+    except Exception as e:
+        logger.warning(f"Progress owner for task {progress_id} not stored: {e}")
+        return False
+
+
+def publish_progress(progress_id, stage, persist=True, **data):
+    """
+    Record and broadcast a stage transition.
+
+    Args:
+        progress_id: Celery task id the client follows
+        stage: Stage name (started, translated, classified, searched,
+            uploaded, analysed, saved, error, explanation)
+        persist: Append the event to the history list. Ephemeral events
+            (persist=False) are only published and get seq None.
+        **data: JSON-serialisable details sent with the event
+
+    Returns:
+        dict: The published event (with its seq), or None if there is no
+        task id, or Redis is disabled or unreachable.
+    """
+    client = get_redis_client()
+    if client is None or not progress_id:
+        return None
+
+    event = {
+        "task_id": progress_id,
+        "stage": stage,
+        "timestamp": time.time(),
+        **data,
+    }
+    history_key = progress_history_key(progress_id)
+    try:
+        if persist:
+            event["seq"] = client.rpush(history_key, json.dumps(event, default=str))
+            client.expire(history_key, settings.PROGRESS_EVENTS_TTL)
+        else:
+            event["seq"] = None
+        client.publish(progress_channel(progress_id), json.dumps(event, default=str))
+    except Exception as e:
+        logger.warning(f"Progress event {stage} for task {progress_id} not published: {e}")
+        return None
+    return event
+
+
+def store_final_result(progress_id, result, task=None):
+    """
+    Store the result of a task chain as the SUCCESS state of the task the
+    client follows. Chain tasks ignore their own results, so this is the only
+    terminal state written under progress_id.
+
+    Returns:
+        The result, for the concluding task to return.
+    """
+    task = task if task is not None else current_task
+    if not progress_id or task is None:
+        return result
+    try:
+        task.backend.store_result(progress_id, result, states.SUCCESS)
+    except Exception as e:
+        logger.warning(f"Final result of task {progress_id} not stored: {e}")
+    return result
+
+
+def is_terminal(event):
+    return event.get("stage") in TERMINAL_STAGES
+
+
+class StageTracker:
+    """
+    Follow one task through its stages.
+
+    Call the tracker with (stage, **data) at the end of each stage. The
+    transition is published (see publish_progress) and stored as the task's
+    PROGRESS state with the time spent in each stage and the partial results
+    gathered so far, e.g. the Perplexity sources before the LLM verdict.
+
+    stream(text) relays LLM explanation fragments as ephemeral "explanation"
+    events, coalesced to one publish per PROGRESS_TOKEN_FLUSH_INTERVAL; the
+    pending fragments are flushed before the next stage event.
+
+    When a task hands the rest of the work to another task, it passes
+    snapshot() along and the next task resumes from it (resume=...), so the
+    PROGRESS state keeps every stage of the chain.
+    """
+
+    def __init__(self, progress_id, task=None, resume=None, **context):
+        self.progress_id = progress_id
+        self.task = task if task is not None else current_task
+        self.context = context
+        self.stages = list((resume or {}).get("stages", []))
+        self.partial = dict((resume or {}).get("partial", {}))
+        self._started_at = self._last = time.monotonic()
+        self._pending_tokens = []
+        self._last_flush = 0.0
+
+    def __call__(self, stage, **data):
+        self.flush_tokens()
+        now = time.monotonic()
+        elapsed_ms = round((now - self._last) * 1000)
+        self._last = now
+        self.stages.append({"stage": stage, "elapsed_ms": elapsed_ms})
+        for field in PARTIAL_RESULT_FIELDS:
+            if field in data:
+                self.partial[field] = data[field]
+
+        publish_progress(self.progress_id, stage, elapsed_ms=elapsed_ms, **self.context, **data)
+        self._update_state(stage)
+
+    def stream(self, text):
+        """Queue an explanation fragment, publishing at most once per interval."""
+        self._pending_tokens.append(text)
+        if time.monotonic() - self._last_flush >= settings.PROGRESS_TOKEN_FLUSH_INTERVAL:
+            self.flush_tokens()
+
+    def flush_tokens(self):
+        if not self._pending_tokens:
+            return
+        delta = "".join(self._pending_tokens)
+        self._pending_tokens = []
+        self._last_flush = time.monotonic()
+        publish_progress(self.progress_id, "explanation", persist=False, delta=delta, **self.context)
+
+    def snapshot(self):
+        """Stages and partial results to resume from in the next task of a chain."""
+        return {"stages": list(self.stages), "partial": dict(self.partial)}
+
+    @property
+    def elapsed_ms(self):
+        return round((time.monotonic() - self._started_at) * 1000)
+
+    def meta(self, stage):
+        return {
+            "stage": stage,
+            "stages": list(self.stages),
+            "elapsed_ms": self.elapsed_ms,
+            "partial": dict(self.partial),
+            **self.context,
+        }
+
+    def _update_state(self, stage):
+        request = getattr(self.task, "request", None)
+        if not self.progress_id or request is None or getattr(request, "is_eager", False):
+            return
+        try:
+            self.task.update_state(task_id=self.progress_id, state=PROGRESS_STATE, meta=self.meta(stage))
+        except Exception as e:
+            logger.warning(f"Progress state {stage} for task {self.progress_id} not stored: {e}")
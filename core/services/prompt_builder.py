@@ -0,0 +1,238 @@
+"""
+Prompt construction for the OpenRouter fact-check.
+
+The fixed instructions live in FACT_CHECK_SYSTEM_PROMPT, a system message
+that is byte-identical across calls so providers can cache it as a prompt
+prefix; everything that varies (date, claim, classification, Perplexity
+summary, sources) goes in the user message. The JSON answer format is
+enforced by the response schema of the call (llm.FACT_CHECK_SCHEMA), so the
+prompt only asks for a short explanation and at most three sources.
+
+The variable part is kept small:
+- the Perplexity summary is used without the source excerpts that
+  create_enriched_content() appends to it (the sources are listed anyway);
+- sentences repeated across the summary and the snippets are sent once,
+  and sources with the same URL are merged;
+- the summary and the snippets are capped by token budgets
+  (LLM_PROMPT_SUMMARY_TOKEN_BUDGET, LLM_PROMPT_SOURCES_TOKEN_BUDGET), the
+  sources budget being shared evenly between the sources.
+
+build_batch_fact_check_prompt() packs several independent claims into one
+user message (one numbered section per claim, built the same way) under
+FACT_CHECK_BATCH_SYSTEM_PROMPT, so the instructions are sent once per batch
+instead of once per claim.
+
+A source whose domain has enough verdict history (domain_reliability.hints())
+gets a one-line HISTORIQUE DU DOMAINE hint: how many checked claims cited
+the domain, by verdict. It is a clue about the source, not evidence.
+
+Token counts are estimated (about four characters per token); the exact
+prompt tokens of each call come back in the API usage (see llm_usage).
+"""
+
+import re
+
+from django.conf import settings
+
+from core.services.perplexity_search import EXCERPTS_HEADER
+from core.services.sources import domain_of
+
+CHARS_PER_TOKEN = 4
+
+# Sentences shorter than this (normalised) are too generic to deduplicate
+MIN_DEDUP_LENGTH = 20
+
+_FACT_CHECK_INSTRUCTIONS = """Tu es un expert en vérification de faits. Analyse ATTENTIVEMENT les informations fournies par l'utilisateur (date actuelle, déclaration, analyse initiale automatique, recherche Perplexity, sources web) pour déterminer la véracité de la déclaration.
+
+INSTRUCTIONS CRITIQUES:
+1. UTILISE LA DATE ACTUELLE indiquée pour déterminer si les événements mentionnés sont passés, présents ou futurs
+2. ⚠️ PRIORITÉ AUX INFORMATIONS RÉCENTES: Si plusieurs événements similaires existent, privilégie TOUJOURS les plus récents
+3. LIS ATTENTIVEMENT le contenu de vérification Perplexity ET les extraits des sources
+4. CHERCHE des informations spécifiques comme des scores, des résultats, des confirmations dans les sources
+5. Pour les entreprises/personnalités: vérifie TOUJOURS les changements récents (nominations, licenciements, etc.) AVANT les informations historiques
+6. Si les sources mentionnent des scores ou résultats spécifiques, utilise-les pour confirmer ou infirmer
+7. Si un événement est mentionné comme étant dans le futur par rapport à la date actuelle, mais que les sources montrent qu'il a déjà eu lieu, fais confiance aux sources
+8. IGNORE l'analyse initiale automatique si les sources contredisent clairement le fait
+9. Si les sources confirment l'information avec des détails spécifiques, la déclaration est VRAIE
+10. Si les sources contredisent l'information, la déclaration est FAUSSE
+11. Si les sources sont insuffisantes ou contradictoires, la déclaration est INDÉTERMINÉE
+12. L'HISTORIQUE DU DOMAINE d'une source (verdicts des déclarations déjà vérifiées qui la citaient) est un indice de fiabilité, jamais une preuve
+
+CONTEXTE TEMPOREL:
+- Si une source mentionne une date passée par rapport à la date actuelle, l'événement a déjà eu lieu
+- Si une source donne un score ou un résultat final, l'événement s'est déjà déroulé
+- Priorise les informations factuelles (scores, résultats) sur les annonces préliminaires
+
+STATUTS POSSIBLES:
+- VRAIE: L'information est confirmée par des sources fiables avec des détails spécifiques
+- FAUSSE: L'information est contredite par des sources fiables
+- INDÉTERMINÉE: Pas assez d'informations fiables pour confirmer ou infirmer"""
+
+# Le format JSON est imposé par le schéma de réponse (voir llm.py) : seules
+# les consignes de contenu restent dans le prompt
+_FACT_CHECK_ANSWER = """RÉPONSE: un statut, une explication CONCISE en français (4 phrases au plus) citant les faits précis des sources et le contexte temporel, et au plus 3 URL de sources principales."""
+
+_FACT_CHECK_REMINDER = """IMPORTANT: Base ta décision sur les FAITS SPÉCIFIQUES trouvés dans les sources (scores, résultats, confirmations), pas sur des annonces générales ou l'analyse initiale automatique."""
+
+FACT_CHECK_SYSTEM_PROMPT = _FACT_CHECK_INSTRUCTIONS + "\n\n" + _FACT_CHECK_ANSWER + "\n\n" + _FACT_CHECK_REMINDER
+
+FACT_CHECK_BATCH_SYSTEM_PROMPT = _FACT_CHECK_INSTRUCTIONS + """
+
+PLUSIEURS DÉCLARATIONS:
+L'utilisateur fournit plusieurs déclarations INDÉPENDANTES, numérotées (### DÉCLARATION 1, ### DÉCLARATION 2, ...), chacune avec sa propre analyse initiale, sa recherche Perplexity et ses sources. Évalue chaque déclaration séparément, UNIQUEMENT avec ses propres informations, et donne exactement un verdict par déclaration, avec son numéro.
+
+""" + _FACT_CHECK_ANSWER + "\n\n" + _FACT_CHECK_REMINDER
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    """Approximate token count of `text`."""
+    return -(-len(text or "") // CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut `text` at a word boundary so it fits in about `max_tokens`."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text, False
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars].rstrip(" ,;:") + "…", True
+
+
+def _dedup_key(sentence):
+    return re.sub(r"\W+", " ", sentence.lower()).strip()
+
+
+def _unique_sentences(text, seen):
+    """Sentences of `text` not already in `seen` (which is updated), and the number dropped."""
+    kept, dropped = [], 0
+    for sentence in _SENTENCE_END.split(text.strip()):
+        key = _dedup_key(sentence)
+        if not key:
+            continue
+        if len(key) >= MIN_DEDUP_LENGTH:
+            if key in seen:
+                dropped += 1
+                continue
+            seen.add(key)
+        kept.append(sentence.strip())
+    return " ".join(kept), dropped
+
+
+def perplexity_summary(verification_content):
+    """Perplexity answer without the source excerpts appended by create_enriched_content()."""
+    return (verification_content or "").split(EXCERPTS_HEADER)[0].strip()
+
+
+def _claim_section(translated_text, initial_result, web_sources, perplexity_verification, reliability=None):
+    """
+    User-message text describing one claim.
+
+    reliability: domain -> verdict history hint (domain_reliability.hints())
+
+    Returns:
+        tuple: (text, number of sources listed, duplicates removed, texts truncated)
+    """
+    seen = set()
+    duplicates = truncated = 0
+
+    summary, dropped = _unique_sentences(perplexity_summary(perplexity_verification), seen)
+    duplicates += dropped
+    summary, cut = truncate_to_tokens(summary, settings.LLM_PROMPT_SUMMARY_TOKEN_BUDGET)
+    truncated += cut
+
+    sources, links = [], set()
+    for source in web_sources or []:
+        link = source.get("link", "")
+        if link and link in links:
+            duplicates += 1
+            continue
+        links.add(link)
+        sources.append(source)
+
+    per_source_budget = settings.LLM_PROMPT_SOURCES_TOKEN_BUDGET // max(len(sources), 1)
+    lines = []
+    for i, source in enumerate(sources, 1):
+        lines.append(f"{i}. TITRE: {source.get('title', 'Source sans titre')}")
+        lines.append(f"   URL: {source.get('link') or 'Pas de lien'}")
+        if source.get("date"):
+            lines.append(f"   DATE: {source['date']}")
+        hint = (reliability or {}).get(domain_of(source.get("link") or ""))
+        if hint:
+            lines.append(f"   HISTORIQUE DU DOMAINE: {hint}")
+        snippet, dropped = _unique_sentences(source.get("snippet") or "", seen)
+        duplicates += dropped
+        if snippet:
+            snippet, cut = truncate_to_tokens(snippet, per_source_budget)
+            truncated += cut
+            lines.append(f"   CONTENU: {snippet}")
+
+    section = f"""DÉCLARATION À VÉRIFIER: {translated_text}
+
+ANALYSE INITIALE AUTOMATIQUE:
+Le modèle de classification a donné le résultat '{initial_result}' (où 'vérifié' = probablement vrai, 'rejeté' = probablement faux).
+
+RECHERCHE ET VÉRIFICATION PERPLEXITY:
+{summary or "Aucune vérification Perplexity disponible."}
+
+SOURCES WEB DISPONIBLES:
+{chr(10).join(lines) if lines else "Aucune source web spécifique n'a été trouvée."}"""
+    return section, len(sources), duplicates, truncated
+
+
+def _prompt(system_prompt, user_prompt, sources, duplicates, truncated):
+    system_tokens = estimate_tokens(system_prompt)
+    user_tokens = estimate_tokens(user_prompt)
+    return {
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        "estimated_tokens": {"system": system_tokens, "user": user_tokens, "total": system_tokens + user_tokens},
+        "sources": sources,
+        "duplicates_removed": duplicates,
+        "truncated": truncated,
+    }
+
+
+def build_fact_check_prompt(translated_text, initial_result, web_sources, perplexity_verification, current_date,
+                            reliability=None):
+    """
+    Build the fact-check messages.
+
+    reliability: domain -> verdict history hint of the cited domains
+
+    Returns:
+        dict: messages (system prefix + user message), estimated_tokens
+        (system, user, total), sources (number listed), duplicates_removed
+        (sentences and sources) and truncated (texts cut to their budget)
+    """
+    section, sources, duplicates, truncated = _claim_section(
+        translated_text, initial_result, web_sources, perplexity_verification, reliability
+    )
+    return _prompt(FACT_CHECK_SYSTEM_PROMPT, f"DATE ACTUELLE: {current_date}\n\n{section}", sources, duplicates, truncated)
+
+
+def build_batch_fact_check_prompt(claims, current_date, reliability=None):
+    """
+    Build the messages checking several independent claims at once.
+
+    claims: dicts with translated_text, initial_result, web_sources and
+    perplexity_verification; they are numbered from 1 in this order.
+    reliability: domain -> verdict history hint, for all the claims
+
+    Returns:
+        dict: same keys as build_fact_check_prompt (counts summed over the claims)
+    """
+    sections = [f"DATE ACTUELLE: {current_date}"]
+    sources = duplicates = truncated = 0
+    for number, claim in enumerate(claims, 1):
+        section, claim_sources, claim_duplicates, claim_truncated = _claim_section(
+            claim["translated_text"], claim["initial_result"], claim["web_sources"], claim["perplexity_verification"], reliability
+        )
+        sections.append(f"### DÉCLARATION {number}\n{section}")
+        sources += claim_sources
+        duplicates += claim_duplicates
+        truncated += claim_truncated
+    return _prompt(FACT_CHECK_BATCH_SYSTEM_PROMPT, "\n\n".join(sections), sources, duplicates, truncated)
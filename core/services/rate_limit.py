@@ -0,0 +1,101 @@
+"""
+Per-user token-bucket rate limits, stored in Redis.
+
+Each (scope, Supabase user) pair has a bucket of RATE_LIMIT_<SCOPE>_BURST
+tokens refilled at RATE_LIMIT_<SCOPE>_PER_MINUTE tokens per minute. A request
+takes `cost` tokens (one per verification it launches) or is rejected with
+the delay after which it would fit. The refill and the take run in one Lua
+script, so concurrent requests from several web processes cannot overdraw a
+bucket.
+
+Limits are an abuse guard, not accounting: when Redis is disabled or
+unreachable, or a scope has no limit (per minute = 0), requests are allowed.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+
+from core import metrics
+
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Endpoints that launch verification tasks share this bucket
+VERIFICATIONS = "verifications"
+# Image batches (one token per unique image), sized for IMAGE_BATCH_MAX_FILES
+IMAGE_BATCHES = "image_batches"
+# Claims imported from CSV/NDJSON files (one token per claim)
+CLAIM_IMPORTS = "claim_imports"
+
+_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+def rate_limit_key(scope, user_id):
+    return f"ratelimit:{scope}:{user_id}"
+
+
+def scope_limits(scope):
+    """(per minute, burst) configured for `scope`; per minute 0 means unlimited."""
+    name = scope.upper()
+    per_minute = getattr(settings, f"RATE_LIMIT_{name}_PER_MINUTE", 0)
+    burst = getattr(settings, f"RATE_LIMIT_{name}_BURST", 0) or per_minute
+    return per_minute, burst
+
+
+def take(scope, user_id, cost=1):
+    """
+    Take `cost` tokens from the user's bucket for `scope`.
+
+    Returns:
+        dict: allowed, remaining (tokens left, None when not limited) and
+        retry_after (seconds before the request would be allowed)
+    """
+    allowed = {"allowed": True, "remaining": None, "retry_after": 0}
+    per_minute, burst = scope_limits(scope)
+    client = get_redis_client()
+    if not per_minute or client is None:
+        return allowed
+    if cost > burst:
+        # Never fits: reject without draining the bucket
+        metrics.record_throttled(scope)
+        return {"allowed": False, "remaining": None, "retry_after": None}
+
+    try:
+        granted, remaining, retry_after = client.eval(
+            _TOKEN_BUCKET, 1, rate_limit_key(scope, user_id), burst, per_minute / 60, time.time(), cost
+        )
+    except Exception as e:
+        logger.warning(f"Rate limit {scope} not checked for user {user_id}: {e}")
+        return allowed
+
+    if not int(granted):
+        metrics.record_throttled(scope)
+        logger.info(f"Rate limit {scope} reached for user {user_id} (retry in {float(retry_after):.1f}s)")
+    return {
+        "allowed": bool(int(granted)),
+        "remaining": int(float(remaining)),
+        "retry_after": float(retry_after),
+    }
@@ -0,0 +1,56 @@
+"""
+Shared Redis connections for features outside Celery's broker/backend.
+
+One synchronous client per process (used from tasks and sync views) and one
+asyncio client per event loop (used by streaming views). Callers treat Redis
+as optional: helpers return None when REDIS_URL is not configured.
+"""
+
+import logging
+import threading
+
+import redis
+import redis.asyncio
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis_client():
+    """
+    Return the process-wide synchronous Redis client, or None if disabled.
+    """
+    global _client
+    url = getattr(settings, "REDIS_URL", "")
+    if not url:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis.from_url(
+                    url,
+                    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                    decode_responses=True,
+                )
+    return _client
+
+
+def get_async_redis_client():
+    """
+    Return a new asyncio Redis client, or None if disabled.
+
+    asyncio connections are bound to the event loop that created them, so
+    streaming views build their own client and close it when done.
+    """
+    url = getattr(settings, "REDIS_URL", "")
+    if not url:
+        return None
+    return redis.asyncio.Redis.from_url(
+        url,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        decode_responses=True,
+    )
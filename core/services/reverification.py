@@ -0,0 +1,145 @@
+"""
+Nightly re-verification of undetermined and stale verdicts.
+
+Sources appear after a claim was first checked: an INDÉTERMINÉE submission
+may be decidable a few days later, and a fact of the library may have been
+corrected since it was verified. Every night (Celery beat, REVERIFY_HOUR),
+reverify_stale_verdicts_task selects:
+- submissions whose verdict is INDÉTERMINÉE (including provisional verdicts
+  of the degraded mode), younger than REVERIFY_UNDETERMINED_MAX_AGE_DAYS and
+  not re-checked for REVERIFY_UNDETERMINED_INTERVAL_DAYS;
+- facts not verified for REVERIFY_FACT_MAX_AGE_DAYS.
+
+Candidates are read in keyset-paged batches (id > last id, REVERIFY_PAGE_SIZE
+rows per query) up to REVERIFY_MAX_CLAIMS, submissions first, with duplicate
+texts checked once. They are split into REVERIFY_CONCURRENCY chunks, each run
+by a chain of tasks like a submission's analysis (translation on the network
+queue, classifier on the CPU queue, then Perplexity and LLM on the network
+queue), with an equal share of REVERIFY_BUDGET_USD. The budget counts the
+estimated LLM cost and REVERIFY_SEARCH_COST_USD per Perplexity search. A
+chunk stops before the search that would exceed its budget, or when a
+provider is unavailable (open circuit breaker, transient error): the
+remaining claims are picked up by the next run.
+
+Searches bypass the Perplexity cache (search_cache), since new sources are
+the point of a re-verification. Only decisive LLM verdicts are applied; degraded or undetermined results
+just mark the row as re-checked. Every verdict that changes is recorded as a
+VerdictChange. The `reverify_verdicts` management command runs the same
+selection by hand.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import circuit_breaker
+from .ai_analysis import research_claim
+from .llm_usage import estimate_cost
+
+logger = logging.getLogger(__name__)
+
+SUBMISSION = "submission"
+FACT = "fact"
+
+
+def undetermined_submissions(now=None):
+    """Undetermined submissions due for a new check."""
+    from core.models import Submission
+
+    now = now or timezone.now()
+    return Submission.objects.filter(
+        verdict="INDÉTERMINÉE",
+        date__gte=now - timedelta(days=settings.REVERIFY_UNDETERMINED_MAX_AGE_DAYS),
+    ).exclude(statut="en cours").filter(
+        Q(verified_at__isnull=True)
+        | Q(verified_at__lt=now - timedelta(days=settings.REVERIFY_UNDETERMINED_INTERVAL_DAYS))
+    )
+
+
+def stale_facts(now=None):
+    """Facts whose last verification is older than REVERIFY_FACT_MAX_AGE_DAYS."""
+    from core.models import Fact
+
+    cutoff = (now or timezone.now()) - timedelta(days=settings.REVERIFY_FACT_MAX_AGE_DAYS)
+    return Fact.objects.filter(verdict="VRAIE").filter(
+        Q(verified_at__lt=cutoff) | Q(verified_at__isnull=True, date__lt=cutoff)
+    )
+
+
+def keyset_pages(queryset, page_size):
+    """Yield pages of (id, texte) ordered by id, each query starting after the last id."""
+    last_id = 0
+    while True:
+        page = list(queryset.filter(id__gt=last_id).order_by("id").values_list("id", "texte")[:page_size])
+        if not page:
+            return
+        yield page
+        last_id = page[-1][0]
+
+
+def select_candidates(limit=None, now=None):
+    """
+    Claims to re-verify, undetermined submissions first.
+
+    Returns:
+        list: [kind, id] pairs (JSON-serializable for the Celery tasks)
+    """
+    limit = settings.REVERIFY_MAX_CLAIMS if limit is None else limit
+    candidates = []
+    seen = set()
+    for kind, queryset in ((SUBMISSION, undetermined_submissions(now)), (FACT, stale_facts(now))):
+        for page in keyset_pages(queryset, settings.REVERIFY_PAGE_SIZE):
+            for record_id, text in page:
+                if len(candidates) >= limit:
+                    return candidates
+                key = " ".join(text.lower().split())
+                if key in seen:
+                    continue
+                seen.add(key)
+                candidates.append([kind, record_id])
+    return candidates
+
+
+def split(candidates, concurrency):
+    """Split the candidates into at most `concurrency` chunks of similar size."""
+    concurrency = max(1, min(concurrency, len(candidates)))
+    return [candidates[i::concurrency] for i in range(concurrency)]
+
+
+def providers_available():
+    """Whether neither Perplexity's nor OpenRouter's circuit breaker is open."""
+    return not (circuit_breaker.PERPLEXITY.is_open() or circuit_breaker.OPENROUTER.is_open())
+
+
+def reverify_claim(text, translated_text, initial_result, confidence):
+    """
+    Search sources for `text` again and ask the LLM for a new verdict, from
+    the translation and classifier result of the earlier stages.
+
+    Raises TransientError when a provider is unavailable.
+
+    Returns:
+        dict: verdict (None for a degraded or unusable result), analysis,
+        web_sources, usages (LLM usage dicts) and cost_usd (LLM cost plus
+        REVERIFY_SEARCH_COST_USD for the search)
+    """
+    usages = []
+    # New sources are what a re-verification looks for: no cached search
+    analysis, web_sources = research_claim(
+        text, translated_text, initial_result, on_usage=usages.append, confidence=confidence, use_cache=False
+    )
+    cost = sum(estimate_cost(u["model"], u["prompt_tokens"], u["completion_tokens"]) for u in usages)
+
+    verdict = None
+    if isinstance(analysis, dict) and not analysis.get("mode_degrade"):
+        verdict = analysis.get("statut")
+    return {
+        "verdict": verdict,
+        "analysis": analysis if isinstance(analysis, dict) else {},
+        "web_sources": web_sources,
+        "usages": usages,
+        "cost_usd": float(cost) + settings.REVERIFY_SEARCH_COST_USD,
+    }
@@ -0,0 +1,114 @@
+"""
+Cache of Perplexity searches.
+
+search_with_perplexity() results are kept in Redis, keyed on the normalized
+claim text and the search recency filter, so a claim submitted again (same
+words, ignoring case, accents, punctuation and spacing) reuses the sources
+found the first time instead of calling the paid API.
+
+How long a search stays valid depends on the kind of claim (claim_tier()):
+- breaking: news-style claims ("aujourd'hui", "hier", "vient de", "en
+  direct"...) whose sources change within hours, PERPLEXITY_CACHE_TTL_BREAKING;
+- evergreen: scientific, medical or historical claims,
+  PERPLEXITY_CACHE_TTL_EVERGREEN;
+- default: everything else, PERPLEXITY_CACHE_TTL_DEFAULT.
+A TTL of 0 disables the cache for that tier. Only successful searches are
+stored. Lookups are counted in checkia_cache_requests_total, with the cache
+label perplexity_<tier>, which gives the hit rate of each tier.
+
+The nightly re-verification looks for new sources, so it bypasses the cache
+(and refreshes it). Without Redis nothing is cached.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+
+from django.conf import settings
+from django.utils import timezone
+
+from core import metrics
+
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+BREAKING = "breaking"
+EVERGREEN = "evergreen"
+DEFAULT = "default"
+
+_BREAKING_WORDS = re.compile(
+    r"\b(aujourd hui|hier|ce matin|ce soir|cette nuit|cette semaine|en ce moment|en direct|"
+    r"vient d|viennent d|derniere minute|urgent|breaking|today|yesterday|tonight|this week|live)\b"
+)
+_EVERGREEN_WORDS = re.compile(
+    r"\b(etudes?|scientifiques?|science|chercheurs?|recherches?|vaccins?|virus|maladies?|cancer|"
+    r"medical|medicale|medecins?|sante|oms|climat|histoire|historiques?|siecles?|antiquite|"
+    r"colonisation|independance|study|studies|scientists?|research|disease|history|historical|century)\b"
+)
+_YEAR = re.compile(r"\b(1[0-9]{3}|20[0-9]{2})\b")
+
+
+def normalize_query(text):
+    """Lowercase text without accents, punctuation or repeated spaces."""
+    text = unicodedata.normalize("NFKD", text or "").casefold()
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+
+def claim_tier(text):
+    """Kind of claim deciding how long its search is cached (breaking, evergreen or default)."""
+    normalized = normalize_query(text)
+    if _BREAKING_WORDS.search(normalized):
+        return BREAKING
+    if _EVERGREEN_WORDS.search(normalized):
+        return EVERGREEN
+    # Only years at least two years old: the claim is about a settled past
+    years = [int(year) for year in _YEAR.findall(normalized)]
+    if years and max(years) <= timezone.now().year - 2:
+        return EVERGREEN
+    return DEFAULT
+
+
+def ttl(tier):
+    return {
+        BREAKING: settings.PERPLEXITY_CACHE_TTL_BREAKING,
+        EVERGREEN: settings.PERPLEXITY_CACHE_TTL_EVERGREEN,
+    }.get(tier, settings.PERPLEXITY_CACHE_TTL_DEFAULT)
+
+
+def cache_key(text, recency):
+    digest = hashlib.sha256(normalize_query(text).encode()).hexdigest()
+    return f"perplexity:search:{recency}:{digest}"
+
+
+def get(text, recency):
+    """Cached search result for `text`, or None."""
+    client = get_redis_client()
+    tier = claim_tier(text)
+    if client is None or ttl(tier) <= 0:
+        return None
+    try:
+        cached = client.get(cache_key(text, recency))
+    except Exception as e:
+        logger.warning(f"Perplexity cache unavailable, searching: {e}")
+        return None
+    metrics.record_cache(f"perplexity_{tier}", cached is not None)
+    if cached is None:
+        return None
+    logger.info(f"Perplexity search served from the cache ({tier})")
+    return json.loads(cached)
+
+
+def store(text, recency, result):
+    """Keep a successful search result for the TTL of the claim's tier."""
+    client = get_redis_client()
+    seconds = ttl(claim_tier(text))
+    if client is None or seconds <= 0:
+        return
+    try:
+        client.set(cache_key(text, recency), json.dumps(result, ensure_ascii=False), ex=seconds)
+    except Exception as e:
+        logger.warning(f"Perplexity search not cached: {e}")
@@ -0,0 +1,124 @@
+"""
+Web sources cited by verifications, stored once per canonical URL.
+
+The web_sources JSON of submissions and facts repeats the same URLs across
+many rows. Each cited URL is also kept as one Source row (canonical URL,
+its SHA-256, domain, title and date) linked to the facts and submissions
+citing it, so "which claims cite this domain" is an indexed join instead
+of a scan of every JSON blob.
+
+Canonical URLs have a lowercase scheme and host, no "www." prefix, no
+fragment, no tracking parameters (utm_*, fbclid, gclid...) and no trailing
+slash. link_sources() is called wherever web_sources is written; migration
+0017 backfilled the existing rows with its own frozen copy of this logic.
+"""
+
+import hashlib
+import logging
+from datetime import date
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+TRACKING_PARAMS = ("fbclid", "gclid", "mc_cid", "mc_eid", "igshid", "ref_src")
+TITLE_MAX_LENGTH = 500
+URL_MAX_LENGTH = 2000
+
+
+def canonical_url(url):
+    """Canonical form of an http(s) URL, or '' for anything else."""
+    try:
+        parts = urlsplit((url or "").strip())
+        port = parts.port  # ValueError for an invalid or out-of-range port
+    except ValueError:
+        return ""
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").removeprefix("www.")
+    if scheme not in ("http", "https") or not host:
+        return ""
+    netloc = f"{host}:{port}" if port and port not in (80, 443) else host
+    query = urlencode([
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith("utm_") and name.lower() not in TRACKING_PARAMS
+    ])
+    return urlunsplit((scheme, netloc, parts.path.rstrip("/"), query, ""))
+
+
+def url_hash(url):
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def domain_of(url):
+    """Domain of a URL or bare host name, without "www." (lowercase)."""
+    value = (url or "").strip().lower()
+    if "://" not in value:
+        value = f"http://{value}"
+    try:
+        return (urlsplit(value).hostname or "").removeprefix("www.")
+    except ValueError:
+        return ""
+
+
+def _published(value):
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_sources(web_sources):
+    """
+    Source fields of each distinct http(s) URL of a web_sources list.
+
+    Returns:
+        dict: url_hash -> dict(url_hash, url, domain, title, published)
+    """
+    parsed = {}
+    for source in web_sources if isinstance(web_sources, list) else []:
+        if not isinstance(source, dict):
+            continue
+        url = canonical_url(source.get("link") or source.get("url") or "")
+        if not url or len(url) > URL_MAX_LENGTH:
+            continue
+        digest = url_hash(url)
+        parsed.setdefault(digest, {
+            "url_hash": digest,
+            "url": url,
+            "domain": domain_of(url),
+            "title": str(source.get("title") or "")[:TITLE_MAX_LENGTH],
+            "published": _published(source.get("date")),
+        })
+    return parsed
+
+
+def upsert_sources(source_model, parsed):
+    """
+    Create the missing Source rows of `parsed` (see parse_sources).
+
+    Returns:
+        dict: url_hash -> Source id
+    """
+    if not parsed:
+        return {}
+    source_model.objects.bulk_create([source_model(**fields) for fields in parsed.values()], ignore_conflicts=True)
+    return dict(source_model.objects.filter(url_hash__in=list(parsed)).values_list("url_hash", "id"))
+
+
+def link_sources(record, web_sources):
+    """
+    Link a Fact or Submission to the Sources of its web_sources (replacing
+    previous links). Best-effort: never fails a verification.
+
+    Returns:
+        set: Domains of the linked sources (empty if linking failed)
+    """
+    from core.models import Source
+
+    try:
+        parsed = parse_sources(web_sources)
+        ids = upsert_sources(Source, parsed)
+        record.sources.set(ids.values())
+    except Exception as e:
+        logger.warning(f"Sources of {record.__class__.__name__} {record.pk} not linked: {e}")
+        return set()
+    return {fields["domain"] for fields in parsed.values()}
@@ -1,33 +1,126 @@
+import hashlib
 import logging
 import os
-import uuid
-from datetime import datetime
+import threading
 from django.conf import settings
 from supabase import create_client, Client
 from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from core import metrics
 
 logger = logging.getLogger(__name__)
 
+# Process-wide storage client and bucket state (shared by worker threads)
+_client = None
+_client_lock = threading.Lock()
+_bucket_ready = False
+_bucket_lock = threading.Lock()
+
 def get_supabase_client():
     """
     Get Supabase client with service role key for storage operations
+
+    The client is built once per process and reused: construction alone
+    costs tens of milliseconds (HTTP clients, TLS context).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_client(
+                    settings.SUPABASE_URL,
+                    settings.SUPABASE_SERVICE_ROLE_KEY
+                )
+    return _client
+
+def ensure_bucket_exists():
+    """
+    Resolve the image-verifications bucket once per process
+
+    Only the first call lists the buckets (and creates the bucket if
+    needed); later calls return immediately. A failed check is retried on
+    the next call.
+    """
+    global _bucket_ready
+    metrics.record_cache("supabase_bucket", _bucket_ready)
+    if _bucket_ready:
+        return {"success": True, "created": False, "cached": True}
+    with _bucket_lock:
+        if _bucket_ready:
+            return {"success": True, "created": False, "cached": True}
+        result = create_bucket_if_not_exists()
+        if result["success"]:
+            _bucket_ready = True
+        return result
+
+def content_addressed_path(content_hash, file_extension):
+    """
+    Storage path of an image identified by the SHA-256 of its bytes
+    """
+    return f"sha256/{content_hash[:2]}/{content_hash}.{file_extension}"
+
+def derivative_path(content_hash, name):
+    """
+    Storage path of a resized WebP derivative, stored next to its original
+    """
+    return f"sha256/{content_hash[:2]}/{content_hash}.{name}.webp"
+
+def upload_image_derivatives(content_hash, image_bytes):
+    """
+    Generate and upload the thumbnail/preview derivatives of an image
+    
+    Failures are logged and skipped: derivatives are an optimisation for
+    list views, never a reason to fail the verification.
+    
+    Args:
+        content_hash: SHA-256 of the original bytes
+        image_bytes: Raw bytes of the original image
+    
+    Returns:
+        dict: derivative name -> signed URL (only successful uploads)
     """
-    return create_client(
-        settings.SUPABASE_URL,
-        settings.SUPABASE_SERVICE_ROLE_KEY
-    )
+    from .image_derivatives import generate_derivatives
+
+    urls = {}
+    derivatives = generate_derivatives(image_bytes)
+    if not derivatives:
+        return urls
+
+    bucket = get_supabase_client().storage.from_("image-verifications")
+    for name, data in derivatives.items():
+        path = derivative_path(content_hash, name)
+        try:
+            bucket.upload(
+                path=path,
+                file=data,
+                file_options={
+                    "content-type": "image/webp",
+                    "cache-control": "31536000",
+                    "upsert": "true"
+                }
+            )
+            signed_url_response = bucket.create_signed_url(path, expires_in=31536000)
+            signed_url = signed_url_response.get('signedURL') if signed_url_response else None
+            if signed_url:
+                urls[name] = signed_url
+        except Exception as e:
+            logger.warning(f"Upload du dérivé {name} échoué pour {content_hash}: {str(e)}")
+    return urls
 
 def upload_image_to_supabase(image_file, user_id, verification_type="general"):
     """
     Upload an image file to Supabase storage bucket
     
+    The object is content-addressed: its path is derived from the SHA-256 of
+    the bytes, so identical images always map to the same object. Callers
+    skip this upload when an ImageBlob already exists for the hash.
+    
     Args:
         image_file: Django uploaded file object
         user_id: Supabase user UUID
         verification_type: Type of verification (content, ai_detection, etc.)
     
     Returns:
-        dict: Contains success status, file_path, and public_url
+        dict: Contains success status, file_path, public_url and content_hash
     """
     try:
         logger.info(f"=== DÉBUT UPLOAD SUPABASE ===")
@@ -39,12 +132,7 @@ def upload_image_to_supabase(image_file, user_id, verification_type="general"):
         # Create Supabase client
         supabase: Client = get_supabase_client()
         
-        # Generate unique filename
-        file_extension = image_file.name.split('.')[-1] if '.' in image_file.name else 'jpg'
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{user_id}/{verification_type}/{timestamp}_{uuid.uuid4().hex[:8]}.{file_extension}"
-        
-        logger.info(f"Nom de fichier généré: {unique_filename}")
+        file_extension = image_file.name.split('.')[-1].lower() if '.' in image_file.name else 'jpg'
         
         # Read file content
         if hasattr(image_file, 'read'):
@@ -55,6 +143,12 @@ def upload_image_to_supabase(image_file, user_id, verification_type="general"):
             
         logger.info(f"Contenu du fichier lu: {len(file_content)} bytes")
         
+        # Content-addressed filename
+        content_hash = hashlib.sha256(file_content).hexdigest()
+        unique_filename = content_addressed_path(content_hash, file_extension)
+        
+        logger.info(f"Nom de fichier généré: {unique_filename}")
+        
         # Upload to Supabase storage
         bucket_name = "image-verifications"
         
@@ -62,14 +156,17 @@ def upload_image_to_supabase(image_file, user_id, verification_type="general"):
         logger.info(f"Chemin du fichier: {unique_filename}")
         
         # Upload file
-        result = supabase.storage.from_(bucket_name).upload(
-            path=unique_filename,
-            file=file_content,
-            file_options={
-                "content-type": f"image/{file_extension}",
-                "cache-control": "3600"
-            }
-        )
+        with metrics.observe_stage(metrics.SUPABASE_UPLOAD):
+            result = supabase.storage.from_(bucket_name).upload(
+                path=unique_filename,
+                file=file_content,
+                file_options={
+                    "content-type": f"image/{file_extension}",
+                    "cache-control": "3600",
+                    # Same bytes, same path: a concurrent upload of the same image is harmless
+                    "upsert": "true"
+                }
+            )
         
         logger.info(f"Résultat de l'upload: {result}")
         
@@ -95,7 +192,8 @@ def upload_image_to_supabase(image_file, user_id, verification_type="general"):
             "success": True,
             "file_path": unique_filename,
             "public_url": signed_url,
-            "bucket": bucket_name
+            "bucket": bucket_name,
+            "content_hash": content_hash
         }
         
     except Exception as e:
@@ -112,7 +210,7 @@ def delete_image_from_supabase(file_path):
     Delete an image from Supabase storage
     
     Args:
-        file_path: Path to the file in Supabase storage
+        file_path: Path (or list of paths) of the file(s) in Supabase storage
         
     Returns:
         dict: Contains success status
@@ -125,7 +223,8 @@ def delete_image_from_supabase(file_path):
         bucket_name = "image-verifications"
         
         # Delete file
-        result = supabase.storage.from_(bucket_name).remove([file_path])
+        paths = file_path if isinstance(file_path, (list, tuple)) else [file_path]
+        result = supabase.storage.from_(bucket_name).remove(list(paths))
         
         logger.info(f"Résultat de la suppression: {result}")
         
@@ -141,6 +240,17 @@ def delete_image_from_supabase(file_path):
             "error": str(e)
         }
 
+def download_image_from_supabase(file_path, bucket_name="image-verifications"):
+    """
+    Bytes of a stored image, or None if it cannot be read
+    """
+    try:
+        with metrics.observe_stage(metrics.IMAGE_DOWNLOAD):
+            return get_supabase_client().storage.from_(bucket_name).download(file_path)
+    except Exception as e:
+        logger.error(f"Erreur lors du téléchargement de {file_path}: {str(e)}")
+        return None
+
 def get_image_url_from_supabase(file_path, bucket_name="image-verifications"):
     """
     Get signed URL for an image from Supabase storage
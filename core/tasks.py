@@ -1,18 +1,268 @@
 # factcheck/tasks.py
 
-from celery import shared_task
-from .services.ai_analysis import analyze_text
+from celery import group, shared_task
+from django.conf import settings
+from django.utils import timezone
+from .services.ai_analysis import translate_text, classify_text, research_claim, research_claims_batch
 from .services.image_verification import verify_image_content, detect_ai_generated_image
-from .services.supabase_storage import upload_image_to_supabase, create_bucket_if_not_exists
+from .services.supabase_storage import (
+    upload_image_to_supabase, upload_image_derivatives, ensure_bucket_exists, get_image_url_from_supabase,
+    download_image_from_supabase, derivative_path
+)
+from .services.progress import publish_progress, current_progress_id, store_final_result, StageTracker
+from .services.llm_usage import record_llm_usage
+from .services.idempotency import claim_run, release_run
+from .services.errors import TransientError
+from .services import domain_reliability, reverification, sources
+from core import metrics
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
-@shared_task
-def analyze_submission_text_task(submission_id, text):
+# Verdicts du LLM enregistrés sur les soumissions et les faits, et statut
+# de soumission correspondant
+VERDICTS = ('VRAIE', 'FAUSSE', 'INDÉTERMINÉE')
+STATUS_BY_VERDICT = {
+    'VRAIE': 'vérifié',
+    'FAUSSE': 'rejeté',
+    'INDÉTERMINÉE': 'rejeté'
+}
+
+# Tâches d'une chaîne (texte -> CPU -> réseau) : aucune n'enregistre son
+# propre résultat, celle qui conclut l'enregistre sous l'id suivi par le
+# client (store_final_result), qui ne passe à SUCCESS qu'en fin de chaîne
+CHAIN_TASK = {'ignore_result': True}
+
+# Nouvelles tentatives sur les erreurs transitoires des fournisseurs
+# (TransientError) : attente exponentielle à partir de retry_backoff
+# secondes, avec gigue, plafonnée à TASK_RETRY_BACKOFF_MAX ; le nombre
+# d'essais et l'attente initiale sont réglés par tâche
+RETRY_TRANSIENT = {
+    'bind': True,
+    'autoretry_for': (TransientError,),
+    'retry_backoff_max': settings.TASK_RETRY_BACKOFF_MAX,
+    'retry_jitter': True,
+}
+
+
+def _will_retry(task, e):
+    """
+    Une erreur transitoire est relancée vers Celery (autoretry_for) tant
+    qu'il reste des essais ; sinon la tâche conclut en échec comme avant.
+
+    Une tâche appelée directement (image d'un lot) n'est jamais relancée.
+    """
+    if not isinstance(e, TransientError) or task.request.called_directly:
+        return False
+    if task.request.retries < task.max_retries:
+        logger.warning(
+            f"{task.name}: erreur transitoire ({e}), nouvel essai "
+            f"{task.request.retries + 1}/{task.max_retries}"
+        )
+        return True
+    metrics.record_retries_exhausted(task.name)
+    return False
+
+
+def _submission_failed(submission_id, tracker, e, task_name):
+    """Marquer la soumission en erreur (si elle est encore en cours) et publier l'étape error."""
+    logger.error(f"Erreur dans {task_name}: {e}")
+    import traceback
+    logger.error(f"Traceback: {traceback.format_exc()}")
+
+    try:
+        from .models import Submission
+        Submission.objects.filter(id=submission_id, statut='en cours').update(
+            statut='rejeté',
+            detailed_result=f'Erreur lors de l\'analyse: {str(e)}'
+        )
+    except:
+        pass
+    tracker('error', error=str(e))
+
+    return {
+        'success': False,
+        'submission_id': submission_id,
+        'error': str(e)
+    }
+
+
+def _batch_failed(submission_ids, tracker, e, task_name):
+    """Marquer en erreur les soumissions d'un groupe encore en cours et publier l'étape error."""
+    logger.error(f"Erreur dans {task_name}: {e}")
+    import traceback
+    logger.error(f"Traceback: {traceback.format_exc()}")
+
+    try:
+        from .models import Submission
+        Submission.objects.filter(id__in=submission_ids, statut='en cours').update(
+            statut='rejeté',
+            detailed_result=f'Erreur lors de l\'analyse: {str(e)}'
+        )
+    except Exception:
+        pass
+    tracker('error', error=str(e))
+
+    return {
+        'success': False,
+        'submission_ids': submission_ids,
+        'error': str(e)
+    }
+
+
+def _already_processed(record_id, current_status, task_name):
+    """Résultat d'une tâche ignorée : son enregistrement n'est plus en cours (exécution en double)."""
+    logger.warning(f"{task_name} ignorée pour {record_id} : déjà traité (statut {current_status})")
+    return {
+        'success': True,
+        'skipped': True,
+        'record_id': record_id,
+        'status': current_status
+    }
+
+
+def _add_fact_to_library(submission, analysis_result, web_sources):
+    """Ajouter une soumission vérifiée comme VRAIE à la bibliothèque des faits vérifiés."""
+    try:
+        from .models import Fact
+        
+        # Déterminer la source principale à utiliser
+        primary_source = ''
+        logger.info(f"Détermination de la source principale - Analysis result type: {type(analysis_result)}")
+        
+        if isinstance(analysis_result, dict):
+            # Essayer d'utiliser les sources principales de l'analyse AI
+            sources_principales = analysis_result.get('sources_principales', [])
+            logger.info(f"Sources principales trouvées: {sources_principales}")
+            
+            if sources_principales and isinstance(sources_principales, list):
+                primary_source = sources_principales[0]
+                logger.info(f"Source principale sélectionnée depuis analysis_result: {primary_source}")
+            # Sinon, essayer d'extraire de web_sources
+            elif web_sources and isinstance(web_sources, list) and len(web_sources) > 0:
+                primary_source = web_sources[0].get('url', '') if isinstance(web_sources[0], dict) else str(web_sources[0])
+                logger.info(f"Source principale sélectionnée depuis web_sources: {primary_source}")
+        
+        # Si aucune source de vérification, utiliser la source soumise
+        if not primary_source:
+            primary_source = submission.source or 'Source de vérification non disponible'
+            logger.info(f"Aucune source de vérification trouvée, utilisation par défaut: {primary_source}")
+        
+        logger.info(f"Source finale pour la bibliothèque: {primary_source}")
+        
+        # Créer le fait vérifié
+        fact = Fact.objects.create(
+            texte=submission.texte,
+            source=primary_source,
+            web_sources=web_sources,
+            verified_at=timezone.now()
+        )
+        
+        logger.info(f"Fait vérifié ajouté à la bibliothèque - ID: {fact.id}")
+        sources.link_sources(fact, web_sources)
+
+        # Extraire et associer les mots-clés (file CPU)
+        extract_fact_keywords_task.delay(fact.id)
+        return fact
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de l'ajout du fait à la bibliothèque: {e}")
+        # Ne pas faire échouer la tâche pour cette erreur
+        return None
+
+
+def _save_submission_result(submission, analysis_result, web_sources, tracker, task_name='research_submission_task',
+                            batch=False):
+    """
+    Enregistrer le verdict d'une soumission (si elle est encore en cours) et
+    ajouter les faits vérifiés comme VRAIS à la bibliothèque.
+
+    Dans un lot (batch=True), l'étape publiée est submission_saved : le suivi
+    partagé par le lot ne se termine qu'au 'saved' émis après la dernière.
+    """
+    from .models import Submission
+
+    # Traiter le résultat
+    if isinstance(analysis_result, dict):
+        ai_status = analysis_result.get('statut', 'INDÉTERMINÉE')
+        explanation = analysis_result.get('explication', 'Pas d\'explication disponible')
+        
+        # Mapping du statut
+        final_status = STATUS_BY_VERDICT.get(ai_status, 'rejeté')
+        
+    else:
+        # Format legacy
+        ai_status = 'LEGACY'
+        final_status = analysis_result
+        explanation = f"Résultat d'analyse: {analysis_result}"
+    
+    # Verdict enregistré : un verdict provisoire du mode dégradé (non
+    # vérifié par le LLM) compte comme indéterminé, pour être re-vérifié
+    degraded = isinstance(analysis_result, dict) and analysis_result.get('mode_degrade', False)
+    verdict = 'INDÉTERMINÉE' if degraded else ai_status
+    if verdict not in VERDICTS:
+        verdict = ''
+
+    # Mettre à jour la soumission, sauf si une autre exécution l'a déjà fait
+    with metrics.observe_stage(metrics.DB_WRITE):
+        updated = Submission.objects.filter(id=submission.id, statut='en cours').update(
+            statut=final_status,
+            web_sources=web_sources,
+            detailed_result=explanation,
+            verdict=verdict,
+            verified_at=timezone.now()
+        )
+    if not updated:
+        submission.refresh_from_db(fields=['statut'])
+        return _already_processed(submission.id, submission.statut, task_name)
+    domain_reliability.record_verdict(sources.link_sources(submission, web_sources), verdict)
+    if batch:
+        tracker('submission_saved', submission_id=submission.id, status=final_status)
+    else:
+        tracker('saved', status=final_status)
+    
+    # Si le fait est vérifié comme VRAI, l'ajouter à la bibliothèque des faits vérifiés
+    # (pas les verdicts provisoires du mode dégradé, non vérifiés par le LLM)
+    if ai_status == 'VRAIE' and final_status == 'vérifié' and not degraded:
+        _add_fact_to_library(submission, analysis_result, web_sources)
+    
+    logger.info(f"=== ANALYSE CELERY TERMINÉE - Soumission {submission.id} ===")
+    logger.info(f"Statut final: {final_status}")
+    logger.info(f"Durées par étape (ms): {tracker.stages}")
+    
+    return {
+        'success': True,
+        'submission_id': submission.id,
+        'status': final_status,
+        'explanation': explanation[:100] + '...' if len(explanation) > 100 else explanation,
+        'degraded': degraded,
+        'stages': tracker.stages
+    }
+
+
+@shared_task(**RETRY_TRANSIENT, **CHAIN_TASK, max_retries=5, retry_backoff=5)
+def analyze_submission_text_task(self, submission_id, text):
     """
-    Tâche asynchrone pour analyser le texte d'une soumission
+    Tâche asynchrone pour analyser le texte d'une soumission (file réseau)
+
+    L'analyse est une chaîne de tâches réparties entre les files de workers :
+    traduction ici, classification RoBERTa sur la file CPU
+    (classify_submission_task), puis recherche, décision du LLM et
+    enregistrement sur la file réseau (research_submission_task).
+
+    Chaque étape (translated, classified, searched, analysed, saved) est
+    publiée sur le canal de progression de cette tâche, celle que suit le
+    client, et exposée comme état PROGRESS (étape, durée par étape,
+    résultats partiels). Le résultat final est enregistré sous l'id de
+    cette tâche par la dernière tâche de la chaîne.
+
+    Une tâche livrée deux fois (nouvel essai du client, redélivrance
+    Celery) ne relance pas l'analyse d'une soumission qui n'est plus
+    "en cours", et le résultat n'est enregistré que par la première.
     """
+    progress_id = current_progress_id()
+    tracker = StageTracker(progress_id, submission_id=submission_id)
     try:
         from .models import Submission
         
@@ -21,123 +271,311 @@ def analyze_submission_text_task(submission_id, text):
         # Récupérer la soumission
         submission = Submission.objects.get(id=submission_id)
         logger.info(f"Soumission trouvée: {submission.texte[:50]}...")
+        if submission.statut != 'en cours':
+            return store_final_result(
+                progress_id, _already_processed(submission_id, submission.statut, 'analyze_submission_text_task')
+            )
         
-        # Effectuer l'analyse
-        analysis_result, web_sources = analyze_text(text)
-        logger.info(f"Analyse terminée. Type de résultat: {type(analysis_result)}")
-        
-        # Traiter le résultat
-        if isinstance(analysis_result, dict):
-            ai_status = analysis_result.get('statut', 'INDÉTERMINÉE')
-            explanation = analysis_result.get('explication', 'Pas d\'explication disponible')
-            
-            # Mapping du statut
-            status_mapping = {
-                'VRAIE': 'vérifié',
-                'FAUSSE': 'rejeté', 
-                'INDÉTERMINÉE': 'rejeté'
-            }
-            final_status = status_mapping.get(ai_status, 'rejeté')
-            
-        else:
-            # Format legacy
-            ai_status = 'LEGACY'
-            final_status = analysis_result
-            explanation = f"Résultat d'analyse: {analysis_result}"
-        
-        # Mettre à jour la soumission
-        submission.statut = final_status
-        submission.web_sources = web_sources
-        submission.detailed_result = explanation
-        submission.save()
-        
-        # Si le fait est vérifié comme VRAI, l'ajouter à la bibliothèque des faits vérifiés
-        if ai_status == 'VRAIE' and final_status == 'vérifié':
-            try:
-                from .models import Fact
-                from .services.keywords_extractor import extract_keywords
-                
-                # Déterminer la source principale à utiliser
-                primary_source = ''
-                logger.info(f"Détermination de la source principale - Analysis result type: {type(analysis_result)}")
-                
-                if isinstance(analysis_result, dict):
-                    # Essayer d'utiliser les sources principales de l'analyse AI
-                    sources_principales = analysis_result.get('sources_principales', [])
-                    logger.info(f"Sources principales trouvées: {sources_principales}")
-                    
-                    if sources_principales and isinstance(sources_principales, list):
-                        primary_source = sources_principales[0]
-                        logger.info(f"Source principale sélectionnée depuis analysis_result: {primary_source}")
-                    # Sinon, essayer d'extraire de web_sources
-                    elif web_sources and isinstance(web_sources, list) and len(web_sources) > 0:
-                        primary_source = web_sources[0].get('url', '') if isinstance(web_sources[0], dict) else str(web_sources[0])
-                        logger.info(f"Source principale sélectionnée depuis web_sources: {primary_source}")
-                
-                # Si aucune source de vérification, utiliser la source soumise
-                if not primary_source:
-                    primary_source = submission.source or 'Source de vérification non disponible'
-                    logger.info(f"Aucune source de vérification trouvée, utilisation par défaut: {primary_source}")
-                
-                logger.info(f"Source finale pour la bibliothèque: {primary_source}")
-                
-                # Créer le fait vérifié
-                fact = Fact.objects.create(
-                    texte=submission.texte,
-                    source=primary_source,
-                    web_sources=web_sources
-                )
-                
-                # Extraire et associer les mots-clés
-                keywords = extract_keywords(submission.texte)
-                if keywords:
-                    from .models import Keyword
-                    for keyword_text in keywords:
-                        keyword, created = Keyword.objects.get_or_create(mot=keyword_text.lower())
-                        fact.mots_cles.add(keyword)
-                
-                logger.info(f"Fait vérifié ajouté à la bibliothèque - ID: {fact.id}")
-                
-            except Exception as e:
-                logger.error(f"Erreur lors de l'ajout du fait à la bibliothèque: {e}")
-                # Ne pas faire échouer la tâche pour cette erreur
-        
-        logger.info(f"=== ANALYSE CELERY TERMINÉE - Soumission {submission_id} ===")
-        logger.info(f"Statut final: {final_status}")
-        
+        tracker('started')
+
+        translated_text = translate_text(text)
+        tracker('translated', translated_text=translated_text)
+
+        task_result = classify_submission_task.delay(
+            submission_id, text, translated_text,
+            progress_id=progress_id,
+            progress=tracker.snapshot()
+        )
+        logger.info(f"Classification lancée sur la file CPU - Task ID: {task_result.id}")
+
         return {
             'success': True,
             'submission_id': submission_id,
-            'status': final_status,
-            'explanation': explanation[:100] + '...' if len(explanation) > 100 else explanation
+            'task_id': task_result.id
         }
-        
+
     except Exception as e:
-        logger.error(f"Erreur dans analyze_submission_text_task: {e}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        
-        # Marquer la soumission comme erreur
-        try:
-            submission = Submission.objects.get(id=submission_id)
-            submission.statut = 'rejeté'
-            submission.detailed_result = f'Erreur lors de l\'analyse: {str(e)}'
-            submission.save()
-        except:
-            pass
-            
+        if _will_retry(self, e):
+            raise
+        return store_final_result(
+            progress_id, _submission_failed(submission_id, tracker, e, 'analyze_submission_text_task')
+        )
+
+
+@shared_task(**CHAIN_TASK)
+def classify_submission_task(submission_id, text, translated_text, progress_id=None, progress=None):
+    """
+    Classification RoBERTa d'une soumission (file CPU)
+
+    progress_id: tâche suivie par le client ; progress: étapes déjà
+    franchies (StageTracker.snapshot).
+    """
+    progress_id = progress_id or current_progress_id()
+    tracker = StageTracker(progress_id, resume=progress, submission_id=submission_id)
+    try:
+        initial_result, confidence = classify_text(translated_text)
+        tracker('classified', initial_result=initial_result, confidence=round(confidence, 4))
+
+        task_result = research_submission_task.delay(
+            submission_id, text, translated_text, initial_result,
+            progress_id=progress_id,
+            progress=tracker.snapshot(),
+            confidence=confidence
+        )
+        logger.info(f"Recherche lancée sur la file réseau - Task ID: {task_result.id}")
+
         return {
-            'success': False,
+            'success': True,
             'submission_id': submission_id,
-            'error': str(e)
+            'task_id': task_result.id
+        }
+
+    except Exception as e:
+        return store_final_result(
+            progress_id, _submission_failed(submission_id, tracker, e, 'classify_submission_task')
+        )
+
+
+@shared_task(**RETRY_TRANSIENT, **CHAIN_TASK, max_retries=3, retry_backoff=30)
+def research_submission_task(self, submission_id, text, translated_text, initial_result, progress_id=None, progress=None, confidence=None):
+    """
+    Recherche Perplexity, décision du LLM et enregistrement du résultat
+    d'une soumission (file réseau)
+
+    progress_id: tâche suivie par le client ; progress: étapes déjà
+    franchies (StageTracker.snapshot) ; confidence: confiance du
+    classifieur, pour le mode dégradé.
+    """
+    progress_id = progress_id or current_progress_id()
+    tracker = StageTracker(progress_id, resume=progress, submission_id=submission_id)
+    run_name = None
+    try:
+        from .models import Submission
+
+        submission = Submission.objects.get(id=submission_id)
+        # Une seule exécution par chaîne appelle Perplexity et le LLM
+        run_name = f"research:{submission_id}:{progress_id}"
+        if submission.statut != 'en cours' or not claim_run(run_name):
+            return _already_processed(submission_id, submission.statut, 'research_submission_task')
+
+        # Effectuer la recherche et la décision finale
+        llm_usages = []
+        analysis_result, web_sources = research_claim(
+            text,
+            translated_text,
+            initial_result,
+            on_stage=tracker,
+            on_token=tracker.stream if settings.LLM_STREAM_EXPLANATIONS else None,
+            on_usage=llm_usages.append,
+            confidence=confidence
+        )
+        record_llm_usage(llm_usages, user_id=submission.supabase_user_id, submission=submission)
+        logger.info(f"Analyse terminée. Type de résultat: {type(analysis_result)}")
+        
+        return store_final_result(
+            progress_id, _save_submission_result(submission, analysis_result, web_sources, tracker)
+        )
+
+    except Exception as e:
+        if _will_retry(self, e):
+            release_run(run_name)
+            raise
+        return store_final_result(
+            progress_id, _submission_failed(submission_id, tracker, e, 'research_submission_task')
+        )
+
+
+
+@shared_task(**RETRY_TRANSIENT, **CHAIN_TASK, max_retries=5, retry_backoff=5)
+def analyze_submission_batch_task(self, submission_ids):
+    """
+    Analyse groupée de soumissions importées en masse (file réseau)
+
+    Même chaîne que analyze_submission_text_task pour un groupe d'au plus
+    LLM_BATCH_SIZE soumissions : traduction ici, classification sur la
+    file CPU (classify_submission_batch_task), puis recherche Perplexity
+    de chaque soumission et décision du LLM en un seul appel pour tout le
+    groupe (research_submission_batch_task). Les soumissions qui ne sont
+    plus "en cours" sont ignorées.
+    """
+    progress_id = current_progress_id()
+    tracker = StageTracker(progress_id, submission_ids=submission_ids)
+    try:
+        from .models import Submission
+
+        logger.info(f"=== DÉBUT ANALYSE GROUPÉE CELERY - {len(submission_ids)} soumissions ===")
+        pending = list(
+            Submission.objects.filter(id__in=submission_ids, statut='en cours')
+            .order_by('id').values_list('id', 'texte')
+        )
+        if not pending:
+            return store_final_result(
+                progress_id, _already_processed(submission_ids, 'traité', 'analyze_submission_batch_task')
+            )
+
+        tracker('started')
+        items = [[submission_id, text, translate_text(text)] for submission_id, text in pending]
+        tracker('translated')
+
+        task_result = classify_submission_batch_task.delay(
+            items,
+            progress_id=progress_id,
+            progress=tracker.snapshot()
+        )
+        logger.info(f"Classification groupée lancée sur la file CPU - Task ID: {task_result.id}")
+
+        return {
+            'success': True,
+            'submission_ids': [item[0] for item in items],
+            'task_id': task_result.id
         }
 
+    except Exception as e:
+        if _will_retry(self, e):
+            raise
+        return store_final_result(
+            progress_id, _batch_failed(submission_ids, tracker, e, 'analyze_submission_batch_task')
+        )
+
+
+@shared_task(**CHAIN_TASK)
+def classify_submission_batch_task(items, progress_id=None, progress=None):
+    """
+    Classification RoBERTa d'un groupe de soumissions (file CPU)
+
+    items: [id, texte, texte traduit] par soumission.
+    """
+    progress_id = progress_id or current_progress_id()
+    submission_ids = [item[0] for item in items]
+    tracker = StageTracker(progress_id, resume=progress, submission_ids=submission_ids)
+    try:
+        claims = []
+        for submission_id, text, translated_text in items:
+            initial_result, confidence = classify_text(translated_text)
+            claims.append([submission_id, text, translated_text, initial_result, confidence])
+        tracker('classified')
+
+        task_result = research_submission_batch_task.delay(
+            claims,
+            progress_id=progress_id,
+            progress=tracker.snapshot()
+        )
+        logger.info(f"Recherche groupée lancée sur la file réseau - Task ID: {task_result.id}")
+
+        return {
+            'success': True,
+            'submission_ids': submission_ids,
+            'task_id': task_result.id
+        }
+
+    except Exception as e:
+        return store_final_result(
+            progress_id, _batch_failed(submission_ids, tracker, e, 'classify_submission_batch_task')
+        )
+
+
+@shared_task(**RETRY_TRANSIENT, **CHAIN_TASK, max_retries=3, retry_backoff=30)
+def research_submission_batch_task(self, claims, progress_id=None, progress=None):
+    """
+    Recherche Perplexity, décision groupée du LLM et enregistrement des
+    résultats d'un groupe de soumissions (file réseau)
+
+    claims: [id, texte, texte traduit, résultat initial, confiance] par
+    soumission. Les verdicts que l'appel groupé ne fournit pas sont
+    redemandés un par un (voir llm_analysis_batch).
+    """
+    progress_id = progress_id or current_progress_id()
+    submission_ids = [claim[0] for claim in claims]
+    tracker = StageTracker(progress_id, resume=progress, submission_ids=submission_ids)
+    run_name = None
+    try:
+        from .models import Submission
+
+        submissions = Submission.objects.in_bulk(submission_ids)
+        pending = [
+            claim for claim in claims
+            if claim[0] in submissions and submissions[claim[0]].statut == 'en cours'
+        ]
+        # Une seule exécution par chaîne appelle Perplexity et le LLM
+        run_name = f"research-batch:{progress_id}"
+        if not pending or not claim_run(run_name):
+            return _already_processed(submission_ids, 'traité', 'research_submission_batch_task')
+
+        llm_usages = []
+        results = research_claims_batch(
+            [
+                {
+                    'text': text,
+                    'translated_text': translated_text,
+                    'initial_result': initial_result,
+                    'confidence': confidence
+                }
+                for _, text, translated_text, initial_result, confidence in pending
+            ],
+            on_usage=llm_usages.append
+        )
+        # Un appel groupé n'appartient à aucune soumission : rattaché à l'utilisateur
+        record_llm_usage(llm_usages, user_id=submissions[pending[0][0]].supabase_user_id)
+        tracker('analysed')
+
+        statuses = {}
+        for claim, (analysis_result, web_sources) in zip(pending, results):
+            result = _save_submission_result(
+                submissions[claim[0]], analysis_result, web_sources, tracker, 'research_submission_batch_task',
+                batch=True
+            )
+            statuses[claim[0]] = result.get('status')
+        tracker('saved', statuses=statuses)
+
+        logger.info(f"=== ANALYSE GROUPÉE CELERY TERMINÉE - {len(pending)} soumissions ===")
+        return store_final_result(progress_id, {
+            'success': True,
+            'submission_ids': submission_ids,
+            'statuses': statuses,
+            'stages': tracker.stages
+        })
+
+    except Exception as e:
+        if _will_retry(self, e):
+            release_run(run_name)
+            raise
+        return store_final_result(
+            progress_id, _batch_failed(submission_ids, tracker, e, 'research_submission_batch_task')
+        )
+
 
 @shared_task
-def verify_image_content_task(verification_id, image_url, claim_text=""):
+def extract_fact_keywords_task(fact_id):
+    """
+    Extraction des mots-clés d'un fait vérifié avec spaCy (file CPU)
+    """
+    try:
+        from .models import Fact, Keyword
+        from .services.keywords_extractor import extract_keywords
+
+        fact = Fact.objects.get(id=fact_id)
+        keywords = extract_keywords(fact.texte)
+        for keyword_text in keywords:
+            keyword, created = Keyword.objects.get_or_create(mot=keyword_text.lower())
+            fact.mots_cles.add(keyword)
+
+        logger.info(f"Mots-clés du fait {fact_id}: {keywords}")
+        return {'success': True, 'fact_id': fact_id, 'keywords': keywords}
+
+    except Exception as e:
+        logger.error(f"Erreur lors de l'extraction des mots-clés du fait {fact_id}: {e}")
+        return {'success': False, 'fact_id': fact_id, 'error': str(e)}
+
+
+@shared_task(**RETRY_TRANSIENT, max_retries=3, retry_backoff=30)
+def verify_image_content_task(self, verification_id, image_url, claim_text="", progress_id=None):
     """
     Tâche asynchrone pour vérifier le contenu d'une image
+    
+    progress_id: tâche suivie par le client (la tâche d'upload), à défaut
+    cette tâche elle-même.
     """
+    progress_id = progress_id or current_progress_id()
     try:
         from .models import ImageVerification
         
@@ -147,15 +585,26 @@ def verify_image_content_task(verification_id, image_url, claim_text=""):
         image_verification = ImageVerification.objects.get(id=verification_id)
         logger.info(f"Vérification trouvée: {image_verification.original_filename}")
         
+        if image_verification.status != 'EN_COURS' or not claim_run(f"image:{verification_id}"):
+            return _already_processed(verification_id, image_verification.status, 'verify_image_content')
+
         # Effectuer la vérification
-        verification_result = verify_image_content(image_url, claim_text)
+        llm_usages = []
+        verification_result = verify_image_content(image_url, claim_text, on_usage=llm_usages.append)
+        record_llm_usage(
+            llm_usages,
+            user_id=image_verification.supabase_user_id,
+            image_verification=image_verification
+        )
         
         if verification_result['statut'] == 'ERREUR':
             # Marquer comme erreur
-            image_verification.status = 'ERREUR'
-            image_verification.explanation = verification_result['explication']
-            image_verification.confidence = 0
-            image_verification.save()
+            ImageVerification.objects.filter(id=verification_id, status='EN_COURS').update(
+                status='ERREUR',
+                explanation=verification_result['explication'],
+                confidence=0
+            )
+            publish_progress(progress_id, 'error', verification_id=verification_id, error=verification_result['explication'])
             
             return {
                 'success': False,
@@ -163,13 +612,26 @@ def verify_image_content_task(verification_id, image_url, claim_text=""):
                 'error': verification_result['explication']
             }
         
-        # Mettre à jour la vérification
-        image_verification.status = verification_result['statut']
-        image_verification.explanation = verification_result['explication']
-        image_verification.confidence = verification_result['confidence']
-        image_verification.details = verification_result['details']
-        image_verification.model_used = verification_result.get('details', {}).get('model', 'openai/gpt-4.1-mini')
-        image_verification.save()
+        publish_progress(progress_id, 'analysed', verification_id=verification_id, status=verification_result['statut'])
+        
+        # Mettre à jour la vérification, sauf si une autre exécution l'a déjà fait
+        with metrics.observe_stage(metrics.DB_WRITE):
+            updated = ImageVerification.objects.filter(id=verification_id, status='EN_COURS').update(
+                status=verification_result['statut'],
+                explanation=verification_result['explication'],
+                confidence=verification_result['confidence'],
+                details=verification_result['details'],
+                model_used=verification_result.get('details', {}).get('model', 'openai/gpt-4.1-mini')
+            )
+        if not updated:
+            image_verification.refresh_from_db(fields=['status'])
+            return _already_processed(verification_id, image_verification.status, 'verify_image_content')
+        publish_progress(
+            progress_id, 'saved',
+            verification_id=verification_id,
+            status=verification_result['statut'],
+            confidence=verification_result['confidence']
+        )
 
         logger.info(f"=== VÉRIFICATION IMAGE CELERY TERMINÉE - ID {verification_id} ===")
         logger.info(f"Statut: {verification_result['statut']}, Confiance: {verification_result['confidence']}%")
@@ -185,19 +647,23 @@ def verify_image_content_task(verification_id, image_url, claim_text=""):
         }
         
     except Exception as e:
+        if _will_retry(self, e):
+            release_run(f"image:{verification_id}")
+            raise
         logger.error(f"Erreur dans verify_image_content_task: {e}")
         import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
         
         # Marquer comme erreur
         try:
-            image_verification = ImageVerification.objects.get(id=verification_id)
-            image_verification.status = 'ERREUR'
-            image_verification.explanation = f'Erreur lors de la vérification: {str(e)}'
-            image_verification.confidence = 0
-            image_verification.save()
+            ImageVerification.objects.filter(id=verification_id, status='EN_COURS').update(
+                status='ERREUR',
+                explanation=f'Erreur lors de la vérification: {str(e)}',
+                confidence=0
+            )
         except:
             pass
+        publish_progress(progress_id, 'error', verification_id=verification_id, error=str(e))
             
         return {
             'success': False,
@@ -206,11 +672,15 @@ def verify_image_content_task(verification_id, image_url, claim_text=""):
         }
 
 
-@shared_task
-def detect_ai_image_task(verification_id, image_url):
+@shared_task(**RETRY_TRANSIENT, max_retries=3, retry_backoff=30)
+def detect_ai_image_task(self, verification_id, image_url, progress_id=None):
     """
     Tâche asynchrone pour détecter si une image est générée par IA
+    
+    progress_id: tâche suivie par le client (la tâche d'upload), à défaut
+    cette tâche elle-même.
     """
+    progress_id = progress_id or current_progress_id()
     try:
         from .models import ImageVerification
         
@@ -220,15 +690,26 @@ def detect_ai_image_task(verification_id, image_url):
         image_verification = ImageVerification.objects.get(id=verification_id)
         logger.info(f"Détection IA trouvée: {image_verification.original_filename}")
         
+        if image_verification.status != 'EN_COURS' or not claim_run(f"image:{verification_id}"):
+            return _already_processed(verification_id, image_verification.status, 'detect_ai_generated_image')
+
         # Effectuer la détection
-        detection_result = detect_ai_generated_image(image_url)
+        llm_usages = []
+        detection_result = detect_ai_generated_image(image_url, on_usage=llm_usages.append)
+        record_llm_usage(
+            llm_usages,
+            user_id=image_verification.supabase_user_id,
+            image_verification=image_verification
+        )
         
         if detection_result['statut'] == 'ERREUR':
             # Marquer comme erreur
-            image_verification.status = 'ERREUR'
-            image_verification.explanation = detection_result['explication']
-            image_verification.confidence = 0
-            image_verification.save()
+            ImageVerification.objects.filter(id=verification_id, status='EN_COURS').update(
+                status='ERREUR',
+                explanation=detection_result['explication'],
+                confidence=0
+            )
+            publish_progress(progress_id, 'error', verification_id=verification_id, error=detection_result['explication'])
             
             return {
                 'success': False,
@@ -236,13 +717,26 @@ def detect_ai_image_task(verification_id, image_url):
                 'error': detection_result['explication']
             }
         
-        # Mettre à jour la vérification
-        image_verification.status = detection_result['statut']
-        image_verification.explanation = detection_result['explication']
-        image_verification.confidence = detection_result['confidence']
-        image_verification.details = detection_result['details']
-        image_verification.model_used = detection_result.get('details', {}).get('model', 'openai/gpt-4.1-mini')
-        image_verification.save()
+        publish_progress(progress_id, 'analysed', verification_id=verification_id, status=detection_result['statut'])
+        
+        # Mettre à jour la vérification, sauf si une autre exécution l'a déjà fait
+        with metrics.observe_stage(metrics.DB_WRITE):
+            updated = ImageVerification.objects.filter(id=verification_id, status='EN_COURS').update(
+                status=detection_result['statut'],
+                explanation=detection_result['explication'],
+                confidence=detection_result['confidence'],
+                details=detection_result['details'],
+                model_used=detection_result.get('details', {}).get('model', 'openai/gpt-4.1-mini')
+            )
+        if not updated:
+            image_verification.refresh_from_db(fields=['status'])
+            return _already_processed(verification_id, image_verification.status, 'detect_ai_generated_image')
+        publish_progress(
+            progress_id, 'saved',
+            verification_id=verification_id,
+            status=detection_result['statut'],
+            confidence=detection_result['confidence']
+        )
 
         logger.info(f"=== DÉTECTION IA CELERY TERMINÉE - ID {verification_id} ===")
         logger.info(f"Statut: {detection_result['statut']}, Confiance: {detection_result['confidence']}%")
@@ -258,19 +752,23 @@ def detect_ai_image_task(verification_id, image_url):
         }
 
     except Exception as e:
+        if _will_retry(self, e):
+            release_run(f"image:{verification_id}")
+            raise
         logger.error(f"Erreur dans detect_ai_image_task: {e}")
         import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
         
         # Marquer comme erreur
         try:
-            image_verification = ImageVerification.objects.get(id=verification_id)
-            image_verification.status = 'ERREUR'
-            image_verification.explanation = f'Erreur lors de la détection: {str(e)}'
-            image_verification.confidence = 0
-            image_verification.save()
+            ImageVerification.objects.filter(id=verification_id, status='EN_COURS').update(
+                status='ERREUR',
+                explanation=f'Erreur lors de la détection: {str(e)}',
+                confidence=0
+            )
         except:
             pass
+        publish_progress(progress_id, 'error', verification_id=verification_id, error=str(e))
             
         return {
             'success': False,
@@ -279,61 +777,184 @@ def detect_ai_image_task(verification_id, image_url):
         }
 
 
+def _fresh_blob_urls(blob):
+    """
+    URLs signées à nouveau d'un blob déjà stocké (celles du premier upload
+    expirent au bout d'un an), ou None si l'objet n'est plus disponible.
+    """
+    url = get_image_url_from_supabase(blob.path)
+    if not url:
+        return None
+    urls = {'url': url, 'thumbnail_url': '', 'preview_url': ''}
+    for name in ('thumbnail', 'preview'):
+        if getattr(blob, f'{name}_url'):
+            urls[f'{name}_url'] = get_image_url_from_supabase(derivative_path(blob.sha256, name)) or ''
+    return urls
+
+
 @shared_task
-def upload_and_verify_image_task(user_id, user_email, user_name, image_data, image_name, claim_text, verification_type):
+def upload_and_verify_image_task(user_id, user_email, user_name, image_data, image_name, claim_text, verification_type, batch_id=None, staged=None):
     """
     Tâche asynchrone complète pour uploader et vérifier une image
+
+    Pour une image d'un lot (batch_id), la vérification s'exécute dans la même
+    tâche afin que la concurrence du lot reste bornée par le nombre de chunks.
+    Les images d'un lot sont déjà dans le stockage (envoyées par la vue) :
+    staged donne leur sha256, leur taille et leur chemin, et image_data est
+    None, pour que les messages du broker ne transportent pas les fichiers.
+    La vue a aussi pris la référence au blob : la tâche la rend si la
+    vérification échoue.
     """
+    progress_id = current_progress_id()
+    content_hash = None
+    image_verification = None
     try:
-        from .models import ImageVerification
+        from .models import ImageBlob, ImageVerification
         from django.core.files.base import ContentFile
         
         logger.info(f"=== DÉBUT UPLOAD ET VÉRIFICATION CELERY ===")
         logger.info(f"Utilisateur: {user_email}, Type: {verification_type}")
         
-        # Créer un objet fichier depuis les données
-        image_file = ContentFile(image_data, name=image_name)
-        
-        # Vérifier/créer le bucket
-        bucket_result = create_bucket_if_not_exists()
-        if not bucket_result["success"]:
-            logger.error(f"Erreur création bucket: {bucket_result.get('error')}")
+        if staged:
+            image_hash, image_size = staged['sha256'], staged['size']
+        else:
+            image_hash, image_size = hashlib.sha256(image_data).hexdigest(), len(image_data)
+
+        # Stockage adressé par contenu : la référence au blob est prise avant
+        # l'upload, sous son verrou, pour qu'une suppression concurrente de
+        # la dernière référence ne puisse pas effacer l'objet réutilisé.
+        # Pour une image d'un lot, la vue l'a déjà prise pour cette tâche
+        with metrics.observe_stage(metrics.DB_WRITE):
+            if staged:
+                content_hash = image_hash
+                blob, created = ImageBlob.objects.get(pk=image_hash), False
+            else:
+                blob, created = ImageBlob.acquire(image_hash, size=image_size)
+        content_hash = blob.sha256
+
+        # Objet déjà stocké avec ses URLs (sinon upload en cours ailleurs,
+        # envoyé par la vue sans dérivés, ou objet perdu)
+        stored_urls = _fresh_blob_urls(blob) if not created and blob.path and blob.url else None
+        metrics.record_cache("image_blob", stored_urls is not None)
         
-        # Upload vers Supabase
-        upload_result = upload_image_to_supabase(image_file, user_id, verification_type)
+        if stored_urls:
+            logger.info(f"Image déjà stockée ({content_hash[:12]}), upload ignoré")
+            upload_result = {
+                "success": True,
+                "file_path": blob.path,
+                "public_url": stored_urls['url'],
+                "thumbnail_url": stored_urls['thumbnail_url'],
+                "preview_url": stored_urls['preview_url'],
+                "content_hash": content_hash
+            }
+        elif staged:
+            # Image déjà envoyée par la vue : relue seulement pour les dérivés
+            image_data = download_image_from_supabase(staged['path'])
+            public_url = get_image_url_from_supabase(staged['path']) if image_data is not None else None
+            if not public_url:
+                upload_result = {"success": False, "error": "Image introuvable dans le stockage"}
+            else:
+                upload_result = {
+                    "success": True,
+                    "file_path": staged['path'],
+                    "public_url": public_url,
+                    "content_hash": content_hash
+                }
+                derivative_urls = upload_image_derivatives(content_hash, image_data)
+                upload_result['thumbnail_url'] = derivative_urls.get('thumbnail', '')
+                upload_result['preview_url'] = derivative_urls.get('preview', '')
+        else:
+            # Vérifier/créer le bucket (une seule fois par processus)
+            bucket_result = ensure_bucket_exists()
+            if not bucket_result["success"]:
+                logger.error(f"Erreur création bucket: {bucket_result.get('error')}")
+            
+            # Upload vers Supabase
+            image_file = ContentFile(image_data, name=image_name)
+            upload_result = upload_image_to_supabase(image_file, user_id, verification_type)
+            
+            # Miniature et aperçu WebP pour l'historique (non bloquant)
+            if upload_result["success"]:
+                derivative_urls = upload_image_derivatives(content_hash, image_data)
+                upload_result['thumbnail_url'] = derivative_urls.get('thumbnail', '')
+                upload_result['preview_url'] = derivative_urls.get('preview', '')
         
         if not upload_result["success"]:
+            ImageBlob.release(content_hash)
+            content_hash = None
+            if batch_id:
+                from django.db.models import F
+                from .models import ImageVerificationBatch
+                ImageVerificationBatch.objects.filter(id=batch_id).update(failed_uploads=F('failed_uploads') + 1)
+            publish_progress(progress_id, 'error', error=upload_result.get("error"))
             return {
                 'success': False,
                 'error': f'Erreur lors de l\'upload: {upload_result.get("error")}'
             }
         
-        # Créer l'enregistrement de vérification
-        image_verification = ImageVerification.objects.create(
-            supabase_user_id=user_id,
-            user_email=user_email,
-            user_name=user_name,
-            image_path=upload_result['file_path'],
+        with metrics.observe_stage(metrics.DB_WRITE):
+            # Emplacement et URLs à jour du blob
+            ImageBlob.objects.filter(pk=content_hash).update(
+                path=upload_result['file_path'],
+                url=upload_result['public_url'],
+                thumbnail_url=upload_result['thumbnail_url'],
+                preview_url=upload_result['preview_url']
+            )
+        
+            # Créer l'enregistrement de vérification
+            image_verification = ImageVerification.objects.create(
+                supabase_user_id=user_id,
+                user_email=user_email,
+                user_name=user_name,
+                image_path=upload_result['file_path'],
+                image_url=upload_result['public_url'],
+                original_filename=image_name,
+                claim_text=claim_text,
+                verification_type=verification_type,
+                status='EN_COURS',  # Statut temporaire
+                explanation='Analyse en cours...',
+                confidence=0,
+                blob=blob,
+                batch_id=batch_id
+            )
+        publish_progress(
+            progress_id, 'uploaded',
+            verification_id=image_verification.id,
             image_url=upload_result['public_url'],
-            original_filename=image_name,
-            claim_text=claim_text,
-            verification_type=verification_type,
-            status='EN_COURS',  # Statut temporaire
-            explanation='Analyse en cours...',
-            confidence=0
+            thumbnail_url=upload_result['thumbnail_url'] or None
         )
         
+        # Image d'un lot : vérifier dans cette tâche
+        if batch_id:
+            if verification_type == 'content':
+                verification_result = verify_image_content_task(
+                    image_verification.id,
+                    upload_result['public_url'],
+                    claim_text,
+                    progress_id=progress_id
+                )
+            else:  # ai_detection
+                verification_result = detect_ai_image_task(
+                    image_verification.id,
+                    upload_result['public_url'],
+                    progress_id=progress_id
+                )
+            logger.info(f"=== IMAGE DU LOT {batch_id} VÉRIFIÉE - ID {image_verification.id} ===")
+            return verification_result
+
         # Lancer la tâche de vérification appropriée
         if verification_type == 'content':
             task_result = verify_image_content_task.delay(
                 image_verification.id, 
                 upload_result['public_url'], 
-                claim_text
+                claim_text,
+                progress_id=progress_id
             )
         else:  # ai_detection
             task_result = detect_ai_image_task.delay(
                 image_verification.id, 
-                upload_result['public_url']
+                upload_result['public_url'],
+                progress_id=progress_id
             )
         
         logger.info(f"=== UPLOAD ET VÉRIFICATION CELERY LANCÉE ===")
@@ -350,8 +971,252 @@ def upload_and_verify_image_task(user_id, user_email, user_name, image_data, ima
         logger.error(f"Erreur dans upload_and_verify_image_task: {e}")
         import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
+
+        # Référence prise sans vérification pour la porter
+        if content_hash and image_verification is None:
+            try:
+                from .models import ImageBlob
+                ImageBlob.release(content_hash)
+            except Exception:
+                pass
+        if batch_id:
+            try:
+                from django.db.models import F
+                from .models import ImageVerificationBatch
+                ImageVerificationBatch.objects.filter(id=batch_id).update(failed_uploads=F('failed_uploads') + 1)
+            except Exception:
+                pass
+        publish_progress(progress_id, 'error', error=str(e))
         
         return {
             'success': False,
             'error': str(e)
         }
+
+
+@shared_task
+def reverify_stale_verdicts_task(limit=None, concurrency=None, budget_usd=None):
+    """
+    Tâche périodique (Celery beat) : re-vérification des soumissions
+    indéterminées et des faits anciens (voir services/reverification.py)
+
+    Sélectionne au plus limit affirmations (REVERIFY_MAX_CLAIMS) et les
+    répartit en concurrency lots (REVERIFY_CONCURRENCY) traités en parallèle,
+    chacun avec une part égale du budget (REVERIFY_BUDGET_USD).
+    """
+    limit = settings.REVERIFY_MAX_CLAIMS if limit is None else limit
+    budget_usd = settings.REVERIFY_BUDGET_USD if budget_usd is None else budget_usd
+    candidates = reverification.select_candidates(limit) if limit > 0 else []
+    if not candidates:
+        logger.info("Re-vérification : aucune affirmation à re-vérifier")
+        return {'success': True, 'selected': 0, 'chunks': 0}
+
+    chunks = reverification.split(candidates, concurrency or settings.REVERIFY_CONCURRENCY)
+    group(reverify_claims_task.s(chunk, budget_usd / len(chunks)) for chunk in chunks).apply_async()
+
+    logger.info(f"=== RE-VÉRIFICATION LANCÉE - {len(candidates)} affirmations, {len(chunks)} lots ===")
+    return {'success': True, 'selected': len(candidates), 'chunks': len(chunks)}
+
+
+def _next_reverification_stage(current, next_task, *args):
+    """
+    Étape suivante d'un lot de re-vérification : sur sa file, ou dans ce
+    processus quand l'étape courante est appelée directement (commande
+    reverify_verdicts --sync), qui reçoit alors le bilan du lot.
+    """
+    if current.request.called_directly:
+        return next_task(*args)
+    task_result = next_task.delay(*args)
+    return {'success': True, 'task_id': task_result.id}
+
+
+@shared_task
+def reverify_claims_task(items, budget_usd):
+    """
+    Re-vérification d'un lot d'affirmations (file réseau)
+
+    Même chaîne que l'analyse d'une soumission : traduction ici,
+    classification RoBERTa sur la file CPU (classify_reverification_task),
+    puis recherche, décision du LLM et enregistrement sur la file réseau
+    (research_reverification_task).
+
+    items: paires [type, id] de reverification.select_candidates ;
+    budget_usd: coût maximal du lot (LLM et recherches Perplexity).
+    """
+    from .models import Fact, Submission
+
+    summary = {'success': True, 'checked': 0, 'changed': 0, 'errors': 0, 'cost_usd': 0.0, 'stopped': None}
+    claims = []
+    for kind, record_id in items:
+        model = Submission if kind == reverification.SUBMISSION else Fact
+        text = model.objects.filter(id=record_id).values_list('texte', flat=True).first()
+        if text is None:
+            continue
+        try:
+            claims.append([kind, record_id, text, translate_text(text)])
+        except TransientError as e:
+            logger.warning(f"Re-vérification interrompue : {e}")
+            summary['stopped'] = 'provider_unavailable'
+            break
+
+    return _next_reverification_stage(
+        reverify_claims_task, classify_reverification_task, claims, budget_usd, summary
+    )
+
+
+@shared_task
+def classify_reverification_task(claims, budget_usd, summary):
+    """
+    Classification RoBERTa d'un lot de re-vérification (file CPU)
+
+    claims: [type, id, texte, texte traduit] par affirmation.
+    """
+    claims = [claim + list(classify_text(claim[3])) for claim in claims]
+    return _next_reverification_stage(
+        classify_reverification_task, research_reverification_task, claims, budget_usd, summary
+    )
+
+
+def _reverification_claim_cost(summary):
+    """
+    Coût estimé de la re-vérification d'une affirmation : une recherche
+    Perplexity et le coût LLM moyen des affirmations déjà vérifiées du lot
+    (REVERIFY_LLM_COST_USD avant la première).
+    """
+    search_cost = settings.REVERIFY_SEARCH_COST_USD
+    if not summary['checked']:
+        return search_cost + settings.REVERIFY_LLM_COST_USD
+    llm_cost = (summary['cost_usd'] - summary['checked'] * search_cost) / summary['checked']
+    return search_cost + max(llm_cost, 0.0)
+
+
+@shared_task
+def research_reverification_task(claims, budget_usd, summary):
+    """
+    Recherche Perplexity, décision du LLM et enregistrement d'un lot de
+    re-vérification (file réseau)
+
+    claims: [type, id, texte, texte traduit, résultat initial, confiance]
+    par affirmation. Le lot s'arrête avant l'affirmation qui dépasserait son
+    budget (voir _reverification_claim_cost) ou dès qu'un fournisseur est
+    indisponible ; les affirmations restantes seront reprises par la
+    prochaine exécution.
+    """
+    from .models import Fact, Submission
+
+    for kind, record_id, text, translated_text, initial_result, confidence in claims:
+        if summary['cost_usd'] + _reverification_claim_cost(summary) >= budget_usd:
+            summary['stopped'] = 'budget'
+            break
+        if not reverification.providers_available():
+            summary['stopped'] = 'provider_unavailable'
+            break
+
+        model = Submission if kind == reverification.SUBMISSION else Fact
+        record = model.objects.filter(id=record_id).first()
+        if record is None:
+            continue
+        try:
+            result = reverification.reverify_claim(text, translated_text, initial_result, confidence)
+        except TransientError as e:
+            logger.warning(f"Re-vérification interrompue : {e}")
+            summary['stopped'] = 'provider_unavailable'
+            break
+        except Exception as e:
+            logger.error(f"Erreur lors de la re-vérification ({kind} {record_id}): {e}")
+            metrics.record_reverification(kind, 'error')
+            summary['errors'] += 1
+            continue
+
+        summary['cost_usd'] += result['cost_usd']
+        if kind == reverification.SUBMISSION:
+            record_llm_usage(result['usages'], user_id=record.supabase_user_id, submission=record)
+            outcome = _apply_submission_reverification(record, result)
+        else:
+            record_llm_usage(result['usages'])
+            outcome = _apply_fact_reverification(record, result)
+        metrics.record_reverification(kind, outcome)
+        summary['checked'] += 1
+        if outcome == 'changed':
+            summary['changed'] += 1
+
+    logger.info(f"Re-vérification d'un lot terminée : {summary}")
+    return summary
+
+
+def _apply_submission_reverification(submission, result):
+    """
+    Enregistrer le nouveau verdict d'une soumission indéterminée.
+
+    Returns:
+        str: changed, unchanged ou skipped (modifiée entre-temps)
+    """
+    from .models import Submission, VerdictChange
+
+    verdict = result['verdict']
+    rows = Submission.objects.filter(id=submission.id, verdict=submission.verdict)
+    if verdict not in VERDICTS or verdict == submission.verdict:
+        rows.update(verified_at=timezone.now())
+        return 'unchanged'
+
+    explanation = result['analysis'].get('explication', '')
+    updated = rows.update(
+        statut=STATUS_BY_VERDICT[verdict],
+        verdict=verdict,
+        detailed_result=explanation,
+        web_sources=result['web_sources'],
+        verified_at=timezone.now()
+    )
+    if not updated:
+        return 'skipped'
+    previous_domains = set(submission.sources.values_list('domain', flat=True))
+    domain_reliability.record_verdict(
+        sources.link_sources(submission, result['web_sources']), verdict, previous_domains, submission.verdict
+    )
+    VerdictChange.objects.create(
+        submission=submission,
+        previous_verdict=submission.verdict,
+        new_verdict=verdict,
+        explanation=explanation,
+        web_sources=result['web_sources']
+    )
+    logger.info(f"Soumission {submission.id} : {submission.verdict} -> {verdict}")
+
+    if verdict == 'VRAIE':
+        _add_fact_to_library(submission, result['analysis'], result['web_sources'])
+    return 'changed'
+
+
+def _apply_fact_reverification(fact, result):
+    """
+    Enregistrer la re-vérification d'un fait de la bibliothèque : seul un
+    verdict FAUSSE le retire, un résultat indéterminé le laisse en place.
+
+    Returns:
+        str: changed, unchanged ou skipped (modifié entre-temps)
+    """
+    from .models import Fact, VerdictChange
+
+    verdict = result['verdict']
+    rows = Fact.objects.filter(id=fact.id, verdict=fact.verdict)
+    if verdict == fact.verdict:
+        if rows.update(web_sources=result['web_sources'], verified_at=timezone.now()):
+            sources.link_sources(fact, result['web_sources'])
+        return 'unchanged'
+    if verdict not in ('VRAIE', 'FAUSSE'):
+        rows.update(verified_at=timezone.now())
+        return 'unchanged'
+
+    explanation = result['analysis'].get('explication', '')
+    if not rows.update(verdict=verdict, web_sources=result['web_sources'], verified_at=timezone.now()):
+        return 'skipped'
+    sources.link_sources(fact, result['web_sources'])
+    VerdictChange.objects.create(
+        fact=fact,
+        previous_verdict=fact.verdict,
+        new_verdict=verdict,
+        explanation=explanation,
+        web_sources=result['web_sources']
+    )
+    logger.info(f"Fait {fact.id} : {fact.verdict} -> {verdict}")
+    return 'changed'
@@ -2,7 +2,7 @@ import uuid
 from unittest.mock import Mock, patch
 
 from django.test import TestCase
-from core.models import Fact, Keyword, Submission, ImageVerification, VerifiedMedia
+from core.models import Fact, ImageBlob, Keyword, Submission, ImageVerification, VerifiedMedia
 
 
 class FactModelTest(TestCase):
@@ -212,6 +212,50 @@ class ImageVerificationModelTest(TestCase):
         self.assertFalse(ImageVerification.objects.filter(pk=verification.pk).exists())
 
 
+class ImageBlobModelTest(TestCase):
+    def _verification(self, blob):
+        return ImageVerification.objects.create(
+            supabase_user_id=uuid.uuid4(),
+            user_email="test@example.com",
+            image_path=blob.path,
+            image_url=blob.url,
+            original_filename="shared.jpg",
+            verification_type="content",
+            status="EN_COURS",
+            explanation="Test",
+            blob=blob,
+        )
+
+    def test_acquire_counts_references(self):
+        first, created = ImageBlob.acquire("a" * 64, size=10)
+        self.assertTrue(created)
+        ImageBlob.objects.filter(pk=first.pk).update(path="sha256/aa/a.jpg")
+        second, created = ImageBlob.acquire("a" * 64, size=10)
+
+        self.assertFalse(created)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(second.ref_count, 2)
+        self.assertEqual(second.path, "sha256/aa/a.jpg")
+
+    @patch("core.services.supabase_storage.delete_image_from_supabase")
+    def test_delete_removes_shared_image_only_with_last_reference(self, delete_image_from_supabase):
+        delete_image_from_supabase.return_value = {"success": True}
+        blob, _ = ImageBlob.acquire("b" * 64)
+        ImageBlob.objects.filter(pk=blob.pk).update(path="sha256/bb/b.jpg", url="https://storage.example.com/b.jpg")
+        first = self._verification(ImageBlob.objects.get(pk=blob.pk))
+        second = self._verification(ImageBlob.acquire(blob.sha256)[0])
+
+        first.delete()
+
+        delete_image_from_supabase.assert_not_called()
+        self.assertEqual(ImageBlob.objects.get(pk=blob.pk).ref_count, 1)
+
+        second.delete()
+
+        delete_image_from_supabase.assert_called_once_with("sha256/bb/b.jpg")
+        self.assertFalse(ImageBlob.objects.filter(pk=blob.pk).exists())
+
+
 class VerifiedMediaModelTest(TestCase):
     def test_str_representation(self):
         fact = Fact.objects.create(texte="Test fact for media", source="https://example.com")
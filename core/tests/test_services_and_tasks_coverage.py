@@ -1,16 +1,47 @@
+import importlib
 import io
 import json
 import uuid
 from types import SimpleNamespace
+from datetime import timedelta
 from unittest.mock import Mock
 
 import pytest
+from celery.exceptions import Retry
 from django.core.files.base import ContentFile
-
-from core.models import Fact, ImageVerification, Keyword, Submission
-from core.services import image_verification, llm, perplexity_search, supabase_storage
+from django.utils import timezone
+
+from core import metrics, tracing
+from core.models import DomainReliability, Fact, ImageBlob, ImageVerification, Keyword, LLMUsage, Source, Submission, VerdictChange
+from core.services import (
+    ai_analysis,
+    circuit_breaker,
+    claim_import,
+    domain_reliability,
+    errors,
+    fair_queue,
+    idempotency,
+    image_derivatives,
+    image_verification,
+    llm,
+    llm_usage,
+    metadata_analyzer,
+    perplexity_search,
+    progress,
+    prompt_builder,
+    rate_limit,
+    reverification,
+    search_cache,
+    sources,
+    supabase_storage,
+)
 from core.tasks import (
+    analyze_submission_batch_task,
     analyze_submission_text_task,
+    classify_submission_task,
+    research_submission_task,
+    reverify_claims_task,
+    reverify_stale_verdicts_task,
     detect_ai_image_task,
     upload_and_verify_image_task,
     verify_image_content_task,
@@ -84,8 +115,167 @@ class FakeSupabaseClient:
         self.storage = FakeStorage(bucket or FakeStorageBucket(), buckets=buckets)
 
 
-def test_llm_analysis_parses_json_and_supplies_missing_fields(monkeypatch):
-    response = "```json\n{\"statut\":\"VRAIE\"}\n```"
+class FakeRedis:
+    def __init__(self):
+        self.lists = {}
+        self.values = {}
+        self.ttls = {}
+        self.published = []
+
+    def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value)
+        return len(self.lists[key])
+
+    def expire(self, key, seconds):
+        return True
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        self.ttls[key] = ex
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+
+class FakeFairQueueRedis:
+    """Runs the fair queue scripts on Python lists."""
+
+    def __init__(self):
+        self.lists = {}
+        self.inflight = {}
+
+    def eval(self, script, numkeys, *keys_and_args):
+        keys, args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        if script == fair_queue._ENQUEUE:
+            queue = self.lists.setdefault(keys[1], [])
+            queue.append(args[1])
+            if len(queue) == 1:
+                self.lists.setdefault(keys[0], []).append(args[0])
+            return len(queue)
+        if script == fair_queue._REQUEUE:
+            queue = self.lists.setdefault(keys[1], [])
+            queue.insert(0, args[1])
+            if len(queue) == 1:
+                self.lists.setdefault(keys[0], []).insert(0, args[0])
+            return len(queue)
+        now, max_in_flight, stale_before, prefix = args
+        self.inflight = {task_id: at for task_id, at in self.inflight.items() if at > stale_before}
+        if len(self.inflight) >= max_in_flight:
+            return None
+        users = self.lists.setdefault(keys[0], [])
+        while users:
+            user = users.pop(0)
+            queue = self.lists.get(prefix + user, [])
+            if queue:
+                item = queue.pop(0)
+                if queue:
+                    users.append(user)
+                self.inflight[json.loads(item)["task_id"]] = now
+                return item
+        return None
+
+    def zrem(self, key, member):
+        return int(self.inflight.pop(member, None) is not None)
+
+
+class FakeBreakerRedis:
+    """Runs the circuit breaker scripts on Python dicts."""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def hmget(self, key, *fields):
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    def eval(self, script, numkeys, *keys_and_args):
+        keys, args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        breaker = self.hashes.setdefault(keys[0], {})
+        state = breaker.get("state", "closed")
+        if script == circuit_breaker._ALLOW:
+            now, open_seconds, probe_seconds = args
+            if state == "closed":
+                return [1, state]
+            if state == "open":
+                if now - breaker["opened_at"] < open_seconds:
+                    return [0, state]
+                breaker.update(state="half_open", probe_until=now + probe_seconds)
+                return [1, "half_open"]
+            if now < breaker["probe_until"]:
+                return [0, state]
+            breaker["probe_until"] = now + probe_seconds
+            return [1, state]
+
+        now, success, slow, min_calls, failure_rate, slow_rate, _ = args
+        if state == "half_open":
+            if not success or slow:
+                breaker.update(state="open", opened_at=now)
+                return ["open", 1]
+            breaker["state"] = "closed"
+            for key in keys[1:]:
+                self.hashes.pop(key, None)
+            return ["closed", 1]
+        bucket = self.hashes.setdefault(keys[1], {})
+        for field, counted in (("calls", True), ("failures", not success), ("slow", slow)):
+            bucket[field] = bucket.get(field, 0) + int(counted)
+        if state == "open":
+            return [state, 0]
+        window = [self.hashes.get(key, {}) for key in keys[2:]]
+        calls, failures, slows = (sum(b.get(field, 0) for b in window) for field in ("calls", "failures", "slow"))
+        if calls >= min_calls and (failures / calls >= failure_rate or slows / calls >= slow_rate):
+            breaker.update(state="open", opened_at=now)
+            for key in keys[2:]:
+                self.hashes.pop(key, None)
+            return ["open", 1]
+        return [state, 0]
+
+
+class FakeStreamingCompletions:
+    def __init__(self, fragments):
+        self.fragments = fragments
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return iter(
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=fragment))])
+            for fragment in self.fragments
+        )
+
+
+def test_explanation_extractor_decodes_partial_json_across_fragments():
+    extractor = llm.ExplanationExtractor()
+    fragments = ['{"statut": "FAUSSE", "expli', 'cation": "Ligne\\', 'n2 \\u00', 'e9t\\u00e9 \\"x\\"', '", "sources_principales": []}']
+
+    assert "".join(extractor.feed(fragment) for fragment in fragments) == 'Ligne\n2 été "x"'
+    assert extractor.done is True
+
+
+def test_llm_analysis_streams_explanation_and_returns_parsed_verdict(monkeypatch):
+    response = '{"statut": "VRAIE", "explication": "Confirmé par les sources.", "sources_principales": ["https://a.test"]}'
+    completions = FakeStreamingCompletions([response[i:i + 7] for i in range(0, len(response), 7)])
+    monkeypatch.setattr(llm, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    tokens = []
+
+    result = llm.llm_analysis("claim", "vérifié", [], "", on_token=tokens.append)
+
+    assert completions.calls[0]["stream"] is True
+    assert "".join(tokens) == "Confirmé par les sources."
+    assert len(tokens) > 1
+    assert result == {
+        "statut": "VRAIE",
+        "explication": "Confirmé par les sources.",
+        "sources_principales": ["https://a.test"],
+    }
+
+
+def test_llm_analysis_requests_the_fact_check_schema_and_validates_the_verdict(monkeypatch):
+    response = '{"statut":"VRAIE","explication":"Confirmé.","sources_principales":["https://source.test", 3]}'
     fake_client = FakeOpenAIClient(content=response)
     monkeypatch.setattr(llm, "client", fake_client)
 
@@ -98,25 +288,28 @@ def test_llm_analysis_parses_json_and_supplies_missing_fields(monkeypatch):
 
     assert result == {
         "statut": "VRAIE",
-        "explication": response,
+        "explication": "Confirmé.",
         "sources_principales": ["https://source.test"],
     }
     call = fake_client.chat.completions.calls[0]
     assert call["model"] == "openai/gpt-4o-mini"
-    assert "translated claim" in call["messages"][0]["content"]
+    assert call["response_format"] == llm.FACT_CHECK_SCHEMA
+    assert call["max_tokens"] == 400
+    assert call["messages"][0] == {"role": "system", "content": prompt_builder.FACT_CHECK_SYSTEM_PROMPT}
+    assert "translated claim" in call["messages"][-1]["content"]
 
 
-def test_llm_analysis_falls_back_for_plain_text_and_api_errors(monkeypatch):
-    monkeypatch.setattr(llm, "client", FakeOpenAIClient(content="Cette déclaration est fausse."))
+def test_llm_analysis_falls_back_to_the_classifier_for_invalid_answers_and_api_errors(monkeypatch):
+    # No fence stripping or keyword scan: an answer outside the schema is an error
+    for content in ("```json\n{\"statut\":\"VRAIE\"}\n```", "Cette déclaration est fausse.",
+                    '{"statut": "PROBABLE", "explication": "?", "sources_principales": []}'):
+        monkeypatch.setattr(llm, "client", FakeOpenAIClient(content=content))
 
-    plain_result = llm.llm_analysis(
-        "claim",
-        "vérifié",
-        [{"link": "https://fallback.test"}],
-    )
+        invalid_result = llm.llm_analysis("claim", "vérifié", [{"link": "https://fallback.test"}])
 
-    assert plain_result["statut"] == "FAUSSE"
-    assert plain_result["sources_principales"] == ["https://fallback.test"]
+        assert invalid_result["statut"] == "VRAIE"
+        assert invalid_result["mode_degrade"] is True
+        assert invalid_result["sources_principales"] == ["https://fallback.test"]
 
     monkeypatch.setattr(llm, "client", FakeOpenAIClient(side_effect=RuntimeError("api down")))
 
@@ -124,6 +317,121 @@ def test_llm_analysis_falls_back_for_plain_text_and_api_errors(monkeypatch):
 
     assert error_result["statut"] == "FAUSSE"
     assert "api down" in error_result["explication"]
+    assert error_result["mode_degrade"] is True
+
+
+def test_llm_analysis_batch_splits_verdicts_and_checks_invalid_ones_alone(monkeypatch):
+    batch_response = json.dumps({"verdicts": [
+        {"numero": 1, "statut": "VRAIE", "explication": "Confirmé.", "sources_principales": ["https://one.test"]},
+        {"numero": 3, "statut": "PEUT-ÊTRE", "explication": "?", "sources_principales": []},
+        {"numero": 7, "statut": "FAUSSE", "explication": "Hors plage.", "sources_principales": []},
+    ]})
+    single_response = '{"statut": "FAUSSE", "explication": "Démenti.", "sources_principales": []}'
+    responses = iter([batch_response, single_response, single_response])
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=next(responses)))],
+            usage=SimpleNamespace(prompt_tokens=3000, completion_tokens=300),
+        )
+
+    monkeypatch.setattr(llm, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+    claims = [
+        {"translated_text": f"claim {n}", "initial_result": "vérifié",
+         "web_sources": [{"link": f"https://{n}.test", "snippet": f"evidence {n}"}], "perplexity_verification": ""}
+        for n in (1, 2, 3)
+    ]
+    usages = []
+
+    results = llm.llm_analysis_batch(claims, on_usage=usages.append)
+
+    assert results[0] == {"statut": "VRAIE", "explication": "Confirmé.", "sources_principales": ["https://one.test"]}
+    assert [result["statut"] for result in results[1:]] == ["FAUSSE", "FAUSSE"]
+    batch_call = calls[0]
+    assert batch_call["response_format"]["json_schema"]["name"] == "fact_check_batch"
+    assert batch_call["messages"][0]["content"] == prompt_builder.FACT_CHECK_BATCH_SYSTEM_PROMPT
+    assert "### DÉCLARATION 3" in batch_call["messages"][1]["content"]
+    assert "evidence 2" in batch_call["messages"][1]["content"]
+    # Claims 2 (missing) and 3 (invalid verdict) are checked alone
+    assert ["claim 2" in calls[1]["messages"][-1]["content"], "claim 3" in calls[2]["messages"][-1]["content"]] == [True, True]
+    assert [usage["operation"] for usage in usages] == ["fact_check_batch", "fact_check", "fact_check"]
+
+
+def test_llm_analysis_batch_falls_back_to_single_calls_on_unparseable_response(monkeypatch):
+    fake_client = FakeOpenAIClient(content="pas du JSON")
+    monkeypatch.setattr(llm, "client", fake_client)
+    claims = [
+        {"translated_text": f"claim {n}", "initial_result": "rejeté", "web_sources": [], "perplexity_verification": ""}
+        for n in (1, 2)
+    ]
+
+    results = llm.llm_analysis_batch(claims)
+
+    # One batched call, then one call per claim (invalid too: classifier fallback)
+    assert len(fake_client.chat.completions.calls) == 3
+    assert [(result["statut"], result["mode_degrade"]) for result in results] == [("FAUSSE", True), ("FAUSSE", True)]
+
+    fake_client = FakeOpenAIClient(side_effect=llm.RateLimitError(
+        "Too many requests", response=Mock(status_code=429, headers={}), body=None
+    ))
+    monkeypatch.setattr(llm, "client", fake_client)
+    with pytest.raises(errors.TransientError):
+        llm.llm_analysis_batch(claims)
+
+
+def test_llm_analysis_reports_token_usage_streamed_or_not(monkeypatch):
+    response = '{"statut": "VRAIE", "explication": "Oui.", "sources_principales": []}'
+    usage = SimpleNamespace(prompt_tokens=1200, completion_tokens=80)
+    completions = FakeCompletions(content=response)
+    completions.create = lambda **kwargs: SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=response))], usage=usage
+    )
+    monkeypatch.setattr(llm, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    usages = []
+
+    llm.llm_analysis("claim", "vérifié", [], "", on_usage=usages.append)
+
+    assert usages[0]["operation"] == "fact_check"
+    assert usages[0]["model"] == "openai/gpt-4o-mini"
+    assert (usages[0]["prompt_tokens"], usages[0]["completion_tokens"]) == (1200, 80)
+    assert isinstance(usages[0]["latency_ms"], int)
+
+    streaming = FakeStreamingCompletions([response])
+    create = streaming.create
+    streaming.create = lambda **kwargs: iter([*create(**kwargs), SimpleNamespace(choices=[], usage=usage)])
+    monkeypatch.setattr(llm, "client", SimpleNamespace(chat=SimpleNamespace(completions=streaming)))
+
+    llm.llm_analysis("claim", "vérifié", [], "", on_token=lambda text: None, on_usage=usages.append)
+
+    assert streaming.calls[0]["stream_options"] == {"include_usage": True}
+    assert usages[1]["prompt_tokens"] == 1200
+
+
+def test_fact_check_prompt_deduplicates_snippets_and_caps_sources(settings):
+    settings.LLM_PROMPT_SOURCES_TOKEN_BUDGET = 40
+    repeated = "Le Mali a battu le Sénégal 2-1 en finale le 3 mars."
+    sources = [
+        {"title": "A", "link": "https://a.test", "snippet": f"{repeated} Match disputé à Bamako."},
+        {"title": "A bis", "link": "https://a.test", "snippet": "Copie de la même page."},
+        {"title": "B", "link": "https://b.test", "snippet": " ".join([repeated] + [f"Phrase {n} du compte rendu." for n in range(40)])},
+    ]
+    verification = perplexity_search.create_enriched_content(f"Résumé Perplexity. {repeated}", sources, "01/01/2025")
+
+    first = prompt_builder.build_fact_check_prompt("claim", "vérifié", sources, verification, "01/01/2025")
+    second = prompt_builder.build_fact_check_prompt("autre", "rejeté", [], "", "02/01/2025")
+
+    user = first["messages"][-1]["content"]
+    assert first["messages"][0] == second["messages"][0]
+    assert "01/01/2025" not in first["messages"][0]["content"]
+    assert user.count(repeated) == 1
+    assert "EXTRAITS DES SOURCES" not in user and "Copie de la même page" not in user
+    assert "Match disputé à Bamako." in user
+    assert (first["sources"], first["duplicates_removed"], first["truncated"]) == (2, 3, 1)
+    assert first["estimated_tokens"]["user"] == prompt_builder.estimate_tokens(user)
+    assert "Phrase 39" not in user and user.endswith("…")
+    assert "Aucune source web" in second["messages"][-1]["content"]
 
 
 def test_perplexity_search_formats_sources_and_cleans_content(monkeypatch):
@@ -168,6 +476,16 @@ def test_perplexity_search_handles_errors_and_helper_exceptions(monkeypatch):
     response = Mock(status_code=500, text="server error")
     monkeypatch.setattr(perplexity_search.requests, "post", Mock(return_value=response))
 
+    with pytest.raises(errors.TransientError):
+        perplexity_search.search_with_perplexity("claim")
+    monkeypatch.setattr(
+        perplexity_search.requests, "post", Mock(side_effect=perplexity_search.requests.ConnectionError("reset"))
+    )
+    with pytest.raises(errors.TransientError):
+        perplexity_search.search_with_perplexity("claim")
+
+    response = Mock(status_code=400, text="bad request")
+    monkeypatch.setattr(perplexity_search.requests, "post", Mock(return_value=response))
     assert perplexity_search.search_with_perplexity("claim") == {
         "verification_content": "",
         "sources": [],
@@ -192,6 +510,42 @@ def test_perplexity_search_handles_errors_and_helper_exceptions(monkeypatch):
     assert "CONTEXTE" in perplexity_search.create_enriched_content("main", [], "19/05/2026")
 
 
+def test_perplexity_searches_are_cached_by_normalized_text_with_tiered_ttls(monkeypatch, settings):
+    redis = FakeRedis()
+    monkeypatch.setattr(search_cache, "get_redis_client", lambda: redis)
+    response = Mock(status_code=200)
+    response.json.return_value = {
+        "choices": [{"message": {"content": "Confirmed."}}],
+        "search_results": [{"title": "Report", "url": "https://report.test"}],
+    }
+    post = Mock(return_value=response)
+    monkeypatch.setattr(perplexity_search.requests, "post", post)
+    hits = metrics.CACHE_REQUESTS.labels(cache="perplexity_default", result="hit")._value.get()
+
+    first = perplexity_search.search_with_perplexity("Le Mali a gagné le match.")
+    again = perplexity_search.search_with_perplexity("  le MALI a gagne le match ")
+
+    assert post.call_count == 1
+    assert again == first
+    assert metrics.CACHE_REQUESTS.labels(cache="perplexity_default", result="hit")._value.get() == hits + 1
+    key = search_cache.cache_key("le mali a gagne le match", perplexity_search.SEARCH_RECENCY_FILTER)
+    assert redis.ttls[key] == settings.PERPLEXITY_CACHE_TTL_DEFAULT
+
+    # A forced search calls the API again and refreshes the cache
+    perplexity_search.search_with_perplexity("Le Mali a gagné le match.", use_cache=False)
+    assert post.call_count == 2
+
+    assert search_cache.claim_tier("Le président vient d'annoncer sa démission aujourd'hui") == search_cache.BREAKING
+    assert search_cache.claim_tier("Une étude montre que le vaccin est efficace") == search_cache.EVERGREEN
+    assert search_cache.claim_tier("Le Mali est devenu indépendant en 1960") == search_cache.EVERGREEN
+    assert search_cache.claim_tier("Le Mali a gagné le match") == search_cache.DEFAULT
+
+    settings.PERPLEXITY_CACHE_TTL_BREAKING = 0
+    perplexity_search.search_with_perplexity("En direct : le pont s'est effondré")
+    perplexity_search.search_with_perplexity("En direct : le pont s'est effondré")
+    assert post.call_count == 4
+
+
 def test_supabase_storage_upload_delete_urls_and_bucket_paths(monkeypatch):
     bucket = FakeStorageBucket(signed_url={"signedURL": "https://signed.test/file.jpg"})
     client = FakeSupabaseClient(bucket=bucket)
@@ -208,6 +562,8 @@ def test_supabase_storage_upload_delete_urls_and_bucket_paths(monkeypatch):
     assert upload["bucket"] == "image-verifications"
     assert bucket.upload_calls[0]["file"] == b"image-bytes"
     assert bucket.upload_calls[0]["file_options"]["content-type"] == "image/png"
+    content_hash = upload["content_hash"]
+    assert upload["file_path"] == f"sha256/{content_hash[:2]}/{content_hash}.png"
 
     assert supabase_storage.delete_image_from_supabase("path/image.png") == {
         "success": True,
@@ -289,7 +645,14 @@ def test_image_encoding_and_pixel_analyzer_paths(monkeypatch):
         "get",
         Mock(side_effect=image_verification.requests.exceptions.Timeout),
     )
-    assert image_verification.encode_image_url_to_base64("https://image.test/timeout") is None
+    with pytest.raises(errors.TransientError):
+        image_verification.encode_image_url_to_base64("https://image.test/timeout")
+    monkeypatch.setattr(
+        image_verification.requests,
+        "get",
+        Mock(side_effect=image_verification.requests.exceptions.InvalidURL),
+    )
+    assert image_verification.encode_image_url_to_base64("not a url") is None
 
     monkeypatch.setattr(image_verification, "_run_pixel_analyzer", Mock(return_value=0.72))
     assert image_verification._run_pixel_analyzer("https://image.test/pic.png") == 0.72
@@ -396,6 +759,96 @@ def test_verify_image_content_with_claim_without_claim_and_fallbacks(monkeypatch
     assert image_verification.verify_image_content("https://image.test/pic.png")["statut"] == "ERREUR"
 
 
+def _png_bytes(text_chunks=None, trailer=b""):
+    from PIL import Image
+    from PIL.PngImagePlugin import PngInfo
+
+    info = PngInfo()
+    for key, value in (text_chunks or {}).items():
+        info.add_text(key, value)
+    image = io.BytesIO()
+    Image.new("RGB", (4, 4), color="white").save(image, format="PNG", pnginfo=info)
+    return image.getvalue() + trailer
+
+
+def test_metadata_analyzer_flags_generators_and_reads_camera_exif():
+    generated = metadata_analyzer.analyze_image_metadata(
+        _png_bytes({"parameters": "a cat, Steps: 20, Sampler: Euler a"})
+    )
+    assert generated["success"] is True
+    assert generated["verdict"] == "IA_DÉTECTÉE"
+    assert generated["generator"] == "stable diffusion (automatic1111)"
+
+    from PIL import Image
+
+    exif = Image.Exif()
+    exif[metadata_analyzer.EXIF_MAKE] = "Canon"
+    exif[metadata_analyzer.EXIF_MODEL] = "EOS 80D"
+    photo = io.BytesIO()
+    Image.new("RGB", (4, 4), color="white").save(photo, format="JPEG", exif=exif)
+
+    camera = metadata_analyzer.analyze_image_metadata(photo.getvalue())
+    assert camera["verdict"] is None
+    assert camera["exif"]["make"] == "Canon"
+    assert "Données EXIF d'appareil photo : Canon EOS 80D" in camera["signals"]
+
+    unreadable = metadata_analyzer.analyze_image_metadata(b"not an image")
+    assert unreadable["success"] is False
+
+
+def test_metadata_analyzer_matches_whole_generator_names_only():
+    plugin = metadata_analyzer.analyze_image_metadata(_png_bytes({"Software": "Imagenomic Portraiture 4"}))
+    assert (plugin["generator"], plugin["verdict"]) == (None, None)
+
+    ambiguous = metadata_analyzer.analyze_image_metadata(_png_bytes({"Software": "Google Gemini"}))
+    assert (ambiguous["generator"], ambiguous["verdict"]) == (None, None)
+    assert any("gemini" in signal for signal in ambiguous["signals"])
+
+    firefly = metadata_analyzer.analyze_image_metadata(_png_bytes({"Software": "Adobe Firefly 3"}))
+    assert (firefly["generator"], firefly["verdict"]) == ("adobe firefly", "IA_DÉTECTÉE")
+
+
+def test_metadata_analyzer_reads_c2pa_manifest_as_an_unverified_signal():
+    manifest = (
+        b"jumb\x00c2pa\x00claim_generator\x6eOpenAI-API/1.0"
+        b"http://cv.iptc.org/newscodes/digitalsourcetype/trainedAlgorithmicMedia"
+    )
+    result = metadata_analyzer.analyze_image_metadata(_png_bytes(trailer=manifest))
+    assert result["c2pa"] == {"present": True, "claim_generator": "OpenAI-API/1.0"}
+    assert result["digital_source_type"] == "trainedalgorithmicmedia"
+    assert result["verdict"] == "IA_DÉTECTÉE"
+
+    capture = (
+        b"jumb\x00c2pa\x00claim_generator\x6bLeica M11-P"
+        b"http://cv.iptc.org/newscodes/digitalsourcetype/digitalCapture"
+    )
+    # Unsigned: a capture manifest is never a verdict
+    captured = metadata_analyzer.analyze_image_metadata(_png_bytes(trailer=capture))
+    assert captured["verdict"] is None
+    assert "Type de source numérique déclaré : capture par appareil photo (non vérifié)" in captured["signals"]
+
+
+def test_detect_ai_generated_image_skips_remote_calls_on_generator_metadata(monkeypatch):
+    import base64
+
+    data_url = "data:image/png;base64," + base64.b64encode(
+        _png_bytes({"Software": "Midjourney v6"})
+    ).decode()
+    monkeypatch.setattr(image_verification, "encode_image_url_to_base64", Mock(return_value=data_url))
+    pixel_analyzer = Mock(return_value=0.1)
+    openai_client = Mock()
+    monkeypatch.setattr(image_verification, "_run_pixel_analyzer", pixel_analyzer)
+    monkeypatch.setattr(image_verification, "_get_openai_client", openai_client)
+
+    result = image_verification.detect_ai_generated_image("https://image.test/pic.png")
+
+    assert result["statut"] == "IA_DÉTECTÉE"
+    assert result["details"]["model"] == image_verification.METADATA_PRESCREEN_MODEL
+    assert result["details"]["metadata"]["generator"] == "midjourney"
+    pixel_analyzer.assert_not_called()
+    openai_client.assert_not_called()
+
+
 @pytest.mark.django_db
 def test_analyze_submission_task_updates_submission_and_creates_fact(monkeypatch):
     user_id = uuid.uuid4()
@@ -406,8 +859,10 @@ def test_analyze_submission_task_updates_submission_and_creates_fact(monkeypatch
         texte="Claim to verify",
         source="https://submitted.test",
     )
+    monkeypatch.setattr("core.tasks.translate_text", Mock(return_value="Claim to verify"))
+    monkeypatch.setattr("core.tasks.classify_text", Mock(return_value=("vérifié", 0.9)))
     monkeypatch.setattr(
-        "core.tasks.analyze_text",
+        "core.tasks.research_claim",
         Mock(
             return_value=(
                 {
@@ -425,11 +880,126 @@ def test_analyze_submission_task_updates_submission_and_creates_fact(monkeypatch
 
     submission.refresh_from_db()
     assert result["success"] is True
+    assert result["task_id"]  # Classification handed to the CPU queue
     assert submission.statut == "vérifié"
     assert submission.detailed_result == "Verified with sources"
+    assert submission.verdict == "VRAIE"
+    assert submission.verified_at is not None
     fact = Fact.objects.get()
     assert fact.source == "https://primary.test"
     assert Keyword.objects.filter(mot="health").exists()
+    assert list(fact.sources.values_list("domain", flat=True)) == ["web-source.test"]
+    assert list(submission.sources.values_list("url", flat=True)) == ["https://web-source.test"]
+
+
+@pytest.mark.django_db
+def test_analyze_submission_batch_task_decides_the_group_with_one_llm_call(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(progress, "get_redis_client", lambda: redis)
+    monkeypatch.setattr("core.tasks.current_progress_id", lambda: "batch-1")
+    user_id = uuid.uuid4()
+    submissions = [
+        Submission.objects.create(supabase_user_id=user_id, user_email="user@example.com", texte=text)
+        for text in ("Claim one", "Claim two", "Claim three")
+    ]
+    Submission.objects.filter(id=submissions[2].id).update(statut="vérifié")
+    monkeypatch.setattr("core.tasks.translate_text", lambda text: text)
+    monkeypatch.setattr("core.tasks.classify_text", lambda text: ("vérifié", 0.9))
+    monkeypatch.setattr(ai_analysis, "search_with_perplexity", lambda text, use_cache=True: {
+        "verification_content": f"About {text}", "sources": [{"link": f"https://{len(text)}.test"}], "citations": []
+    })
+    fake_client = FakeOpenAIClient(content=json.dumps({"verdicts": [
+        {"numero": 1, "statut": "FAUSSE", "explication": "Démenti.", "sources_principales": []},
+        {"numero": 2, "statut": "INDÉTERMINÉE", "explication": "Rien trouvé.", "sources_principales": []},
+    ]}))
+    monkeypatch.setattr(llm, "client", fake_client)
+
+    result = analyze_submission_batch_task.run([submission.id for submission in submissions])
+
+    assert result["success"] is True
+    assert result["submission_ids"] == [submissions[0].id, submissions[1].id]
+    assert len(fake_client.chat.completions.calls) == 1
+    assert [
+        (s.statut, s.verdict, s.detailed_result)
+        for s in Submission.objects.filter(id__in=result["submission_ids"]).order_by("id")
+    ] == [("rejeté", "FAUSSE", "Démenti."), ("rejeté", "INDÉTERMINÉE", "Rien trouvé.")]
+    assert Submission.objects.get(id=submissions[0].id).web_sources == [{"link": "https://9.test"}]
+    # The shared progress stream closes once, after every submission is saved
+    saved = [event for _, event in redis.published if event["stage"] in ("submission_saved", "saved")]
+    assert [(event["stage"], event.get("submission_id")) for event in saved] == [
+        ("submission_saved", submissions[0].id), ("submission_saved", submissions[1].id), ("saved", None)
+    ]
+
+
+@pytest.mark.django_db
+def test_analyze_submission_task_publishes_stage_transitions(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(progress, "get_redis_client", lambda: redis)
+    monkeypatch.setattr("core.tasks.current_progress_id", lambda: "task-1")
+    submission = Submission.objects.create(
+        supabase_user_id=uuid.uuid4(), user_email="user@example.com", texte="Claim"
+    )
+
+    def fake_research_claim(text, translated_text, initial_result, on_stage=None, on_token=None, on_usage=None,
+                            confidence=None):
+        on_stage("searched")
+        on_token("N")
+        on_token("o")
+        on_stage("analysed")
+        return {"statut": "FAUSSE", "explication": "No"}, []
+
+    monkeypatch.setattr("core.tasks.translate_text", lambda text: "Claim")
+    monkeypatch.setattr("core.tasks.classify_text", lambda text: ("rejeté", 0.8))
+    monkeypatch.setattr("core.tasks.research_claim", fake_research_claim)
+    monkeypatch.setattr("django.conf.settings.PROGRESS_TOKEN_FLUSH_INTERVAL", 60)
+
+    analyze_submission_text_task.run(submission.id, "Claim")
+
+    assert [channel for channel, _ in redis.published] == ["progress:task-1"] * 8
+    assert [event["stage"] for _, event in redis.published] == [
+        "started", "translated", "classified", "searched", "explanation", "explanation", "analysed", "saved"
+    ]
+    assert [event["seq"] for _, event in redis.published] == [1, 2, 3, 4, None, None, 5, 6]
+    # First fragment is sent at once, later ones are coalesced until the next stage
+    assert [event.get("delta") for _, event in redis.published[4:6]] == ["N", "o"]
+    assert redis.published[-1][1]["status"] == "rejeté"
+    assert len(redis.lists["progress:history:task-1"]) == 6
+
+
+def test_stage_tracker_stores_progress_state_with_timings_and_partial_results(monkeypatch):
+    monkeypatch.setattr(progress, "get_redis_client", lambda: None)
+    task = SimpleNamespace(request=SimpleNamespace(is_eager=False), update_state=Mock())
+    tracker = progress.StageTracker("task-1", task=task, submission_id=7)
+
+    tracker("translated", translated_text="Claim")
+    tracker("searched", sources_count=1, sources=[{"link": "https://source.test"}])
+
+    call = task.update_state.call_args.kwargs
+    assert call["task_id"] == "task-1"
+    assert call["state"] == "PROGRESS"
+    assert call["meta"]["stage"] == "searched"
+    assert call["meta"]["submission_id"] == 7
+    assert [stage["stage"] for stage in call["meta"]["stages"]] == ["translated", "searched"]
+    assert all(isinstance(stage["elapsed_ms"], int) for stage in call["meta"]["stages"])
+    assert call["meta"]["partial"] == {
+        "translated_text": "Claim",
+        "sources": [{"link": "https://source.test"}],
+    }
+
+    eager = SimpleNamespace(request=SimpleNamespace(is_eager=True), update_state=Mock())
+    progress.StageTracker("task-2", task=eager)("saved")
+    eager.update_state.assert_not_called()
+
+
+def test_progress_publishing_is_skipped_without_redis_or_task_id(monkeypatch):
+    monkeypatch.setattr(progress, "get_redis_client", lambda: None)
+    assert progress.publish_progress("task-1", "saved") is None
+    assert progress.register_progress_owner("task-1", "user") is False
+
+    broken = Mock(rpush=Mock(side_effect=ConnectionError("down")))
+    monkeypatch.setattr(progress, "get_redis_client", lambda: broken)
+    assert progress.publish_progress("task-1", "saved") is None
+    assert progress.publish_progress(None, "saved") is None
 
 
 @pytest.mark.django_db
@@ -441,7 +1011,9 @@ def test_analyze_submission_task_handles_legacy_and_errors(monkeypatch):
         texte="Legacy claim",
         source="",
     )
-    monkeypatch.setattr("core.tasks.analyze_text", Mock(return_value=("rejeté", [])))
+    monkeypatch.setattr("core.tasks.translate_text", Mock(return_value="Legacy claim"))
+    monkeypatch.setattr("core.tasks.classify_text", Mock(return_value=("rejeté", 0.7)))
+    monkeypatch.setattr("core.tasks.research_claim", Mock(return_value=("rejeté", [])))
 
     legacy = analyze_submission_text_task.run(submission.id, "Legacy claim")
 
@@ -450,7 +1022,8 @@ def test_analyze_submission_task_handles_legacy_and_errors(monkeypatch):
     assert submission.statut == "rejeté"
     assert submission.detailed_result == "Résultat d'analyse: rejeté"
 
-    monkeypatch.setattr("core.tasks.analyze_text", Mock(side_effect=RuntimeError("analysis failed")))
+    Submission.objects.filter(id=submission.id).update(statut="en cours")
+    monkeypatch.setattr("core.tasks.translate_text", Mock(side_effect=RuntimeError("analysis failed")))
     failed = analyze_submission_text_task.run(submission.id, "Legacy claim")
 
     assert failed["success"] is False
@@ -458,6 +1031,14 @@ def test_analyze_submission_task_handles_legacy_and_errors(monkeypatch):
     assert submission.statut == "rejeté"
     assert "analysis failed" in submission.detailed_result
 
+    Submission.objects.filter(id=submission.id).update(statut="en cours")
+    monkeypatch.setattr("core.tasks.research_claim", Mock(side_effect=RuntimeError("search failed")))
+    failed = research_submission_task.run(submission.id, "Legacy claim", "Legacy claim", "rejeté")
+
+    assert failed["success"] is False
+    submission.refresh_from_db()
+    assert "search failed" in submission.detailed_result
+
 
 @pytest.mark.django_db
 def test_image_tasks_update_success_error_and_upload_paths(monkeypatch):
@@ -501,12 +1082,13 @@ def test_image_tasks_update_success_error_and_upload_paths(monkeypatch):
             }
         ),
     )
+    ImageVerification.objects.filter(id=verification.id).update(status="EN_COURS")
     error = detect_ai_image_task.run(verification.id, verification.image_url)
     verification.refresh_from_db()
     assert error["success"] is False
     assert verification.status == "ERREUR"
 
-    monkeypatch.setattr("core.tasks.create_bucket_if_not_exists", Mock(return_value={"success": True}))
+    monkeypatch.setattr("core.tasks.ensure_bucket_exists", Mock(return_value={"success": True}))
     monkeypatch.setattr(
         "core.tasks.upload_image_to_supabase",
         Mock(
@@ -544,9 +1126,822 @@ def test_image_tasks_update_success_error_and_upload_paths(monkeypatch):
         str(uuid.uuid4()),
         "user@example.com",
         "User",
-        b"image",
+        b"other-image",
         "pic.png",
         "",
         "ai_detection",
     )
     assert failed_upload == {"success": False, "error": "Erreur lors de l'upload: upload failed"}
+
+
+@pytest.mark.django_db
+def test_upload_task_reuses_stored_blob_for_identical_images(monkeypatch):
+    upload = Mock(
+        return_value={
+            "success": True,
+            "file_path": "sha256/ab/abc.png",
+            "public_url": "https://image.test/abc.png",
+        }
+    )
+    signed = Mock(return_value="https://image.test/abc.png?token=fresh")
+    monkeypatch.setattr("core.tasks.ensure_bucket_exists", Mock(return_value={"success": True}))
+    monkeypatch.setattr("core.tasks.upload_image_to_supabase", upload)
+    monkeypatch.setattr("core.tasks.upload_image_derivatives", Mock(return_value={}))
+    monkeypatch.setattr("core.tasks.get_image_url_from_supabase", signed)
+    monkeypatch.setattr(detect_ai_image_task, "delay", Mock(return_value=SimpleNamespace(id="detect-task")))
+
+    def run(user):
+        result = upload_and_verify_image_task.run(
+            str(uuid.uuid4()), user, "User", b"same-bytes", "pic.png", "", "ai_detection"
+        )
+        assert result["success"] is True
+        return result
+
+    run("first@example.com")
+    # The reused blob gets a new signed URL: the one of the first upload expires
+    assert run("second@example.com")["image_url"] == "https://image.test/abc.png?token=fresh"
+
+    upload.assert_called_once()
+    signed.assert_called_once_with("sha256/ab/abc.png")
+    blob = ImageBlob.objects.get()
+    assert (blob.ref_count, blob.url) == (2, "https://image.test/abc.png?token=fresh")
+    assert set(ImageVerification.objects.values_list("blob_id", flat=True)) == {blob.sha256}
+    assert ImageVerification.objects.filter(image_path="sha256/ab/abc.png").count() == 2
+
+    # Object gone from storage: uploaded again
+    signed.return_value = None
+    run("third@example.com")
+    assert upload.call_count == 2
+    assert ImageBlob.objects.get().ref_count == 3
+
+    # A failed upload drops its reference
+    upload.return_value = {"success": False, "error": "down"}
+    assert upload_and_verify_image_task.run(
+        str(uuid.uuid4()), "user@example.com", "User", b"other-bytes", "pic.png", "", "ai_detection"
+    )["success"] is False
+    assert ImageBlob.objects.count() == 1
+
+
+def test_image_derivatives_are_resized_webp_uploaded_next_to_original(monkeypatch):
+    from PIL import Image
+
+    original = io.BytesIO()
+    Image.new("RGB", (2000, 1000), color="red").save(original, format="JPEG")
+    derivatives = image_derivatives.generate_derivatives(original.getvalue())
+
+    assert Image.open(io.BytesIO(derivatives["thumbnail"])).size == (256, 128)
+    assert Image.open(io.BytesIO(derivatives["preview"])).format == "WEBP"
+    assert image_derivatives.generate_derivatives(b"not an image") == {}
+
+    bucket = FakeStorageBucket(signed_url={"signedURL": "https://signed.test/derivative.webp"})
+    monkeypatch.setattr(supabase_storage, "get_supabase_client", Mock(return_value=FakeSupabaseClient(bucket=bucket)))
+
+    urls = supabase_storage.upload_image_derivatives("ab" * 32, original.getvalue())
+
+    assert urls == {
+        "thumbnail": "https://signed.test/derivative.webp",
+        "preview": "https://signed.test/derivative.webp",
+    }
+    assert [call["path"] for call in bucket.upload_calls] == [
+        f"sha256/ab/{'ab' * 32}.thumbnail.webp",
+        f"sha256/ab/{'ab' * 32}.preview.webp",
+    ]
+    assert bucket.upload_calls[0]["file_options"]["content-type"] == "image/webp"
+
+
+@pytest.mark.django_db
+def test_upload_task_stores_derivative_urls_on_new_blob(monkeypatch):
+    monkeypatch.setattr("core.tasks.ensure_bucket_exists", Mock(return_value={"success": True}))
+    monkeypatch.setattr(
+        "core.tasks.upload_image_to_supabase",
+        Mock(return_value={"success": True, "file_path": "sha256/cd/cd.png", "public_url": "https://image.test/cd.png"}),
+    )
+    derivatives = Mock(return_value={"thumbnail": "https://image.test/cd.thumbnail.webp"})
+    monkeypatch.setattr("core.tasks.upload_image_derivatives", derivatives)
+    monkeypatch.setattr("core.tasks.get_image_url_from_supabase", lambda path: f"https://image.test/{path}?token=new")
+    monkeypatch.setattr(detect_ai_image_task, "delay", Mock(return_value=SimpleNamespace(id="detect-task")))
+
+    for _ in range(2):
+        upload_and_verify_image_task.run(
+            str(uuid.uuid4()), "user@example.com", "User", b"png-bytes", "pic.png", "", "ai_detection"
+        )
+
+    derivatives.assert_called_once()
+    blob = ImageBlob.objects.get()
+    assert blob.thumbnail_url == f"https://image.test/sha256/{blob.sha256[:2]}/{blob.sha256}.thumbnail.webp?token=new"
+    assert blob.preview_url == ""
+
+
+def test_observe_stage_records_latency_and_errors():
+    from prometheus_client import REGISTRY
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    count_before = sample("checkia_stage_duration_seconds_count", stage="unit_test")
+    errors_before = sample("checkia_stage_errors_total", stage="unit_test", error="ValueError")
+    hits_before = sample("checkia_cache_requests_total", cache="unit_test", result="hit")
+
+    with metrics.observe_stage("unit_test"):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.observe_stage("unit_test"):
+            raise ValueError("boom")
+    metrics.record_cache("unit_test", True)
+
+    assert sample("checkia_stage_duration_seconds_count", stage="unit_test") == count_before + 2
+    assert sample("checkia_stage_errors_total", stage="unit_test", error="ValueError") == errors_before + 1
+    assert sample("checkia_cache_requests_total", cache="unit_test", result="hit") == hits_before + 1
+
+
+def test_trace_context_follows_celery_headers_and_stage_spans(monkeypatch, settings, tmp_path):
+    settings.TRACING_EXPORTER = "file"
+    settings.TRACING_FILE = str(tmp_path / "traces.jsonl")
+    exported = []
+    monkeypatch.setattr(tracing, "_exporter", lambda: SimpleNamespace(export=exported.append))
+
+    headers = {}
+    with tracing.span("POST /api/submissions/", kind=tracing.SERVER) as request_span:
+        tracing.inject_task_headers(headers=headers)
+        with metrics.observe_stage(metrics.DB_WRITE):
+            pass
+
+    # Worker side: only the message headers cross the process boundary
+    task = SimpleNamespace(name="core.tasks.analyze_submission_text_task", request=SimpleNamespace(**headers))
+    tracing.start_task_span(task_id="task-1", task=task)
+    with pytest.raises(RuntimeError):
+        with metrics.observe_stage(metrics.OPENROUTER):
+            raise RuntimeError("timeout")
+    tracing.end_task_span(task_id="task-1", state="SUCCESS")
+
+    spans = {span.name: span for span in exported}
+    assert headers["traceparent"] == request_span.traceparent
+    assert {span.trace_id for span in exported} == {request_span.trace_id}
+    assert spans["db_write"].parent_id == request_span.span_id
+    task_span = spans["celery core.tasks.analyze_submission_text_task"]
+    assert task_span.parent_id == request_span.span_id
+    assert spans["openrouter"].parent_id == task_span.span_id
+    assert spans["openrouter"].kind == tracing.CLIENT
+    assert spans["openrouter"].error == "RuntimeError: timeout"
+    assert tracing.current_span() is None
+
+    tracing._write_file([spans["openrouter"]])
+    written = json.loads((tmp_path / "traces.jsonl").read_text())
+    otlp_span = written["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert otlp_span["traceId"] == request_span.trace_id
+    assert otlp_span["status"] == {"code": 2, "message": "RuntimeError: timeout"}
+
+
+def test_tracing_is_a_no_op_when_disabled(settings):
+    settings.TRACING_EXPORTER = ""
+    with tracing.span("anything") as span:
+        assert span is None
+    assert tracing.parse_traceparent("00-" + "0" * 32 + "-" + "1" * 16 + "-01") is None
+    assert tracing.parse_traceparent("garbage") is None
+
+
+def test_supabase_client_and_bucket_are_resolved_once_per_process(monkeypatch):
+    create_client = Mock(return_value=FakeSupabaseClient(buckets=[SimpleNamespace(name="image-verifications")]))
+    monkeypatch.setattr(supabase_storage, "create_client", create_client)
+    monkeypatch.setattr(supabase_storage, "_client", None)
+    monkeypatch.setattr(supabase_storage, "_bucket_ready", False)
+
+    assert supabase_storage.get_supabase_client() is supabase_storage.get_supabase_client()
+    create_client.assert_called_once()
+
+    failing = Mock(side_effect=[{"success": False, "error": "down"}, {"success": True, "created": False}])
+    monkeypatch.setattr(supabase_storage, "create_bucket_if_not_exists", failing)
+
+    assert supabase_storage.ensure_bucket_exists()["success"] is False
+    assert supabase_storage.ensure_bucket_exists() == {"success": True, "created": False}
+    assert supabase_storage.ensure_bucket_exists()["cached"] is True
+    assert failing.call_count == 2
+
+
+@pytest.mark.django_db
+def test_image_task_records_llm_usage_with_estimated_cost(monkeypatch):
+    user_id = uuid.uuid4()
+    verification = ImageVerification.objects.create(
+        supabase_user_id=user_id,
+        user_email="user@example.com",
+        image_path="path/pic.png",
+        image_url="https://image.test/pic.png",
+        original_filename="pic.png",
+        verification_type="ai_detection",
+        status="EN_COURS",
+        explanation="pending",
+    )
+
+    def fake_detect(image_url, on_usage=None):
+        on_usage({
+            "operation": "ai_detection",
+            "model": "openai/gpt-4.1-mini",
+            "prompt_tokens": 2000,
+            "completion_tokens": 500,
+            "latency_ms": 1800,
+        })
+        return {"statut": "AUTHENTIQUE", "explication": "ok", "confidence": 80, "details": {}}
+
+    monkeypatch.setattr("core.tasks.detect_ai_generated_image", fake_detect)
+
+    detect_ai_image_task.run(verification.id, verification.image_url)
+
+    usage = LLMUsage.objects.get()
+    assert usage.image_verification_id == verification.id
+    assert usage.supabase_user_id == user_id
+    # 2000 * 0.40 + 500 * 1.60 USD per million tokens
+    assert float(usage.cost_usd) == pytest.approx(0.0016)
+
+
+@pytest.mark.django_db
+def test_llm_usage_report_aggregates_per_user_day_and_prompt(settings):
+    settings.LLM_PRICES = '{"test/model": [1, 2]}'
+    alice, bob = uuid.uuid4(), uuid.uuid4()
+    usages = [
+        {"operation": "fact_check", "model": "test/model", "prompt_tokens": 1000, "completion_tokens": 100, "latency_ms": 900},
+        {"operation": "fact_check", "model": "test/model", "prompt_tokens": 3000, "completion_tokens": 300, "latency_ms": 1100},
+    ]
+    llm_usage.record_llm_usage(usages, user_id=alice)
+    llm_usage.record_llm_usage(usages[:1], user_id=bob)
+
+    report = llm_usage.usage_report(user_id=alice)
+
+    assert report["totals"]["calls"] == 2
+    assert report["totals"]["prompt_tokens"] == 4000
+    assert float(report["totals"]["cost_usd"]) == pytest.approx(0.0048)
+    assert [(row["supabase_user_id"], row["calls"]) for row in report["per_user_day"]] == [(alice, 2)]
+    prompt = report["per_prompt"][0]
+    assert (prompt["operation"], prompt["avg_prompt_tokens"], prompt["avg_latency_ms"]) == ("fact_check", 2000, 1000)
+    assert llm_usage.estimate_cost("unknown/model", 10, 10) == 0
+
+    from django.core.management import call_command
+
+    output = io.StringIO()
+    call_command("llm_usage_report", "--days", "1", stdout=output)
+    assert "3 calls" in output.getvalue()
+
+
+def test_rate_limit_takes_tokens_and_fails_open(monkeypatch, settings):
+    settings.RATE_LIMIT_VERIFICATIONS_PER_MINUTE = 6
+    settings.RATE_LIMIT_VERIFICATIONS_BURST = 3
+    redis = Mock(eval=Mock(return_value=[0, "0.5", "4.5"]))
+    monkeypatch.setattr(rate_limit, "get_redis_client", lambda: redis)
+    throttled = metrics.THROTTLED_REQUESTS.labels(scope="verifications")
+    before = throttled._value.get()
+
+    result = rate_limit.take(rate_limit.VERIFICATIONS, "user-1")
+
+    assert result == {"allowed": False, "remaining": 0, "retry_after": 4.5}
+    keys_and_args = redis.eval.call_args.args[1:]
+    assert keys_and_args[:4] == (1, "ratelimit:verifications:user-1", 3, 0.1)
+    assert rate_limit.take(rate_limit.VERIFICATIONS, "user-1", cost=4)["allowed"] is False
+    assert throttled._value.get() == before + 2
+
+    redis.eval.side_effect = ConnectionError("down")
+    assert rate_limit.take(rate_limit.VERIFICATIONS, "user-1")["allowed"] is True
+    monkeypatch.setattr(rate_limit, "get_redis_client", lambda: None)
+    assert rate_limit.take(rate_limit.VERIFICATIONS, "user-1")["allowed"] is True
+
+
+def test_fair_queue_dispatches_users_round_robin_within_slots(monkeypatch, settings):
+    settings.FAIR_QUEUE_MAX_IN_FLIGHT = 1
+    redis = FakeFairQueueRedis()
+    sent = []
+    task = SimpleNamespace(
+        name="core.tasks.fake_task",
+        apply_async=lambda args, kwargs, task_id: sent.append((args[0], task_id)),
+    )
+    monkeypatch.setattr(fair_queue, "get_redis_client", lambda: redis)
+    monkeypatch.setattr(fair_queue, "current_app", SimpleNamespace(tasks={task.name: task}))
+
+    ids = {label: fair_queue.submit(task, user, label) for label, user in
+           [("a1", "alice"), ("a2", "alice"), ("a3", "alice"), ("b1", "bob")]}
+
+    assert [label for label, _ in sent] == ["a1"]
+    assert sent[0][1] == ids["a1"]
+    for label in ("a1", "a2", "b1"):
+        assert fair_queue.release(ids[label]) is True
+    assert [label for label, _ in sent] == ["a1", "a2", "b1", "a3"]
+    assert fair_queue.release("not-dispatched-here") is False
+
+    settings.FAIR_QUEUE_MAX_IN_FLIGHT = 0
+    direct = fair_queue.submit(task, "carol", "c1")
+    assert sent[-1] == ("c1", direct)
+
+
+def test_fair_queue_keeps_a_task_the_broker_refused(monkeypatch, settings):
+    settings.FAIR_QUEUE_MAX_IN_FLIGHT = 2
+    redis = FakeFairQueueRedis()
+    sent = []
+    broker_down = True
+
+    def apply_async(args, kwargs, task_id):
+        if broker_down:
+            raise ConnectionError("broker down")
+        sent.append(args[0])
+
+    task = SimpleNamespace(name="core.tasks.fake_task", apply_async=apply_async)
+    monkeypatch.setattr(fair_queue, "get_redis_client", lambda: redis)
+    monkeypatch.setattr(fair_queue, "current_app", SimpleNamespace(tasks={task.name: task}))
+
+    fair_queue.submit(task, "alice", "a1")
+    fair_queue.submit(task, "alice", "a2")
+    assert sent == [] and redis.inflight == {}
+
+    broker_down = False
+    assert fair_queue.dispatch() == 2
+    assert sent == ["a1", "a2"]
+
+
+def test_fair_queue_publishes_queued_tasks_in_the_submitter_trace(monkeypatch, settings):
+    settings.FAIR_QUEUE_MAX_IN_FLIGHT = 1
+    settings.TRACING_EXPORTER = "file"
+    redis = FakeFairQueueRedis()
+    published = []
+
+    def apply_async(args, kwargs, task_id):
+        headers = {}
+        tracing.inject_task_headers(headers=headers)
+        published.append((args[0], headers.get("traceparent")))
+
+    task = SimpleNamespace(name="core.tasks.fake_task", apply_async=apply_async)
+    monkeypatch.setattr(fair_queue, "get_redis_client", lambda: redis)
+    monkeypatch.setattr(fair_queue, "current_app", SimpleNamespace(tasks={task.name: task}))
+    monkeypatch.setattr(tracing, "_exporter", lambda: Mock())
+
+    with tracing.span("alice request") as alice:
+        first = fair_queue.submit(task, "alice", "a1")
+        fair_queue.submit(task, "alice", "a2")
+    # a2 is sent when a1 ends, from another user's request
+    with tracing.span("bob request") as bob:
+        fair_queue.release(first)
+
+    assert published == [("a1", alice.traceparent), ("a2", alice.traceparent)]
+    assert bob.traceparent not in dict(published).values()
+    assert tracing.current_span() is None
+
+
+def test_text_stages_are_routed_to_cpu_and_io_queues(monkeypatch):
+    from config.celery import app
+
+    def queue(task_name):
+        return app.amqp.router.route({}, task_name)["queue"].name
+
+    assert queue(classify_submission_task.name) == "cpu"
+    assert queue("core.tasks.extract_fact_keywords_task") == "cpu"
+    assert queue(analyze_submission_text_task.name) == "celery"
+    assert queue(research_submission_task.name) == "celery"
+
+    released = []
+    monkeypatch.setattr(fair_queue, "release", released.append)
+    handoff = {"success": True, "submission_id": 1, "task_id": "next"}
+
+    assert fair_queue.release_finished("entry", {}, handoff) is False
+    fair_queue.release_finished("last", {"progress_id": "entry"}, {"success": True, "status": "vérifié"})
+    fair_queue.release_finished("failed", {}, {"success": False, "error": "boom"})
+    assert released == ["entry", "failed"]
+
+
+def test_stage_tracker_resumes_stages_of_the_previous_task(monkeypatch):
+    monkeypatch.setattr(progress, "get_redis_client", lambda: None)
+    task = SimpleNamespace(request=SimpleNamespace(is_eager=False), update_state=Mock())
+    first = progress.StageTracker("task-1", task=task)
+    first("translated", translated_text="Claim")
+
+    second = progress.StageTracker("task-1", task=task, resume=first.snapshot())
+    second("classified", initial_result="vérifié")
+
+    meta = task.update_state.call_args.kwargs["meta"]
+    assert [stage["stage"] for stage in meta["stages"]] == ["translated", "classified"]
+    assert meta["partial"] == {"translated_text": "Claim", "initial_result": "vérifié"}
+
+
+def test_circuit_breaker_opens_on_failures_or_slow_calls_and_probes_when_half_open(monkeypatch, settings):
+    settings.CIRCUIT_BREAKER_MIN_CALLS = 2
+    settings.CIRCUIT_BREAKER_OPEN_SECONDS = 30
+    settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS = 10
+    redis = FakeBreakerRedis()
+    clock = [1000.0]
+    monkeypatch.setattr(circuit_breaker, "get_redis_client", lambda: redis)
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(time=lambda: clock[0], perf_counter=lambda: clock[0]))
+    breaker = circuit_breaker.CircuitBreaker("fake_provider")
+    state = metrics.BREAKER_STATE.labels(provider="fake_provider")
+    rejections = metrics.BREAKER_REJECTIONS.labels(provider="fake_provider")
+
+    breaker.record(False, 1)
+    assert breaker.allow() is True
+    breaker.record(True, 1)
+    assert breaker.is_open() is True  # 1 failure out of 2 calls reaches the 50 % rate
+    assert state._value.get() == 2
+    with pytest.raises(circuit_breaker.CircuitOpenError):
+        with breaker.guard():
+            raise AssertionError("the provider must not be called")
+    assert rejections._value.get() == 1
+
+    clock[0] += 31
+    assert breaker.is_open() is False
+    assert breaker.allow() is True  # Half-open: only this probe goes out
+    assert breaker.allow() is False
+    breaker.record(True, 1)
+    assert redis.hashes["breaker:fake_provider"]["state"] == "closed"
+    assert state._value.get() == 0
+
+    for _ in range(2):
+        with breaker.guard() as call:
+            clock[0] += 12  # Slower than CIRCUIT_BREAKER_SLOW_CALL_SECONDS
+            call.success = True
+    assert breaker.is_open() is True
+    transitions = metrics.BREAKER_TRANSITIONS.labels(provider="fake_provider", state="open")
+    assert transitions._value.get() == 2
+
+    monkeypatch.setattr(circuit_breaker, "get_redis_client", lambda: None)
+    assert breaker.allow() is True and breaker.is_open() is False
+
+
+@pytest.mark.django_db
+def test_research_claim_degrades_to_classifier_and_cached_sources_while_breakers_are_open(monkeypatch, settings):
+    settings.DEGRADED_MIN_CONFIDENCE = 0.9
+    cached = [{"title": "Earlier source", "link": "https://earlier.test", "snippet": "Known"}]
+    Submission.objects.create(
+        supabase_user_id=uuid.uuid4(), user_email="user@example.com", texte="Claim", web_sources=cached
+    )
+    submission = Submission.objects.create(supabase_user_id=uuid.uuid4(), user_email="user@example.com", texte="Claim")
+    monkeypatch.setattr(circuit_breaker.PERPLEXITY, "is_open", lambda: True)
+    monkeypatch.setattr(circuit_breaker.OPENROUTER, "is_open", lambda: True)
+    search = Mock()
+    llm_call = Mock()
+    monkeypatch.setattr(ai_analysis, "search_with_perplexity", search)
+    monkeypatch.setattr(ai_analysis, "llm_analysis", llm_call)
+
+    analysis, sources = ai_analysis.research_claim("claim", "Claim", "rejeté", confidence=0.95)
+
+    assert sources == cached
+    assert analysis["statut"] == "FAUSSE"
+    assert analysis["mode_degrade"] is True
+    assert analysis["sources_principales"] == ["https://earlier.test"]
+    search.assert_not_called()
+    llm_call.assert_not_called()
+    assert ai_analysis.research_claim("Claim", "Claim", "vérifié", confidence=0.6)[0]["statut"] == "INDÉTERMINÉE"
+
+    # A confident degraded VRAIE is saved but not added to the fact library
+    result = research_submission_task.run(submission.id, "Claim", "Claim", "vérifié", confidence=0.97)
+    submission.refresh_from_db()
+    assert result["degraded"] is True
+    assert submission.statut == "vérifié"
+    assert not Fact.objects.exists()
+
+
+@pytest.mark.django_db
+def test_submission_tasks_run_once_and_never_overwrite_a_saved_result(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(idempotency, "get_redis_client", lambda: redis)
+    submission = Submission.objects.create(
+        supabase_user_id=uuid.uuid4(), user_email="user@example.com", texte="Claim"
+    )
+    research = Mock(return_value=({"statut": "VRAIE", "explication": "Yes", "sources_principales": []}, []))
+    monkeypatch.setattr("core.tasks.research_claim", research)
+    monkeypatch.setattr("core.tasks.extract_fact_keywords_task.delay", Mock())
+
+    first = research_submission_task.run(submission.id, "Claim", "Claim", "vérifié", progress_id="chain-1")
+    assert first["status"] == "vérifié"
+
+    # Redelivered while the submission is still "en cours": the run is already claimed
+    Submission.objects.filter(id=submission.id).update(statut="en cours")
+    redelivered = research_submission_task.run(submission.id, "Claim", "Claim", "vérifié", progress_id="chain-1")
+    assert redelivered["skipped"] is True
+    assert research.call_count == 1
+
+    # Finished submissions are not analysed again
+    Submission.objects.filter(id=submission.id).update(statut="vérifié")
+    translate = Mock()
+    monkeypatch.setattr("core.tasks.translate_text", translate)
+    assert analyze_submission_text_task.run(submission.id, "Claim")["skipped"] is True
+    assert research_submission_task.run(submission.id, "Claim", "Claim", "vérifié", progress_id="chain-2")["skipped"]
+    translate.assert_not_called()
+
+    # Another run saved its result first: this one neither overwrites it nor adds a fact
+    Submission.objects.filter(id=submission.id).update(statut="en cours")
+    Fact.objects.all().delete()
+
+    def finished_elsewhere(*args, **kwargs):
+        Submission.objects.filter(id=submission.id).update(statut="rejeté", detailed_result="Other run")
+        return {"statut": "VRAIE", "explication": "Late", "sources_principales": []}, []
+
+    monkeypatch.setattr("core.tasks.research_claim", finished_elsewhere)
+    late = research_submission_task.run(submission.id, "Claim", "Claim", "vérifié", progress_id="chain-3")
+
+    submission.refresh_from_db()
+    assert late == {"success": True, "skipped": True, "record_id": submission.id, "status": "rejeté"}
+    assert submission.detailed_result == "Other run"
+    assert not Fact.objects.exists()
+
+
+@pytest.mark.django_db
+def test_transient_errors_are_retried_then_fail_like_before(monkeypatch):
+    submission = Submission.objects.create(
+        supabase_user_id=uuid.uuid4(), user_email="user@example.com", texte="Claim"
+    )
+    research = Mock(side_effect=errors.TransientError("openrouter", "HTTP 502"))
+    monkeypatch.setattr("core.tasks.research_claim", research)
+    release = Mock()
+    monkeypatch.setattr("core.tasks.release_run", release)
+    exhausted = metrics.TASK_RETRIES_EXHAUSTED.labels(task=research_submission_task.name)
+    before = exhausted._value.get()
+
+    # Attempts left: Celery schedules a retry with backoff and the submission stays "en cours"
+    retry = Mock(side_effect=Retry("retry"))
+    monkeypatch.setattr(research_submission_task, "retry", retry)
+    research_submission_task.push_request(called_directly=False, retries=0)
+    try:
+        with pytest.raises(Retry):
+            research_submission_task.run(submission.id, "Claim", "Claim", "vérifié", progress_id="chain-1")
+    finally:
+        research_submission_task.pop_request()
+    submission.refresh_from_db()
+    assert submission.statut == "en cours"
+    assert isinstance(retry.call_args.kwargs["exc"], errors.TransientError)
+    assert 0 <= retry.call_args.kwargs["countdown"] <= research_submission_task.retry_backoff
+    release.assert_called_once_with(f"research:{submission.id}:chain-1")
+
+    # Last attempt: marked as failed as before
+    research_submission_task.push_request(called_directly=False, retries=research_submission_task.max_retries)
+    try:
+        failed = research_submission_task.run(submission.id, "Claim", "Claim", "vérifié", progress_id="chain-1")
+    finally:
+        research_submission_task.pop_request()
+    submission.refresh_from_db()
+    assert failed["success"] is False
+    assert submission.statut == "rejeté"
+    assert "HTTP 502" in submission.detailed_result
+    assert exhausted._value.get() == before + 1
+
+    # A permanent error is not retried
+    Submission.objects.filter(id=submission.id).update(statut="en cours")
+    monkeypatch.setattr("core.tasks.translate_text", Mock(side_effect=ValueError("bad input")))
+    analyze_submission_text_task.push_request(called_directly=False, retries=0)
+    try:
+        assert analyze_submission_text_task.run(submission.id, "Claim")["success"] is False
+    finally:
+        analyze_submission_text_task.pop_request()
+
+
+def test_llm_analysis_raises_transient_errors_instead_of_a_fallback_verdict(monkeypatch):
+    import httpx
+    from openai import InternalServerError
+
+    response = httpx.Response(502, request=httpx.Request("POST", "https://openrouter.test"))
+    client = FakeOpenAIClient(side_effect=InternalServerError("Bad gateway", response=response, body=None))
+    monkeypatch.setattr(llm, "client", client)
+
+    with pytest.raises(errors.TransientError):
+        llm.llm_analysis("Claim", "vérifié", [])
+
+    client.chat.completions.side_effect = ValueError("unexpected")
+    assert llm.llm_analysis("Claim", "vérifié", [])["statut"] == "VRAIE"  # Fallback kept for other errors
+
+
+@pytest.mark.django_db
+def test_nightly_reverification_pages_through_stale_rows_and_records_verdict_changes(monkeypatch, settings):
+    settings.REVERIFY_PAGE_SIZE = 1
+    now = timezone.now()
+
+    def submission(texte, verdict="INDÉTERMINÉE", checked_days_ago=2, **fields):
+        row = Submission.objects.create(
+            supabase_user_id=uuid.uuid4(), user_email="user@example.com", texte=texte,
+            statut="rejeté", verdict=verdict, verified_at=now - timedelta(days=checked_days_ago),
+        )
+        Submission.objects.filter(id=row.id).update(**fields)
+        return row
+
+    undetermined = submission("Undetermined claim")
+    duplicate = submission("undetermined  CLAIM")  # Same text: checked once per run
+    submission("Checked today", checked_days_ago=0)
+    submission("Too old", date=now - timedelta(days=60))
+    submission("Already false", verdict="FAUSSE")
+    stale_fact = Fact.objects.create(texte="Stale fact", source="https://a.test", verified_at=now - timedelta(days=100))
+    Fact.objects.create(texte="Fresh fact", source="https://b.test", verified_at=now)
+
+    assert reverification.select_candidates() == [["submission", undetermined.id], ["fact", stale_fact.id]]
+
+    verdicts = {"Undetermined claim": "VRAIE", "Stale fact": "FAUSSE"}
+
+    def research(text, translated_text, initial_result, on_usage=None, confidence=None, use_cache=True):
+        assert use_cache is False  # Re-verification looks for new sources
+        on_usage({"operation": "fact_check", "model": "openai/gpt-4o-mini", "prompt_tokens": 1000,
+                  "completion_tokens": 100, "latency_ms": 5})
+        return {"statut": verdicts[text], "explication": "New sources", "sources_principales": ["https://new.test"]}, []
+
+    monkeypatch.setattr("core.tasks.translate_text", lambda text: text)
+    monkeypatch.setattr("core.tasks.classify_text", Mock(return_value=("vérifié", 0.6)))
+    monkeypatch.setattr(reverification, "research_claim", research)
+    monkeypatch.setattr("core.tasks.extract_fact_keywords_task.delay", Mock())
+
+    assert reverify_stale_verdicts_task.run(concurrency=2) == {"success": True, "selected": 2, "chunks": 2}
+
+    undetermined.refresh_from_db()
+    stale_fact.refresh_from_db()
+    assert (undetermined.verdict, undetermined.statut) == ("VRAIE", "vérifié")
+    assert stale_fact.verdict == "FAUSSE"
+    assert Fact.objects.filter(texte="Undetermined claim", verdict="VRAIE").exists()
+    changes = {(change.previous_verdict, change.new_verdict) for change in VerdictChange.objects.all()}
+    assert changes == {("INDÉTERMINÉE", "VRAIE"), ("VRAIE", "FAUSSE")}
+    assert LLMUsage.objects.filter(submission=undetermined).count() == 1
+    assert reverification.select_candidates() == [["submission", duplicate.id]]
+
+
+@pytest.mark.django_db
+def test_reverification_chunk_stops_on_budget_or_unavailable_provider(monkeypatch, settings):
+    fact = Fact.objects.create(texte="Fact", source="https://a.test")
+    rerun = Mock(side_effect=errors.TransientError("perplexity"))
+    monkeypatch.setattr(reverification, "reverify_claim", rerun)
+    monkeypatch.setattr("core.tasks.translate_text", lambda text: text)
+    monkeypatch.setattr("core.tasks.classify_text", Mock(return_value=("vérifié", 0.6)))
+
+    assert reverify_claims_task.run([["fact", fact.id]], 0)["stopped"] == "budget"
+    assert reverify_claims_task.run([["fact", fact.id]], 1)["stopped"] == "provider_unavailable"
+    monkeypatch.setattr(reverification, "providers_available", lambda: False)
+    assert reverify_claims_task.run([["fact", fact.id]], 1)["stopped"] == "provider_unavailable"
+    assert rerun.call_count == 1
+
+    # Degraded or undetermined results never retract a fact
+    monkeypatch.setattr(reverification, "providers_available", lambda: True)
+    for verdict in (None, "INDÉTERMINÉE"):
+        rerun = Mock(return_value={"verdict": verdict, "analysis": {}, "web_sources": [], "usages": [], "cost_usd": 0.0})
+        monkeypatch.setattr(reverification, "reverify_claim", rerun)
+        assert reverify_claims_task.run([["fact", fact.id]], 1)["changed"] == 0
+    fact.refresh_from_db()
+    assert fact.verdict == "VRAIE"
+    assert fact.verified_at is not None
+    assert not VerdictChange.objects.exists()
+
+    # Each Perplexity search counts in the budget: no search once it would exceed it
+    settings.REVERIFY_SEARCH_COST_USD = 0.01
+    second = Fact.objects.create(texte="Other fact", source="https://b.test")
+    rerun = Mock(return_value={"verdict": "VRAIE", "analysis": {}, "web_sources": [], "usages": [], "cost_usd": 0.01})
+    monkeypatch.setattr(reverification, "reverify_claim", rerun)
+    summary = reverify_claims_task([["fact", fact.id], ["fact", second.id]], 0.015)
+    assert (summary["checked"], summary["stopped"]) == (1, "budget")
+    assert rerun.call_count == 1
+
+    # So does the LLM: the average LLM cost of the chunk is reserved before each claim
+    rerun = Mock(return_value={"verdict": "VRAIE", "analysis": {}, "web_sources": [], "usages": [], "cost_usd": 0.03})
+    monkeypatch.setattr(reverification, "reverify_claim", rerun)
+    summary = reverify_claims_task([["fact", fact.id], ["fact", second.id]], 0.05)
+    assert (summary["checked"], summary["stopped"]) == (1, "budget")
+    settings.REVERIFY_LLM_COST_USD = 0.04
+    assert reverify_claims_task([["fact", fact.id]], 0.05)["checked"] == 0
+    assert rerun.call_count == 1
+
+
+def test_reverification_classifies_on_cpu_and_searches_on_the_network_queue():
+    from config.celery import app
+
+    def queue(task_name):
+        return app.amqp.router.route({}, task_name)["queue"].name
+
+    assert queue(reverify_claims_task.name) == "celery"
+    assert queue("core.tasks.classify_reverification_task") == "cpu"
+    assert queue("core.tasks.research_reverification_task") == "celery"
+
+
+def test_claim_import_reads_ndjson_lines_and_reports_invalid_ones(settings):
+    lines = [
+        b'{"text": "Claim one", "url": "https://a.test"}\n',
+        b"\n",
+        b"not json\n",
+        b'["a list"]\n',
+        b'{"texte": "Claim two", "source": "https://' + b"x" * 200 + b'.test"}\n',
+        b'{"claim": "Claim three"}\n',
+    ]
+
+    parsed = claim_import.parse_claims(lines, claim_import.NDJSON)
+
+    assert parsed["claims"] == [(1, "Claim one", "https://a.test"), (6, "Claim three", "")]
+    assert [line["line"] for line in parsed["rejected"]] == [3, 4, 5]
+    with pytest.raises(claim_import.ClaimImportError):
+        claim_import.parse_claims(lines, claim_import.NDJSON, max_claims=1)
+    assert claim_import.detect_format("claims.jsonl") == claim_import.NDJSON
+
+
+def test_fair_queue_submit_many_queues_every_task_before_dispatching(monkeypatch, settings):
+    settings.FAIR_QUEUE_MAX_IN_FLIGHT = 8
+    client = Mock()
+    client.eval.return_value = 1
+    monkeypatch.setattr(fair_queue, "get_redis_client", lambda: client)
+    dispatch = Mock()
+    monkeypatch.setattr(fair_queue, "dispatch", dispatch)
+    task = Mock()
+    task.name = "core.tasks.analyze_submission_text_task"
+
+    task_ids = fair_queue.submit_many(task, "user-1", [(1, "a"), (2, "b")])
+
+    assert len(set(task_ids)) == 2
+    assert client.eval.call_count == 2
+    dispatch.assert_called_once_with()
+    task.apply_async.assert_not_called()
+
+    # Redis down: the rest of the chunk goes straight to Celery
+    client.eval.side_effect = ConnectionError("down")
+    fair_queue.submit_many(task, "user-1", [(3, "c"), (4, "d")])
+    assert client.eval.call_count == 3
+    assert task.apply_async.call_count == 2
+
+
+def test_source_urls_are_canonicalized():
+    assert sources.canonical_url("HTTPS://www.Example.org/news/?utm_source=x&id=3#top") == "https://example.org/news?id=3"
+    assert sources.canonical_url("http://example.org:8080/a/") == "http://example.org:8080/a"
+    assert sources.canonical_url("mailto:someone@example.org") == ""
+    assert sources.domain_of("WWW.Example.org") == "example.org"
+    # Invalid ports are rejected like any unparsable URL, also by the frozen backfill copy
+    migration = importlib.import_module("core.migrations.0017_source")
+    for url in ("https://example.org:99999/a", "https://example.org:abc/a"):
+        assert sources.canonical_url(url) == ""
+        assert migration.canonical_url(url) == ""
+
+
+@pytest.mark.django_db
+def test_sources_are_linked_once_per_url_and_backfilled_in_batches():
+    user_id = uuid.uuid4()
+    shared = [
+        {"title": "Report", "link": "https://www.example.org/report?utm_medium=social", "date": "2026-05-01"},
+        {"title": "Same report", "link": "https://example.org/report/"},
+    ]
+    facts = [
+        Fact.objects.create(texte=f"Fact {i}", source="https://a.test", web_sources=shared + [{"url": f"https://other.test/{i}"}])
+        for i in range(3)
+    ]
+    Fact.objects.create(texte="No sources", source="https://a.test", web_sources=None)
+    submission = Submission.objects.create(
+        supabase_user_id=user_id, user_email="user@example.com", texte="Claim",
+        web_sources=[{"link": "https://example.org/report"}, "not a source", {"link": "ftp://files.test/x"}],
+    )
+
+    migration = importlib.import_module("core.migrations.0017_source")
+    assert migration.backfill(Source, Fact, batch_size=2) == 3
+    assert migration.backfill(Source, Submission, batch_size=2) == 1
+    migration.backfill(Source, Fact, batch_size=2)  # Running again adds nothing
+
+    report = Source.objects.get(url="https://example.org/report")
+    assert (report.domain, report.title, str(report.published)) == ("example.org", "Report", "2026-05-01")
+    assert Source.objects.count() == 4
+    assert set(report.facts.values_list("id", flat=True)) == {fact.id for fact in facts}
+    assert list(Submission.objects.filter(sources__domain="example.org")) == [submission]
+    assert facts[0].sources.count() == 2
+
+    sources.link_sources(facts[0], [{"link": "https://new.test/a"}])
+    assert list(facts[0].sources.values_list("url", flat=True)) == ["https://new.test/a"]
+
+
+@pytest.mark.django_db
+def test_domain_reliability_counts_verdicts_incrementally_and_hints_the_prompt(monkeypatch, settings):
+    from core import tasks
+
+    monkeypatch.setattr("core.tasks.extract_fact_keywords_task.delay", Mock())
+
+    def submission(texte):
+        return Submission.objects.create(
+            supabase_user_id=uuid.uuid4(), user_email="user@example.com", texte=texte, statut="en cours",
+        )
+
+    def counts():
+        return {
+            row.domain: (row.vraie, row.fausse, row.indeterminee)
+            for row in DomainReliability.objects.all()
+        }
+
+    false_claim = submission("False claim")
+    cited_twice = [{"link": "https://www.news.example.org/a"}, {"link": "https://news.example.org/b"}]
+    tasks._save_submission_result(
+        false_claim, {"statut": "FAUSSE", "explication": "Wrong"}, cited_twice + [{"link": "https://other.test/c"}], Mock()
+    )
+    tasks._save_submission_result(
+        submission("Unclear claim"), {"statut": "VRAIE", "explication": "Provisional", "mode_degrade": True}, cited_twice, Mock()
+    )
+    assert counts() == {"news.example.org": (0, 1, 1), "other.test": (0, 1, 0)}
+
+    # The re-verification moves the claim's verdict from its old domains to its new ones
+    false_claim.refresh_from_db()
+    outcome = tasks._apply_submission_reverification(false_claim, {
+        "verdict": "VRAIE", "analysis": {"explication": "New sources"},
+        "web_sources": [{"link": "https://news.example.org/d"}, {"link": "https://new.test/e"}],
+    })
+    assert outcome == "changed"
+    assert counts() == {"news.example.org": (1, 0, 1), "other.test": (0, 0, 0), "new.test": (1, 0, 0)}
+    assert DomainReliability.objects.get(domain="new.test").last_seen is not None
+
+    # The migration backfill finds the same counts from the Source links
+    # (without the domains no claim cites any more)
+    incremental = counts()
+    DomainReliability.objects.all().delete()
+    migration = importlib.import_module("core.migrations.0018_domainreliability")
+    assert migration.backfill(DomainReliability, Submission) == 2
+    assert counts() == {domain: row for domain, row in incremental.items() if any(row)}
+
+    settings.DOMAIN_RELIABILITY_MIN_VERDICTS = 2
+    web_sources = [{"title": "D", "link": "https://www.news.example.org/d"}, {"title": "E", "link": "https://new.test/e"}]
+    hints = domain_reliability.hints(web_sources)
+    assert hints == {"news.example.org": "cité par 2 déclarations vérifiées (1 VRAIES, 0 FAUSSES, 1 INDÉTERMINÉES)"}
+    user = prompt_builder.build_fact_check_prompt("claim", "vérifié", web_sources, "", "01/01/2026", hints)["messages"][-1]["content"]
+    assert user.count("HISTORIQUE DU DOMAINE") == 1
+    assert "   HISTORIQUE DU DOMAINE: cité par 2" in user.split("2. TITRE")[0]
+
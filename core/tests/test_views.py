@@ -1,10 +1,17 @@
+import hashlib
+import json
 import uuid
+from datetime import timedelta
 from unittest.mock import Mock, patch
+from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from core.models import Fact, Keyword, Submission
+from core.models import DomainReliability, Fact, ImageBlob, Keyword, Submission, SubmissionBatch
+from core.services import sources
+from core.tasks import upload_and_verify_image_task
 
 
 class MockSupabaseUser:
@@ -14,9 +21,29 @@ class MockSupabaseUser:
         self.id = uuid.uuid4()
         self.email = "testuser@example.com"
         self.user_metadata = {"full_name": "Test User"}
+        self.app_metadata = {}
         self.is_authenticated = True
 
 
+class FakeKeyValueRedis:
+    """Minimal Redis strings for idempotency keys."""
+
+    def __init__(self):
+        self.values = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def delete(self, key):
+        return int(self.values.pop(key, None) is not None)
+
+
 class PublicEndpointTest(TestCase):
     """Test endpoints that don't require authentication."""
 
@@ -29,6 +56,39 @@ class PublicEndpointTest(TestCase):
         # but we test the model was created
         self.assertEqual(Fact.objects.count(), 1)
 
+    def test_facts_filtered_by_cited_domain(self):
+        self.client.force_authenticate(user=MockSupabaseUser())
+        cited = Fact.objects.create(texte="Cited fact", source="https://example.com")
+        Fact.objects.create(texte="Other fact", source="https://example.com")
+        sources.link_sources(cited, [
+            {"link": "https://www.news.example.org/a"}, {"link": "https://news.example.org/b"}
+        ])
+
+        response = self.client.get("/api/facts/?domain=https://www.News.example.org/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"] if isinstance(response.data, dict) else response.data
+        self.assertEqual([fact["texte"] for fact in results], ["Cited fact"])
+        self.assertNotIn("sources", results[0])
+
+    def test_domain_reliability_list_and_detail(self):
+        self.client.force_authenticate(user=MockSupabaseUser())
+        DomainReliability.objects.create(domain="old.example.org", vraie=1, last_seen=timezone.now() - timedelta(days=1))
+        DomainReliability.objects.create(domain="news.example.org", vraie=6, fausse=2, indeterminee=1, last_seen=timezone.now())
+
+        response = self.client.get("/api/domains/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"] if isinstance(response.data, dict) else response.data
+        self.assertEqual([row["domain"] for row in results], ["news.example.org", "old.example.org"])
+
+        response = self.client.get("/api/domains/www.News.example.org/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {key: response.data[key] for key in ("vraie", "fausse", "indeterminee", "total", "score")},
+            {"vraie": 6, "fausse": 2, "indeterminee": 1, "total": 9, "score": 0.75},
+        )
+        self.assertEqual(self.client.get("/api/domains/unknown.test/").status_code, status.HTTP_404_NOT_FOUND)
+
     def test_keywords_list(self):
         Keyword.objects.create(mot="test-keyword")
         self.assertEqual(Keyword.objects.count(), 1)
@@ -46,6 +106,50 @@ class SubmissionViewTest(TestCase):
         response = self.client.post("/api/submissions/", {"texte": "test claim"})
         self.assertIn(response.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN])
 
+    @patch("core.views.rate_limit.take", return_value={"allowed": False, "remaining": 0, "retry_after": 4.2})
+    def test_submit_is_throttled_per_user(self, take):
+        self.client.force_authenticate(user=self.mock_user)
+
+        response = self.client.post("/api/submissions/", {"texte": "test claim"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "5")
+        self.assertEqual(response.data["retry_after"], 5)
+        take.assert_called_once_with("verifications", self.mock_user.id, 1)
+        self.assertFalse(Submission.objects.exists())
+
+    @patch("core.views.fair_queue.submit", return_value="task-1")
+    def test_submit_with_idempotency_key_is_replayed(self, submit):
+        redis = FakeKeyValueRedis()
+        self.client.force_authenticate(user=self.mock_user)
+
+        with patch("core.services.idempotency.get_redis_client", return_value=redis):
+            first = self.client.post(
+                "/api/submissions/", {"texte": "test claim"}, format="json", HTTP_IDEMPOTENCY_KEY="key-1"
+            )
+            retry = self.client.post(
+                "/api/submissions/", {"texte": "test claim"}, format="json", HTTP_IDEMPOTENCY_KEY="key-1"
+            )
+            reused = self.client.post(
+                "/api/submissions/", {"texte": "other claim"}, format="json", HTTP_IDEMPOTENCY_KEY="key-1"
+            )
+            with patch("core.views.rate_limit.take", return_value={"allowed": False, "remaining": 0, "retry_after": 1}):
+                throttled = self.client.post(
+                    "/api/submissions/", {"texte": "test claim"}, format="json", HTTP_IDEMPOTENCY_KEY="key-2"
+                )
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.data["id"], first.data["id"])
+        self.assertEqual(retry.data["task_id"], "task-1")
+        self.assertEqual(reused.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Submission.objects.count(), 1)
+        submit.assert_called_once()
+        # A rejected request frees its key for a later retry
+        self.assertEqual(throttled.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertNotIn(f"idempotency:{self.mock_user.id}:key-2", redis.values)
+
     def test_user_submissions_requires_auth(self):
         """Unauthenticated requests to user submissions should be rejected."""
         response = self.client.get("/api/submissions/")
@@ -70,6 +174,274 @@ class ImageVerificationViewTest(TestCase):
         response = self.client.get("/api/image-verifications/")
         self.assertIn(response.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN])
 
+    def test_image_verifications_expose_derivative_urls(self):
+        from core.models import ImageBlob, ImageVerification
+
+        user = MockSupabaseUser()
+        blob = ImageBlob.objects.create(
+            sha256="c" * 64,
+            path="sha256/cc/c.jpg",
+            url="https://image.test/c.jpg",
+            thumbnail_url="https://image.test/c.thumbnail.webp",
+            preview_url="https://image.test/c.preview.webp",
+            ref_count=1,
+        )
+        common = {
+            "supabase_user_id": user.id,
+            "user_email": user.email,
+            "image_path": "sha256/cc/c.jpg",
+            "image_url": "https://image.test/c.jpg",
+            "original_filename": "c.jpg",
+            "verification_type": "ai_detection",
+            "status": "AUTHENTIQUE",
+            "explanation": "ok",
+            "confidence": 90,
+        }
+        ImageVerification.objects.create(blob=blob, **common)
+        ImageVerification.objects.create(**common)
+        self.client.force_authenticate(user=user)
+
+        response = self.client.get("/api/image-verifications/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        urls = {(item["thumbnail_url"], item["preview_url"]) for item in response.data}
+        self.assertEqual(
+            urls,
+            {
+                (None, None),
+                ("https://image.test/c.thumbnail.webp", "https://image.test/c.preview.webp"),
+            },
+        )
+
+
+class TaskStatusViewTest(TestCase):
+    """Test the task status endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = MockSupabaseUser()
+        self.client.force_authenticate(user=self.user)
+        self.redis = FakeKeyValueRedis()
+        self.redis.set("progress:owner:task-1", str(self.user.id))
+
+    def progress(self):
+        return Mock(
+            state="PROGRESS",
+            info={
+                "stage": "searched",
+                "stages": [{"stage": "translated", "elapsed_ms": 120}, {"stage": "searched", "elapsed_ms": 2400}],
+                "elapsed_ms": 2600,
+                "partial": {"sources": [{"link": "https://source.test"}]},
+            },
+        )
+
+    @patch("celery.result.AsyncResult")
+    def test_progress_state_exposes_stage_timings_and_partial_results(self, async_result):
+        async_result.return_value = self.progress()
+
+        with patch("core.views.get_redis_client", return_value=self.redis):
+            response = self.client.get("/api/task-status/task-1/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "EN_COURS")
+        self.assertEqual(response.data["stage"], "searched")
+        self.assertEqual(response.data["stages"][1]["elapsed_ms"], 2400)
+        self.assertEqual(response.data["partial"]["sources"][0]["link"], "https://source.test")
+        self.assertEqual(response.data["message"], "Dernière étape terminée: searched")
+
+    @patch("celery.result.AsyncResult")
+    def test_progress_details_are_hidden_from_other_users(self, async_result):
+        async_result.return_value = self.progress()
+        self.redis.set("progress:owner:task-1", str(uuid.uuid4()))
+
+        with patch("core.views.get_redis_client", return_value=self.redis):
+            response = self.client.get("/api/task-status/task-1/")
+        # Without Redis the owner cannot be checked: no details either
+        with patch("core.views.get_redis_client", return_value=None):
+            unchecked = self.client.get("/api/task-status/task-1/")
+
+        for response in (response, unchecked):
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["status"], "EN_COURS")
+            self.assertNotIn("partial", response.data)
+            self.assertNotIn("stages", response.data)
+
+
+    @patch("core.services.keywords_extractor.extract_keywords", Mock(return_value=[]))
+    @patch("core.tasks.research_claim")
+    @patch("core.tasks.classify_text", Mock(return_value=("vérifié", 0.9)))
+    @patch("core.tasks.translate_text", Mock(return_value="Claim to verify"))
+    def test_followed_task_succeeds_with_the_final_result_of_the_chain(self, research_claim):
+        from celery import Celery
+        from celery.backends.cache import CacheBackend
+        from config.celery import app
+        from core.tasks import analyze_submission_text_task, classify_submission_task, research_submission_task
+
+        research_claim.return_value = ({"statut": "FAUSSE", "explication": "Refuted"}, [])
+        submission = Submission.objects.create(
+            supabase_user_id=uuid.uuid4(), user_email="user@example.com", texte="Claim to verify"
+        )
+        backend = CacheBackend(app=app, backend="memory")
+
+        with patch.object(Celery, "backend", new=backend):
+            analyze_submission_text_task.apply(args=(submission.id, "Claim to verify"), task_id="chain-1")
+            response = self.client.get("/api/task-status/chain-1/")
+
+        # The hand-offs of the translation and classification tasks are never stored
+        for task in (analyze_submission_text_task, classify_submission_task, research_submission_task):
+            self.assertTrue(task.ignore_result)
+        self.assertEqual(response.data["state"], "SUCCESS")
+        self.assertEqual(response.data["result"]["submission_id"], submission.id)
+        self.assertEqual(response.data["result"]["status"], "rejeté")
+        self.assertNotIn("task_id", response.data["result"])
+
+class MetricsViewTest(TestCase):
+    """Test the Prometheus metrics endpoint."""
+
+    @override_settings(METRICS_TOKEN="scrape-token")
+    def test_metrics_are_exposed_in_prometheus_format(self):
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-token")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(b"checkia_stage_duration_seconds", response.content)
+
+    @override_settings(METRICS_TOKEN="scrape-token")
+    def test_metrics_token_is_enforced_when_configured(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-token")
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_metrics_are_closed_without_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer ")
+        self.assertEqual(response.status_code, 401)
+
+
+class TracingMiddlewareTest(TestCase):
+    """Test that requests open a server span continuing the caller's trace."""
+
+    @override_settings(TRACING_EXPORTER="file", METRICS_TOKEN="scrape-token")
+    def test_request_span_continues_incoming_traceparent(self):
+        from core import tracing
+
+        exported = []
+        traceparent = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+        with patch.object(tracing, "_exporter", return_value=Mock(export=exported.append)):
+            response = self.client.get(
+                "/metrics", HTTP_TRACEPARENT=traceparent, HTTP_AUTHORIZATION="Bearer scrape-token"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(exported), 1)
+        span = exported[0]
+        self.assertEqual(span.name, "GET /metrics")
+        self.assertEqual(span.trace_id, "a" * 32)
+        self.assertEqual(span.parent_id, "b" * 16)
+        self.assertEqual(span.attributes["http.status_code"], 200)
+
+
+class FakeAsyncPubSub:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.channels = []
+
+    async def subscribe(self, channel):
+        self.channels.append(channel)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=None):
+        return self.messages.pop(0) if self.messages else None
+
+    async def aclose(self):
+        pass
+
+
+class FakeAsyncRedis:
+    def __init__(self, owner, history=(), live=()):
+        self.owner = owner
+        self.history = [json.dumps(event) for event in history]
+        self.pubsub_instance = FakeAsyncPubSub(
+            {"type": "message", "data": json.dumps(event)} for event in live
+        )
+        self.closed = False
+
+    async def get(self, key):
+        return self.owner
+
+    async def lrange(self, key, start, end):
+        return self.history[start:]
+
+    def pubsub(self):
+        return self.pubsub_instance
+
+    async def aclose(self):
+        self.closed = True
+
+
+class TaskEventsViewTest(TestCase):
+    """Test the server-sent events progress stream."""
+
+    def setUp(self):
+        self.user = MockSupabaseUser()
+
+    async def _stream(self, redis, **extra):
+        with patch("core.views.get_async_redis_client", return_value=redis), patch(
+            "core.views.SupabaseAuthentication.authenticate_token", return_value=(self.user, "token")
+        ):
+            response = await self.async_client.get(
+                "/api/task-events/task-1/", {"access_token": "token"}, **extra
+            )
+            body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        return response, body
+
+    async def test_stream_replays_history_then_live_events_until_saved(self):
+        redis = FakeAsyncRedis(
+            owner=str(self.user.id),
+            history=[{"stage": "started"}, {"stage": "translated"}],
+            live=[{"stage": "translated", "seq": 2}, {"stage": "saved", "seq": 3}],
+        )
+
+        response, body = await self._stream(redis)
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(
+            [line for line in body.splitlines() if line.startswith("event:")],
+            ["event: started", "event: translated", "event: saved"],
+        )
+        self.assertIn("id: 3\n", body)
+        self.assertEqual(redis.pubsub_instance.channels, ["progress:task-1"])
+        self.assertTrue(redis.closed)
+
+    async def test_stream_resumes_after_last_event_id(self):
+        redis = FakeAsyncRedis(
+            owner=str(self.user.id),
+            history=[{"stage": "started"}, {"stage": "error", "error": "boom"}],
+        )
+
+        _, body = await self._stream(redis, headers={"Last-Event-ID": "1"})
+
+        self.assertNotIn("event: started", body)
+        self.assertIn("id: 2\nevent: error", body)
+
+    async def test_stream_rejects_other_users_tasks(self):
+        with patch("core.views.get_async_redis_client", return_value=FakeAsyncRedis(owner="someone-else")), patch(
+            "core.views.SupabaseAuthentication.authenticate_token", return_value=(self.user, "token")
+        ):
+            response = await self.async_client.get("/api/task-events/task-1/", {"access_token": "token"})
+
+        self.assertEqual(response.status_code, 404)
+
+    async def test_stream_requires_token_and_redis(self):
+        response = await self.async_client.get("/api/task-events/task-1/")
+        self.assertEqual(response.status_code, 401)
+
+        with patch(
+            "core.views.SupabaseAuthentication.authenticate_token", return_value=(self.user, "token")
+        ):
+            response = await self.async_client.get("/api/task-events/task-1/", {"access_token": "token"})
+        self.assertEqual(response.status_code, 503)
+
 
 class BambaraVoiceViewTest(TestCase):
     """Test Bambara voice proxy endpoints."""
@@ -143,3 +515,260 @@ class BambaraVoiceViewTest(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
         self.assertEqual(response.data["error"], "Bambara API is not configured")
+
+
+class ImageBatchViewTest(TestCase):
+    """Test the multi-file image verification endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.mock_user = MockSupabaseUser()
+
+    def test_batch_requires_auth(self):
+        response = self.client.post("/api/image-verifications/batch/")
+        self.assertIn(response.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN])
+
+    @patch("core.tasks.verify_image_content")
+    @patch("core.tasks.upload_image_derivatives", Mock(return_value={}))
+    @patch("core.tasks.get_image_url_from_supabase", lambda path: f"https://storage.test/{path}")
+    @patch("core.tasks.download_image_from_supabase", Mock(return_value=b"stored-bytes"))
+    @patch("core.tasks.upload_and_verify_image_task.chunks")
+    @patch("core.views.upload_image_to_supabase")
+    @patch("core.views.ensure_bucket_exists", Mock(return_value={"success": True}))
+    def test_batch_dedupes_files_and_reports_progress(self, upload_image_to_supabase, chunks, verify_image_content):
+        upload_image_to_supabase.side_effect = lambda image_file, user_id, verification_type: {
+            "success": True,
+            "file_path": f"{user_id}/{image_file.name}",
+            "public_url": f"https://storage.test/{image_file.name}",
+        }
+
+        def run_chunks(task_args, chunk_size):
+            # The messages carry the hash and path of each stored image, no bytes
+            for args in task_args:
+                self.assertIsNone(args[3])
+                self.assertEqual(set(args[8]), {"sha256", "size", "path"})
+                # The view already holds the blob reference the task will own
+                blob = ImageBlob.objects.get(pk=args[8]["sha256"])
+                self.assertEqual((blob.ref_count, blob.path), (1, args[8]["path"]))
+                upload_and_verify_image_task.run(*args)
+            return Mock(group=lambda: Mock(apply_async=lambda: Mock(id="group-id")))
+
+        chunks.side_effect = run_chunks
+        verify_image_content.return_value = {
+            "statut": "VRAIE",
+            "explication": "verified",
+            "confidence": 80,
+            "details": {"model": "vision-model"},
+        }
+        self.client.force_authenticate(user=self.mock_user)
+        images = [
+            SimpleUploadedFile("a.png", b"first-image", content_type="image/png"),
+            SimpleUploadedFile("b.png", b"second-image", content_type="image/png"),
+            SimpleUploadedFile("copy-of-a.png", b"first-image", content_type="image/png"),
+        ]
+
+        response = self.client.post(
+            "/api/image-verifications/batch/",
+            {"images": images, "claim_text": "claim", "verification_type": "content"},
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["total"], 2)
+        self.assertEqual(response.data["duplicates"], [{"filename": "copy-of-a.png", "duplicate_of": "a.png"}])
+        self.assertEqual(upload_image_to_supabase.call_count, 2)
+
+        progress = self.client.get(f"/api/image-verifications/batch/{response.data['batch_id']}/")
+
+        self.assertEqual(progress.status_code, status.HTTP_200_OK)
+        self.assertEqual(progress.data["status"], "TERMINÉ")
+        self.assertEqual(progress.data["completed"], 2)
+        self.assertEqual(progress.data["pending"], 0)
+        self.assertEqual({item["status"] for item in progress.data["items"]}, {"VRAIE"})
+        self.assertEqual(list(ImageBlob.objects.values_list("ref_count", flat=True)), [1, 1])
+
+    @patch("core.tasks.upload_and_verify_image_task.chunks")
+    @patch("core.views.upload_image_to_supabase")
+    @patch("core.views.ensure_bucket_exists", Mock(return_value={"success": True}))
+    def test_batch_releases_blob_references_it_cannot_hand_over(self, upload_image_to_supabase, chunks):
+        stored = ImageBlob.objects.create(
+            sha256=hashlib.sha256(b"stored-image").hexdigest(),
+            path="u/stored.png",
+            url="https://storage.test/stored.png",
+            ref_count=1,
+        )
+        upload_image_to_supabase.side_effect = lambda image_file, user_id, verification_type: (
+            {"success": False, "error": "storage down"} if image_file.name == "broken.png"
+            else {"success": True, "file_path": f"{user_id}/{image_file.name}"}
+        )
+        chunks.return_value = Mock(group=lambda: Mock(apply_async=Mock(side_effect=ConnectionError("broker down"))))
+        self.client.force_authenticate(user=self.mock_user)
+        images = [
+            SimpleUploadedFile("stored.png", b"stored-image", content_type="image/png"),
+            SimpleUploadedFile("new.png", b"new-image", content_type="image/png"),
+            SimpleUploadedFile("broken.png", b"broken-image", content_type="image/png"),
+        ]
+
+        with patch("core.services.supabase_storage.delete_image_from_supabase", return_value={"success": True}) as delete:
+            response = self.client.post(
+                "/api/image-verifications/batch/",
+                {"images": images, "verification_type": "content"},
+                format="multipart",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # The stored image is reused without upload and keeps only its earlier reference
+        self.assertEqual(upload_image_to_supabase.call_count, 2)
+        self.assertEqual(list(ImageBlob.objects.values_list("sha256", "ref_count")), [(stored.sha256, 1)])
+        delete.assert_called_once_with(f"{self.mock_user.id}/new.png")
+
+    @patch("core.tasks.upload_and_verify_image_task.chunks")
+    @patch("core.views.upload_image_to_supabase")
+    @patch("core.views.ensure_bucket_exists", Mock(return_value={"success": True}))
+    @override_settings(
+        RATE_LIMIT_VERIFICATIONS_PER_MINUTE=10,
+        RATE_LIMIT_VERIFICATIONS_BURST=20,
+        RATE_LIMIT_IMAGE_BATCHES_PER_MINUTE=10,
+        RATE_LIMIT_IMAGE_BATCHES_BURST=50,
+    )
+    def test_batch_larger_than_verification_burst_is_accepted(self, upload_image_to_supabase, chunks):
+        upload_image_to_supabase.side_effect = lambda image_file, user_id, verification_type: {
+            "success": True,
+            "file_path": f"{user_id}/{image_file.name}",
+        }
+        chunks.return_value = Mock(group=lambda: Mock(apply_async=lambda: Mock(id="group-id")))
+        redis = Mock(eval=Mock(return_value=[1, "25", "0"]))
+        self.client.force_authenticate(user=self.mock_user)
+        images = [
+            SimpleUploadedFile(f"{index}.png", f"image-{index}".encode(), content_type="image/png")
+            for index in range(25)
+        ]
+
+        with patch("core.services.rate_limit.get_redis_client", return_value=redis):
+            response = self.client.post(
+                "/api/image-verifications/batch/",
+                {"images": images, "verification_type": "content"},
+                format="multipart",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["total"], 25)
+        keys_and_args = redis.eval.call_args.args[1:]
+        self.assertEqual(keys_and_args[1], f"ratelimit:image_batches:{self.mock_user.id}")
+        self.assertEqual(keys_and_args[-1], 25)
+
+    @patch("core.tasks.upload_and_verify_image_task.chunks")
+    @patch("core.views.upload_image_to_supabase", Mock(return_value={"success": True, "file_path": "u/a.png"}))
+    @patch("core.views.ensure_bucket_exists", Mock(return_value={"success": True}))
+    def test_batch_idempotency_key_is_claimed_for_the_whole_upload(self, chunks):
+        chunks.return_value = Mock(group=lambda: Mock(apply_async=lambda: Mock(id="group-id")))
+        redis = Mock(set=Mock(return_value=True))
+        self.client.force_authenticate(user=self.mock_user)
+        image = SimpleUploadedFile("a.png", b"image", content_type="image/png")
+
+        with patch("core.services.idempotency.get_redis_client", return_value=redis):
+            response = self.client.post(
+                "/api/image-verifications/batch/",
+                {"images": [image], "verification_type": "content"},
+                format="multipart",
+                HTTP_IDEMPOTENCY_KEY="batch-1",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        # Claimed longer than the default PENDING_TTL, which 50 uploads can exceed
+        claim = redis.set.call_args_list[0]
+        self.assertEqual(claim.kwargs, {"nx": True, "ex": settings.IDEMPOTENCY_BATCH_PENDING_TTL})
+
+    def test_batch_rejects_invalid_type_and_unknown_batch(self):
+        self.client.force_authenticate(user=self.mock_user)
+        image = SimpleUploadedFile("a.png", b"image", content_type="image/png")
+
+        response = self.client.post(
+            "/api/image-verifications/batch/",
+            {"images": [image], "verification_type": "unknown"},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        missing = self.client.get(f"/api/image-verifications/batch/{uuid.uuid4()}/")
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ClaimImportViewTest(TestCase):
+    """Test the bulk claim import endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.mock_user = MockSupabaseUser()
+        self.mock_user.app_metadata = {"claim_import": True}
+
+    def test_import_requires_auth(self):
+        response = self.client.post("/api/submissions/batch/")
+        self.assertIn(response.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN])
+
+    def test_import_is_reserved_to_partners(self):
+        self.client.force_authenticate(user=MockSupabaseUser())
+        claims = SimpleUploadedFile("claims.csv", b"texte\nClaim one\n", content_type="text/csv")
+
+        response = self.client.post("/api/submissions/batch/", {"file": claims}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Submission.objects.exists())
+
+    @patch("core.services.claim_import.fair_queue.submit_many")
+    @override_settings(CLAIM_IMPORT_CHUNK_SIZE=2)
+    def test_import_creates_submissions_in_chunks_and_streams_results(self, submit_many):
+        self.client.force_authenticate(user=self.mock_user)
+        claims = SimpleUploadedFile(
+            "claims.csv",
+            "texte,source\nFirst claim,https://a.test\n,\nSecond claim,\nfirst  CLAIM,\nThird claim,\n".encode(),
+            content_type="text/csv",
+        )
+
+        response = self.client.post("/api/submissions/batch/", {"file": claims}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["total"], 3)
+        self.assertEqual(response.data["duplicates"], [{"line": 5, "duplicate_of": 2}])
+        self.assertEqual(response.data["rejected"], [{"line": 3, "error": "Texte vide"}])
+        # One batched analysis (LLM_BATCH_SIZE claims per LLM call) per chunk
+        self.assertEqual(
+            [[len(ids) for ids, in call.args[2]] for call in submit_many.call_args_list], [[2], [1]]
+        )
+        batch = SubmissionBatch.objects.get(id=response.data["batch_id"])
+        self.assertEqual(batch.submissions.filter(statut="en cours").count(), 3)
+
+        batch.submissions.filter(texte="First claim").update(
+            statut="vérifié", verdict="VRAIE", detailed_result="Confirmed",
+            web_sources=[{"link": "https://source.test"}],
+        )
+        progress = self.client.get(f"/api/submissions/batch/{batch.id}/")
+        self.assertEqual(progress.status_code, status.HTTP_200_OK)
+        self.assertEqual(progress.data["status"], "EN_COURS")
+        self.assertEqual((progress.data["completed"], progress.data["pending"]), (1, 2))
+        self.assertEqual(progress.data["verdicts"], {"VRAIE": 1})
+
+        results = self.client.get(f"/api/submissions/batch/{batch.id}/results/?output=ndjson")
+        self.assertEqual(results.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in b"".join(results.streaming_content).decode().splitlines()]
+        self.assertEqual([row["texte"] for row in rows], ["First claim", "Second claim", "Third claim"])
+        self.assertEqual(rows[0]["sources"], ["https://source.test"])
+
+        csv_results = self.client.get(f"/api/submissions/batch/{batch.id}/results/")
+        lines = b"".join(csv_results.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,texte,source,statut,verdict,detailed_result,sources,verified_at")
+        self.assertEqual(len(lines), 4)
+
+    def test_import_rejects_invalid_files_and_unknown_batch(self):
+        self.client.force_authenticate(user=self.mock_user)
+        no_text_column = SimpleUploadedFile("claims.csv", b"title\nClaim\n", content_type="text/csv")
+        response = self.client.post("/api/submissions/batch/", {"file": no_text_column}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        unknown_format = SimpleUploadedFile("claims.txt", b"Claim\n", content_type="text/plain")
+        response = self.client.post("/api/submissions/batch/", {"file": unknown_format}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        missing = self.client.get(f"/api/submissions/batch/{uuid.uuid4()}/")
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
@@ -0,0 +1,317 @@
+"""
+Lightweight distributed tracing for the verification pipeline.
+
+A trace starts at the HTTP request (TracingMiddleware, continuing an incoming
+W3C traceparent header), follows every Celery task it enqueues (the
+traceparent is injected into the message headers by before_task_publish and
+picked up by task_prerun) and contains one span per service call: every
+metrics.observe_stage() block is also a span.
+
+Spans are exported in the OTLP/HTTP JSON format, either to a collector
+(TRACING_EXPORTER=otlp, TRACING_OTLP_ENDPOINT) or appended to a JSON-lines
+file (TRACING_EXPORTER=file, TRACING_FILE). With TRACING_EXPORTER unset,
+tracing is disabled and span() costs a settings lookup.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+PRODUCER = 4
+CONSUMER = 5
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_current_span = ContextVar("current_span", default=None)
+_service_name = None
+
+
+class SpanContext:
+    """Identifiers of a span, local or received from another process."""
+
+    def __init__(self, trace_id, span_id):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+class Span(SpanContext):
+    def __init__(self, name, kind, parent, attributes):
+        super().__init__(
+            parent.trace_id if parent else os.urandom(16).hex(),
+            os.urandom(8).hex(),
+        )
+        self.name = name
+        self.kind = kind
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_error(self, error):
+        self.error = f"{type(error).__name__}: {error}"
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def enabled():
+    return bool(getattr(settings, "TRACING_EXPORTER", ""))
+
+
+def set_service_name(name):
+    """Override the service name (Celery workers report as a separate service)."""
+    global _service_name
+    _service_name = name
+
+
+def current_span():
+    return _current_span.get()
+
+
+def parse_traceparent(value):
+    """Return the SpanContext encoded in a W3C traceparent, or None."""
+    match = _TRACEPARENT.match((value or "").strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return SpanContext(match.group(1), match.group(2))
+
+
+@contextmanager
+def span(name, kind=INTERNAL, parent=None, **attributes):
+    """
+    Open a span as a child of `parent` (default: the current span).
+
+    Yields the Span, or None when tracing is disabled. An exception raised in
+    the block marks the span as failed and is re-raised.
+    """
+    if not enabled():
+        yield None
+        return
+    current = Span(name, kind, parent or _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.record_error(e)
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        _exporter().export(current)
+
+
+@contextmanager
+def use_traceparent(value):
+    """
+    Make the span of a W3C traceparent (None: no span) the current span for
+    the block, so the tasks it publishes join that trace.
+
+    Used to send a task later, from another request or task, in the trace of
+    the request that queued it.
+    """
+    token = _current_span.set(parse_traceparent(value))
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+
+
+def start_span(name, kind=INTERNAL, parent=None, **attributes):
+    """
+    Open a span that outlives the calling frame (closed by end_span).
+
+    Used where the start and end of the work are two separate callbacks,
+    such as Celery's task_prerun / task_postrun signals.
+    """
+    if not enabled():
+        return None, None
+    current = Span(name, kind, parent or _current_span.get(), attributes)
+    return current, _current_span.set(current)
+
+
+def end_span(current, token):
+    if current is None:
+        return
+    current.end_ns = time.time_ns()
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        _current_span.set(None)  # Reset from another context: just detach
+    _exporter().export(current)
+
+
+def _resource_spans(spans):
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                _otlp_attribute("service.name", _service_name or settings.TRACING_SERVICE_NAME),
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "check-ia"},
+                "spans": [span.to_otlp() for span in spans],
+            }],
+        }]
+    }
+
+
+class _BatchExporter:
+    """
+    Export finished spans from a background thread, in batches, so request
+    and task threads never wait on the collector or the disk.
+    """
+
+    def __init__(self, write):
+        self.write = write
+        self.queue = queue.Queue(maxsize=settings.TRACING_MAX_QUEUE)
+        self.thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self.thread.start()
+        atexit.register(self.flush)
+
+    def export(self, finished):
+        try:
+            self.queue.put_nowait(finished)
+        except queue.Full:
+            pass  # Drop rather than slow down the pipeline
+
+    def _drain(self):
+        batch = []
+        while len(batch) < 512:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        batch = self._drain()
+        while batch:
+            try:
+                self.write(batch)
+            except Exception as e:
+                logger.warning(f"Trace export failed ({len(batch)} spans dropped): {e}")
+            batch = self._drain()
+
+    def _run(self):
+        while True:
+            time.sleep(settings.TRACING_FLUSH_INTERVAL)
+            self.flush()
+
+
+def _write_otlp(batch):
+    response = requests.post(
+        settings.TRACING_OTLP_ENDPOINT,
+        data=json.dumps(_resource_spans(batch)),
+        headers={"Content-Type": "application/json"},
+        timeout=5,
+    )
+    response.raise_for_status()
+
+
+_file_lock = threading.Lock()
+
+
+def _write_file(batch):
+    line = json.dumps(_resource_spans(batch))
+    with _file_lock, open(settings.TRACING_FILE, "a", encoding="utf-8") as trace_file:
+        trace_file.write(line + "\n")
+
+
+_exporter_instance = None
+_exporter_lock = threading.Lock()
+
+
+def _exporter():
+    global _exporter_instance
+    if _exporter_instance is None:
+        with _exporter_lock:
+            if _exporter_instance is None:
+                write = _write_otlp if settings.TRACING_EXPORTER == "otlp" else _write_file
+                _exporter_instance = _BatchExporter(write)
+    return _exporter_instance
+
+
+# --- Celery propagation (signals connected in config/celery.py) ---
+
+_task_spans = {}
+
+
+def inject_task_headers(headers=None, **kwargs):
+    """before_task_publish: carry the current trace in the message headers."""
+    current = _current_span.get()
+    if current is not None and headers is not None:
+        headers["traceparent"] = current.traceparent
+
+
+def start_task_span(task_id=None, task=None, **kwargs):
+    """task_prerun: open the task span, continuing the publisher's trace."""
+    parent = parse_traceparent(getattr(task.request, "traceparent", None))
+    current, token = start_span(
+        f"celery {task.name}",
+        kind=CONSUMER,
+        parent=parent,
+        **{"celery.task_name": task.name, "celery.task_id": task_id},
+    )
+    if current is not None:
+        _task_spans[task_id] = (current, token)
+
+
+def end_task_span(task_id=None, state=None, **kwargs):
+    """task_postrun: close the task span."""
+    current, token = _task_spans.pop(task_id, (None, None))
+    if current is not None:
+        current.set_attribute("celery.state", state or "")
+        end_span(current, token)
+
+
+def flush():
+    """Export every finished span now (tests, worker shutdown)."""
+    if _exporter_instance is not None:
+        _exporter_instance.flush()
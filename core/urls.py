@@ -1,9 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from core.views import (
-    FactViewSet, SubmissionViewSet, VerifiedMediaViewSet, KeywordViewSet,
+    DomainReliabilityViewSet, FactViewSet, SubmissionViewSet, VerifiedMediaViewSet, KeywordViewSet,
     verify_image_content_view, detect_ai_image_view, get_image_verifications_view,
-    check_task_status_view, bambara_translate_view, bambara_transcribe_view
+    check_task_status_view, task_events_view, bambara_translate_view, bambara_transcribe_view,
+    verify_image_batch_view, get_image_batch_view,
+    import_claims_view, get_claim_import_view, download_claim_import_results_view
 )
 from core.services.deep_translator import get_facts_translated
 # from . import views
@@ -13,14 +15,22 @@ router.register(r'facts', FactViewSet)
 router.register(r'submissions', SubmissionViewSet)
 router.register(r'verified_media', VerifiedMediaViewSet)
 router.register(r'keywords', KeywordViewSet)
+router.register(r'domains', DomainReliabilityViewSet)
 
 urlpatterns = [
+    # Avant le routeur : submissions/<pk>/ capturerait « batch »
+    path('submissions/batch/', import_claims_view, name='import_claims'),
+    path('submissions/batch/<uuid:batch_id>/', get_claim_import_view, name='get_claim_import'),
+    path('submissions/batch/<uuid:batch_id>/results/', download_claim_import_results_view, name='claim_import_results'),
     path('', include(router.urls)),
     path('facts_translated/', get_facts_translated, name='get_facts_translated'),
     path('verify-image-content/', verify_image_content_view, name='verify_image_content'),
     path('detect-ai-image/', detect_ai_image_view, name='detect_ai_image'),
     path('image-verifications/', get_image_verifications_view, name='get_image_verifications'),
+    path('image-verifications/batch/', verify_image_batch_view, name='verify_image_batch'),
+    path('image-verifications/batch/<uuid:batch_id>/', get_image_batch_view, name='get_image_batch'),
     path('task-status/<str:task_id>/', check_task_status_view, name='check_task_status'),
+    path('task-events/<str:task_id>/', task_events_view, name='task_events'),
     path('bambara/translate/', bambara_translate_view, name='bambara_translate'),
     path('bambara/transcribe/', bambara_transcribe_view, name='bambara_transcribe'),
 ]
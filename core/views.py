@@ -1,33 +1,153 @@
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework import status
-from core.models import Fact, Submission, VerifiedMedia, Keyword, ImageVerification
-from core.serializers import FactSerializer, SubmissionSerializer, VerifiedMediaSerializer, KeywordSerializer
-from django.http import HttpResponse, JsonResponse
+from core.models import (
+    DomainReliability, Fact, Submission, SubmissionBatch, VerifiedMedia, Keyword, ImageBlob, ImageVerification,
+    ImageVerificationBatch
+)
+from core.serializers import DomainReliabilitySerializer, FactSerializer, SubmissionSerializer, VerifiedMediaSerializer, KeywordSerializer
+from django.db.models import F
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-from .services.keywords_extractor import extract_keywords
 from deep_translator import GoogleTranslator
 from django.conf import settings
 from supabase import create_client, Client
+import asyncio
+import functools
+import hashlib
 import json
-from .services.ai_analysis import analyze_text
+import math
 from .services.image_verification import verify_image_content, detect_ai_generated_image
-from .services.supabase_storage import upload_image_to_supabase, create_bucket_if_not_exists
+from .services.supabase_storage import upload_image_to_supabase, create_bucket_if_not_exists, ensure_bucket_exists
 from .services.bambara_voice import translate_bambara_text, transcribe_bambara_audio
+from .services.progress import (
+    register_progress_owner, progress_channel, progress_history_key, progress_owner_key, is_terminal,
+    PROGRESS_STATE
+)
+from .services.redis_client import get_async_redis_client, get_redis_client
+from .services import claim_import, fair_queue, idempotency, rate_limit, sources
+from .authentication import SupabaseAuthentication
+from .permissions import IsClaimImportPartner
+from .metrics import render_metrics
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _throttled_response(user, cost=1, scope=rate_limit.VERIFICATIONS):
+    """
+    Réponse 429 si l'utilisateur a dépassé sa limite de vérifications, sinon None.
+
+    cost: nombre de vérifications lancées par la requête (une par image d'un lot)
+    scope: compteur utilisé (les lots d'images et les imports de fichiers ont le leur)
+    """
+    limit = rate_limit.take(scope, user.id, cost)
+    if limit['allowed']:
+        return None
+    if limit['retry_after'] is None:
+        _, burst = rate_limit.scope_limits(scope)
+        return Response(
+            {"error": f"Une requête ne peut pas lancer plus de {burst} vérifications"},
+            status=status.HTTP_429_TOO_MANY_REQUESTS
+        )
+    retry_after = math.ceil(limit['retry_after'])
+    return Response(
+        {"error": f"Trop de vérifications lancées, réessayez dans {retry_after} secondes", "retry_after": retry_after},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={'Retry-After': str(retry_after)}
+    )
+
+
+def idempotent(view=None, *, pending_ttl=idempotency.PENDING_TTL):
+    """
+    Rend une vue de création idempotente avec l'en-tête Idempotency-Key :
+    une requête répétée avec la même clé reçoit la réponse de la première,
+    sans nouvel enregistrement ni nouvelle tâche.
+
+    pending_ttl (secondes) doit dépasser la durée maximale de la vue, sinon
+    une nouvelle tentative pendant son exécution la relancerait.
+    """
+    if view is None:
+        return functools.partial(idempotent, pending_ttl=pending_ttl)
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        request = next(arg for arg in args if isinstance(arg, Request))
+        key = request.headers.get(idempotency.HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > idempotency.MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"La clé d'idempotence ne peut pas dépasser {idempotency.MAX_KEY_LENGTH} caractères"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user_id = request.user.id
+        fingerprint = idempotency.request_fingerprint(request)
+        previous = idempotency.begin(user_id, key, fingerprint, pending_ttl)
+        if previous['state'] == idempotency.DONE:
+            logger.info(f"Requête rejouée pour la clé d'idempotence {key}")
+            return Response(previous['data'], status=previous['status'], headers={idempotency.REPLAYED_HEADER: 'true'})
+        if previous['state'] == idempotency.PENDING:
+            return Response(
+                {"error": "Une requête avec cette clé d'idempotence est déjà en cours de traitement"},
+                status=status.HTTP_409_CONFLICT
+            )
+        if previous['state'] == idempotency.MISMATCH:
+            return Response(
+                {"error": "Cette clé d'idempotence a déjà été utilisée pour une autre requête"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+
+        try:
+            response = view(*args, **kwargs)
+        except Exception:
+            idempotency.release(user_id, key)
+            raise
+        if status.is_success(response.status_code):
+            idempotency.complete(user_id, key, fingerprint, response.status_code, response.data)
+        else:
+            idempotency.release(user_id, key)
+        return response
+    return wrapper
+
 
 class FactViewSet(viewsets.ModelViewSet):
-    queryset = Fact.objects.all().order_by('-date')  # Tri par date de création en ordre décroissant (LIFO)
+    # Faits dont le verdict est toujours VRAIE (la re-vérification peut le retirer)
+    queryset = Fact.objects.filter(verdict='VRAIE').order_by('-date')  # Tri par date de création en ordre décroissant (LIFO)
     serializer_class = FactSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # ?domain=example.org : faits citant une source de ce domaine
+        domain = sources.domain_of(self.request.query_params.get('domain', ''))
+        if domain:
+            queryset = queryset.filter(sources__domain=domain).distinct()
+        return queryset
+
+
+class DomainReliabilityViewSet(viewsets.ReadOnlyModelViewSet):
+    # Verdicts des déclarations citant chaque domaine : /domains/ (dernier
+    # domaine cité en premier) et /domains/<domaine>/
+    queryset = DomainReliability.objects.order_by(F('last_seen').desc(nulls_last=True), 'domain')
+    serializer_class = DomainReliabilitySerializer
+    permission_classes = [IsAuthenticated]
+    lookup_field = 'domain'
+    lookup_value_regex = '[^/]+'
+
+    def get_object(self):
+        # www.Example.org ou une URL désignent le même domaine
+        self.kwargs['domain'] = sources.domain_of(self.kwargs['domain'])
+        return super().get_object()
+
 
 class KeywordViewSet(viewsets.ModelViewSet):
     queryset = Keyword.objects.all()
@@ -41,6 +161,7 @@ class SubmissionViewSet(viewsets.ModelViewSet):
     serializer_class = SubmissionSerializer
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         try:
             logger.info("=== NOUVELLE SOUMISSION DE VÉRIFICATION ===")
@@ -61,6 +182,10 @@ class SubmissionViewSet(viewsets.ModelViewSet):
                     {"error": "Le texte ne peut pas être vide"}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
+
+            throttled = _throttled_response(user)
+            if throttled is not None:
+                return throttled
             
             # Create submission with "en cours" status
             submission = Submission.objects.create(
@@ -78,15 +203,16 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             
             # Launch async analysis task
             from .tasks import analyze_submission_text_task
-            task_result = analyze_submission_text_task.delay(submission.id, texte)
+            task_id = fair_queue.submit(analyze_submission_text_task, user.id, submission.id, texte)
             
-            logger.info(f"Tâche Celery lancée - Task ID: {task_result.id}")
+            logger.info(f"Tâche Celery lancée - Task ID: {task_id}")
+            register_progress_owner(task_id, user.id)
             logger.info("=== SOUMISSION CRÉÉE - ANALYSE EN COURS ===")
             
             # Return the submission with "en cours" status
             serializer = self.get_serializer(submission)
             response_data = serializer.data
-            response_data['task_id'] = task_result.id  # Include task ID for tracking
+            response_data['task_id'] = task_id  # Include task ID for tracking
             
             return Response(response_data, status=status.HTTP_201_CREATED)
             
@@ -303,6 +429,7 @@ def bambara_transcribe_view(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def verify_image_content_view(request):
     """
     API endpoint for image content verification - Using Celery async tasks
@@ -327,12 +454,18 @@ def verify_image_content_view(request):
         logger.info(f"Image reçue: {image_file.name}")
         logger.info(f"Affirmation: {claim_text}")
         
+        throttled = _throttled_response(user)
+        if throttled is not None:
+            return throttled
+
         # Read image data
         image_data = image_file.read()
         
         # Launch async upload and verification task
         from .tasks import upload_and_verify_image_task
-        task_result = upload_and_verify_image_task.delay(
+        task_id = fair_queue.submit(
+            upload_and_verify_image_task,
+            user.id,
             str(user.id),
             user.email,
             getattr(user, 'user_metadata', {}).get('full_name', ''),
@@ -342,11 +475,12 @@ def verify_image_content_view(request):
             'content'
         )
         
-        logger.info(f"Tâche de vérification d'image lancée - Task ID: {task_result.id}")
+        logger.info(f"Tâche de vérification d'image lancée - Task ID: {task_id}")
+        register_progress_owner(task_id, user.id)
         
         return Response({
             'message': 'Vérification d\'image lancée',
-            'task_id': task_result.id,
+            'task_id': task_id,
             'status': 'EN_COURS'
         }, status=status.HTTP_202_ACCEPTED)
         
@@ -362,6 +496,7 @@ def verify_image_content_view(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def detect_ai_image_view(request):
     """
     API endpoint for detecting AI-generated images - Using Celery async tasks
@@ -384,12 +519,18 @@ def detect_ai_image_view(request):
         
         logger.info(f"Image reçue pour détection IA: {image_file.name}")
         
+        throttled = _throttled_response(user)
+        if throttled is not None:
+            return throttled
+
         # Read image data
         image_data = image_file.read()
         
         # Launch async upload and detection task
         from .tasks import upload_and_verify_image_task
-        task_result = upload_and_verify_image_task.delay(
+        task_id = fair_queue.submit(
+            upload_and_verify_image_task,
+            user.id,
             str(user.id),
             user.email,
             getattr(user, 'user_metadata', {}).get('full_name', ''),
@@ -399,11 +540,12 @@ def detect_ai_image_view(request):
             'ai_detection'
         )
         
-        logger.info(f"Tâche de détection IA lancée - Task ID: {task_result.id}")
+        logger.info(f"Tâche de détection IA lancée - Task ID: {task_id}")
+        register_progress_owner(task_id, user.id)
         
         return Response({
             'message': 'Détection IA lancée',
-            'task_id': task_result.id,
+            'task_id': task_id,
             'status': 'EN_COURS'
         }, status=status.HTTP_202_ACCEPTED)
         
@@ -417,6 +559,345 @@ def detect_ai_image_view(request):
         )
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotent(pending_ttl=settings.IDEMPOTENCY_BATCH_PENDING_TTL)
+def verify_image_batch_view(request):
+    """
+    API endpoint for verifying many images at once - Using a Celery group
+
+    Identical files (same SHA-256) are verified only once. The group is split
+    into at most IMAGE_BATCH_CONCURRENCY chunks so a single batch cannot occupy
+    more workers than that. The files are stored here, one at a time, and the
+    tasks only receive their hash and storage path: the broker messages never
+    carry image bytes. Each task owns the blob reference taken here and
+    releases it if its verification fails.
+    """
+    try:
+        logger.info("=== NOUVELLE VÉRIFICATION D'IMAGES PAR LOT ===")
+
+        user = request.user
+        logger.info(f"Utilisateur authentifié: {user.email}")
+
+        image_files = request.FILES.getlist('images')
+        claim_text = request.data.get('claim_text', '')
+        verification_type = request.data.get('verification_type', 'content')
+
+        if not image_files:
+            return Response(
+                {"error": "Aucune image fournie"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if verification_type not in ('content', 'ai_detection'):
+            return Response(
+                {"error": "Type de vérification invalide"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(image_files) > settings.IMAGE_BATCH_MAX_FILES:
+            return Response(
+                {"error": f"Un lot ne peut pas dépasser {settings.IMAGE_BATCH_MAX_FILES} images"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Dédupliquer les fichiers identiques par empreinte de contenu
+        unique_images = {}
+        duplicates = []
+        for image_file in image_files:
+            digest = hashlib.sha256()
+            for chunk in image_file.chunks():
+                digest.update(chunk)
+            content_hash = digest.hexdigest()
+            if content_hash in unique_images:
+                duplicates.append({
+                    'filename': image_file.name,
+                    'duplicate_of': unique_images[content_hash].name,
+                })
+                continue
+            unique_images[content_hash] = image_file
+
+        logger.info(f"Images reçues: {len(image_files)}, uniques: {len(unique_images)}")
+
+        throttled = _throttled_response(user, cost=len(unique_images), scope=rate_limit.IMAGE_BATCHES)
+        if throttled is not None:
+            return throttled
+
+        batch = ImageVerificationBatch.objects.create(
+            supabase_user_id=user.id,
+            user_email=user.email,
+            verification_type=verification_type,
+            claim_text=claim_text,
+            total=len(unique_images),
+            duplicates=duplicates,
+        )
+
+        # Envoyer les fichiers au stockage (sauf ceux déjà stockés) : les
+        # tâches ne reçoivent que l'empreinte et le chemin de chaque image.
+        # La référence au blob est prise ici, avant l'upload ou la
+        # réutilisation du chemin stocké, puis transmise à la tâche : une
+        # suppression concurrente ne peut pas effacer l'objet entre-temps
+        user_name = getattr(user, 'user_metadata', {}).get('full_name', '')
+        task_args = []
+        bucket_checked = False
+        for content_hash, image_file in unique_images.items():
+            blob, _ = ImageBlob.acquire(content_hash, size=image_file.size)
+            path = blob.path
+            if not path:
+                if not bucket_checked:
+                    ensure_bucket_exists()
+                    bucket_checked = True
+                upload_result = upload_image_to_supabase(image_file, user.id, verification_type)
+                if not upload_result['success']:
+                    ImageBlob.release(content_hash)
+                    batch.failed_uploads += 1
+                    continue
+                path = upload_result['file_path']
+                # Chemin enregistré pour que la dernière référence supprime l'objet
+                ImageBlob.objects.filter(pk=content_hash, path='').update(path=path)
+            task_args.append((
+                str(user.id),
+                user.email,
+                user_name,
+                None,
+                image_file.name,
+                claim_text if verification_type == 'content' else '',
+                verification_type,
+                str(batch.id),
+                {'sha256': content_hash, 'size': image_file.size, 'path': path},
+            ))
+
+        if task_args:
+            # Concurrence bornée: au plus IMAGE_BATCH_CONCURRENCY tâches par lot
+            chunk_size = math.ceil(len(task_args) / max(1, settings.IMAGE_BATCH_CONCURRENCY))
+
+            from .tasks import upload_and_verify_image_task
+            try:
+                group_result = upload_and_verify_image_task.chunks(task_args, chunk_size).group().apply_async()
+            except Exception:
+                # Aucune tâche ne rendra les références prises pour elles
+                for args in task_args:
+                    ImageBlob.release(args[8]['sha256'])
+                raise
+            batch.task_id = group_result.id or ''
+        batch.save(update_fields=['task_id', 'failed_uploads'])
+
+        logger.info(f"Lot {batch.id} lancé - {len(task_args)} images, {batch.failed_uploads} uploads échoués")
+
+        return Response({
+            'message': 'Vérification du lot lancée',
+            'batch_id': str(batch.id),
+            'total': batch.total,
+            'duplicates': duplicates,
+            'status': 'EN_COURS'
+        }, status=status.HTTP_202_ACCEPTED)
+
+    except Exception as e:
+        logger.error(f"Erreur lors de la vérification par lot: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return Response(
+            {"error": f"Une erreur s'est produite: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_image_batch_view(request, batch_id):
+    """
+    API endpoint to get the aggregated progress of an image batch
+    """
+    try:
+        batch = ImageVerificationBatch.objects.filter(id=batch_id, supabase_user_id=request.user.id).first()
+        if batch is None:
+            return Response(
+                {"error": "Lot introuvable"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        items = []
+        completed = batch.failed_uploads
+        failed = batch.failed_uploads
+        for verification in batch.verifications.select_related('blob'):
+            if verification.status != 'EN_COURS':
+                completed += 1
+            if verification.status == 'ERREUR':
+                failed += 1
+            items.append({
+                'id': verification.id,
+                'original_filename': verification.original_filename,
+                'status': verification.status,
+                'confidence': verification.confidence,
+                'image_url': verification.image_url,
+                'thumbnail_url': (verification.blob.thumbnail_url or None) if verification.blob else None,
+            })
+
+        pending = max(0, batch.total - completed)
+
+        return Response({
+            'batch_id': str(batch.id),
+            'verification_type': batch.verification_type,
+            'status': 'EN_COURS' if pending else 'TERMINÉ',
+            'total': batch.total,
+            'completed': completed,
+            'failed': failed,
+            'pending': pending,
+            'duplicates': batch.duplicates,
+            'items': items,
+            'date': batch.date,
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération du lot: {e}")
+        return Response(
+            {"error": f"Une erreur s'est produite: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsClaimImportPartner])
+@idempotent
+def import_claims_view(request):
+    """
+    API endpoint for importing many claims from a CSV or NDJSON file
+
+    Reserved to partners (claim_import flag in their Supabase app_metadata).
+    The file is read line by line; the submissions are created in chunks and
+    their analyses queued in the user's fair queue. Returns the batch id to
+    follow the import.
+    """
+    try:
+        logger.info("=== NOUVEL IMPORT D'AFFIRMATIONS ===")
+
+        user = request.user
+        logger.info(f"Utilisateur authentifié: {user.email}")
+
+        claims_file = request.FILES.get('file')
+        if claims_file is None:
+            return Response(
+                {"error": "Aucun fichier fourni"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            file_format = claim_import.detect_format(claims_file.name, request.data.get('format'))
+            parsed = claim_import.parse_claims(claims_file, file_format)
+        except claim_import.ClaimImportError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        claims = parsed['claims']
+        logger.info(
+            f"Affirmations lues: {len(claims)}, doublons: {len(parsed['duplicates'])}, "
+            f"rejetées: {len(parsed['rejected'])}"
+        )
+        if not claims:
+            return Response(
+                {"error": "Aucune affirmation valide dans le fichier", "rejected": parsed['rejected']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        throttled = _throttled_response(user, cost=len(claims), scope=rate_limit.CLAIM_IMPORTS)
+        if throttled is not None:
+            return throttled
+
+        batch = SubmissionBatch.objects.create(
+            supabase_user_id=user.id,
+            user_email=user.email,
+            file_format=file_format,
+            filename=claims_file.name[:255],
+            total=len(claims),
+            duplicates=parsed['duplicates'],
+            rejected=parsed['rejected'],
+        )
+        claim_import.create_submissions(batch, claims, getattr(user, 'user_metadata', {}).get('full_name', ''))
+
+        logger.info(f"Import {batch.id} lancé - {batch.total} affirmations")
+
+        return Response({
+            'message': 'Import des affirmations lancé',
+            'batch_id': str(batch.id),
+            'total': batch.total,
+            'duplicates': batch.duplicates,
+            'rejected': batch.rejected,
+            'status': 'EN_COURS'
+        }, status=status.HTTP_202_ACCEPTED)
+
+    except Exception as e:
+        logger.error(f"Erreur lors de l'import des affirmations: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return Response(
+            {"error": f"Une erreur s'est produite: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_claim_import_view(request, batch_id):
+    """
+    API endpoint to get the aggregated progress of a claim import
+    """
+    try:
+        batch = SubmissionBatch.objects.filter(id=batch_id, supabase_user_id=request.user.id).first()
+        if batch is None:
+            return Response(
+                {"error": "Import introuvable"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        progress = claim_import.batch_progress(batch)
+        return Response({
+            'batch_id': str(batch.id),
+            'filename': batch.filename,
+            'format': batch.file_format,
+            'status': 'EN_COURS' if progress['pending'] else 'TERMINÉ',
+            **progress,
+            'duplicates': batch.duplicates,
+            'rejected': batch.rejected,
+            'date': batch.date,
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération de l'import: {e}")
+        return Response(
+            {"error": f"Une erreur s'est produite: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def download_claim_import_results_view(request, batch_id):
+    """
+    API endpoint streaming the results of a claim import as CSV or NDJSON
+    (?output=csv|ndjson, the format of the imported file by default)
+    """
+    batch = SubmissionBatch.objects.filter(id=batch_id, supabase_user_id=request.user.id).first()
+    if batch is None:
+        return Response(
+            {"error": "Import introuvable"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    output = request.query_params.get('output', batch.file_format)
+    if output not in claim_import.FORMATS:
+        return Response(
+            {"error": "Format de sortie non pris en charge (csv ou ndjson)"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    content_type = 'text/csv' if output == claim_import.CSV else 'application/x-ndjson'
+    response = StreamingHttpResponse(
+        claim_import.export_results(batch, output),
+        content_type=f'{content_type}; charset=utf-8'
+    )
+    response['Content-Disposition'] = f'attachment; filename="import-{batch.id}.{output}"'
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_image_verifications_view(request):
@@ -425,10 +906,13 @@ def get_image_verifications_view(request):
     """
     try:
         user = request.user
-        verifications = ImageVerification.objects.filter(supabase_user_id=user.id)
+        verifications = ImageVerification.objects.filter(
+            supabase_user_id=user.id
+        ).select_related('blob')
         
         verification_data = []
         for verification in verifications:
+            blob = verification.blob
             verification_data.append({
                 'id': verification.id,
                 'verification_type': verification.verification_type,
@@ -438,6 +922,9 @@ def get_image_verifications_view(request):
                 'confidence': verification.confidence,
                 'date': verification.date,
                 'image_url': verification.image_url,
+                # Dérivés WebP légers pour les listes (None pour les images anciennes)
+                'thumbnail_url': (blob.thumbnail_url or None) if blob else None,
+                'preview_url': (blob.preview_url or None) if blob else None,
                 'original_filename': verification.original_filename
             })
         
@@ -451,11 +938,29 @@ def get_image_verifications_view(request):
         )
 
 
+def _is_progress_owner(task_id, user):
+    """L'utilisateur a-t-il lancé la tâche (clé progress_owner_key, comme le flux SSE) ?"""
+    client = get_redis_client()
+    if client is None:
+        return False
+    try:
+        owner = client.get(progress_owner_key(task_id))
+    except Exception as e:
+        logger.warning(f"Propriétaire de la tâche {task_id} non vérifié: {e}")
+        return False
+    if isinstance(owner, bytes):
+        owner = owner.decode()
+    return owner == str(user.id)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def check_task_status_view(request, task_id):
     """
     API endpoint to check the status of a Celery task
+
+    The stages and partial results of a task in progress are only shown to
+    the user who launched it (same owner check as the event stream).
     """
     try:
         from celery.result import AsyncResult
@@ -483,6 +988,24 @@ def check_task_status_view(request, task_id):
                     'status': 'TERMINÉ',
                     'message': 'Tâche terminée avec succès'
                 }
+        elif task_result.state == PROGRESS_STATE and not _is_progress_owner(task_id, request.user):
+            response = {
+                'state': task_result.state,
+                'status': 'EN_COURS',
+                'message': 'Tâche en cours...'
+            }
+        elif task_result.state == PROGRESS_STATE:
+            # État personnalisé publié par StageTracker
+            info = task_result.info if isinstance(task_result.info, dict) else {}
+            response = {
+                'state': task_result.state,
+                'status': 'EN_COURS',
+                'stage': info.get('stage'),
+                'stages': info.get('stages', []),
+                'elapsed_ms': info.get('elapsed_ms'),
+                'partial': info.get('partial', {}),
+                'message': f"Dernière étape terminée: {info.get('stage')}"
+            }
         elif task_result.state == 'FAILURE':
             response = {
                 'state': task_result.state,
@@ -504,3 +1027,116 @@ def check_task_status_view(request, task_id):
             {"error": f"Une erreur s'est produite: {str(e)}"}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Prometheus metrics of the web process
+
+    Protected by METRICS_TOKEN (Authorization: Bearer <token>); closed while
+    the token is unset, so the endpoint is never world-readable by default.
+    """
+    token = settings.METRICS_TOKEN
+    if not token or request.META.get('HTTP_AUTHORIZATION') != f'Bearer {token}':
+        return JsonResponse({"error": "Non autorisé"}, status=401)
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
+
+
+def _format_sse(event):
+    data = f"event: {event['stage']}\ndata: {json.dumps(event, default=str)}\n\n"
+    if event.get('seq') is None:
+        return data  # Fragment d'explication : pas d'id, non rejouable
+    return f"id: {event['seq']}\n{data}"
+
+
+@require_GET
+async def task_events_view(request, task_id):
+    """
+    Server-sent events stream of a task's stage transitions
+
+    Replaces polling /task-status/: the client keeps one idle connection and
+    receives each stage (started, translated, classified, searched, uploaded,
+    analysed, saved, error) as it happens, plus "explanation" events carrying
+    the LLM explanation while it is generated. EventSource cannot send headers, so
+    the Supabase token is also accepted as the access_token query parameter.
+    Events missed before connecting (or before a reconnect, via Last-Event-ID)
+    are replayed first; the stream closes after saved or error.
+    """
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    token = request.GET.get('access_token') or (
+        auth_header.split(' ')[1] if auth_header.startswith('Bearer ') else None
+    )
+    if not token:
+        return JsonResponse({"error": "Authentification requise"}, status=401)
+    try:
+        user, _ = await sync_to_async(SupabaseAuthentication().authenticate_token)(token)
+    except AuthenticationFailed as e:
+        return JsonResponse({"error": str(e.detail)}, status=401)
+
+    client = get_async_redis_client()
+    if client is None:
+        return JsonResponse(
+            {"error": "Suivi en temps réel indisponible, utilisez /task-status/"},
+            status=503
+        )
+
+    try:
+        owner = await client.get(progress_owner_key(task_id))
+    except Exception as e:
+        logger.error(f"Redis indisponible pour le suivi de la tâche {task_id}: {e}")
+        await client.aclose()
+        return JsonResponse(
+            {"error": "Suivi en temps réel indisponible, utilisez /task-status/"},
+            status=503
+        )
+    if owner != str(user.id):
+        await client.aclose()
+        return JsonResponse({"error": "Tâche introuvable"}, status=404)
+
+    try:
+        last_seq = int(request.headers.get('Last-Event-ID') or 0)
+    except ValueError:
+        last_seq = 0
+
+    async def event_stream():
+        nonlocal last_seq
+        pubsub = client.pubsub()
+        try:
+            # S'abonner avant de relire l'historique pour ne rien perdre entre les deux
+            await pubsub.subscribe(progress_channel(task_id))
+            history = await client.lrange(progress_history_key(task_id), last_seq, -1)
+            for seq, payload in enumerate(history, start=last_seq + 1):
+                event = {**json.loads(payload), 'seq': seq}
+                last_seq = seq
+                yield _format_sse(event)
+                if is_terminal(event):
+                    return
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + settings.PROGRESS_SSE_MAX_DURATION
+            while loop.time() < deadline:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=settings.PROGRESS_SSE_KEEPALIVE
+                )
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                event = json.loads(message['data'])
+                if event.get('seq') is not None:
+                    if event['seq'] <= last_seq:
+                        continue  # Déjà envoyé lors de la relecture de l'historique
+                    last_seq = event['seq']
+                yield _format_sse(event)
+                if is_terminal(event):
+                    return
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Pas de mise en tampon par le proxy
+    return response